@@ -170,6 +170,7 @@ class MerchantQuoteService:
         target_margin: float | None = None,
         fixed_fee_per_tx: float = 0.0,
         avg_ticket: float | None = None,
+        fee_rate_sweep: list[float] | None = None,
     ) -> dict | None:
         if not onboarding_rows:
             return None
@@ -303,6 +304,9 @@ class MerchantQuoteService:
                                 profit_body["avg_ticket"] = avg_ticket
                             if target_margin is not None:
                                 profit_body["target_margin"] = target_margin
+                            if fee_rate_sweep:
+                                # Simulated profitability at every rate, on one set of draws
+                                profit_body["fee_rates"] = fee_rate_sweep
                             profit_resp = client.post(
                                 f"{_ML_SERVICE_URL}/ml/GetProfitForecast",
                                 json=profit_body,
@@ -326,6 +330,64 @@ class MerchantQuoteService:
             "profit": profit_payload,
         }
 
+    @staticmethod
+    def fee_rate_sweep_grid(
+        recommended_rate: float,
+        extra_rates_pct: list | None = None,
+        step_pct: float = 0.05,
+    ) -> list[float]:
+        """
+        Decimal fee rates for the profit simulation's sweep: every ``step_pct``
+        from 0.25 % to max(3.5 %, recommended + 0.5 %), plus the recommended
+        rate and any caller-supplied rates (in percent).
+        """
+        recommended_pct = round(recommended_rate * 100.0, 2)
+        grid_max = max(3.50, recommended_pct + 0.50)
+        steps = int((grid_max - 0.25) / step_pct + 1e-9)
+        grid_pct = {round(0.25 + step_pct * i, 2) for i in range(steps + 1)}
+        grid_pct.add(round(grid_max, 2))
+        if recommended_pct > 0:
+            grid_pct.add(recommended_pct)
+        for value in extra_rates_pct or []:
+            try:
+                value = round(float(value), 2)
+            except (TypeError, ValueError):
+                continue
+            if 0.0 < value < 100.0:
+                grid_pct.add(value)
+        return [round(v / 100.0, 6) for v in sorted(grid_pct)]
+
+    @staticmethod
+    def interpolate_sweep(rate: float, sweep_points: list[dict], key: str = "avg_p_profitable") -> float | None:
+        """``key`` of a simulated fee-rate sweep at ``rate``, linear between swept rates."""
+        points = sorted(
+            (float(p["fee_rate"]), float(p[key]))
+            for p in sweep_points
+            if p.get("fee_rate") is not None and p.get(key) is not None
+        )
+        if not points:
+            return None
+        if rate <= points[0][0]:
+            return points[0][1]
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            if rate <= x1:
+                return y0 + (y1 - y0) * (rate - x0) / (x1 - x0) if x1 > x0 else y1
+        return points[-1][1]
+
+    @classmethod
+    def p_profitable_at(
+        cls,
+        rate: float,
+        sweep_points: list[dict],
+        break_even: float,
+        std_dev: float,
+    ) -> float:
+        """Simulated P(profitable) at ``rate`` from the sweep; the Gaussian approximation without one."""
+        simulated = cls.interpolate_sweep(rate, sweep_points)
+        if simulated is not None:
+            return simulated
+        return cls.normal_cdf(rate, break_even, std_dev)
+
     @staticmethod
     def normal_cdf(x: float, mean: float, std_dev: float) -> float:
         safe_std = max(std_dev, 1e-9)
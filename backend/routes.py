@@ -581,6 +581,11 @@ def calculate_desired_margin_details(data: dict, db: Session = Depends(get_db)):
         target_margin=desired_margin,
         fixed_fee_per_tx=float(result.get("minimum_fee") or 0.0),
         avg_ticket=float(result.get("average_ticket") or 0.0) or None,
+        # The profitability curve is read off this simulated sweep.
+        fee_rate_sweep=MerchantQuoteService.fee_rate_sweep_grid(
+            recommended_rate,
+            data.get("rate_grid_pct") if isinstance(data.get("rate_grid_pct"), list) else None,
+        ),
     )
 
     def _safe_float(value: object, default: float = 0.0) -> float:
@@ -748,7 +753,9 @@ def calculate_desired_margin_details(data: dict, db: Session = Depends(get_db)):
             mc_summary = profit_payload.get("summary", {})
             break_even_rate = _safe_float(mc_summary.get("break_even_fee_rate"), recommended_rate * 0.9)
 
-            # P(profitable at rate r) = P(cost < r).
+            # Simulated curve: P(profit > 0 at rate r) from the profit
+            # forecast's fee-rate sweep, evaluated on one set of draws.
+            # Without a sweep (older ml-service): P(profitable at rate r) = P(cost < r).
             # Model cost as Gaussian with mean = avg cost_mid, σ from CI.
             # This is INDEPENDENT of the user's fee rate — the cost distribution
             # doesn't change based on what rate the merchant charges.
@@ -816,9 +823,15 @@ def calculate_desired_margin_details(data: dict, db: Session = Depends(get_db)):
             base_grid.add(recommended_rate_pct)
             rate_grid = sorted(base_grid)
 
+            # Simulated P(profitable) per rate when the profit forecast swept
+            # fee rates; the Gaussian approximation otherwise.
+            sweep_points = (profit_payload.get("sweep") or {}).get("points") or []
+
             for rate_pct in rate_grid:
                 rate_decimal = rate_pct / 100.0
-                probability_pct = MerchantQuoteService.normal_cdf(rate_decimal, effective_break_even, spread_sigma) * 100.0
+                probability_pct = MerchantQuoteService.p_profitable_at(
+                    rate_decimal, sweep_points, effective_break_even, spread_sigma
+                ) * 100.0
                 profitability_pct = ((rate_decimal - break_even_rate) / max(break_even_rate, 0.001)) * 100.0
                 profitability_curve.append(
                     {
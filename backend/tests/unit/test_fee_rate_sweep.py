@@ -0,0 +1,44 @@
+import pytest
+
+from modules.merchant_quote.service import MerchantQuoteService
+
+
+def test_sweep_grid_bounds_and_step():
+    grid = MerchantQuoteService.fee_rate_sweep_grid(0.02)
+    assert grid[0] == 0.0025
+    assert grid[-1] == 0.035
+    assert len(grid) == 66  # 0.25 % .. 3.50 % every 0.05 %
+    assert all(round(b - a, 6) == 0.0005 for a, b in zip(grid, grid[1:]))
+
+
+def test_sweep_grid_extends_past_recommended_rate():
+    grid = MerchantQuoteService.fee_rate_sweep_grid(0.0333, extra_rates_pct=[1.234, 'x', None, 0, 150])
+    assert grid[-1] == 0.0383  # recommended 3.33 % + 0.50 %
+    assert 0.0333 in grid
+    assert 0.0123 in grid
+    assert all(0 < rate < 1 for rate in grid)
+    assert grid == sorted(set(grid))
+
+
+def test_interpolate_between_and_beyond_swept_points():
+    points = [
+        {'fee_rate': 0.03, 'avg_p_profitable': 0.9},
+        {'fee_rate': 0.01, 'avg_p_profitable': 0.1},
+        {'fee_rate': 0.02, 'avg_p_profitable': None},
+    ]
+    assert MerchantQuoteService.interpolate_sweep(0.02, points) == pytest.approx(0.5)
+    assert MerchantQuoteService.interpolate_sweep(0.015, points) == pytest.approx(0.3)
+    assert MerchantQuoteService.interpolate_sweep(0.005, points) == 0.1
+    assert MerchantQuoteService.interpolate_sweep(0.05, points) == 0.9
+
+
+def test_normal_cdf_fallback_without_sweep():
+    assert MerchantQuoteService.interpolate_sweep(0.02, []) is None
+    assert MerchantQuoteService.interpolate_sweep(0.02, [{'fee_rate': 0.02}]) is None
+
+    assert MerchantQuoteService.p_profitable_at(0.015, [], 0.015, 0.002) == pytest.approx(0.5)
+    assert MerchantQuoteService.p_profitable_at(0.019, [], 0.015, 0.002) == pytest.approx(0.97725, abs=1e-4)
+    assert MerchantQuoteService.p_profitable_at(0.014, [], 0.015, 0.0) == 0.0
+
+    swept = [{'fee_rate': 0.01, 'avg_p_profitable': 0.2}, {'fee_rate': 0.02, 'avg_p_profitable': 0.6}]
+    assert MerchantQuoteService.p_profitable_at(0.015, swept, 0.015, 0.002) == pytest.approx(0.4)
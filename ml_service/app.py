@@ -19,10 +19,12 @@ import logging
 import os
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from database import init_db
+from engine_executor import EngineSaturatedError, shutdown_executors
 from routes import router
 
 logger = logging.getLogger(__name__)
@@ -40,6 +42,20 @@ async def lifespan(app: FastAPI):
     except Exception as exc:
         logger.warning("[KNN Seed] Seeding skipped: %s", exc)
 
+    # Materialize monthly KNN features if the feature store is empty
+    try:
+        from feature_store import refresh_if_empty
+        refresh_if_empty()
+    except Exception as exc:
+        logger.warning("[FeatureStore] Refresh skipped: %s", exc)
+
+    # Prebuild KNN neighbour indexes for KNN_PREBUILD_MCCS (others build on first use)
+    try:
+        from modules.knn_rate_quote.controller import warm_neighbor_indexes
+        warm_neighbor_indexes()
+    except Exception as exc:
+        logger.warning("[KNN] Neighbour index prebuild skipped: %s", exc)
+
     # Initialize processing-cost forecast artifacts (graceful — warns if missing)
     try:
         from modules.cost_forecast.service import initialize as init_proc_cost
@@ -47,16 +63,23 @@ async def lifespan(app: FastAPI):
     except Exception as exc:
         logger.warning("[ProcCost] Initialization skipped: %s", exc)
 
+    # Pre-generate the profit Monte Carlo base-sample bank (no-op without variance reduction)
+    try:
+        from modules.profit_forecast.service import initialize as init_profit
+        init_profit()
+    except Exception as exc:
+        logger.warning("[Profit] Sample bank preload skipped: %s", exc)
+
     # Initialize TPV forecast artifacts (graceful — does not crash if missing)
     try:
+        from config import MLConfig
         from modules.tpv_forecast.service import initialize as init_tpv, set_repository
-        from modules.tpv_forecast.repository import SQLAlchemyMerchantRepository
+        from reference_data import get_reference_data
 
-        db_url = os.environ.get("DATABASE_URL")
-        if not db_url:
+        if not os.environ.get("DATABASE_URL") and not MLConfig.REFERENCE_SNAPSHOT_DIR:
             raise ValueError("DATABASE_URL environment variable is not set")
-        repo = SQLAlchemyMerchantRepository(connection_string=db_url)
-        set_repository(repo)
+        # Same reference rows and cache as the KNN engine: one load per pipeline run.
+        set_repository(get_reference_data())
         init_tpv()
         print("[TPV] Initialization complete", flush=True)
     except Exception as exc:
@@ -66,6 +89,8 @@ async def lifespan(app: FastAPI):
 
     yield
 
+    shutdown_executors()
+
 
 app = FastAPI(
     title="ML Microservice",
@@ -88,4 +113,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(EngineSaturatedError)
+async def engine_saturated_handler(request: Request, exc: EngineSaturatedError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
 app.include_router(router)
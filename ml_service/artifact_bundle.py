@@ -0,0 +1,197 @@
+"""
+Single-file, memory-mappable artifact bundles.
+
+An artifact directory used to hold one joblib pickle per object (models,
+scaler, calibration residuals, risk models, stratification knots), and every
+worker unpickled all of them in full.  bundle.bin holds the same content as
+plain arrays behind a JSON header.  read_bundle() maps the file, so loading
+is a header parse, arrays are paged in on first touch, and workers on one
+host share those pages through the page cache.
+
+── LAYOUT (little-endian) ────────────────────────────────────────────────────
+0        8 bytes   magic b"MLBUNDLE"
+8        uint64    header length H
+16       H bytes   UTF-8 JSON header
+                   {"format_version": 1, "metadata": {config snapshot},
+                    "arrays": {name: {"dtype": "<f8", "shape": [...], "offset": n}}}
+data     arrays, each at a 64-byte aligned ``offset`` from the data start (the
+         first 64-byte boundary after the header)
+
+── CONTENT (pack_artifacts) ──────────────────────────────────────────────────
+linear/{coef,intercept,mean,scale}   per-horizon HuberRegressor + StandardScaler
+trees/*                              flat node arrays of every risk-model tree
+                                     (compiled_models.tree_arrays)
+cal/{merchant_ids,offsets,values}    calibration residuals, CSR by merchant
+                                     (calibration_residuals.ResidualStore)
+global_q90, strat/{knot_x,q_vals}    conformal fallback and stratification map
+
+A reader refuses files with a newer format_version than it knows; bump
+FORMAT_VERSION whenever a name or meaning above changes.
+
+Usage:
+    arrays = pack_artifacts(scaler, models, risk_models, cal_residuals, global_q90, knot_x, q_vals)
+    write_bundle(artifact_dir / BUNDLE_FILE, arrays, metadata=snapshot)   # training
+    bundle = read_bundle(artifact_dir / BUNDLE_FILE)                      # service
+    CompiledLinearPredictor.from_arrays(**bundle.group("linear"))
+    Convert pickled directories: python artifact_bundle.py artifacts/tpv artifacts/proc_cost
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Sequence
+
+import numpy as np
+
+from calibration_residuals import ResidualStore
+from compiled_models import linear_arrays, tree_arrays
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FILE = "bundle.bin"
+MAGIC = b"MLBUNDLE"
+FORMAT_VERSION = 1
+ALIGN = 64
+
+
+def _align(n: int) -> int:
+    return -(-n // ALIGN) * ALIGN
+
+
+def pack_residuals(cal_residuals: Mapping[int, Sequence[float]]) -> Dict[str, np.ndarray]:
+    """merchant_id → residuals as the CSR arrays of a ResidualStore (float32 values)."""
+    store = ResidualStore.from_dict(cal_residuals)
+    return {"merchant_ids": store.merchant_ids, "offsets": store.offsets, "values": store.values}
+
+
+def pack_artifacts(
+    scaler,
+    models: Sequence,
+    risk_models: Sequence,
+    cal_residuals: Mapping[int, Sequence[float]],
+    global_q90: float,
+    strat_knot_x: Optional[np.ndarray] = None,
+    strat_q_vals: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """Everything one (mcc, ctx_len) artifact directory holds, as named arrays."""
+    groups = {
+        "linear": linear_arrays(scaler, models),
+        "trees": tree_arrays(risk_models),
+        "cal": pack_residuals(cal_residuals),
+    }
+    arrays = {f"{group}/{name}": a for group, members in groups.items() for name, a in members.items()}
+    arrays["global_q90"] = np.array(float(global_q90))
+    if strat_knot_x is not None and strat_q_vals is not None:
+        arrays["strat/knot_x"] = np.asarray(strat_knot_x, dtype=float)
+        arrays["strat/q_vals"] = np.asarray(strat_q_vals, dtype=float)
+    return arrays
+
+
+def write_bundle(path: Path, arrays: Mapping[str, np.ndarray], metadata: Optional[Dict[str, Any]] = None) -> Path:
+    """Write ``arrays`` and ``metadata`` to ``path`` via a temporary file and an atomic rename."""
+    path = Path(path)
+    arrays = {name: np.array(a, dtype=np.asarray(a).dtype.newbyteorder("<"), order="C") for name, a in arrays.items()}
+    entries, end = {}, 0
+    for name, a in arrays.items():
+        entries[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": end}
+        end = _align(end + a.nbytes)
+    header = json.dumps(
+        {"format_version": FORMAT_VERSION, "metadata": metadata or {}, "arrays": entries}, default=float,
+    ).encode()
+    data_start = _align(len(MAGIC) + 8 + len(header))
+
+    tmp = path.with_name(f".tmp_{path.name}")
+    try:
+        with open(tmp, "wb") as fh:
+            fh.write(MAGIC + struct.pack("<Q", len(header)) + header)
+            for name, a in arrays.items():
+                fh.seek(data_start + entries[name]["offset"])
+                fh.write(a.tobytes())
+        os.replace(tmp, path)
+    except Exception:
+        tmp.unlink(missing_ok=True)
+        raise
+    return path
+
+
+@dataclass(frozen=True)
+class ArtifactFile:
+    path: Path
+    format_version: int
+    metadata: Dict[str, Any]
+    arrays: Dict[str, np.ndarray]  # read-only; views into the mapped file
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(a.nbytes for a in self.arrays.values()))
+
+    def group(self, prefix: str) -> Dict[str, np.ndarray]:
+        """Arrays named ``prefix/*``, keyed without the prefix."""
+        start = f"{prefix}/"
+        return {name[len(start):]: a for name, a in self.arrays.items() if name.startswith(start)}
+
+    def residuals(self) -> ResidualStore:
+        """Calibration residuals as a ResidualStore over the mapped CSR arrays."""
+        return ResidualStore.from_arrays(**self.group("cal"))
+
+
+def read_bundle(path: Path, mmap: bool = True) -> ArtifactFile:
+    """Open a bundle; with ``mmap=False`` the arrays are read into private memory instead."""
+    path = Path(path)
+    raw = np.memmap(path, dtype=np.uint8, mode="r") if mmap else np.fromfile(path, dtype=np.uint8)
+    if bytes(raw[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path} is not an artifact bundle")
+    (header_len,) = struct.unpack("<Q", bytes(raw[len(MAGIC):len(MAGIC) + 8]))
+    header = json.loads(bytes(raw[len(MAGIC) + 8:len(MAGIC) + 8 + header_len]))
+    version = header.get("format_version")
+    if not isinstance(version, int) or version > FORMAT_VERSION:
+        raise ValueError(f"{path} has unsupported bundle format_version {version!r} (max {FORMAT_VERSION})")
+
+    data_start = _align(len(MAGIC) + 8 + header_len)
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        start = data_start + entry["offset"]
+        count = int(np.prod(shape, dtype=np.int64))
+        arrays[name] = np.asarray(raw[start:start + count * dtype.itemsize]).view(dtype).reshape(shape)
+    return ArtifactFile(path=path, format_version=version, metadata=header["metadata"], arrays=arrays)
+
+
+# ---------------------------------------------------------------------------
+# Conversion of pickled artifact directories
+# ---------------------------------------------------------------------------
+
+def convert_directory(artifact_dir: Path) -> Path:
+    """Write bundle.bin for a directory of joblib pickles + config_snapshot.json."""
+    import joblib
+
+    d = Path(artifact_dir)
+    snapshot = json.loads((d / "config_snapshot.json").read_text())
+    strat = snapshot.get("strat_enabled", False) and (d / "strat_knot_x.pkl").exists()
+    arrays = pack_artifacts(
+        joblib.load(d / "scaler.pkl"),
+        joblib.load(d / "models.pkl"),
+        joblib.load(d / "risk_models.pkl"),
+        joblib.load(d / "cal_residuals.pkl"),
+        joblib.load(d / "global_q90.pkl"),
+        joblib.load(d / "strat_knot_x.pkl") if strat else None,
+        joblib.load(d / "strat_q_vals.pkl") if strat else None,
+    )
+    return write_bundle(d / BUNDLE_FILE, arrays, metadata=snapshot)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Write bundle.bin next to pickled forecast artifacts.")
+    parser.add_argument("base_paths", type=Path, nargs="+",
+                        help="Artifact base directories laid out as <base>/<mcc>/<ctx_len>/.")
+    args = parser.parse_args()
+    for base in args.base_paths:
+        for snapshot_path in sorted(base.glob("*/*/config_snapshot.json")):
+            logger.info("Wrote %s", convert_directory(snapshot_path.parent))
@@ -0,0 +1,424 @@
+"""
+Manifest-driven, lazily loaded artifact bundles for the forecast services.
+
+GetCostForecast and GetTPVForecast used to unpickle every bundle in a
+hard-coded SUPPORTED_MCCS × SUPPORTED_CONTEXT_LENS grid at startup and stat
+every one of them on each poll, so startup time and resident memory grew
+with every MCC trained.  An ArtifactStore instead reads an index of what is
+on disk once, loads a bundle the first time a request needs it, and keeps
+the loaded bundles in an LRU bounded by a memory budget.
+
+── MANIFEST ──────────────────────────────────────────────────────────────────
+<base>/manifest.json   written by training/{tpv,proc_cost}/train.py after
+                       every run:
+    {"version": 1, "generated_at": "...",
+     "bundles": [{"mcc": 5411, "context_len": 6, "trained_at": "...",
+                  "strat_enabled": true, "bytes": 437554}, ...]}
+Without a manifest file the store scans <base>/<mcc>/<ctx>/config_snapshot.json
+once instead.  Any MCC listed is served; there is no MCC list in config.
+
+── CACHE ─────────────────────────────────────────────────────────────────────
+get(mcc, ctx_len)      loads on first use; concurrent requests for the same
+                       bundle wait for a single load
+resolve(mcc, ctx_len)  exact context length, else the nearest one trained
+                       for the MCC; None when the MCC has no usable bundle
+max_bytes              budget on resident bundles, measured by their size on
+                       disk; least recently used bundles are evicted first
+hot_set                "5411,5812:6" — every context length of 5411 and ctx 6
+                       of 5812; loaded by preload() and never evicted
+poll()                 re-reads the manifest when its mtime changes (rescans
+                       when there is none) and reloads resident bundles whose
+                       config_snapshot.json changed; nothing else is stat'ed
+subscribe(callback)    ``callback(mcc)`` runs after a bundle of ``mcc`` is
+                       reloaded or its manifest entry changes, so results
+                       derived from the old bundle can be dropped
+
+Usage:
+    store = ArtifactStore("tpv", base_path, loader=_load_bundle,
+                          max_bytes=..., hot_set=parse_hot_set("5411"))
+    store.refresh_manifest(); store.preload()   # at startup
+    store.subscribe(result_cache.invalidate)
+    bundle = store.resolve(mcc, ctx_len)
+    GET /ml/artifacts/stats  → all_store_stats()
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from artifact_bundle import BUNDLE_FILE
+
+logger = logging.getLogger(__name__)
+
+BundleKey = Tuple[int, int]
+HotSet = FrozenSet[Tuple[int, Optional[int]]]
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+SNAPSHOT_NAME = "config_snapshot.json"
+
+
+def parse_hot_set(spec: str) -> HotSet:
+    """``"5411,5812:6"`` → {(5411, None), (5812, 6)}; None matches every context length."""
+    keys = set()
+    for item in spec.replace(";", ",").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        mcc, _, ctx_len = item.partition(":")
+        keys.add((int(mcc), int(ctx_len) if ctx_len else None))
+    return frozenset(keys)
+
+
+# ---------------------------------------------------------------------------
+# Manifest
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    mcc: int
+    context_len: int
+    trained_at: Optional[str] = None
+    strat_enabled: bool = False
+    bytes: int = 0
+
+
+def _bundle_bytes(bundle_dir: Path) -> int:
+    """Size of what the services load: bundle.bin when present, else every artifact file."""
+    if (bundle_dir / BUNDLE_FILE).is_file():
+        return (bundle_dir / BUNDLE_FILE).stat().st_size
+    return sum(p.stat().st_size for p in bundle_dir.iterdir() if p.is_file() and not p.name.startswith("."))
+
+
+def scan_artifacts(base_path: Path) -> Dict[BundleKey, ManifestEntry]:
+    """Every <mcc>/<ctx_len> directory under ``base_path`` with a readable config snapshot."""
+    entries: Dict[BundleKey, ManifestEntry] = {}
+    for snapshot_path in sorted(Path(base_path).glob(f"*/*/{SNAPSHOT_NAME}")):
+        bundle_dir = snapshot_path.parent
+        try:
+            key = (int(bundle_dir.parent.name), int(bundle_dir.name))
+            snapshot = json.loads(snapshot_path.read_text())
+            entries[key] = ManifestEntry(
+                mcc=key[0],
+                context_len=key[1],
+                trained_at=snapshot.get("trained_at"),
+                strat_enabled=bool(snapshot.get("strat_enabled", False)),
+                bytes=_bundle_bytes(bundle_dir),
+            )
+        except (OSError, ValueError) as exc:
+            logger.warning("Skipping artifact directory %s: %s", bundle_dir, exc)
+    return entries
+
+
+def read_manifest(path: Path) -> Dict[BundleKey, ManifestEntry]:
+    data = json.loads(Path(path).read_text())
+    if data.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"unsupported manifest version {data.get('version')!r}")
+    entries = {}
+    for item in data["bundles"]:
+        entry = ManifestEntry(
+            mcc=int(item["mcc"]),
+            context_len=int(item["context_len"]),
+            trained_at=item.get("trained_at"),
+            strat_enabled=bool(item.get("strat_enabled", False)),
+            bytes=int(item.get("bytes", 0)),
+        )
+        entries[(entry.mcc, entry.context_len)] = entry
+    return entries
+
+
+def write_manifest(base_path: Path) -> Path:
+    """Scan ``base_path`` and (atomically) write its manifest.json."""
+    path = Path(base_path) / MANIFEST_NAME
+    entries = scan_artifacts(base_path)
+    body = {
+        "version": MANIFEST_VERSION,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "bundles": [asdict(entries[key]) for key in sorted(entries)],
+    }
+    tmp = path.with_name(f".tmp_{MANIFEST_NAME}")
+    tmp.write_text(json.dumps(body, indent=2))
+    os.replace(tmp, path)
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+@dataclass
+class _Resident:
+    bundle: Any
+    nbytes: int
+    mtime: float
+
+
+def _mtime(path: Path) -> Optional[float]:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+_stores: "weakref.WeakValueDictionary[str, ArtifactStore]" = weakref.WeakValueDictionary()
+_stores_lock = threading.Lock()
+
+
+class ArtifactStore:
+    """
+    Thread-safe, lazily filled LRU of artifact bundles under ``base_path``.
+
+    ``loader(mcc, ctx_len)`` builds one bundle from <base>/<mcc>/<ctx_len>.
+    A bundle that fails to load is not retried until its config snapshot
+    changes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_path: Path,
+        loader: Callable[[int, int], Any],
+        max_bytes: int,
+        hot_set: HotSet = frozenset(),
+    ) -> None:
+        self.name = name
+        self.base_path = Path(base_path)
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.hot_set = hot_set
+        self._manifest: Optional[Dict[BundleKey, ManifestEntry]] = None
+        self._manifest_source = "none"
+        self._manifest_mtime: Optional[float] = None
+        self._resident: "OrderedDict[BundleKey, _Resident]" = OrderedDict()
+        self._failed: Dict[BundleKey, Optional[float]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks: Dict[BundleKey, threading.Lock] = {}
+        self._subscribers: List[Callable[[int], Any]] = []
+        self.hits = 0
+        self.loads = 0
+        self.load_failures = 0
+        self.evictions = 0
+        self.reloads = 0
+        self.last_load_seconds = 0.0
+        with _stores_lock:
+            _stores[name] = self
+
+    # ── manifest ──────────────────────────────────────────────────────────
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.base_path / MANIFEST_NAME
+
+    def refresh_manifest(self) -> int:
+        """Re-read the manifest (or rescan); returns the number of bundles listed."""
+        mtime = _mtime(self.manifest_path)
+        entries, source = None, "scan"
+        if mtime is not None:
+            try:
+                entries, source = read_manifest(self.manifest_path), "file"
+            except (OSError, ValueError, KeyError) as exc:
+                logger.warning("[%s] Unreadable artifact manifest %s, scanning instead: %s", self.name, self.manifest_path, exc)
+        if entries is None:
+            entries = scan_artifacts(self.base_path)
+        with self._lock:
+            previous = self._manifest
+            self._manifest = entries
+            self._manifest_source = source
+            self._manifest_mtime = mtime
+            for key in [k for k in self._resident if k not in entries]:
+                self._drop(key)
+        if previous is not None:
+            changed = {key[0] for key in set(previous) | set(entries) if previous.get(key) != entries.get(key)}
+            for mcc in sorted(changed):
+                self._notify(mcc)
+        return len(entries)
+
+    def entries(self) -> Dict[BundleKey, ManifestEntry]:
+        if self._manifest is None:
+            self.refresh_manifest()
+        with self._lock:
+            return dict(self._manifest or {})
+
+    def mccs(self) -> List[int]:
+        return sorted({mcc for mcc, _ in self.entries()})
+
+    # ── loading ───────────────────────────────────────────────────────────
+
+    def is_hot(self, key: BundleKey) -> bool:
+        return (key[0], None) in self.hot_set or key in self.hot_set
+
+    def _snapshot_path(self, key: BundleKey) -> Path:
+        return self.base_path / str(key[0]) / str(key[1]) / SNAPSHOT_NAME
+
+    def get(self, mcc: int, ctx_len: int) -> Any:
+        """The bundle for exactly (mcc, ctx_len), loading it on first use; None if unavailable."""
+        key = (int(mcc), int(ctx_len))
+        entry = self.entries().get(key)
+        if entry is None:
+            return None
+        with self._lock:
+            resident = self._resident.get(key)
+            if resident is not None:
+                self._resident.move_to_end(key)
+                self.hits += 1
+                return resident.bundle
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                # Another request may have loaded the bundle while we waited.
+                resident = self._resident.get(key)
+                if resident is not None:
+                    self._resident.move_to_end(key)
+                    self.hits += 1
+                    return resident.bundle
+            return self._load(key, entry)
+
+    def _load(self, key: BundleKey, entry: ManifestEntry) -> Any:
+        mtime = _mtime(self._snapshot_path(key))
+        if key in self._failed and self._failed[key] == mtime:
+            return None
+        started = time.perf_counter()
+        try:
+            bundle = self.loader(*key)
+        except Exception as exc:
+            with self._lock:
+                self._failed[key] = mtime
+                self.load_failures += 1
+            logger.warning("[%s] Failed to load artifacts for MCC %d ctx=%d: %s", self.name, key[0], key[1], exc)
+            return None
+        nbytes = _bundle_bytes(self._snapshot_path(key).parent)
+        with self._lock:
+            self._failed.pop(key, None)
+            replaced = key in self._resident
+            if replaced:
+                self._drop(key)
+            self._resident[key] = _Resident(bundle=bundle, nbytes=nbytes, mtime=mtime or 0.0)
+            self._bytes += nbytes
+            self.loads += 1
+            self.last_load_seconds = time.perf_counter() - started
+            self._evict()
+        if replaced:
+            self._notify(key[0])
+        logger.info(
+            "[%s] Loaded artifacts for MCC %d ctx=%d trained_at=%s (%.0f ms)",
+            self.name, key[0], key[1], entry.trained_at, 1000 * self.last_load_seconds,
+        )
+        return bundle
+
+    def resolve(self, mcc: int, ctx_len: int) -> Any:
+        """Bundle for ``ctx_len``, else the nearest context length trained for ``mcc``; None if none loads."""
+        available = sorted(cl for m, cl in self.entries() if m == int(mcc))
+        for cl in sorted(available, key=lambda cl: (abs(cl - ctx_len), cl)):
+            bundle = self.get(mcc, cl)
+            if bundle is not None:
+                return bundle
+        return None
+
+    def preload(self) -> int:
+        """Load every hot-set bundle listed in the manifest; returns how many are resident."""
+        loaded = 0
+        for key in sorted(self.entries()):
+            if self.is_hot(key) and self.get(*key) is not None:
+                loaded += 1
+        return loaded
+
+    # ── eviction / hot reload ─────────────────────────────────────────────
+
+    def subscribe(self, callback: Callable[[int], Any]) -> None:
+        """Register ``callback(mcc)`` to run when a bundle of ``mcc`` is reloaded or re-listed."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def _notify(self, mcc: int) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(mcc)
+            except Exception as exc:
+                logger.warning("[%s] Reload subscriber failed for MCC %d: %s", self.name, mcc, exc)
+
+    def _drop(self, key: BundleKey) -> None:
+        resident = self._resident.pop(key)
+        self._bytes -= resident.nbytes
+
+    def _evict(self) -> None:
+        for key in list(self._resident):
+            if self._bytes <= self.max_bytes:
+                break
+            if not self.is_hot(key):
+                self._drop(key)
+                self.evictions += 1
+
+    def poll(self) -> None:
+        """One watcher pass: manifest changes, then resident bundles whose snapshot changed."""
+        mtime = _mtime(self.manifest_path)
+        if mtime is None or mtime != self._manifest_mtime:
+            self.refresh_manifest()
+        with self._lock:
+            resident = [(key, r.mtime) for key, r in self._resident.items()]
+        for key, loaded_mtime in resident:
+            current = _mtime(self._snapshot_path(key))
+            entry = self.entries().get(key)
+            if current is None or entry is None or current <= loaded_mtime:
+                continue
+            with self._lock:
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+            with key_lock:
+                if self._load(key, entry) is not None:
+                    with self._lock:
+                        self.reloads += 1
+                    logger.info("[%s] Hot-reloaded artifacts for MCC %d ctx=%d", self.name, key[0], key[1])
+
+    def start_watcher(self, interval_s: float) -> threading.Thread:
+        def _run() -> None:
+            while True:
+                time.sleep(interval_s)
+                try:
+                    self.poll()
+                except Exception as exc:
+                    logger.warning("[%s] Artifact poll failed: %s", self.name, exc)
+
+        thread = threading.Thread(target=_run, daemon=True, name=f"{self.name}-artifact-watcher")
+        thread.start()
+        return thread
+
+    def stats(self) -> Dict[str, object]:
+        entries = self.entries()
+        with self._lock:
+            return {
+                "base_path": str(self.base_path),
+                "manifest": self._manifest_source,
+                "bundles": len(entries),
+                "mccs": sorted({mcc for mcc, _ in entries}),
+                "resident": len(self._resident),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hot_set": sorted(f"{mcc}:{cl}" if cl else str(mcc) for mcc, cl in self.hot_set),
+                "hits": self.hits,
+                "loads": self.loads,
+                "load_failures": self.load_failures,
+                "evictions": self.evictions,
+                "reloads": self.reloads,
+                "last_load_ms": round(1000 * self.last_load_seconds, 3),
+                "keys": [
+                    {"mcc": mcc, "ctx_len": cl, "bytes": r.nbytes, "hot": self.is_hot((mcc, cl))}
+                    for (mcc, cl), r in self._resident.items()
+                ],
+            }
+
+
+def all_store_stats() -> Dict[str, object]:
+    with _stores_lock:
+        stores = dict(_stores)
+    return {name: store.stats() for name, store in sorted(stores.items())}
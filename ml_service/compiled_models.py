@@ -0,0 +1,334 @@
+"""
+Compiled forms of the sklearn artifacts used by the forecast services.
+
+GetCostForecast and GetTPVForecast predict each horizon with a StandardScaler
+followed by one HuberRegressor per horizon.  Each sklearn call re-validates
+its input, and only one row is scored at a time.  Both steps are affine, so
+they fold into a single (features × horizons) weight matrix and a bias:
+
+    x_scaled = (x - mean) / scale
+    y_h      = x_scaled · coef_h + intercept_h
+             = x · (coef_h / scale) + (intercept_h - Σ coef_h · mean / scale)
+
+── COMPILATION ───────────────────────────────────────────────────────────────
+CompiledLinearPredictor.from_sklearn(scaler, models)
+    folds the scaler into every horizon's coefficients.  verify() scores a
+    fixed set of probe rows spread around the scaler's training distribution
+    through both paths and raises CompiledModelMismatch past tolerance.
+compile_linear(scaler, models)
+    from_sklearn + verify; returns None (and logs) if the artifacts cannot
+    be compiled or fail the check, so callers keep the sklearn path.
+
+CompiledTreeEnsemble.from_sklearn(models)
+    pads every tree of every GradientBoostingRegressor (one per horizon) to
+    a perfect tree of the ensemble's depth and stores each level's splits
+    as arrays.  A batch of rows is scored level by level with one gather
+    and compare per level, and the leaves reached are summed per model with
+    one matmul.  That replaces one validated sklearn call per model and row.
+    Inputs are rounded to float32 before comparison, as sklearn's trees do,
+    and non-finite inputs are rejected as GradientBoostingRegressor.predict
+    rejects them.
+compile_trees(models)
+    from_sklearn + verify on probe rows built from the split thresholds
+    (both sides of every boundary); None when not possible.
+
+── PLAIN-ARRAY FORM ──────────────────────────────────────────────────────────
+linear_arrays / tree_arrays extract the raw parameters (coefficients, scaler
+moments; every tree's node arrays concatenated) that bundle.bin stores, and
+CompiledLinearPredictor.from_arrays / CompiledTreeEnsemble.from_arrays build
+the compiled forms from them without the sklearn objects.  from_sklearn is
+from_arrays over the extracted arrays.
+
+Usage:
+    linear = compile_linear(bundle.scaler, bundle.models)
+    y = linear.predict(X_raw)          # (rows × horizons), one matmul
+    risk = compile_trees(bundle.risk_models)
+    scores = risk.predict(risk_rows)   # (rows × models)
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PROBE_ROWS = 64
+RTOL = 1e-9
+ATOL = 1e-9
+
+
+class CompiledModelMismatch(ValueError):
+    """A compiled model disagrees with the sklearn artifacts it was built from."""
+
+
+def _check(actual: np.ndarray, expected: np.ndarray, what: str) -> float:
+    gap = np.abs(actual - expected)
+    if not np.all(gap <= ATOL + RTOL * np.abs(expected)):
+        raise CompiledModelMismatch(f"compiled {what} differs from sklearn by up to {float(gap.max()):.3g}")
+    return float(gap.max())
+
+
+def _probe_rows(n_features: int, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return mean + scale * rng.standard_normal((PROBE_ROWS, n_features)) * 3.0
+
+
+@dataclass(frozen=True)
+class CompiledLinearPredictor:
+    """StandardScaler + per-horizon linear models as one affine map."""
+
+    weights: np.ndarray  # features × horizons
+    bias: np.ndarray     # horizons
+
+    @property
+    def n_features(self) -> int:
+        return self.weights.shape[0]
+
+    @property
+    def n_horizons(self) -> int:
+        return self.weights.shape[1]
+
+    @classmethod
+    def from_sklearn(cls, scaler, models: Sequence) -> "CompiledLinearPredictor":
+        return cls.from_arrays(**linear_arrays(scaler, models))
+
+    @classmethod
+    def from_arrays(
+        cls, coef: np.ndarray, intercept: np.ndarray, mean: np.ndarray, scale: np.ndarray,
+    ) -> "CompiledLinearPredictor":
+        """From the raw parameters of linear_arrays(): coef is horizons × features."""
+        weights = np.asarray(coef, dtype=float).T / np.asarray(scale, dtype=float)[:, None]
+        return cls(weights=weights, bias=np.asarray(intercept, dtype=float) - np.asarray(mean, dtype=float) @ weights)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predictions for every row of ``X`` (raw, unscaled features) and every horizon."""
+        return np.atleast_2d(np.asarray(X, dtype=float)) @ self.weights + self.bias
+
+    def verify(self, scaler, models: Sequence, X: Optional[np.ndarray] = None) -> float:
+        """Largest absolute gap to the sklearn path on ``X`` (probe rows by default)."""
+        if X is None:
+            mean = getattr(scaler, "mean_", None)
+            scale = getattr(scaler, "scale_", None)
+            X = _probe_rows(
+                self.n_features,
+                np.zeros(self.n_features) if mean is None else np.asarray(mean, dtype=float),
+                np.ones(self.n_features) if scale is None else np.asarray(scale, dtype=float),
+            )
+        X_scaled = scaler.transform(X)
+        expected = np.column_stack([m.predict(X_scaled) for m in models])
+        return _check(self.predict(X), expected, "linear predictor")
+
+
+def linear_arrays(scaler, models: Sequence) -> Dict[str, np.ndarray]:
+    """StandardScaler + per-horizon linear models as plain arrays (coef, intercept, mean, scale)."""
+    coef = np.vstack([np.asarray(m.coef_, dtype=float) for m in models])
+    n_features = coef.shape[1]
+    mean = getattr(scaler, "mean_", None)
+    scale = getattr(scaler, "scale_", None)
+    return {
+        "coef": coef,
+        "intercept": np.array([float(m.intercept_) for m in models]),
+        "mean": np.zeros(n_features) if mean is None else np.asarray(mean, dtype=float),
+        "scale": np.ones(n_features) if scale is None else np.asarray(scale, dtype=float),
+    }
+
+
+def compile_linear(scaler, models: Sequence) -> Optional[CompiledLinearPredictor]:
+    """Compiled, verified predictor for ``scaler`` + ``models``; None when that is not possible."""
+    try:
+        compiled = CompiledLinearPredictor.from_sklearn(scaler, models)
+        compiled.verify(scaler, models)
+    except (AttributeError, ValueError) as exc:
+        logger.warning("Linear artifacts not compiled; using sklearn predict: %s", exc)
+        return None
+    return compiled
+
+
+MAX_TREE_DEPTH = 8
+BATCH_ROWS = 256  # rows per pass; keeps the leaf indicator cache-sized
+
+
+def _init_constant(model) -> float:
+    if isinstance(model.init_, str) and model.init_ == "zero":
+        return 0.0
+    if hasattr(model.init_, "constant_"):
+        return float(np.ravel(model.init_.constant_)[0])
+    raise ValueError(f"unsupported init estimator {type(model.init_).__name__}")
+
+
+def tree_arrays(models: Sequence) -> Dict[str, np.ndarray]:
+    """
+    Every tree of several GradientBoostingRegressors as flat node arrays:
+    tree t owns nodes node_offsets[t]:node_offsets[t + 1] (child ids are
+    local to the tree, -1 at leaves) and belongs to model tree_model[t].
+    """
+    trees, owners, init, learning_rate = [], [], [], []
+    for m, model in enumerate(models):
+        init.append(_init_constant(model))
+        learning_rate.append(float(model.learning_rate))
+        for estimator in np.ravel(model.estimators_):
+            trees.append(estimator.tree_)
+            owners.append(m)
+    return {
+        "node_offsets": np.concatenate([[0], np.cumsum([t.node_count for t in trees])]).astype(np.int64),
+        "children_left": np.concatenate([t.children_left for t in trees]).astype(np.int32),
+        "children_right": np.concatenate([t.children_right for t in trees]).astype(np.int32),
+        "feature": np.concatenate([t.feature for t in trees]).astype(np.int32),
+        "threshold": np.concatenate([t.threshold for t in trees]).astype(float),
+        "value": np.concatenate([np.asarray(t.value, dtype=float).reshape(t.node_count) for t in trees]),
+        "tree_model": np.array(owners, dtype=np.int32),
+        "learning_rate": np.array(learning_rate),
+        "init": np.array(init),
+        "n_features": np.array(int(models[0].n_features_in_), dtype=np.int64),
+    }
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    depth, level = 0, [0]
+    while True:
+        level = [child for node in level if left[node] >= 0 for child in (left[node], right[node])]
+        if not level:
+            return depth
+        depth += 1
+
+
+def _perfect_tree(
+    left: np.ndarray, right: np.ndarray, feature: np.ndarray, threshold: np.ndarray, value: np.ndarray, depth: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    One tree's node arrays padded to a perfect binary tree of ``depth``
+    levels in heap order: (feature, threshold) per internal slot and value
+    per leaf slot.  Leaves above the last level become always-left splits
+    (threshold +inf) over two copies of themselves.
+    """
+    n_internal = 2 ** depth - 1
+    padded_feature = np.zeros(n_internal, dtype=np.intp)
+    padded_threshold = np.full(n_internal, np.inf, dtype=np.float32)
+    leaf_value = np.empty(2 ** depth)
+    stack = [(0, 0)]  # (node, heap slot)
+    while stack:
+        node, slot = stack.pop()
+        if slot >= n_internal:
+            leaf_value[slot - n_internal] = value[node]
+        elif left[node] < 0:
+            stack += [(node, 2 * slot + 1), (node, 2 * slot + 2)]
+        else:
+            padded_feature[slot] = feature[node]
+            # Largest float32 <= the float64 threshold: float32 inputs then
+            # compare exactly as sklearn compares them against the float64 cut.
+            cut = np.float32(threshold[node])
+            padded_threshold[slot] = cut if cut <= threshold[node] else np.nextafter(cut, np.float32(-np.inf))
+            stack += [(left[node], 2 * slot + 1), (right[node], 2 * slot + 2)]
+    return padded_feature, padded_threshold, leaf_value
+
+
+@dataclass(frozen=True)
+class CompiledTreeEnsemble:
+    """Every tree of several GradientBoostingRegressors as padded perfect trees."""
+
+    features: List[np.ndarray]    # per level: trees × 2**level split features
+    thresholds: List[np.ndarray]  # per level: trees × 2**level float32 cuts (rounded down)
+    leaf_values: np.ndarray       # models × (trees · 2**depth); leaf value × learning rate
+    init: np.ndarray              # models; constant initial prediction
+    n_features: int
+
+    @property
+    def depth(self) -> int:
+        return len(self.features)
+
+    @property
+    def n_models(self) -> int:
+        return len(self.init)
+
+    @classmethod
+    def from_sklearn(cls, models: Sequence) -> "CompiledTreeEnsemble":
+        return cls.from_arrays(tree_arrays(models))
+
+    @classmethod
+    def from_arrays(cls, arrays: Mapping[str, np.ndarray]) -> "CompiledTreeEnsemble":
+        """From the flat node arrays of tree_arrays()."""
+        offsets = np.asarray(arrays["node_offsets"])
+        columns = [np.asarray(arrays[name]) for name in ("children_left", "children_right", "feature", "threshold", "value")]
+        trees = [[c[lo:hi] for c in columns] for lo, hi in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+        depth = max(max(_tree_depth(tree[0], tree[1]) for tree in trees), 1)
+        if depth > MAX_TREE_DEPTH:
+            raise ValueError(f"trees of depth {depth} are too deep to pad (max {MAX_TREE_DEPTH})")
+
+        owners = np.asarray(arrays["tree_model"], dtype=np.intp)
+        init = np.array(arrays["init"], dtype=float)
+        padded = [_perfect_tree(*tree, depth) for tree in trees]
+        feature = np.stack([f for f, _, _ in padded])
+        threshold = np.stack([t for _, t, _ in padded])
+        # Block matrix: row m holds the (scaled) leaves of model m's trees.
+        scales = np.asarray(arrays["learning_rate"], dtype=float)[owners]
+        leaf_values = np.zeros((len(init), len(trees), 2 ** depth))
+        leaf_values[owners, np.arange(len(trees))] = np.stack([v for _, _, v in padded]) * scales[:, None]
+        levels = [slice(2 ** d - 1, 2 ** (d + 1) - 1) for d in range(depth)]
+        return cls(
+            features=[np.ascontiguousarray(feature[:, level]) for level in levels],
+            thresholds=[np.ascontiguousarray(threshold[:, level, None]) for level in levels],
+            leaf_values=leaf_values.reshape(len(init), -1),
+            init=init,
+            n_features=int(arrays["n_features"]),
+        )
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Scores of every model for every row of ``X``: (rows × models)."""
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        if not np.isfinite(X).all():
+            raise ValueError("Input X contains NaN or infinity.")
+        columns = np.ascontiguousarray(X.astype(np.float32).T)
+        return np.vstack([
+            self._predict_columns(columns[:, start:start + BATCH_ROWS])
+            for start in range(0, X.shape[0], BATCH_ROWS)
+        ])
+
+    def _predict_columns(self, columns: np.ndarray) -> np.ndarray:
+        # Expand a (tree, leaf, row) indicator one level at a time: every split
+        # of a level is one row gather and compare, then each slot's rows are
+        # routed to its two children.  Each tree lands in exactly one leaf, so
+        # summing leaf values is a single matmul with the block value matrix.
+        n_trees, n_rows = self.features[0].shape[0], columns.shape[1]
+        reached = np.ones((n_trees, 1, n_rows), dtype=bool)
+        for features, thresholds in zip(self.features, self.thresholds):
+            goes_right = columns.take(features.ravel(), axis=0).reshape(*features.shape, n_rows) > thresholds
+            children = np.empty((n_trees, 2 * features.shape[1], n_rows), dtype=bool)
+            np.logical_and(reached, ~goes_right, out=children[:, 0::2])
+            np.logical_and(reached, goes_right, out=children[:, 1::2])
+            reached = children
+        return (self.leaf_values @ reached.reshape(-1, n_rows)).T + self.init
+
+    def probe_rows(self) -> np.ndarray:
+        """Rows whose features sit on, just below and just above the split thresholds."""
+        rng = np.random.default_rng(0)
+        features = np.concatenate([f.ravel() for f in self.features])
+        thresholds = np.concatenate([t.ravel() for t in self.thresholds]).astype(float)
+        X = rng.standard_normal((PROBE_ROWS, self.n_features))
+        for f in range(self.n_features):
+            cuts = thresholds[(features == f) & np.isfinite(thresholds)]
+            if cuts.size:
+                candidates = np.concatenate([cuts, np.nextafter(cuts, -np.inf), np.nextafter(cuts, np.inf)])
+                X[:, f] = rng.choice(candidates, PROBE_ROWS)
+        return X
+
+    def verify(self, models: Sequence, X: Optional[np.ndarray] = None) -> float:
+        """Largest absolute gap to sklearn's predict on ``X`` (threshold probes by default)."""
+        X = self.probe_rows() if X is None else X
+        expected = np.column_stack([m.predict(X) for m in models])
+        return _check(self.predict(X), expected, "tree ensemble")
+
+
+def compile_trees(models: Sequence) -> Optional[CompiledTreeEnsemble]:
+    """Compiled, verified evaluator for ``models``; None when that is not possible."""
+    if not models:
+        return None
+    try:
+        compiled = CompiledTreeEnsemble.from_sklearn(models)
+        compiled.verify(models)
+    except (AttributeError, ValueError) as exc:
+        logger.warning("Risk models not compiled; using sklearn predict: %s", exc)
+        return None
+    return compiled
@@ -6,5 +6,23 @@ class MLConfig:
     # Must be provided via DATABASE_URL environment variable.
     DATABASE_URL: str = os.environ.get("DATABASE_URL", "")
 
+    # Connection pool per engine (db_pool.py).  Sized for the executor lanes
+    # that query Postgres concurrently; see GET /ml/db/pool-stats when tuning.
+    DB_POOL_SIZE: int = int(os.environ.get("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT_S: float = float(os.environ.get("DB_POOL_TIMEOUT_S", "30"))
+
     # Service port
     PORT: int = int(os.environ.get("ML_PORT", "8001"))
+
+    # Directory of per-MCC reference snapshots written by reference_snapshots.py.
+    # When set, the KNN and TPV engines read reference transactions from these
+    # memory-mapped files instead of knn_transactions.
+    REFERENCE_SNAPSHOT_DIR: str = os.environ.get("REFERENCE_SNAPSHOT_DIR", "")
+
+    # Shared reference-data cache (reference_data.py) used by KNN and TPV:
+    # upper bound on cached frame bytes and seconds before a frame is reloaded.
+    REFERENCE_CACHE_MAX_BYTES: int = int(
+        float(os.environ.get("KNN_REFERENCE_CACHE_MAX_MB", "512")) * 1024 * 1024
+    )
+    REFERENCE_CACHE_TTL_S: float = float(os.environ.get("KNN_REFERENCE_CACHE_TTL_S", "900"))
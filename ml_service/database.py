@@ -11,12 +11,12 @@ Use `db: Session = Depends(get_db)` in any route that needs DB access.
 """
 from __future__ import annotations
 
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from config import MLConfig
+from db_pool import create_pooled_engine
 
-engine = create_engine(MLConfig.DATABASE_URL, pool_pre_ping=True)
+engine = create_pooled_engine(MLConfig.DATABASE_URL, name="database", pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -0,0 +1,139 @@
+"""
+Instrumented SQLAlchemy connection pools.
+
+Engines built here keep one QueuePool for the life of the process and
+record, per checkout, how long the caller waited for a connection (including
+opening a new one while the pool grows), how many connections were checked
+out at the time, and how many checkouts timed out.  That is what is needed
+to size DB_POOL_SIZE / DB_MAX_OVERFLOW under concurrent load: a rising
+checkout wait with saturation near 1.0 means the pool, not Postgres, is the
+bottleneck.
+
+── SETTINGS (config.MLConfig) ────────────────────────────────────────────────
+DB_POOL_SIZE         connections kept open                     (default 5)
+DB_MAX_OVERFLOW      extra connections opened under load       (default 10)
+DB_POOL_TIMEOUT_S    seconds a checkout waits before failing   (default 30)
+
+Usage:
+    engine = create_pooled_engine(url, name="database", pool_pre_ping=True)
+    pool_stats(engine)      → size, checked_out, saturation, wait p50/p95/max, timeouts
+    GET /ml/db/pool-stats   → the same for every named engine
+"""
+from __future__ import annotations
+
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Any, Dict, Optional
+
+import numpy as np
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+
+from config import MLConfig
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times every checkout and tracks peak usage."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._waits: deque = deque(maxlen=1000)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.peak_checked_out = 0
+        self.wait_s_total = 0.0
+        self.wait_s_max = 0.0
+
+    def connect(self):  # type: ignore[override]
+        started = time.perf_counter()
+        try:
+            conn = super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        with self._stats_lock:
+            self.checkouts += 1
+            self.wait_s_total += waited
+            self.wait_s_max = max(self.wait_s_max, waited)
+            self._waits.append(waited)
+            self.peak_checked_out = max(self.peak_checked_out, self.checkedout())
+        return conn
+
+    def capacity(self) -> Optional[int]:
+        """Most connections the pool will hand out; None when overflow is unbounded."""
+        return None if self._max_overflow < 0 else self.size() + self._max_overflow
+
+    def stats(self) -> Dict[str, object]:
+        capacity = self.capacity()
+        checked_out = self.checkedout()
+        with self._stats_lock:
+            waits = np.array(self._waits, dtype=float)
+            done = self.checkouts
+            return {
+                "pool_size": self.size(),
+                "max_overflow": self._max_overflow,
+                "timeout_s": self._timeout,
+                "checked_out": checked_out,
+                "idle": self.checkedin(),
+                "overflow": max(0, self.overflow()),
+                "saturation": round(checked_out / capacity, 4) if capacity else None,
+                "peak_saturation": round(self.peak_checked_out / capacity, 4) if capacity else None,
+                "checkouts": done,
+                "timeouts": self.timeouts,
+                "avg_checkout_wait_ms": round(1000 * self.wait_s_total / done, 3) if done else 0.0,
+                "p95_checkout_wait_ms": round(1000 * float(np.percentile(waits, 95)), 3) if waits.size else 0.0,
+                "max_checkout_wait_ms": round(1000 * self.wait_s_max, 3),
+            }
+
+
+_engines: "weakref.WeakValueDictionary[str, Engine]" = weakref.WeakValueDictionary()
+_engines_lock = threading.Lock()
+
+
+def create_pooled_engine(
+    url: str,
+    name: Optional[str] = None,
+    pool_size: int = MLConfig.DB_POOL_SIZE,
+    max_overflow: int = MLConfig.DB_MAX_OVERFLOW,
+    pool_timeout: float = MLConfig.DB_POOL_TIMEOUT_S,
+    **kwargs: Any,
+) -> Engine:
+    """
+    create_engine with an InstrumentedQueuePool; ``name`` lists the engine in
+    all_pool_stats().  In-memory SQLite keeps SQLAlchemy's default pool.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        engine = create_engine(url, **kwargs)
+    else:
+        engine = create_engine(
+            url,
+            poolclass=InstrumentedQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            **kwargs,
+        )
+    if name:
+        with _engines_lock:
+            _engines[name] = engine
+    return engine
+
+
+def pool_stats(engine: Engine) -> Dict[str, object]:
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.stats()
+    return {"pool": type(pool).__name__, "status": pool.status()}
+
+
+def all_pool_stats() -> Dict[str, object]:
+    with _engines_lock:
+        engines = dict(_engines)
+    return {name: pool_stats(engine) for name, engine in sorted(engines.items())}
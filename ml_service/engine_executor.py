@@ -0,0 +1,203 @@
+"""
+Bounded executors for the CPU-bound ML engines.
+
+Routes are ``async def`` but the engines are synchronous pandas / sklearn /
+statsmodels code; called inline, one SARIMA grid search blocks every other
+request on the worker, health checks included.  Each engine instead runs on
+its own lane — a thread or process pool with a fixed number of workers — so
+the event loop stays free and one slow engine cannot starve the others.
+
+── LANES ─────────────────────────────────────────────────────────────────────
+knn      /getQuote, /getQuoteBatch, /getCompositeMerchant, /knn-rate-quote
+tpv      /GetTPVForecast
+volume   /GetVolumeForecast          (process-safe)
+profit   /GetProfitForecast          (process-safe)
+cost     /GetCostForecast
+rate_optimisation   /rate-optimisation, /process step 1
+tpv_prediction      /tpv-prediction, /process step 2
+
+Per-lane settings (environment):
+    ML_EXECUTOR_<LANE>_WORKERS    concurrent calls (default per lane below)
+    ML_EXECUTOR_<LANE>_MAX_QUEUE  calls allowed to wait for a worker; further
+                                  calls are rejected with 503 (0 = unbounded)
+    ML_EXECUTOR_<LANE>_KIND       "thread" (default) or "process"
+
+Process pools only apply to process-safe lanes: knn / tpv / cost keep
+reference caches and loaded artifacts in process memory, and the
+rate_optimisation / tpv_prediction engines take the request's DB session,
+so they always run on threads.
+
+Usage:
+    result = await run_engine("volume", run_volume_forecast, payload)
+    GET /ml/executor/stats  → per-lane queue depth and latency counters
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# lane → (default workers, process-safe)
+LANES: Dict[str, Tuple[int, bool]] = {
+    "knn": (4, False),
+    "tpv": (2, False),
+    "volume": (2, True),
+    "profit": (2, True),
+    "cost": (2, False),
+    "rate_optimisation": (2, False),
+    "tpv_prediction": (2, False),
+}
+
+
+class EngineSaturatedError(RuntimeError):
+    """Raised when a lane's queue is full; routes answer 503."""
+
+
+def _timed_call(fn: Callable[..., Any], args: tuple, kwargs: dict) -> Tuple[float, float, Any]:
+    """Run ``fn`` and report wall-clock start / end (also valid across processes)."""
+    started = time.time()
+    result = fn(*args, **kwargs)
+    return started, time.time(), result
+
+
+@dataclass
+class EngineLane:
+    name: str
+    workers: int
+    max_queue: int = 0
+    kind: str = "thread"
+    _executor: Optional[Executor] = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _pending: int = field(default=0, init=False)
+    _submitted: int = field(default=0, init=False)
+    _completed: int = field(default=0, init=False)
+    _failed: int = field(default=0, init=False)
+    _rejected: int = field(default=0, init=False)
+    _peak_queued: int = field(default=0, init=False)
+    _wait_s_total: float = field(default=0.0, init=False)
+    _wait_s_max: float = field(default=0.0, init=False)
+    _run_s_total: float = field(default=0.0, init=False)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix=f"engine-{self.name}"
+                )
+        return self._executor
+
+    def _admit(self) -> None:
+        with self._lock:
+            queued = max(0, self._pending - self.workers)
+            if self.max_queue and self._pending >= self.workers and queued >= self.max_queue:
+                self._rejected += 1
+                raise EngineSaturatedError(
+                    f"Engine '{self.name}' is saturated ({self._pending} calls pending); retry shortly."
+                )
+            self._pending += 1
+            self._submitted += 1
+            self._peak_queued = max(self._peak_queued, self._pending - self.workers)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        self._admit()
+        submitted = time.time()
+        try:
+            future = self._get_executor().submit(_timed_call, fn, args, kwargs)
+        except BaseException:
+            self._finish(submitted, None)
+            raise
+        # Accounting runs when the work finishes, even if the request was cancelled.
+        future.add_done_callback(partial(self._finish, submitted))
+        _, _, result = await asyncio.wrap_future(future)
+        return result
+
+    def _finish(self, submitted: float, future: Optional[Future]) -> None:
+        with self._lock:
+            self._pending -= 1
+            if future is None or future.cancelled() or future.exception() is not None:
+                self._failed += 1
+                return
+            started, finished, _ = future.result()
+            self._completed += 1
+            wait = max(0.0, started - submitted)
+            self._wait_s_total += wait
+            self._wait_s_max = max(self._wait_s_max, wait)
+            self._run_s_total += finished - started
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            done = self._completed
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": min(self._pending, self.workers),
+                "queued": max(0, self._pending - self.workers),
+                "peak_queued": self._peak_queued,
+                "submitted": self._submitted,
+                "completed": done,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_queue_wait_ms": round(1000 * self._wait_s_total / done, 2) if done else 0.0,
+                "max_queue_wait_ms": round(1000 * self._wait_s_max, 2),
+                "avg_run_ms": round(1000 * self._run_s_total / done, 2) if done else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _lane_from_env(name: str) -> EngineLane:
+    default_workers, process_safe = LANES[name]
+    prefix = f"ML_EXECUTOR_{name.upper()}_"
+    kind = os.getenv(prefix + "KIND", "thread").strip().lower()
+    if kind not in ("thread", "process"):
+        raise ValueError(f"{prefix}KIND must be 'thread' or 'process', got {kind!r}")
+    if kind == "process" and not process_safe:
+        logger.warning("[Executor] Lane %s keeps state in process memory; using threads", name)
+        kind = "thread"
+    return EngineLane(
+        name=name,
+        workers=max(1, int(os.getenv(prefix + "WORKERS", str(default_workers)))),
+        max_queue=max(0, int(os.getenv(prefix + "MAX_QUEUE", "0"))),
+        kind=kind,
+    )
+
+
+_lanes: Dict[str, EngineLane] = {}
+_lanes_lock = threading.Lock()
+
+
+def get_lane(name: str) -> EngineLane:
+    with _lanes_lock:
+        if name not in _lanes:
+            _lanes[name] = _lane_from_env(name)
+        return _lanes[name]
+
+
+async def run_engine(name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run ``fn(*args, **kwargs)`` on lane ``name`` without blocking the event loop."""
+    return await get_lane(name).run(fn, *args, **kwargs)
+
+
+def executor_stats() -> Dict[str, object]:
+    return {name: get_lane(name).stats() for name in LANES}
+
+
+def shutdown_executors() -> None:
+    with _lanes_lock:
+        for lane in _lanes.values():
+            lane.shutdown()
+        _lanes.clear()
@@ -0,0 +1,346 @@
+"""
+Monthly feature store materialized from knn_transactions.
+
+Aggregates raw reference transactions once into merchant × month rows so the
+KNN quote service and the training pipeline read merchant-months instead of
+re-deriving them from every transaction.
+
+── TABLES (see models.py) ────────────────────────────────────────────────────
+knn_monthly_features          — additive sums plus per-cell summary stats
+knn_monthly_cost_type_counts  — transaction counts per cost_type_id
+
+Grain: (mcc, card_brand, card_type, merchant_id, ym).  Card-level rows carry
+only additive measures that callers may sum across any card filter; the
+roll-up row (card_brand = card_type = ROLLUP_KEY) holds exact medians/IQRs
+over all cards, which is what training consumes.
+
+Staleness: an MCC's rows are stale when knn_transactions holds a different
+number of dated rows than the roll-up rows count, or a later month.  The KNN
+quote service checks this whenever it (re)loads an MCC — on first use, after
+its monthly cache expires and after /knn-rate-quote/cache/invalidate — and
+rebuilds that MCC's rows before serving them, so reseeded or appended
+transactions are picked up without a restart.
+
+Usage:
+    Called from app.py lifespan when the store is empty.
+    refresh_if_stale(engine, 5411)  → rebuilds one MCC when its source changed
+    Manual refresh: docker compose exec ml-service python feature_store.py [--mcc 5411]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+FEATURES_TABLE = "knn_monthly_features"
+COST_TYPE_COUNTS_TABLE = "knn_monthly_cost_type_counts"
+ROLLUP_KEY = "*"
+
+_KEYS = ["mcc", "card_brand", "card_type", "merchant_id", "ym"]
+
+
+# ---------------------------------------------------------------------------
+# Aggregation
+# ---------------------------------------------------------------------------
+
+def _prepare_transactions(raw: pd.DataFrame) -> pd.DataFrame:
+    tx = raw.copy()
+    if "transaction_date" in tx.columns and "date" not in tx.columns:
+        tx = tx.rename(columns={"transaction_date": "date"})
+    tx["date"] = pd.to_datetime(tx["date"], errors="coerce")
+    tx = tx.dropna(subset=["date", "merchant_id"])
+
+    tx["merchant_id"] = tx["merchant_id"].astype(str)
+    tx["card_brand"] = tx.get("card_brand", pd.Series("", index=tx.index)).fillna("").astype(str).str.strip().str.lower()
+    tx["card_type"] = tx.get("card_type", pd.Series("", index=tx.index)).fillna("").astype(str).str.strip().str.lower()
+    tx["ym"] = tx["date"].dt.strftime("%Y-%m")
+    tx["amount"] = pd.to_numeric(tx["amount"], errors="coerce")
+    tx["proc_cost"] = pd.to_numeric(tx.get("proc_cost"), errors="coerce")
+
+    raw_ct = tx["cost_type_ID"] if "cost_type_ID" in tx.columns else tx.get("cost_type_id")
+    tx["cost_type_id"] = pd.to_numeric(raw_ct, errors="coerce").fillna(-1).astype(int)
+
+    # Per-transaction cost %, matching training/prepare_data.py (zero amounts excluded).
+    tx["_pct"] = np.where(tx["amount"] > 0, tx["proc_cost"] / tx["amount"], np.nan)
+    return tx
+
+
+def _summarise(tx: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Aggregate prepared transactions to the store grain (keys must be set on tx)."""
+    grouped = tx.groupby(_KEYS, sort=True)
+    features = grouped.agg(
+        transaction_count=("amount", "size"),
+        amount_count=("amount", "count"),
+        total_processing_value=("amount", "sum"),
+        sum_proc_cost=("proc_cost", "sum"),
+        avg_transaction_value=("amount", "mean"),
+        std_txn_amount=("amount", "std"),
+        median_txn_amount=("amount", "median"),
+        pct_count=("_pct", "count"),
+        avg_proc_cost_pct=("_pct", "mean"),
+        std_proc_cost_pct=("_pct", "std"),
+        median_proc_cost_pct=("_pct", "median"),
+    )
+    quartiles = grouped["_pct"].quantile([0.25, 0.75]).unstack()
+    features["iqr_proc_cost_pct"] = quartiles[0.75] - quartiles[0.25]
+
+    # Single-observation cells have no spread (prepare_data.py reports 0.0).
+    features.loc[features["amount_count"] < 2, "std_txn_amount"] = 0.0
+    features.loc[features["pct_count"] < 2, ["std_proc_cost_pct", "iqr_proc_cost_pct"]] = 0.0
+    features = features.drop(columns="pct_count").reset_index()
+
+    counts = (
+        tx.groupby(_KEYS + ["cost_type_id"], sort=True)
+        .size()
+        .rename("txn_count")
+        .reset_index()
+    )
+    return features, counts
+
+
+def aggregate_monthly_features(raw: pd.DataFrame, mcc: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Aggregate raw knn_transactions rows for one MCC into store rows.
+
+    Returns (features, cost_type_counts) including both card-level and
+    roll-up rows.
+    """
+    tx = _prepare_transactions(raw)
+    if tx.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    tx["mcc"] = int(mcc)
+
+    card_features, card_counts = _summarise(tx)
+
+    rollup = tx.assign(card_brand=ROLLUP_KEY, card_type=ROLLUP_KEY)
+    rollup_features, rollup_counts = _summarise(rollup)
+
+    return (
+        pd.concat([rollup_features, card_features], ignore_index=True),
+        pd.concat([rollup_counts, card_counts], ignore_index=True),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Refresh
+# ---------------------------------------------------------------------------
+
+def _available_mccs(engine: Engine) -> List[int]:
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT DISTINCT mcc FROM knn_transactions WHERE mcc IS NOT NULL ORDER BY mcc"
+        )).fetchall()
+    return [int(r[0]) for r in rows]
+
+
+def refresh_mcc(engine: Engine, mcc: int) -> int:
+    """Rebuild the store rows for one MCC atomically; returns the feature-row count."""
+    with engine.connect() as conn:
+        raw = pd.read_sql(
+            text("""
+                SELECT merchant_id, card_brand, card_type, date, amount,
+                       proc_cost, cost_type_id
+                FROM knn_transactions
+                WHERE mcc = :mcc
+            """),
+            conn,
+            params={"mcc": int(mcc)},
+        )
+
+    features, counts = aggregate_monthly_features(raw, mcc)
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM {FEATURES_TABLE} WHERE mcc = :mcc"), {"mcc": int(mcc)})
+        conn.execute(text(f"DELETE FROM {COST_TYPE_COUNTS_TABLE} WHERE mcc = :mcc"), {"mcc": int(mcc)})
+        if not features.empty:
+            features.to_sql(FEATURES_TABLE, conn, if_exists="append", index=False,
+                            method="multi", chunksize=5000)
+            counts.to_sql(COST_TYPE_COUNTS_TABLE, conn, if_exists="append", index=False,
+                          method="multi", chunksize=5000)
+    return len(features)
+
+
+def is_stale(engine: Engine, mcc: int) -> bool:
+    """True when the MCC's store rows no longer match knn_transactions (count or latest month)."""
+    with engine.connect() as conn:
+        n_source, last_date = conn.execute(
+            text("""
+                SELECT count(*), max(date) FROM knn_transactions
+                WHERE mcc = :mcc AND date IS NOT NULL AND merchant_id IS NOT NULL
+            """),
+            {"mcc": int(mcc)},
+        ).one()
+        n_stored, last_ym = conn.execute(
+            text(f"""
+                SELECT sum(transaction_count), max(ym) FROM {FEATURES_TABLE}
+                WHERE mcc = :mcc AND card_brand = '{ROLLUP_KEY}'
+            """),
+            {"mcc": int(mcc)},
+        ).one()
+    if int(n_source or 0) != int(n_stored or 0):
+        return True
+    return last_date is not None and pd.Timestamp(str(last_date)).strftime("%Y-%m") != last_ym
+
+
+def refresh_if_stale(engine: Engine, mcc: int) -> bool:
+    """Rebuild one MCC's rows when its source changed; returns True if a refresh ran."""
+    if not is_stale(engine, mcc):
+        return False
+    t0 = time.time()
+    n_rows = refresh_mcc(engine, mcc)
+    logger.info(
+        "[FeatureStore] MCC %s was stale: rebuilt %s merchant-month rows in %.1fs",
+        mcc, f"{n_rows:,}", time.time() - t0,
+    )
+    return True
+
+
+def refresh_feature_store(
+    database_url: str | None = None,
+    mccs: Optional[Iterable[int]] = None,
+    engine: Engine | None = None,
+) -> int:
+    """Rebuild the monthly feature store from knn_transactions (all MCCs by default)."""
+    if engine is None:
+        db_url = database_url or os.environ.get("DATABASE_URL")
+        if not db_url:
+            logger.error("[FeatureStore] DATABASE_URL is not set — skipping refresh")
+            return 0
+        engine = create_engine(db_url)
+
+    targets = list(mccs) if mccs else _available_mccs(engine)
+    total = 0
+    for mcc in targets:
+        t0 = time.time()
+        n_rows = refresh_mcc(engine, mcc)
+        total += n_rows
+        logger.info(
+            "[FeatureStore] MCC %s: %s merchant-month rows in %.1fs",
+            mcc, f"{n_rows:,}", time.time() - t0,
+        )
+    return total
+
+
+def refresh_if_empty(database_url: str | None = None) -> bool:
+    """Materialize the store on first startup; returns True if a refresh ran."""
+    db_url = database_url or os.environ.get("DATABASE_URL")
+    if not db_url:
+        return False
+    engine = create_engine(db_url)
+    with engine.connect() as conn:
+        n_features = conn.execute(text(f"SELECT count(*) FROM {FEATURES_TABLE}")).scalar()
+        n_txn = conn.execute(text("SELECT count(*) FROM knn_transactions")).scalar()
+    if n_features or not n_txn:
+        return False
+    refresh_feature_store(engine=engine)
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Readers
+# ---------------------------------------------------------------------------
+
+def load_store_rows(
+    engine: Engine,
+    mcc: int,
+    card_types: Tuple[str, ...] = (),
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Read feature and cost-type-count rows for one MCC.
+
+    An empty ``card_types`` returns the roll-up rows; otherwise the card-level
+    rows whose brand or type matches any of the (lower-case) filters.
+    """
+    bind: dict = {"mcc": int(mcc)}
+    if card_types:
+        placeholders = ", ".join(f":ct{i}" for i in range(len(card_types)))
+        where = (
+            f"mcc = :mcc AND card_brand <> '{ROLLUP_KEY}' "
+            f"AND (card_brand IN ({placeholders}) OR card_type IN ({placeholders}))"
+        )
+        for i, val in enumerate(card_types):
+            bind[f"ct{i}"] = val
+    else:
+        where = f"mcc = :mcc AND card_brand = '{ROLLUP_KEY}'"
+
+    with engine.connect() as conn:
+        features = pd.read_sql(text(f"SELECT * FROM {FEATURES_TABLE} WHERE {where}"), conn, params=bind)
+        counts = pd.read_sql(
+            text(f"""
+                SELECT merchant_id, ym, cost_type_id, txn_count
+                FROM {COST_TYPE_COUNTS_TABLE}
+                WHERE {where}
+            """),
+            conn,
+            params=bind,
+        )
+    return features, counts
+
+
+def load_training_frame(engine: Engine, mcc: int, cost_type_ids: List[int]) -> pd.DataFrame:
+    """
+    Monthly merchant-level training rows in the {mcc}_monthly_v2.csv layout
+    produced by training/prepare_data.py.
+    """
+    features, counts = load_store_rows(engine, mcc)
+    if features.empty:
+        return pd.DataFrame()
+
+    # Restore integer merchant ids when every id is numeric (matches the CSV path).
+    merchant_ids = pd.to_numeric(features["merchant_id"], errors="coerce")
+    if merchant_ids.isna().any():
+        merchant_ids = features["merchant_id"]
+    else:
+        merchant_ids = merchant_ids.astype("int64")
+
+    ym = pd.PeriodIndex(features["ym"], freq="M")
+    monthly = pd.DataFrame({
+        "merchant_id": merchant_ids,
+        "year": ym.year,
+        "month": ym.month,
+        "avg_proc_cost_pct": features["avg_proc_cost_pct"],
+        "std_proc_cost_pct": features["std_proc_cost_pct"],
+        "median_proc_cost_pct": features["median_proc_cost_pct"],
+        "iqr_proc_cost_pct": features["iqr_proc_cost_pct"],
+        "total_processing_value": features["total_processing_value"],
+        "transaction_count": features["transaction_count"].astype(int),
+        "avg_transaction_value": features["avg_transaction_value"],
+        "std_txn_amount": features["std_txn_amount"],
+        "median_txn_amount": features["median_txn_amount"],
+    })
+
+    valid = counts[counts["cost_type_id"] >= 0]
+    ct_counts = valid.pivot_table(
+        index=["merchant_id", "ym"], columns="cost_type_id", values="txn_count",
+        aggfunc="sum", fill_value=0,
+    )
+    ct_counts = ct_counts.reindex(
+        pd.MultiIndex.from_arrays([features["merchant_id"], features["ym"]]),
+        fill_value=0,
+    )
+    monthly["n_unique_cost_types"] = (ct_counts > 0).sum(axis=1).to_numpy()
+    ct_fracs = ct_counts.div(ct_counts.sum(axis=1).replace(0, np.nan), axis=0).fillna(0.0)
+    ct_fracs = ct_fracs.reindex(columns=cost_type_ids, fill_value=0.0)
+    for cid in cost_type_ids:
+        monthly[f"cost_type_{cid}_pct"] = ct_fracs[cid].to_numpy(dtype=float)
+
+    monthly = monthly.dropna(subset=["avg_proc_cost_pct"])
+    return monthly.sort_values(["merchant_id", "year", "month"]).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Rebuild the monthly feature store from knn_transactions.")
+    parser.add_argument("--mcc", type=int, action="append", default=None,
+                        help="Refresh only this MCC (repeatable; default: all MCCs).")
+    args = parser.parse_args()
+    refresh_feature_store(mccs=args.mcc)
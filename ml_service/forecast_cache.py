@@ -0,0 +1,160 @@
+"""
+Memoized forecast results for GetCostForecast and GetTPVForecast.
+
+The backend sends identical forecast inputs again and again: repeated quotes
+for one merchant, and the desired-margin page re-submitting after UI
+changes.  Both forecasts are deterministic functions of their inputs and of
+the artifact bundle that served them, so a ForecastResultCache keeps the
+finished responses and hands back a copy when the same inputs return.
+
+── KEY ───────────────────────────────────────────────────────────────────────
+request_key(**parts)   SHA-256 of the parts as canonical JSON (sorted keys, no
+                       whitespace, floats by repr).  Callers pass what the
+                       result depends on — context months, pool means, peer
+                       IDs, mcc, horizon, CI — plus the bundle's trained_at,
+                       so a retrained bundle never serves an old result.
+
+── EVICTION ──────────────────────────────────────────────────────────────────
+max_entries            least recently used results are evicted first;
+                       0 disables the cache
+ttl_seconds            results expire this long after they were computed
+invalidate(mcc=None)   drops results for ``mcc`` (all when None); subscribed
+                       to ArtifactStore hot-reloads and, for TPV, to
+                       reference-data invalidation
+generation             put() skips results computed across an invalidate()
+
+Usage:
+    cache = ForecastResultCache("proc_cost", max_entries=2048, ttl_seconds=900)
+    key = request_key(mcc=5411, context=[...], trained_at=bundle.trained_at)
+    hit = cache.get(key)
+    generation = cache.generation
+    ... compute result ...
+    cache.put(key, result, mcc=5411, generation=generation)
+    GET /ml/forecast-cache/stats  → all_result_cache_stats()
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+HIT = "hit"
+MISS = "miss"
+DISABLED = "disabled"
+
+
+def request_key(**parts: Any) -> str:
+    """Canonical hash of ``parts``; equal inputs give equal keys whatever their dict order."""
+    body = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+@dataclass
+class _CachedResult:
+    value: Any
+    mcc: Optional[int]
+    stored_at: float
+
+
+_caches: "weakref.WeakValueDictionary[str, ForecastResultCache]" = weakref.WeakValueDictionary()
+_caches_lock = threading.Lock()
+
+
+class ForecastResultCache:
+    """
+    Thread-safe LRU of forecast results with a TTL.
+
+    Stored values are shared; callers copy them before handing them out.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[str, _CachedResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        with _caches_lock:
+            _caches[name] = self
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Fresh result for ``key`` or None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if self._clock() - entry.stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(self, key: str, value: Any, mcc: Optional[int] = None, generation: Optional[int] = None) -> None:
+        """Store ``value``; skipped when invalidate() ran since ``generation`` was read."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = _CachedResult(value=value, mcc=mcc, stored_at=self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, mcc: Optional[int] = None) -> int:
+        """Drop every result (or only those for ``mcc``); returns the number dropped."""
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            keys = [k for k, e in self._entries.items() if mcc is None or e.mcc is None or e.mcc == int(mcc)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "generation": self.generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+def all_result_cache_stats() -> Dict[str, object]:
+    with _caches_lock:
+        caches = dict(_caches)
+    return {name: cache.stats() for name, cache in sorted(caches.items())}
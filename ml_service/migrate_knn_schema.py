@@ -0,0 +1,326 @@
+"""
+Migrate knn_transactions to the typed, indexed schema.
+
+Older databases store ``date`` as text, keep card_brand / card_type in
+whatever case the source CSV used and index ``mcc`` on its own, so reference
+loads had to wrap columns in CAST / LOWER / COALESCE and Postgres fell back
+to sequential scans.  This script brings an existing table in line with
+models.KNNTransaction:
+
+  1. ``date``            TEXT → DATE
+     amount / proc_cost  TEXT → DOUBLE PRECISION, cost_type_id TEXT → INTEGER
+  2. card_brand/type     trimmed and lower-cased in place, then guarded by
+                         CHECK constraints (CARD_CHECKS) so later loads
+                         cannot add mixed-case or padded values
+  3. indexes             ix_knn_transactions_mcc replaced by composite
+                         (mcc, card_brand, date), (mcc, card_type, date) and
+                         (mcc, merchant_id, date) indexes
+  4. optional            --partition-by-mcc: rebuild as a LIST-partitioned
+                         table with one partition per MCC plus a default.
+                         Postgres requires the partition key in every unique
+                         constraint, so the primary key becomes (id, mcc)
+                         and rows with a NULL mcc must be fixed first.
+
+Each step is skipped when already applied, so the script is safe to re-run.
+--dry-run runs every step inside a transaction, logs each statement and
+rolls back (Postgres DDL is transactional).
+
+Repositories check knn_schema_is_typed() and only use the sargable
+predicates once the column types are migrated and the CARD_CHECKS
+constraints exist; column types alone do not prove the card values are
+normalized.  The answer is cached per database
+for KNN_REFERENCE_CACHE_TTL_S and forgotten on reference-cache invalidation,
+so a migration run from another process is picked up without a restart.
+
+Usage:
+    docker compose exec ml-service python migrate_knn_schema.py [--dry-run]
+    docker compose exec ml-service python migrate_knn_schema.py --partition-by-mcc
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import types as sqltypes
+from sqlalchemy.engine import Engine
+
+from config import MLConfig
+
+logger = logging.getLogger(__name__)
+
+TABLE = "knn_transactions"
+COMPOSITE_INDEXES = {
+    "ix_knn_txn_mcc_brand_date": "mcc, card_brand, date",
+    "ix_knn_txn_mcc_type_date": "mcc, card_type, date",
+    "ix_knn_txn_mcc_merchant_date": "mcc, merchant_id, date",
+}
+LEGACY_INDEXES = ["ix_knn_transactions_mcc"]
+# column → (Postgres type after migration, information_schema data_type values already accepted)
+NUMERIC_COLUMNS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "amount": ("DOUBLE PRECISION", ("double precision", "real", "numeric")),
+    "proc_cost": ("DOUBLE PRECISION", ("double precision", "real", "numeric")),
+    "cost_type_id": ("INTEGER", ("integer", "bigint", "smallint")),
+}
+
+# Also declared on models.KNNTransaction, so tables created by init_db() carry them.
+CARD_CHECKS: Dict[str, str] = {
+    "ck_knn_card_brand_normalized": "card_brand = LOWER(TRIM(card_brand))",
+    "ck_knn_card_type_normalized": "card_type = LOWER(TRIM(card_type))",
+}
+
+_typed_cache: Dict[str, Tuple[bool, float]] = {}
+_typed_lock = threading.Lock()
+
+
+_NUMERIC_TYPES = (sqltypes.Float, sqltypes.Numeric)
+
+
+def _columns_are_typed(columns: Dict[str, sqltypes.TypeEngine]) -> bool:
+    date = columns.get("date")
+    return (
+        isinstance(date, sqltypes.Date) and not isinstance(date, sqltypes.DateTime)
+        and isinstance(columns.get("amount"), _NUMERIC_TYPES)
+        and isinstance(columns.get("proc_cost"), _NUMERIC_TYPES)
+        and isinstance(columns.get("cost_type_id"), sqltypes.Integer)
+    )
+
+
+def knn_schema_is_typed(engine: Engine, ttl_seconds: float = MLConfig.REFERENCE_CACHE_TTL_S) -> bool:
+    """
+    True when knn_transactions has a DATE ``date``, numeric amount / proc_cost,
+    an integer cost_type_id and the CARD_CHECKS constraints (migration
+    applied).  Cached per database for ``ttl_seconds``.
+    """
+    key = str(engine.url)
+    now = time.monotonic()
+    with _typed_lock:
+        cached = _typed_cache.get(key)
+        if cached is not None and now - cached[1] <= ttl_seconds:
+            return cached[0]
+    try:
+        inspector = inspect(engine)
+        columns = {c["name"]: c["type"] for c in inspector.get_columns(TABLE)}
+        checks = {c["name"] for c in inspector.get_check_constraints(TABLE)}
+    except Exception as exc:
+        logger.warning("[KNN Schema] Could not inspect %s: %s", TABLE, exc)
+        return False
+    typed = _columns_are_typed(columns) and set(CARD_CHECKS) <= checks
+    with _typed_lock:
+        _typed_cache[key] = (typed, now)
+    return typed
+
+
+def forget_schema_check(engine: Optional[Engine] = None) -> None:
+    """Drop the cached knn_schema_is_typed() answer (for every database when None)."""
+    with _typed_lock:
+        if engine is None:
+            _typed_cache.clear()
+        else:
+            _typed_cache.pop(str(engine.url), None)
+
+
+# ---------------------------------------------------------------------------
+# SQL
+# ---------------------------------------------------------------------------
+
+def numeric_column_sql(current_types: Dict[str, str]) -> List[str]:
+    """ALTER statements for every NUMERIC_COLUMNS column whose current data_type is not accepted."""
+    statements = []
+    for column, (target, accepted) in NUMERIC_COLUMNS.items():
+        if current_types.get(column, "") in accepted:
+            continue
+        statements.append(
+            f"ALTER TABLE {TABLE} ALTER COLUMN {column} TYPE {target} "
+            f"USING CAST(NULLIF(TRIM(CAST({column} AS TEXT)), '') AS {target})"
+        )
+    return statements
+
+
+def card_check_sql(existing: Iterable[str]) -> List[str]:
+    """ADD CONSTRAINT statements for the CARD_CHECKS not in ``existing``."""
+    existing = set(existing)
+    return [
+        f"ALTER TABLE {TABLE} ADD CONSTRAINT {name} CHECK ({condition})"
+        for name, condition in CARD_CHECKS.items() if name not in existing
+    ]
+
+
+def index_sql() -> List[str]:
+    return [f"DROP INDEX IF EXISTS {name}" for name in LEGACY_INDEXES] + [
+        f"CREATE INDEX IF NOT EXISTS {name} ON {TABLE} ({cols})" for name, cols in COMPOSITE_INDEXES.items()
+    ]
+
+
+def partition_sql(mccs: Iterable[int], id_sequence: Optional[str] = None) -> List[str]:
+    """
+    Statements that build the LIST-partitioned copy of knn_transactions, copy
+    the rows and swap it in; the old table is kept as knn_transactions_unpartitioned.
+    """
+    new, old = f"{TABLE}_partitioned", f"{TABLE}_unpartitioned"
+    statements = [
+        f"CREATE TABLE {new} (LIKE {TABLE} INCLUDING DEFAULTS) PARTITION BY LIST (mcc)",
+        # The partition key must be part of the primary key.
+        f"ALTER TABLE {new} ADD PRIMARY KEY (id, mcc)",
+    ]
+    statements += [
+        f"CREATE TABLE {TABLE}_p{int(mcc)} PARTITION OF {new} FOR VALUES IN ({int(mcc)})" for mcc in mccs
+    ]
+    statements += [
+        f"CREATE TABLE {TABLE}_pdefault PARTITION OF {new} DEFAULT",
+        f"INSERT INTO {new} SELECT * FROM {TABLE}",
+        f"ALTER TABLE {TABLE} RENAME TO {old}",
+        f"ALTER TABLE {new} RENAME TO {TABLE}",
+    ]
+    if id_sequence:
+        # Keep the id sequence alive if the old table is dropped later.
+        statements.append(f"ALTER SEQUENCE {id_sequence} OWNED BY {TABLE}.id")
+    statements += [f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_unpartitioned" for name in COMPOSITE_INDEXES]
+    return statements
+
+
+def _execute(conn, sql: str, params: Optional[dict] = None):
+    logger.info("[KNN Schema] %s", " ".join(sql.split()))
+    return conn.execute(text(sql), params or {})
+
+
+# ---------------------------------------------------------------------------
+# Steps
+# ---------------------------------------------------------------------------
+
+def _column_types(conn) -> Dict[str, str]:
+    rows = conn.execute(text("""
+        SELECT column_name, data_type FROM information_schema.columns
+        WHERE table_name = :table
+    """), {"table": TABLE})
+    return {name: data_type for name, data_type in rows}
+
+
+def _convert_date_column(conn) -> bool:
+    if _column_types(conn).get("date") == "date":
+        return False
+    bad = conn.execute(text(f"""
+        SELECT count(*) FROM {TABLE}
+        WHERE date IS NULL OR date !~ '^\\d{{4}}-\\d{{2}}-\\d{{2}}'
+    """)).scalar()
+    if bad:
+        raise ValueError(f"{bad:,} rows have a date that is not ISO formatted; fix them before migrating")
+    _execute(conn, f"ALTER TABLE {TABLE} ALTER COLUMN date TYPE DATE USING CAST(date AS DATE)")
+    return True
+
+
+def _convert_numeric_columns(conn) -> int:
+    statements = numeric_column_sql(_column_types(conn))
+    for sql in statements:
+        _execute(conn, sql)
+    return len(statements)
+
+
+def _normalize_card_columns(conn) -> int:
+    result = _execute(conn, f"""
+        UPDATE {TABLE}
+        SET card_brand = LOWER(TRIM(card_brand)),
+            card_type  = LOWER(TRIM(card_type))
+        WHERE card_brand <> LOWER(TRIM(card_brand))
+           OR card_type  <> LOWER(TRIM(card_type))
+    """)
+    return result.rowcount or 0
+
+
+def _add_card_checks(conn) -> int:
+    existing = [r[0] for r in conn.execute(text("""
+        SELECT con.conname FROM pg_constraint con
+        JOIN pg_class c ON c.oid = con.conrelid
+        WHERE c.relname = :table AND con.contype = 'c'
+    """), {"table": TABLE})]
+    statements = card_check_sql(existing)
+    for sql in statements:
+        _execute(conn, sql)
+    return len(statements)
+
+
+def _rebuild_indexes(conn) -> None:
+    for sql in index_sql():
+        _execute(conn, sql)
+
+
+def _is_partitioned(conn) -> bool:
+    return bool(conn.execute(text("""
+        SELECT 1 FROM pg_partitioned_table p
+        JOIN pg_class c ON c.oid = p.partrelid
+        WHERE c.relname = :table
+    """), {"table": TABLE}).scalar())
+
+
+def _partition_by_mcc(conn) -> bool:
+    """Swap knn_transactions for a LIST-partitioned copy keyed by (id, mcc)."""
+    if _is_partitioned(conn):
+        return False
+    null_mcc = conn.execute(text(f"SELECT count(*) FROM {TABLE} WHERE mcc IS NULL")).scalar()
+    if null_mcc:
+        raise ValueError(f"{null_mcc:,} rows have no mcc; the partitioned primary key (id, mcc) needs one")
+    mccs = [r[0] for r in conn.execute(text(f"SELECT DISTINCT mcc FROM {TABLE}"))]
+    seq = conn.execute(text(f"SELECT pg_get_serial_sequence('{TABLE}', 'id')")).scalar()
+    for sql in partition_sql(mccs, seq):
+        _execute(conn, sql)
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+def migrate_knn_schema(
+    database_url: str | None = None,
+    partition_by_mcc: bool = False,
+    dry_run: bool = False,
+) -> None:
+    db_url = database_url or os.environ.get("DATABASE_URL")
+    if not db_url:
+        raise ValueError("DATABASE_URL is not set")
+    engine = create_engine(db_url)
+    if engine.dialect.name != "postgresql":
+        raise ValueError("migrate_knn_schema targets PostgreSQL; other databases use models.py via init_db()")
+
+    t0 = time.time()
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            if _convert_date_column(conn):
+                logger.info("[KNN Schema] date converted to DATE")
+            converted = _convert_numeric_columns(conn)
+            logger.info("[KNN Schema] %d numeric / cost-type columns converted", converted)
+            updated = _normalize_card_columns(conn)
+            logger.info("[KNN Schema] %s rows with card_brand/card_type lower-cased", f"{updated:,}")
+            if partition_by_mcc and _partition_by_mcc(conn):
+                logger.info("[KNN Schema] %s rebuilt as LIST partitions by mcc", TABLE)
+            # After partitioning: constraints on the parent apply to every partition.
+            logger.info("[KNN Schema] %d card CHECK constraints added", _add_card_checks(conn))
+            _rebuild_indexes(conn)
+            if dry_run:
+                transaction.rollback()
+                logger.info("[KNN Schema] Dry run: rolled back")
+                return
+            _execute(conn, f"ANALYZE {TABLE}")
+            transaction.commit()
+        except BaseException:
+            if transaction.is_active:
+                transaction.rollback()
+            raise
+    forget_schema_check(engine)
+    logger.info("[KNN Schema] Done in %.1fs", time.time() - t0)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Migrate knn_transactions to the typed, indexed schema")
+    parser.add_argument("--partition-by-mcc", action="store_true",
+                        help="Also rebuild the table as LIST partitions by mcc")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Log every statement, then roll back")
+    args = parser.parse_args()
+    migrate_knn_schema(partition_by_mcc=args.partition_by_mcc, dry_run=args.dry_run)
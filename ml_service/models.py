@@ -8,12 +8,29 @@ knn_cost_type_ref  — lookup table of known cost_type_id values
 These tables are populated once by running:
     docker compose exec ml-service python migrate_sqlite_to_postgres.py
 
+knn_transactions.date is a native DATE and card_brand / card_type are stored
+lower-case so reference queries can filter on the raw columns and use the
+composite (mcc, card_brand|card_type|merchant_id, date) indexes.  Databases
+created before this layout are upgraded in place by:
+    docker compose exec ml-service python migrate_knn_schema.py [--partition-by-mcc]
+
+── MONTHLY FEATURE STORE ─────────────────────────────────────────────────────
+knn_monthly_features          — merchant × month aggregates of knn_transactions
+knn_monthly_cost_type_counts  — per cost_type_id transaction counts, same grain
+
+Both are materialized from knn_transactions by:
+    docker compose exec ml-service python feature_store.py [--mcc N]
+
+Rows are kept per (mcc, card_brand, card_type, merchant_id, ym) with brand and
+type lower-cased.  An additional roll-up row per (mcc, merchant_id, ym) carries
+card_brand = card_type = '*' so unfiltered reads need no re-aggregation.
+
 ── WHERE TO EDIT ─────────────────────────────────────────────────────────────
 • Add extra columns here if your engines require additional metadata.
 """
 from __future__ import annotations
 
-from sqlalchemy import Column, Float, Integer, String
+from sqlalchemy import CheckConstraint, Column, Date, Float, Index, Integer, String
 
 from database import Base
 
@@ -21,14 +38,23 @@ from database import Base
 class KNNTransaction(Base):
     """One row per historical transaction used by the KNN Rate Quote Engine."""
     __tablename__ = "knn_transactions"
+    __table_args__ = (
+        Index("ix_knn_txn_mcc_brand_date", "mcc", "card_brand", "date"),
+        Index("ix_knn_txn_mcc_type_date", "mcc", "card_type", "date"),
+        Index("ix_knn_txn_mcc_merchant_date", "mcc", "merchant_id", "date"),
+        # Keep in step with migrate_knn_schema.CARD_CHECKS: the sargable card
+        # filters rely on these values being normalized.
+        CheckConstraint("card_brand = LOWER(TRIM(card_brand))", name="ck_knn_card_brand_normalized"),
+        CheckConstraint("card_type = LOWER(TRIM(card_type))", name="ck_knn_card_type_normalized"),
+    )
 
     id           = Column(Integer, primary_key=True, index=True)
     transaction_id = Column(String, nullable=True, index=True)
     merchant_id  = Column(String, nullable=True, index=True)
-    mcc          = Column(Integer, nullable=True, index=True)
-    card_brand   = Column(String, nullable=True)
-    card_type    = Column(String, nullable=True)
-    date         = Column(String, nullable=False)
+    mcc          = Column(Integer, nullable=True)
+    card_brand   = Column(String, nullable=True)   # lower-case
+    card_type    = Column(String, nullable=True)   # lower-case
+    date         = Column(Date, nullable=False)
     amount       = Column(Float, nullable=True)
     proc_cost    = Column(Float, nullable=True)
     cost_type_id = Column(Integer, nullable=True)
@@ -40,3 +66,46 @@ class KNNCostTypeRef(Base):
 
     id           = Column(Integer, primary_key=True, index=True)
     cost_type_id = Column(Integer, nullable=False)
+
+
+class KNNMonthlyFeature(Base):
+    """Merchant × month aggregates of knn_transactions (see feature_store.py)."""
+    __tablename__ = "knn_monthly_features"
+    __table_args__ = (
+        Index("ix_knn_monthly_features_lookup", "mcc", "card_brand", "card_type", "ym"),
+    )
+
+    id                     = Column(Integer, primary_key=True)
+    mcc                    = Column(Integer, nullable=False)
+    card_brand             = Column(String, nullable=False)
+    card_type              = Column(String, nullable=False)
+    merchant_id            = Column(String, nullable=False)
+    ym                     = Column(String(7), nullable=False)   # 'YYYY-MM'
+    transaction_count      = Column(Integer, nullable=False)
+    amount_count           = Column(Integer, nullable=False)
+    total_processing_value = Column(Float, nullable=False)
+    sum_proc_cost          = Column(Float, nullable=False)
+    avg_transaction_value  = Column(Float, nullable=True)
+    std_txn_amount         = Column(Float, nullable=True)
+    median_txn_amount      = Column(Float, nullable=True)
+    avg_proc_cost_pct      = Column(Float, nullable=True)
+    std_proc_cost_pct      = Column(Float, nullable=True)
+    median_proc_cost_pct   = Column(Float, nullable=True)
+    iqr_proc_cost_pct      = Column(Float, nullable=True)
+
+
+class KNNMonthlyCostTypeCount(Base):
+    """Per cost_type_id transaction counts at the knn_monthly_features grain."""
+    __tablename__ = "knn_monthly_cost_type_counts"
+    __table_args__ = (
+        Index("ix_knn_monthly_ct_counts_lookup", "mcc", "card_brand", "card_type", "ym"),
+    )
+
+    id           = Column(Integer, primary_key=True)
+    mcc          = Column(Integer, nullable=False)
+    card_brand   = Column(String, nullable=False)
+    card_type    = Column(String, nullable=False)
+    merchant_id  = Column(String, nullable=False)
+    ym           = Column(String(7), nullable=False)
+    cost_type_id = Column(Integer, nullable=False)
+    txn_count    = Column(Integer, nullable=False)
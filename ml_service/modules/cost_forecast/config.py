@@ -16,6 +16,19 @@ PROC_COST_ARTIFACTS_BASE_PATH: Path = Path(
     os.getenv("PROC_COST_ARTIFACTS_BASE_PATH", str(Path(__file__).parent.parent.parent / "artifacts" / "proc_cost"))
 )
 
+# MCCs come from the artifact manifest; bundles load on first use and are
+# evicted least recently used past the budget.  The hot set ("5411,5812:6")
+# is loaded at startup and never evicted.
+PROC_COST_ARTIFACT_CACHE_MAX_BYTES: int = int(
+    float(os.getenv("PROC_COST_ARTIFACT_CACHE_MAX_MB", "256")) * 1024 * 1024
+)
+PROC_COST_ARTIFACT_HOT_SET: str = os.getenv("PROC_COST_ARTIFACT_HOT_SET", "")
+
+# Memoized forecast results, keyed by the request inputs and the bundle's
+# trained_at.  0 entries disables the cache.
+PROC_COST_RESULT_CACHE_MAX_ENTRIES: int = int(os.getenv("PROC_COST_RESULT_CACHE_MAX_ENTRIES", "2048"))
+PROC_COST_RESULT_CACHE_TTL_S: float = float(os.getenv("PROC_COST_RESULT_CACHE_TTL_S", "900"))
+
 # ---------------------------------------------------------------------------
 # Pipeline constants — must be identical to those used when train.py ran
 # ---------------------------------------------------------------------------
@@ -32,9 +45,6 @@ DEFAULT_HORIZON_MONTHS: int = 3
 # Default confidence interval for conformal prediction intervals
 DEFAULT_CONFIDENCE_INTERVAL: float = 0.90
 
-# Supported MCCs
-SUPPORTED_MCCS: list[int] = [4121, 5411, 5499, 5812]
-
 # ---------------------------------------------------------------------------
 # Hot-reload
 # ---------------------------------------------------------------------------
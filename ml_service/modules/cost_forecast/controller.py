@@ -7,6 +7,8 @@ from __future__ import annotations
 
 import logging
 
+from engine_executor import run_engine
+
 from .models import CostForecastRequest
 from .service import get_proc_cost_health, get_proc_cost_monthly_forecast
 
@@ -14,9 +16,9 @@ logger = logging.getLogger(__name__)
 
 
 async def run_cost_forecast(payload: CostForecastRequest) -> dict:
-    """Run processing-cost inference directly (no HTTP call)."""
+    """Run processing-cost inference on the cost executor lane (no HTTP call)."""
     logger.info("Running embedded processing-cost forecast for MCC %s", payload.mcc)
-    return get_proc_cost_monthly_forecast(payload)
+    return await run_engine("cost", get_proc_cost_monthly_forecast, payload)
 
 
 async def get_cost_forecast_health() -> dict:
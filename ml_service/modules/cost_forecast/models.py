@@ -74,6 +74,8 @@ class ProcessMetadata(BaseModel):
     generated_at_utc: str
     artifact_trained_at: str
     strat_enabled: bool
+    result_cache: Optional[str] = None  # "hit", "miss" or "disabled"
+    cached_at_utc: Optional[str] = None  # when a cache hit was computed; generated_at_utc is when it was served
 
 
 class CostForecastResponse(BaseModel):
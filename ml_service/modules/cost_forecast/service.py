@@ -10,12 +10,10 @@ and pool means pre-computed by the upstream composite merchant pipeline.
 """
 from __future__ import annotations
 
+import copy
 import json
-import math
 import os
-import threading
-import time
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
@@ -26,14 +24,22 @@ from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.linear_model import HuberRegressor
 from sklearn.preprocessing import StandardScaler
 
+from artifact_bundle import BUNDLE_FILE, read_bundle
+from artifact_store import ArtifactStore, parse_hot_set
+from calibration_residuals import ResidualStore, conformal_quantile
+from compiled_models import CompiledLinearPredictor, CompiledTreeEnsemble, compile_linear, compile_trees
+from forecast_cache import DISABLED, HIT, MISS, ForecastResultCache, request_key
+
 from .config import (
     ARTIFACT_POLL_INTERVAL_S,
     HORIZON_LEN,
+    PROC_COST_ARTIFACT_CACHE_MAX_BYTES,
+    PROC_COST_ARTIFACT_HOT_SET,
     PROC_COST_ARTIFACTS_BASE_PATH,
+    PROC_COST_RESULT_CACHE_MAX_ENTRIES,
+    PROC_COST_RESULT_CACHE_TTL_S,
     MIN_POOL,
     SUPPORTED_CONTEXT_LENS,
-    SUPPORTED_MCCS,
-    TARGET_COV,
     _VOL_EPS,
 )
 from .models import ContextMonth, CostForecastRequest
@@ -77,9 +83,11 @@ def _context_month_to_summary(cm: ContextMonth) -> _MonthSummary:
 @dataclass
 class ArtifactBundle:
     context_len: int
+    # The sklearn objects are only loaded from pickled artifacts; bundles read
+    # from bundle.bin leave them empty and always carry ``linear`` / ``risk``.
     models: List[HuberRegressor]
-    scaler: StandardScaler
-    cal_residuals: Dict[int, List[float]]
+    scaler: Optional[StandardScaler]
+    cal_residuals: ResidualStore
     global_q90: float
     risk_models: List[GradientBoostingRegressor]
     strat_enabled: bool
@@ -88,6 +96,10 @@ class ArtifactBundle:
     strat_q_vals: Optional[np.ndarray]
     config_snapshot: dict
     loaded_mtime: float = field(default=0.0)
+    # Scaler folded into the horizon models; None keeps the sklearn path.
+    linear: Optional[CompiledLinearPredictor] = None
+    # All risk models' trees in flat arrays; None keeps the sklearn path.
+    risk: Optional[CompiledTreeEnsemble] = None
 
     @property
     def trained_at(self) -> Optional[str]:
@@ -102,8 +114,33 @@ def _artifact_dir(mcc: int, ctx_len: int) -> Path:
     return PROC_COST_ARTIFACTS_BASE_PATH / str(mcc) / str(ctx_len)
 
 
+def _load_bundle_file(d: Path, ctx_len: int) -> ArtifactBundle:
+    """Bundle from the memory-mapped bundle.bin; no unpickling."""
+    f = read_bundle(d / BUNDLE_FILE)
+    snapshot = f.metadata
+    strat_enabled = snapshot.get("strat_enabled", False) and "strat/knot_x" in f.arrays
+    return ArtifactBundle(
+        context_len=ctx_len,
+        models=[],
+        scaler=None,
+        cal_residuals=f.residuals(),
+        global_q90=float(f.arrays["global_q90"]),
+        risk_models=[],
+        strat_enabled=strat_enabled,
+        strat_scheme=snapshot.get("strat_scheme"),
+        strat_knot_x=f.arrays["strat/knot_x"] if strat_enabled else None,
+        strat_q_vals=f.arrays["strat/q_vals"] if strat_enabled else None,
+        config_snapshot=snapshot,
+        loaded_mtime=os.path.getmtime(d / "config_snapshot.json"),
+        linear=CompiledLinearPredictor.from_arrays(**f.group("linear")),
+        risk=CompiledTreeEnsemble.from_arrays(f.group("trees")),
+    )
+
+
 def _load_bundle(mcc: int, ctx_len: int) -> ArtifactBundle:
     d = _artifact_dir(mcc, ctx_len)
+    if (d / BUNDLE_FILE).exists():
+        return _load_bundle_file(d, ctx_len)
     snapshot_path = d / "config_snapshot.json"
 
     with open(snapshot_path) as f:
@@ -111,7 +148,7 @@ def _load_bundle(mcc: int, ctx_len: int) -> ArtifactBundle:
 
     models: List[HuberRegressor] = joblib.load(d / "models.pkl")
     scaler: StandardScaler = joblib.load(d / "scaler.pkl")
-    cal_residuals: Dict[int, List[float]] = joblib.load(d / "cal_residuals.pkl")
+    cal_residuals = ResidualStore.from_dict(joblib.load(d / "cal_residuals.pkl"))
     global_q90: float = joblib.load(d / "global_q90.pkl")
     risk_models: List[GradientBoostingRegressor] = joblib.load(d / "risk_models.pkl")
 
@@ -137,66 +174,63 @@ def _load_bundle(mcc: int, ctx_len: int) -> ArtifactBundle:
         strat_q_vals=strat_q_vals,
         config_snapshot=snapshot,
         loaded_mtime=mtime,
+        linear=compile_linear(scaler, models),
+        risk=compile_trees(risk_models),
     )
 
 
+def _predict_horizons(bundle: ArtifactBundle, X_raw: np.ndarray, horizon: int) -> np.ndarray:
+    """Point forecasts for the first ``horizon`` months of the single row ``X_raw``."""
+    if bundle.linear is not None:
+        return bundle.linear.predict(X_raw)[0, :horizon]
+    X_scaled = bundle.scaler.transform(X_raw)
+    return np.array([bundle.models[h].predict(X_scaled)[0] for h in range(horizon)], dtype=float)
+
+
+def _risk_scores(bundle: ArtifactBundle, risk_vec: np.ndarray) -> np.ndarray:
+    """Every risk model's score for the single row ``risk_vec``."""
+    if bundle.risk is not None:
+        return bundle.risk.predict(risk_vec)[0]
+    return np.array([m.predict(risk_vec)[0] for m in bundle.risk_models], dtype=float)
+
+
 # ---------------------------------------------------------------------------
 # Artifact cache with hot-reload
 # ---------------------------------------------------------------------------
 
-_ARTIFACT_CACHE: Dict[Tuple[int, int], ArtifactBundle] = {}
-_CACHE_LOCK = threading.Lock()
+# Bundles listed in the artifact manifest, loaded on first request.
+_ARTIFACTS = ArtifactStore(
+    "proc_cost",
+    PROC_COST_ARTIFACTS_BASE_PATH,
+    loader=_load_bundle,
+    max_bytes=PROC_COST_ARTIFACT_CACHE_MAX_BYTES,
+    hot_set=parse_hot_set(PROC_COST_ARTIFACT_HOT_SET),
+)
+# Finished forecasts for repeated inputs; dropped when a bundle hot-reloads.
+_RESULTS = ForecastResultCache(
+    "proc_cost",
+    max_entries=PROC_COST_RESULT_CACHE_MAX_ENTRIES,
+    ttl_seconds=PROC_COST_RESULT_CACHE_TTL_S,
+)
+_ARTIFACTS.subscribe(_RESULTS.invalidate)
 
 
 def initialize() -> None:
-    """Load artifacts for all SUPPORTED_MCCS × SUPPORTED_CONTEXT_LENS."""
-    loaded = 0
-    for mcc in SUPPORTED_MCCS:
-        for ctx_len in SUPPORTED_CONTEXT_LENS:
-            d = _artifact_dir(mcc, ctx_len)
-            if not (d / "config_snapshot.json").exists():
-                print(
-                    f"[ProcCost] No artifacts for MCC {mcc} ctx={ctx_len} at {d} — skipping"
-                )
-                continue
-            try:
-                bundle = _load_bundle(mcc, ctx_len)
-                with _CACHE_LOCK:
-                    _ARTIFACT_CACHE[(mcc, ctx_len)] = bundle
-                loaded += 1
-                print(
-                    f"[ProcCost] Loaded MCC {mcc} ctx={ctx_len}  "
-                    f"trained_at={bundle.trained_at}  strat={bundle.strat_enabled}"
-                )
-            except Exception as exc:
-                print(f"[ProcCost] WARNING: failed to load MCC {mcc} ctx={ctx_len}: {exc}")
-    if loaded == 0:
-        print("[ProcCost] No artifacts loaded — service will use fallback mode.")
-    else:
-        start_artifact_watcher()
-
-
-def _poll_artifacts() -> None:
-    while True:
-        time.sleep(ARTIFACT_POLL_INTERVAL_S)
-        for (mcc, ctx_len) in list(_ARTIFACT_CACHE.keys()):
-            try:
-                snapshot_path = _artifact_dir(mcc, ctx_len) / "config_snapshot.json"
-                current_mtime = os.path.getmtime(snapshot_path)
-                with _CACHE_LOCK:
-                    old_mtime = _ARTIFACT_CACHE[(mcc, ctx_len)].loaded_mtime
-                if current_mtime > old_mtime:
-                    bundle = _load_bundle(mcc, ctx_len)
-                    with _CACHE_LOCK:
-                        _ARTIFACT_CACHE[(mcc, ctx_len)] = bundle
-                    print(f"[ProcCost] Hot-reloaded MCC {mcc} ctx={ctx_len}")
-            except Exception as exc:
-                print(f"[ProcCost] WARNING: artifact reload failed: {exc}")
+    """Read the artifact manifest and load the configured hot set; the rest load on first request."""
+    n_bundles = _ARTIFACTS.refresh_manifest()
+    start_artifact_watcher()
+    if n_bundles == 0:
+        print("[ProcCost] No artifacts found — service will use fallback mode.")
+        return
+    preloaded = _ARTIFACTS.preload()
+    print(
+        f"[ProcCost] Artifact manifest lists {n_bundles} bundles for MCCs "
+        f"{_ARTIFACTS.mccs()}; {preloaded} preloaded"
+    )
 
 
 def start_artifact_watcher() -> None:
-    t = threading.Thread(target=_poll_artifacts, daemon=True, name="proc-cost-artifact-watcher")
-    t.start()
+    _ARTIFACTS.start_watcher(ARTIFACT_POLL_INTERVAL_S)
 
 
 # ---------------------------------------------------------------------------
@@ -216,21 +250,12 @@ def _select_context_window(months: List[_MonthSummary]) -> List[_MonthSummary]:
 # ---------------------------------------------------------------------------
 
 def _resolve_bundle(mcc: int, ctx_len: int) -> ArtifactBundle:
-    with _CACHE_LOCK:
-        bundle = _ARTIFACT_CACHE.get((mcc, ctx_len))
-    if bundle is not None:
-        return bundle
-
-    with _CACHE_LOCK:
-        available = sorted([cl for (m, cl) in _ARTIFACT_CACHE if m == mcc])
-    if not available:
+    bundle = _ARTIFACTS.resolve(mcc, ctx_len)
+    if bundle is None:
         raise ValueError(
-            f"MCC {mcc} has no loaded artifacts. Available MCCs: "
-            f"{sorted(set(m for m, _ in _ARTIFACT_CACHE.keys()))}"
+            f"MCC {mcc} has no loaded artifacts. Available MCCs: {_ARTIFACTS.mccs()}"
         )
-    nearest = min(available, key=lambda cl: abs(cl - ctx_len))
-    with _CACHE_LOCK:
-        return _ARTIFACT_CACHE[(mcc, nearest)]
+    return bundle
 
 
 # ---------------------------------------------------------------------------
@@ -291,12 +316,6 @@ def _build_risk_vector(
 # Conformal quantile helpers
 # ---------------------------------------------------------------------------
 
-def _adaptive_q(residuals: List[float], target: float = TARGET_COV) -> Optional[float]:
-    n = len(residuals)
-    level = math.ceil((n + 1) * target) / n
-    return float(np.quantile(residuals, level)) if level <= 1.0 else None
-
-
 def _compute_conformal_hw(
     peer_merchant_ids: Optional[List[int]],
     bundle: ArtifactBundle,
@@ -306,19 +325,16 @@ def _compute_conformal_hw(
     confidence_interval: float,
 ) -> Tuple[float, int, str, Optional[float], Optional[str]]:
     # Tier 1: local peer pool
-    peer_residuals: List[float] = []
-    if peer_merchant_ids:
-        for pid in peer_merchant_ids:
-            peer_residuals.extend(bundle.cal_residuals.get(pid, []))
+    peer_residuals = bundle.cal_residuals.gather(peer_merchant_ids or [])
 
     if len(peer_residuals) >= MIN_POOL:
-        q = _adaptive_q(peer_residuals, target=confidence_interval)
+        q = conformal_quantile(peer_residuals, target=confidence_interval)
         if q is not None:
             return float(q), len(peer_residuals), "local", None, None
 
     # Compute risk score for tier 2
     risk_vec = _build_risk_vector(context_months, pool_mean, knn_pool_mean)
-    scores = np.array([m.predict(risk_vec)[0] for m in bundle.risk_models], dtype=float)
+    scores = _risk_scores(bundle, risk_vec)
     risk_score = float(np.max(scores))
 
     # Tier 2: GBR-stratified continuous width mapping
@@ -336,6 +352,42 @@ def _compute_conformal_hw(
     return bundle.global_q90, len(peer_residuals), "global_fallback", risk_score, None
 
 
+# ---------------------------------------------------------------------------
+# Result cache
+# ---------------------------------------------------------------------------
+
+def _result_key(
+    req: CostForecastRequest, context_months: List[_MonthSummary], bundle: ArtifactBundle, horizon: int,
+) -> str:
+    # Peer order does not change the conformal quantile, so it is not part of the key.
+    return request_key(
+        context_months=[asdict(m) for m in context_months],
+        pool_mean=req.pool_mean_at_context_end,
+        knn_pool_mean=req.knn_pool_mean_at_context_end,
+        peer_merchant_ids=sorted(req.peer_merchant_ids or []),
+        mcc=req.mcc,
+        ctx_len=bundle.context_len,
+        horizon=horizon,
+        confidence_interval=req.confidence_interval,
+        trained_at=bundle.trained_at,
+    )
+
+
+def _with_cache_status(result: dict, status: str, served_at: Optional[datetime] = None) -> dict:
+    """
+    A private copy of a (possibly cached) result, tagged with how it was
+    served.  A cache hit is stamped with ``served_at``; cached_at_utc keeps
+    when the result was computed.
+    """
+    result = copy.deepcopy(result)
+    meta = result["process_metadata"]
+    meta["result_cache"] = status
+    if served_at is not None:
+        meta["cached_at_utc"] = meta["generated_at_utc"]
+        meta["generated_at_utc"] = served_at.isoformat()
+    return result
+
+
 # ---------------------------------------------------------------------------
 # Main entry point
 # ---------------------------------------------------------------------------
@@ -346,10 +398,13 @@ def get_proc_cost_monthly_forecast(req: CostForecastRequest) -> dict:
 
     Returns a dict with keys: forecast, conformal_metadata, process_metadata.
     forecast is a list of monthly items (3 months), NOT weekly.
+    Identical inputs served by the same bundle come from the result cache;
+    process_metadata.result_cache says whether this one did.
     """
     generated_at = datetime.now(timezone.utc)
+    cache_generation = _RESULTS.generation
 
-    if not _ARTIFACT_CACHE:
+    if not _ARTIFACTS.entries():
         raise RuntimeError(
             "Processing cost forecast artifacts not loaded. "
             "Either train.py has not been run or PROC_COST_ARTIFACTS_BASE_PATH is misconfigured."
@@ -366,6 +421,12 @@ def get_proc_cost_monthly_forecast(req: CostForecastRequest) -> dict:
 
     # Resolve artifact bundle
     bundle = _resolve_bundle(req.mcc, ctx_len)
+    horizon = min(req.horizon_months, HORIZON_LEN)
+
+    cache_key = _result_key(req, context_months, bundle, horizon)
+    cached = _RESULTS.get(cache_key)
+    if cached is not None:
+        return _with_cache_status(cached, HIT, served_at=generated_at)
 
     # Pool means provided by caller (pre-computed by composite merchant pipeline)
     knn_pool_mean = req.knn_pool_mean_at_context_end
@@ -373,14 +434,9 @@ def get_proc_cost_monthly_forecast(req: CostForecastRequest) -> dict:
 
     # Build feature vector and scale
     X_raw = _build_feature_vector(context_months, knn_pool_mean)
-    X_scaled = bundle.scaler.transform(X_raw)
 
     # Predict HORIZON months
-    horizon = min(req.horizon_months, HORIZON_LEN)
-    point_forecasts = np.array(
-        [bundle.models[h].predict(X_scaled)[0] for h in range(horizon)],
-        dtype=float,
-    )
+    point_forecasts = _predict_horizons(bundle, X_raw, horizon)
 
     # Conformal half-width
     hw, pool_size, conformal_mode, risk_score, strat_scheme = _compute_conformal_hw(
@@ -397,7 +453,7 @@ def get_proc_cost_monthly_forecast(req: CostForecastRequest) -> dict:
     c_std = float(np.std(vals))
     momentum = float(vals[-1] - c_mean)
 
-    return {
+    result = {
         "forecast": [
             {
                 "month_index": h + 1,
@@ -429,22 +485,25 @@ def get_proc_cost_monthly_forecast(req: CostForecastRequest) -> dict:
             "strat_enabled": bundle.strat_enabled,
         },
     }
+    _RESULTS.put(cache_key, result, mcc=req.mcc, generation=cache_generation)
+    return _with_cache_status(result, MISS if _RESULTS.enabled else DISABLED)
 
 
 def get_proc_cost_health() -> dict:
     """Return artifact status (no HTTP call needed)."""
-    with _CACHE_LOCK:
-        loaded = [
-            {
-                "mcc": mcc,
-                "ctx_len": ctx_len,
-                "trained_at": bundle.trained_at,
-                "strat_enabled": bundle.strat_enabled,
-            }
-            for (mcc, ctx_len), bundle in _ARTIFACT_CACHE.items()
-        ]
+    resident = {(k["mcc"], k["ctx_len"]) for k in _ARTIFACTS.stats()["keys"]}
+    bundles = [
+        {
+            "mcc": mcc,
+            "ctx_len": ctx_len,
+            "trained_at": entry.trained_at,
+            "strat_enabled": entry.strat_enabled,
+            "resident": (mcc, ctx_len) in resident,
+        }
+        for (mcc, ctx_len), entry in sorted(_ARTIFACTS.entries().items())
+    ]
     return {
-        "status": "ok" if _ARTIFACT_CACHE else "degraded",
-        "supported_mccs": SUPPORTED_MCCS,
-        "loaded_bundles": loaded,
+        "status": "ok" if bundles else "degraded",
+        "supported_mccs": _ARTIFACTS.mccs(),
+        "loaded_bundles": bundles,
     }
@@ -0,0 +1,76 @@
+"""
+Configuration for the KNN rate quote module.
+
+Knobs are read from the environment so they can be tuned per deployment
+without a code change.  The reference-transaction cache shared with the TPV
+engine is configured in config.MLConfig (see reference_data.py).
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# Monthly feature store (ml_service/feature_store.py)
+# ---------------------------------------------------------------------------
+# Read merchant × month features from knn_monthly_features when the MCC has
+# been materialized; falls back to raw knn_transactions otherwise.
+FEATURE_STORE_ENABLED: bool = os.getenv("KNN_USE_FEATURE_STORE", "true").lower() in ("1", "true", "yes")
+
+# ---------------------------------------------------------------------------
+# Neighbour indexes (neighbor_index.py)
+# ---------------------------------------------------------------------------
+# Comma-separated MCCs whose per-end-month pool indexes are built on startup;
+# other MCCs are indexed on their first quote.
+PREBUILD_INDEX_MCCS: list[int] = [
+    int(m) for m in os.getenv("KNN_PREBUILD_MCCS", "").split(",") if m.strip()
+]
+
+# Memory budgets for the fitted per-end-month pools and the dense monthly
+# panels.  Both also expire after KNN_REFERENCE_CACHE_TTL_S and are released
+# with the cached monthly frame they were built from.
+NEIGHBOR_INDEX_CACHE_MAX_BYTES: int = int(
+    float(os.getenv("KNN_NEIGHBOR_INDEX_CACHE_MAX_MB", "256")) * 1024 * 1024
+)
+MONTHLY_PANEL_CACHE_MAX_BYTES: int = int(
+    float(os.getenv("KNN_MONTHLY_PANEL_CACHE_MAX_MB", "128")) * 1024 * 1024
+)
+
+# ---------------------------------------------------------------------------
+# Batch quotes (/ml/getQuoteBatch)
+# ---------------------------------------------------------------------------
+# Upper bound on requests accepted in one batch call.
+QUOTE_BATCH_MAX_ITEMS: int = int(os.getenv("KNN_QUOTE_BATCH_MAX_ITEMS", "5000"))
+
+# ---------------------------------------------------------------------------
+# Reference aggregation
+# ---------------------------------------------------------------------------
+# "sql"  — merchant × month / week × cost_type GROUP BY runs in the database
+#          and only aggregated rows are transferred.
+# "rows" — transaction rows are loaded and aggregated in pandas.
+AGGREGATION_MODE: str = os.getenv("KNN_AGGREGATION_MODE", "sql").strip().lower()
+
+# ---------------------------------------------------------------------------
+# External processing-cost service (PROC_COST_SERVICE_URL)
+# ---------------------------------------------------------------------------
+# Unpriced transactions are sent in batches of at most this many rows, with up
+# to PROC_COST_MAX_CONCURRENCY batches in flight over one pooled HTTP client.
+PROC_COST_BATCH_SIZE: int = int(os.getenv("PROC_COST_BATCH_SIZE", "500"))
+PROC_COST_MAX_CONCURRENCY: int = int(os.getenv("PROC_COST_MAX_CONCURRENCY", "4"))
+PROC_COST_TIMEOUT_S: float = float(os.getenv("PROC_COST_TIMEOUT_S", "10"))
+
+# Priced tickets cached by (amount, card_brand, card_type, mcc).
+PROC_COST_CACHE_MAX_ENTRIES: int = int(os.getenv("PROC_COST_CACHE_MAX_ENTRIES", "200000"))
+PROC_COST_CACHE_TTL_S: float = float(os.getenv("PROC_COST_CACHE_TTL_S", "3600"))
+
+# ---------------------------------------------------------------------------
+# Local fee schedules (cost_structure/*.JSON)
+# ---------------------------------------------------------------------------
+# Card / network fee schedules shared with the backend's cost calculation.
+# When present, onboarding transactions are priced from them (or they back the
+# external service as its fallback) instead of the flat heuristic.
+_cost_structure_env = os.getenv("COST_STRUCTURE_DIR", "").strip()
+COST_STRUCTURE_DIR: Path = (
+    Path(_cost_structure_env) if _cost_structure_env
+    else Path(__file__).resolve().parents[3] / "cost_structure"
+)
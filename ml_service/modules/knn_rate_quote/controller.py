@@ -16,10 +16,14 @@ from datetime import date
 
 import pandas as pd
 
+from .config import PREBUILD_INDEX_MCCS, QUOTE_BATCH_MAX_ITEMS
 from .schemas import (
     CompositeMerchantRequest,
     CompositeMerchantResponse,
     KNNRateQuoteResult,
+    QuoteBatchItem,
+    QuoteBatchRequest,
+    QuoteBatchResponse,
     QuoteRequest,
     QuoteResponse,
 )
@@ -32,7 +36,10 @@ def _get_service() -> ProductionQuoteService:
     global _service
     if _service is None:
         from database import engine  # imported here to avoid circular imports
-        _service = ProductionQuoteService(engine=engine)
+        from reference_data import get_reference_data
+
+        # Reference rows, cache and invalidation are shared with GetTPVForecast.
+        _service = ProductionQuoteService(engine=engine, reference_data=get_reference_data())
     return _service
 
 
@@ -83,9 +90,51 @@ def run_get_quote(payload: QuoteRequest) -> dict[str, Any]:
     return response.model_dump()
 
 
+def run_get_quote_batch(payload: QuoteBatchRequest) -> dict[str, Any]:
+    if len(payload.requests) > QUOTE_BATCH_MAX_ITEMS:
+        raise ValueError(
+            f"Batch of {len(payload.requests)} requests exceeds the limit of {QUOTE_BATCH_MAX_ITEMS}."
+        )
+    svc = _get_service()
+    outcomes = svc.get_quote_batch(payload.requests)
+
+    items = []
+    for index, (req, outcome) in enumerate(zip(payload.requests, outcomes)):
+        if isinstance(outcome, Exception):
+            items.append(QuoteBatchItem(index=index, mcc=req.mcc, status="error", error=str(outcome)))
+            continue
+        items.append(
+            QuoteBatchItem(
+                index=index,
+                mcc=req.mcc,
+                status="ok",
+                result=QuoteResponse(
+                    neighbor_forecasts=outcome.neighbor_forecasts,
+                    context_len_wk=outcome.context_len_wk,
+                    horizon_len_wk=outcome.horizon_len_wk,
+                    k=outcome.k,
+                    end_month=outcome.end_month,
+                ),
+            )
+        )
+    n_ok = sum(1 for item in items if item.status == "ok")
+    response = QuoteBatchResponse(items=items, n_ok=n_ok, n_failed=len(items) - n_ok)
+    return response.model_dump()
+
+
 def run_get_composite_merchant(payload: CompositeMerchantRequest) -> dict[str, Any]:
     svc = _get_service()
     result = svc.get_composite_merchant(payload)
+    if payload.response_format == "columns":
+        # Plain lists straight from the composite frame; skips per-row model validation.
+        return {
+            "composite_merchant_id": result.composite_merchant_id,
+            "matched_neighbor_merchant_ids": result.matched_neighbor_merchant_ids,
+            "k": result.k,
+            "matching_start_month": result.matching_start_month,
+            "matching_end_month": result.matching_end_month,
+            "weekly_features": result.weekly_features,
+        }
     response = CompositeMerchantResponse(
         composite_merchant_id=result.composite_merchant_id,
         matched_neighbor_merchant_ids=result.matched_neighbor_merchant_ids,
@@ -95,3 +144,21 @@ def run_get_composite_merchant(payload: CompositeMerchantRequest) -> dict[str, A
         weekly_features=result.weekly_features,
     )
     return response.model_dump()
+
+
+def get_reference_cache_stats() -> dict[str, Any]:
+    """Hit/miss/eviction counters and current footprint of the reference cache."""
+    return _get_service().reference_cache_stats()
+
+
+def invalidate_reference_cache(mcc: Optional[int] = None) -> dict[str, Any]:
+    """Drop shared reference frames, and state derived from them, for one MCC (or all)."""
+    dropped = _get_service().invalidate_reference_cache(mcc)
+    return {"status": "ok", "mcc": mcc, "entries_dropped": dropped}
+
+
+def warm_neighbor_indexes() -> int:
+    """Prebuild pool indexes for the MCCs listed in KNN_PREBUILD_MCCS."""
+    if not PREBUILD_INDEX_MCCS:
+        return 0
+    return _get_service().warm_neighbor_indexes(PREBUILD_INDEX_MCCS)
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from typing import Dict, List
 
+import numpy as np
 import pandas as pd
 
 
@@ -70,6 +72,52 @@ def build_monthly_features(df: pd.DataFrame, cost_type_ids: List[str]) -> pd.Dat
     return features
 
 
+def build_monthly_features_from_store(
+    store_features: pd.DataFrame,
+    store_cost_type_counts: pd.DataFrame,
+    cost_type_ids: List[str],
+) -> pd.DataFrame:
+    """
+    Same output as build_monthly_features, assembled from feature-store rows
+    (see ml_service/feature_store.py) by summing the additive measures over
+    the matched card cells.
+    """
+    if store_features.empty:
+        return pd.DataFrame()
+
+    sums = (
+        store_features.groupby(["merchant_id", "ym"])[
+            ["amount_count", "total_processing_value", "sum_proc_cost"]
+        ]
+        .sum()
+    )
+
+    cost_counts = store_cost_type_counts.assign(
+        cost_type_ID=store_cost_type_counts["cost_type_id"].astype(int).astype(str)
+    ).pivot_table(
+        index=["merchant_id", "ym"],
+        columns="cost_type_ID",
+        values="txn_count",
+        aggfunc="sum",
+        fill_value=0,
+    )
+    cost_counts = cost_counts.reindex(index=sums.index, columns=cost_type_ids, fill_value=0)
+
+    total_txn = cost_counts.sum(axis=1).rename("total_transactions")
+    cost_pct = cost_counts.div(total_txn, axis=0).fillna(0.0)
+    cost_pct.columns = [f"pct_ct_{c}" for c in cost_pct.columns]
+
+    avg_amount = (sums["total_processing_value"] / sums["amount_count"]).rename("avg_amount")
+    proc_cost_pct = (
+        sums["sum_proc_cost"] / sums["total_processing_value"]
+    ).replace([float("inf"), float("-inf")], 0.0).fillna(0.0).rename("proc_cost_pct")
+
+    features = pd.concat([cost_pct, total_txn, avg_amount, proc_cost_pct], axis=1).reset_index()
+    features["ym"] = pd.PeriodIndex(features["ym"], freq="M")
+    features["ym_period"] = pd.PeriodIndex(features["ym"], freq="M")
+    return features
+
+
 def build_pool_by_month(
     monthly_df: pd.DataFrame,
     feature_cols: List[str],
@@ -179,40 +227,132 @@ def query_vector_from_pool_means(
     avg_monthly_txn_count: int,
     avg_monthly_txn_value: float,
 ) -> pd.DataFrame:
+    return query_vectors_from_pool_means(
+        feature_cols, pool, [avg_monthly_txn_count], [avg_monthly_txn_value]
+    )
+
+
+def query_vectors_from_pool_means(
+    feature_cols: List[str],
+    pool: pd.DataFrame,
+    avg_monthly_txn_counts: List[int],
+    avg_monthly_txn_values: List[float],
+) -> pd.DataFrame:
+    """One query row per (count, value) pair; pool means are computed once."""
     means = pool[feature_cols].mean()
     pct_cols = [c for c in feature_cols if c.startswith("pct_ct_")]
     pct = means[pct_cols]
     pct = pct / max(float(pct.sum()), 1e-12)
 
-    row = pd.DataFrame([means.to_dict()])
+    template = means.to_dict()
     for col in pct_cols:
-        row[col] = float(pct[col])
-
-    row["total_transactions"] = int(avg_monthly_txn_count)
-    row["avg_amount"] = float(avg_monthly_txn_value)
-    row = row.reindex(columns=feature_cols, fill_value=0.0).fillna(0.0)
-    return row.astype(float)
+        template[col] = float(pct[col])
+
+    rows = pd.DataFrame([template] * len(avg_monthly_txn_counts))
+    rows["total_transactions"] = [int(v) for v in avg_monthly_txn_counts]
+    rows["avg_amount"] = [float(v) for v in avg_monthly_txn_values]
+    rows = rows.reindex(columns=feature_cols, fill_value=0.0).fillna(0.0)
+    return rows.astype(float)
+
+
+@dataclass
+class MonthlyPanel:
+    """
+    Dense (merchant_id, ym_period) index over a monthly feature table.
+
+    ``row_pos[m, p]`` is the row position in the source table for merchant
+    ``merchant_ids[m]`` in month ``first_period + p`` (-1 when absent);
+    ``proc_cost_pct`` is the matching merchant × month matrix.
+    """
+
+    merchant_ids: pd.Index
+    first_period: pd.Period
+    row_pos: np.ndarray
+    proc_cost_pct: np.ndarray
+
+    @property
+    def n_periods(self) -> int:
+        return self.row_pos.shape[1]
+
+    @property
+    def last_period(self) -> pd.Period:
+        return self.first_period + (self.n_periods - 1)
+
+    def offset(self, period: pd.Period) -> int:
+        return period.ordinal - self.first_period.ordinal
+
+    def latest_period_with_month(self, month: int) -> pd.Period | None:
+        """Most recent month present in the table whose calendar month is ``month``."""
+        present = (self.row_pos >= 0).any(axis=0)
+        for p in range(self.n_periods - 1, -1, -1):
+            period = self.first_period + p
+            if present[p] and period.month == month:
+                return period
+        return None
+
+    def window_rows(self, start_period: pd.Period, end_period: pd.Period) -> np.ndarray:
+        """Source rows of merchants present in every month of the window, in month order per merchant."""
+        lo, hi = self.offset(start_period), self.offset(end_period)
+        if lo < 0 or hi >= self.n_periods or lo > hi:
+            return np.empty(0, dtype=np.int64)
+        window = self.row_pos[:, lo:hi + 1]
+        return window[(window >= 0).all(axis=1)].ravel()
+
+    def horizon_proc_cost_pct(
+        self,
+        merchant_ids: pd.Series,
+        end_periods: pd.Series,
+        horizon_len_months: int,
+    ) -> np.ndarray:
+        """
+        proc_cost_pct for months end+1 … end+horizon of each (merchant, end)
+        pair in one gather; missing months are 0.0.
+        """
+        rows = self.merchant_ids.get_indexer(merchant_ids)
+        ends = pd.PeriodIndex(end_periods.astype(str), freq="M").asi8 - self.first_period.ordinal
+        cols = ends[:, None] + np.arange(1, horizon_len_months + 1)[None, :]
+        valid = (rows[:, None] >= 0) & (cols >= 0) & (cols < self.n_periods)
+        values = np.zeros(cols.shape, dtype=float)
+        r = np.broadcast_to(rows[:, None], cols.shape)
+        values[valid] = self.proc_cost_pct[r[valid], cols[valid]]
+        values[np.isnan(values)] = 0.0
+        return values
+
+
+def build_monthly_panel(monthly_df: pd.DataFrame) -> MonthlyPanel:
+    codes, merchant_ids = pd.factorize(monthly_df["merchant_id"])
+    ordinals = pd.PeriodIndex(monthly_df["ym_period"], freq="M").asi8
+    first = int(ordinals.min())
+    n_periods = int(ordinals.max()) - first + 1
+
+    row_pos = np.full((len(merchant_ids), n_periods), -1, dtype=np.int64)
+    # Assign in reverse so the first row wins for duplicate (merchant, month) keys.
+    positions = np.arange(len(monthly_df))[::-1]
+    row_pos[codes[::-1], ordinals[::-1] - first] = positions
+
+    proc = pd.to_numeric(monthly_df["proc_cost_pct"], errors="coerce").to_numpy(dtype=float)
+    proc_matrix = np.where(row_pos >= 0, proc[row_pos], np.nan)
+    return MonthlyPanel(
+        merchant_ids=pd.Index(merchant_ids),
+        first_period=pd.Period(ordinal=first, freq="M"),
+        row_pos=row_pos,
+        proc_cost_pct=proc_matrix,
+    )
 
 
 def lookup_horizon_proc_cost_pct(
     monthly_df: pd.DataFrame,
     matched_cases: pd.DataFrame,
     horizon_len_months: int,
+    panel: MonthlyPanel | None = None,
 ) -> List[List[float]]:
-    results: List[List[float]] = []
-    for _, row in matched_cases.iterrows():
-        merchant_id = row["merchant_id"]
-        end_period = pd.Period(str(row["end_period"]), freq="M")
-        month_values: List[float] = []
-        for i in range(1, horizon_len_months + 1):
-            target_period = end_period + i
-            match = monthly_df[
-                (monthly_df["merchant_id"] == merchant_id)
-                & (monthly_df["ym_period"] == target_period)
-            ]
-            if match.empty or match["proc_cost_pct"].isna().all():
-                month_values.append(0.0)
-            else:
-                month_values.append(float(match["proc_cost_pct"].iloc[0]))
-        results.append(month_values)
-    return results
+    if matched_cases.empty:
+        return []
+    if panel is None:
+        panel = build_monthly_panel(monthly_df)
+    values = panel.horizon_proc_cost_pct(
+        matched_cases["merchant_id"],
+        matched_cases["end_period"],
+        horizon_len_months,
+    )
+    return values.tolist()
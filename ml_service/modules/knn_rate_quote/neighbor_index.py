@@ -0,0 +1,280 @@
+"""
+Prebuilt neighbour indexes for the KNN quote pool.
+
+get_quote used to rebuild the end-month pool from the monthly reference table
+and fit a fresh NearestNeighbors on every request.  NeighborIndexRegistry
+builds the pools once per (mcc, card_types, context_len, horizon_len), keeps
+a fitted index per end month and per feature set, and rebuilds them when the
+monthly reference frame they were built from is replaced (cache expiry or
+invalidation).  MonthlyPanelRegistry does the same for the dense
+(merchant_id, ym_period) panel used for horizon lookups and window pools.
+
+Both hold only a weak reference to the source frame: once the byte-bounded
+monthly cache drops a frame, what was built from it is released too.
+Entries also expire after KNN_REFERENCE_CACHE_TTL_S and are evicted least
+recently used past their own byte budget.  The most recent entry larger
+than the whole budget is kept on its own, so one oversized MCC is not
+rebuilt on every quote.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import NearestNeighbors
+
+from config import MLConfig
+
+from .config import MONTHLY_PANEL_CACHE_MAX_BYTES, NEIGHBOR_INDEX_CACHE_MAX_BYTES
+from .feature_engineering import MonthlyPanel, build_monthly_panel, build_pool_by_month
+
+logger = logging.getLogger(__name__)
+
+IndexKey = Tuple[int, Tuple[str, ...], int, int]
+PanelKey = Tuple[int, Tuple[str, ...]]
+V = TypeVar("V")
+
+
+def _as_matrix(frame: pd.DataFrame, cols: Sequence[str]) -> np.ndarray:
+    values = frame[list(cols)].apply(pd.to_numeric, errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    return np.ascontiguousarray(values)
+
+
+@dataclass
+class PoolIndex:
+    """Reference cases for one end month with fitted indexes per feature set."""
+
+    pool: pd.DataFrame
+    k: int
+    models: Dict[Tuple[str, ...], NearestNeighbors] = field(default_factory=dict)
+
+    def fit(self, feature_cols: Sequence[str]) -> None:
+        model = NearestNeighbors(n_neighbors=self.k, metric="euclidean")
+        model.fit(_as_matrix(self.pool, feature_cols))
+        self.models[tuple(feature_cols)] = model
+
+    def kneighbors(self, query_vecs: pd.DataFrame, feature_cols: Sequence[str]) -> np.ndarray:
+        """Row positions in ``pool`` of the k nearest cases, one row per query vector."""
+        model = self.models.get(tuple(feature_cols))
+        if model is None:
+            raise KeyError(f"No neighbour index fitted for features {list(feature_cols)}")
+        _, idx = model.kneighbors(_as_matrix(query_vecs, feature_cols))
+        return idx
+
+    @property
+    def nbytes(self) -> int:
+        """Pool frame plus the fitted training matrices (their trees are about as large again)."""
+        fitted = sum(getattr(m, "_fit_X", np.empty(0)).nbytes for m in self.models.values())
+        return int(self.pool.memory_usage(deep=True).sum()) + 2 * fitted
+
+
+@dataclass
+class _Entry(Generic[V]):
+    source: "weakref.ref[pd.DataFrame]"
+    tag: Any
+    value: V
+    nbytes: int
+    built_at: float
+
+
+class _SourceBoundCache(Generic[V]):
+    """Thread-safe LRU of values derived from a monthly reference frame, bound to it by weak reference."""
+
+    name = "derived"
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, clock: Callable[[], float]) -> None:
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Any, _Entry[V]]" = OrderedDict()
+        self._oversized: Optional[Tuple[Any, _Entry[V]]] = None
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.builds = 0
+        self.hits = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.released = 0
+        self.oversized = 0
+        self.last_build_seconds = 0.0
+
+    def _lookup(self, key: Any, monthly_ref: pd.DataFrame, tag: Any = None) -> Optional[V]:
+        with self._lock:
+            if self._oversized is not None and self._oversized[0] == key:
+                entry = self._oversized[1]
+            else:
+                entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.source() is monthly_ref and entry.tag == tag:
+                if self._clock() - entry.built_at <= self.ttl_seconds:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.value
+                self.expirations += 1
+            self._drop(key)
+            return None
+
+    def _store(self, key: Any, monthly_ref: pd.DataFrame, value: V, nbytes: int, started: float, tag: Any = None) -> V:
+        entry = _Entry(weakref.ref(monthly_ref), tag, value, int(nbytes), self._clock())
+        with self._lock:
+            self.builds += 1
+            self.last_build_seconds = time.perf_counter() - started
+            self._drop(key)
+            self._release_dead()
+            if entry.nbytes > self.max_bytes:
+                self.oversized += 1
+                self._oversized = (key, entry)
+                logger.warning(
+                    "[KNN] %s for %s is %.1f MB, over its %.1f MB budget; keeping only the latest such entry",
+                    self.name, key, entry.nbytes / 2**20, self.max_bytes / 2**20,
+                )
+                return value
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return value
+
+    def _release_dead(self) -> None:
+        """Drop entries whose source frame has been collected (caller holds the lock)."""
+        for key in [k for k, e in self._entries.items() if e.source() is None]:
+            self._drop(key)
+            self.released += 1
+        if self._oversized is not None and self._oversized[1].source() is None:
+            self._oversized = None
+            self.released += 1
+
+    def _drop(self, key: Any) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes
+        if self._oversized is not None and self._oversized[0] == key:
+            self._oversized = None
+
+    def invalidate(self, mcc: Optional[int] = None) -> int:
+        with self._lock:
+            keys = [key for key in self._entries if mcc is None or key[0] == int(mcc)]
+            if self._oversized is not None and (mcc is None or self._oversized[0][0] == int(mcc)):
+                keys.append(self._oversized[0])
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries) + (self._oversized is not None)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            self._release_dead()
+            return {
+                "entries": len(self._entries) + (self._oversized is not None),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "builds": self.builds,
+                "hits": self.hits,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "released": self.released,
+                "oversized": self.oversized,
+                "oversized_bytes": self._oversized[1].nbytes if self._oversized is not None else 0,
+                "last_build_seconds": round(self.last_build_seconds, 4),
+            }
+
+
+class NeighborIndexRegistry(_SourceBoundCache[Dict[int, PoolIndex]]):
+    """
+    Per-end-month pool indexes per (mcc, card_types, context_len, horizon_len).
+
+    Entries are tied to the monthly reference frame object they were built
+    from; handing in a different frame (reloaded after TTL or invalidation)
+    triggers a rebuild.
+    """
+
+    name = "Neighbour index"
+
+    def __init__(
+        self,
+        k: int,
+        volume_feature_cols: Sequence[str],
+        max_bytes: int = NEIGHBOR_INDEX_CACHE_MAX_BYTES,
+        ttl_seconds: float = MLConfig.REFERENCE_CACHE_TTL_S,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__(max_bytes, ttl_seconds, clock)
+        self.k = k
+        self.volume_feature_cols = list(volume_feature_cols)
+
+    def get(
+        self,
+        key: IndexKey,
+        monthly_ref: pd.DataFrame,
+        feature_cols: List[str],
+    ) -> Dict[int, PoolIndex]:
+        tag = tuple(feature_cols)
+        pools = self._lookup(key, monthly_ref, tag)
+        if pools is not None:
+            return pools
+        started = time.perf_counter()
+        pools = self._build(monthly_ref, feature_cols, context_len_months=key[2], horizon_len_months=key[3])
+        nbytes = sum(index.nbytes for index in pools.values())
+        return self._store(key, monthly_ref, pools, nbytes, started, tag)
+
+    def _build(
+        self,
+        monthly_ref: pd.DataFrame,
+        feature_cols: List[str],
+        context_len_months: int,
+        horizon_len_months: int,
+    ) -> Dict[int, PoolIndex]:
+        pool_by_month = build_pool_by_month(monthly_ref, feature_cols, context_len_months, horizon_len_months)
+        pools: Dict[int, PoolIndex] = {}
+        for month, pool in pool_by_month.items():
+            if pool.empty:
+                continue
+            index = PoolIndex(pool=pool, k=min(self.k, len(pool)))
+            index.fit(feature_cols)
+            index.fit(self.volume_feature_cols)
+            pools[month] = index
+        return pools
+
+    def stats(self) -> Dict[str, object]:
+        stats = super().stats()
+        with self._lock:
+            entries = list(self._entries.values()) + ([self._oversized[1]] if self._oversized else [])
+            stats["pools"] = sum(len(e.value) for e in entries)
+        return stats
+
+
+class MonthlyPanelRegistry(_SourceBoundCache[MonthlyPanel]):
+    """MonthlyPanel per (mcc, card_types), bound to its source frame."""
+
+    name = "Monthly panel"
+
+    def __init__(
+        self,
+        max_bytes: int = MONTHLY_PANEL_CACHE_MAX_BYTES,
+        ttl_seconds: float = MLConfig.REFERENCE_CACHE_TTL_S,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__(max_bytes, ttl_seconds, clock)
+
+    def get(self, key: PanelKey, monthly_ref: pd.DataFrame) -> MonthlyPanel:
+        panel = self._lookup(key, monthly_ref)
+        if panel is not None:
+            return panel
+        started = time.perf_counter()
+        panel = build_monthly_panel(monthly_ref)
+        nbytes = panel.row_pos.nbytes + panel.proc_cost_pct.nbytes + panel.merchant_ids.memory_usage(deep=True)
+        return self._store(key, monthly_ref, panel, nbytes, started)
@@ -1,16 +1,38 @@
 from __future__ import annotations
 
 import json
+import logging
+import math
 import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Protocol
-from urllib.request import Request, urlopen
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Protocol, Tuple
 
+import httpx
+import numpy as np
 import pandas as pd
 
+from .config import (
+    COST_STRUCTURE_DIR,
+    PROC_COST_BATCH_SIZE,
+    PROC_COST_CACHE_MAX_ENTRIES,
+    PROC_COST_CACHE_TTL_S,
+    PROC_COST_MAX_CONCURRENCY,
+    PROC_COST_TIMEOUT_S,
+)
+
+logger = logging.getLogger(__name__)
+
+# (amount, card_brand, card_type, mcc) — what a ticket's processing cost depends on.
+TicketKey = Tuple[Optional[float], Optional[str], Optional[str], Optional[int]]
+
 
 class ProcessingCostProvider(Protocol):
-    def enrich(self, txn_df: pd.DataFrame) -> pd.DataFrame:
+    def enrich(self, txn_df: pd.DataFrame, mcc: Optional[int] = None) -> pd.DataFrame:
         ...
 
 
@@ -19,40 +41,453 @@ class HeuristicProcessingCostProvider:
     base_rate: float = 0.018
     fixed_fee: float = 0.05
 
-    def enrich(self, txn_df: pd.DataFrame) -> pd.DataFrame:
+    def enrich(self, txn_df: pd.DataFrame, mcc: Optional[int] = None) -> pd.DataFrame:
         df = txn_df.copy()
         amount = pd.to_numeric(df.get("amount"), errors="coerce").fillna(0.0)
         df["proc_cost"] = (amount * self.base_rate + self.fixed_fee).astype(float)
         return df
 
 
+def _ticket_keys(df: pd.DataFrame, mcc: Optional[int]) -> List[TicketKey]:
+    def text_column(name: str) -> List[Optional[str]]:
+        if name not in df.columns:
+            return [None] * len(df)
+        values = df[name].astype("string").str.strip().str.lower()
+        return [None if pd.isna(v) else v for v in values]
+
+    if "amount" in df.columns:
+        amount = pd.to_numeric(df["amount"], errors="coerce").astype(float).tolist()
+        amounts = [None if math.isnan(a) else a for a in amount]
+    else:
+        amounts = [None] * len(df)
+    if "mcc" in df.columns:
+        mccs = [None if pd.isna(v) else int(v) for v in pd.to_numeric(df["mcc"], errors="coerce")]
+    else:
+        mccs = [None if mcc is None else int(mcc)] * len(df)
+    return list(zip(amounts, text_column("card_brand"), text_column("card_type"), mccs))
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
 @dataclass
 class ExternalProcessingCostProvider:
+    """
+    Prices transactions through the external processing-cost service.
+
+    Tickets already priced (same amount, card_brand, card_type, mcc) are
+    served from an LRU cache; one row per remaining unique ticket is POSTed as
+    {"transactions": [...]} in batches of at most ``batch_size`` rows, up to
+    ``max_concurrency`` at a time over one keep-alive connection pool.  A
+    batch that times out, errors or returns an unusable body is priced by
+    ``fallback_provider`` instead; stats() reports how often that happens.
+    """
+
     endpoint: str
-    timeout_seconds: int = 10
+    timeout_seconds: float = PROC_COST_TIMEOUT_S
+    batch_size: int = PROC_COST_BATCH_SIZE
+    max_concurrency: int = PROC_COST_MAX_CONCURRENCY
+    cache_max_entries: int = PROC_COST_CACHE_MAX_ENTRIES
+    cache_ttl_seconds: float = PROC_COST_CACHE_TTL_S
     fallback_provider: ProcessingCostProvider = field(default_factory=HeuristicProcessingCostProvider)
+    _client: httpx.Client = field(init=False, repr=False)
+    _pool: ThreadPoolExecutor = field(init=False, repr=False)
+    _cache: "OrderedDict[TicketKey, Tuple[float, float]]" = field(default_factory=OrderedDict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _latencies: deque = field(default_factory=lambda: deque(maxlen=1000), init=False, repr=False)
+    _counters: Dict[str, int] = field(init=False, repr=False)
 
-    def enrich(self, txn_df: pd.DataFrame) -> pd.DataFrame:
-        records = txn_df.to_dict(orient="records")
-        req = Request(
-            self.endpoint,
-            data=json.dumps({"transactions": records}).encode("utf-8"),
+    def __post_init__(self) -> None:
+        self.batch_size = max(1, int(self.batch_size))
+        self.max_concurrency = max(1, int(self.max_concurrency))
+        self._client = httpx.Client(
+            timeout=self.timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            ),
             headers={"Content-Type": "application/json"},
-            method="POST",
         )
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="proc-cost")
+        self._counters = dict.fromkeys(
+            ("calls", "rows", "cache_hits", "cache_misses", "tickets_priced", "batches",
+             "batch_failures", "timeouts", "fallback_rows"),
+            0,
+        )
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def _cache_get(self, keys: List[TicketKey]) -> Dict[TicketKey, float]:
+        now = time.monotonic()
+        found: Dict[TicketKey, float] = {}
+        with self._lock:
+            for key in set(keys):
+                entry = self._cache.get(key)
+                if entry is None:
+                    continue
+                if now - entry[1] > self.cache_ttl_seconds:
+                    del self._cache[key]
+                    continue
+                self._cache.move_to_end(key)
+                found[key] = entry[0]
+        return found
+
+    def _cache_put(self, priced: Dict[TicketKey, float]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for key, cost in priced.items():
+                self._cache[key] = (cost, now)
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+
+    def _price_batch(self, records: List[Dict[str, Any]]) -> Optional[List[float]]:
+        """proc_cost per record, or None when the batch must fall back."""
+        body = json.dumps({"transactions": records}, default=_json_default).encode("utf-8")
+        started = time.perf_counter()
         try:
-            with urlopen(req, timeout=self.timeout_seconds) as response:
-                body = json.loads(response.read().decode("utf-8"))
-            enriched = pd.DataFrame(body.get("transactions", []))
-            if enriched.empty or "proc_cost" not in enriched.columns:
-                return self.fallback_provider.enrich(txn_df)
-            return enriched
-        except Exception:
-            return self.fallback_provider.enrich(txn_df)
+            response = self._client.post(self.endpoint, content=body)
+            response.raise_for_status()
+            priced = response.json().get("transactions", [])
+            if len(priced) != len(records):
+                raise ValueError(f"expected {len(records)} priced transactions, got {len(priced)}")
+            return [float(row["proc_cost"]) for row in priced]
+        except httpx.TimeoutException as exc:
+            self._count(timeouts=1, batch_failures=1)
+            logger.warning("[ProcCost] Batch of %d timed out after %.1fs: %s", len(records), self.timeout_seconds, exc)
+        except Exception as exc:
+            self._count(batch_failures=1)
+            logger.warning("[ProcCost] Batch of %d failed, using fallback pricing: %s", len(records), exc)
+        finally:
+            with self._lock:
+                self._latencies.append(time.perf_counter() - started)
+        return None
+
+    def _count(self, **increments: int) -> None:
+        with self._lock:
+            for name, value in increments.items():
+                self._counters[name] += value
+
+    # ------------------------------------------------------------------
+    # ProcessingCostProvider
+    # ------------------------------------------------------------------
+
+    def enrich(self, txn_df: pd.DataFrame, mcc: Optional[int] = None) -> pd.DataFrame:
+        df = txn_df.copy()
+        if df.empty:
+            return self.fallback_provider.enrich(df, mcc)
+
+        keys = _ticket_keys(df, mcc)
+        costs = self._cache_get(keys)
+
+        # One representative row per unpriced ticket.
+        first_row: Dict[TicketKey, int] = {}
+        for pos, key in enumerate(keys):
+            if key not in costs and key not in first_row:
+                first_row[key] = pos
+        hits = sum(key in costs for key in keys)
+        self._count(calls=1, rows=len(df), cache_hits=hits, cache_misses=len(df) - hits,
+                    tickets_priced=len(first_row))
+
+        if first_row:
+            to_price = df.iloc[list(first_row.values())]
+            if mcc is not None and "mcc" not in to_price.columns:
+                to_price = to_price.assign(mcc=int(mcc))
+            records = to_price.to_dict(orient="records")
+            missing = list(first_row)
+            bounds = range(0, len(records), self.batch_size)
+            self._count(batches=len(bounds))
+            if len(bounds) == 1:
+                results = [self._price_batch(records)]
+            else:
+                results = list(self._pool.map(lambda i: self._price_batch(records[i:i + self.batch_size]), bounds))
+            priced: Dict[TicketKey, float] = {}
+            for start, prices in zip(bounds, results):
+                if prices is None:
+                    continue
+                for key, cost in zip(missing[start:start + self.batch_size], prices):
+                    if math.isfinite(cost):
+                        priced[key] = cost
+            self._cache_put(priced)
+            costs.update(priced)
+
+        proc_cost = pd.Series([costs.get(key, np.nan) for key in keys], index=df.index, dtype=float)
+        unpriced = proc_cost.isna()
+        if unpriced.any():
+            self._count(fallback_rows=int(unpriced.sum()))
+            proc_cost[unpriced] = self.fallback_provider.enrich(df.loc[unpriced], mcc)["proc_cost"]
+        df["proc_cost"] = proc_cost
+        return df
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            counters = dict(self._counters)
+            latencies = np.array(self._latencies, dtype=float)
+            entries = len(self._cache)
+        lookups = counters["cache_hits"] + counters["cache_misses"]
+        return {
+            **counters,
+            "cache_entries": entries,
+            "cache_hit_rate": round(counters["cache_hits"] / lookups, 4) if lookups else 0.0,
+            "timeout_rate": round(counters["timeouts"] / counters["batches"], 4) if counters["batches"] else 0.0,
+            "fallback_rate": round(counters["fallback_rows"] / counters["rows"], 4) if counters["rows"] else 0.0,
+            "latency_ms_p50": round(float(np.percentile(latencies, 50)) * 1000, 2) if latencies.size else 0.0,
+            "latency_ms_p95": round(float(np.percentile(latencies, 95)) * 1000, 2) if latencies.size else 0.0,
+        }
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+        self._client.close()
+
+
+# ---------------------------------------------------------------------------
+# Local fee schedules
+# ---------------------------------------------------------------------------
+
+# Same schedule files and matching rules as the backend's CostCalculationService.
+COST_STRUCTURE_FILES: Dict[str, Tuple[str, str]] = {
+    "mastercard": ("masterCard_Card.JSON", "masterCard_Network.JSON"),
+    "visa": ("visa_Card.JSON", "visa_Network.JSON"),
+}
+CARD_TYPES: Tuple[str, ...] = ("credit", "super premium credit", "debit", "prepaid")
+SMALL_TICKET_LIMIT = 5.0
+LARGE_TICKET_LIMIT = 1000.0
+
+
+def _brand_code(value: Any) -> int:
+    name = "".join(str(value).lower().split()).replace("_", "").replace("-", "")
+    brands = list(COST_STRUCTURE_FILES)
+    return brands.index(name) if name in brands else -1
+
+
+def _card_type_code(value: Any) -> int:
+    name = " ".join(str(value).lower().replace("_", " ").split())
+    if name == "debit (prepaid)":
+        name = "prepaid"
+    return CARD_TYPES.index(name) if name in CARD_TYPES else -1
+
+
+def _two_product(a: np.ndarray, b: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Dekker's exact product: a * b == p + err exactly."""
+    p = a * b
+
+    def split(v):
+        c = 134217729.0 * v  # 2**27 + 1
+        hi = c - (c - v)
+        return hi, v - hi
+
+    (ah, al), (bh, bl) = split(a), split(np.float64(b))
+    return p, ((ah * bh - p) + ah * bl + al * bh) + al * bl
+
+
+def _round_like_python(values: np.ndarray, digits: int = 5) -> np.ndarray:
+    """
+    Vectorized equivalent of round(v, digits) per element.
+
+    np.round scales by 10**digits first, which misrounds values within an ulp
+    of a decimal midpoint (e.g. 0.025725).  Those are settled against the
+    exact midpoint instead, so costs match the backend's round() bit for bit.
+    """
+    scale = 10.0 ** digits
+    scaled = values * scale
+    out = np.round(scaled) / scale
+    floor = np.floor(scaled)
+    near_half = np.abs(scaled - floor - 0.5) < 1e-6
+    if near_half.any():
+        x, k = values[near_half], floor[near_half]
+        mid = (k + 0.5) / scale  # nearest double to the decimal midpoint
+        p, err = _two_product(mid, scale)
+        excess = (p - (k + 0.5)) + err  # sign of (mid - exact midpoint)
+        on_mid = (excess > 0) | ((excess == 0) & (k % 2 == 1))  # exact ties round half-even
+        up = (x > mid) | ((x == mid) & on_mid)
+        out[near_half] = (k + up) / scale
+    return out
+
+
+def _column_codes(df: pd.DataFrame, name: str, encode) -> np.ndarray:
+    """Per-row code via factorize: ``encode`` runs once per distinct value."""
+    if name not in df.columns:
+        return np.full(len(df), -1, dtype=np.int64)
+    codes, uniques = pd.factorize(df[name])
+    table = np.array([encode(v) for v in uniques] + [-1], dtype=np.int64)
+    return table[codes]  # factorize marks missing values -1 → trailing -1
+
+
+@dataclass
+class CostStructureProcessingCostProvider:
+    """
+    Prices transactions from the cost_structure/*.JSON fee schedules.
+
+    The card and network schedules are compiled once into arrays indexed by
+    (brand, card type, mcc slot) — slot 0 is the small-ticket program, the
+    others the industry program per MCC — so enrich() is a handful of numpy
+    gathers over the whole frame.  Costs follow the backend's
+    CostCalculationService: card fee (capped at max_fee) plus network fee, each
+    rounded to 5 d.p., and 0 for non-positive amounts.  Rows with no schedule
+    (unknown brand / card type, or an MCC outside the industry program) are
+    priced by ``fallback_provider``.
+    """
+
+    cost_structure_dir: Path = COST_STRUCTURE_DIR
+    fallback_provider: ProcessingCostProvider = field(default_factory=HeuristicProcessingCostProvider)
+    _mccs: np.ndarray = field(init=False, repr=False)
+    _card_ok: np.ndarray = field(init=False, repr=False)
+    _card_pct: np.ndarray = field(init=False, repr=False)
+    _card_fixed: np.ndarray = field(init=False, repr=False)
+    _card_max: np.ndarray = field(init=False, repr=False)
+    _net_pct: np.ndarray = field(init=False, repr=False)
+    _net_fixed: np.ndarray = field(init=False, repr=False)
+    _net_large_pct: np.ndarray = field(init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _counters: Dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.cost_structure_dir = Path(self.cost_structure_dir)
+        schedules = {}
+        for brand, (card_file, network_file) in COST_STRUCTURE_FILES.items():
+            with open(self.cost_structure_dir / card_file, encoding="utf-8") as fh:
+                card = json.load(fh)
+            with open(self.cost_structure_dir / network_file, encoding="utf-8") as fh:
+                network = json.load(fh)
+            schedules[brand] = (card, network)
+        self._compile(schedules)
+        self._counters = dict.fromkeys(("calls", "rows", "priced_rows", "fallback_rows"), 0)
+
+    def _compile(self, schedules: Dict[str, Tuple[List[dict], List[dict]]]) -> None:
+        mccs = sorted({int(fee["mcc"]) for card, _ in schedules.values() for fee in card if fee.get("mcc") is not None})
+        self._mccs = np.array(mccs, dtype=np.int64)
+        shape = (len(COST_STRUCTURE_FILES), len(CARD_TYPES), len(mccs) + 1)
+        self._card_ok = np.zeros(shape, dtype=bool)
+        self._card_pct = np.zeros(shape)
+        self._card_fixed = np.zeros(shape)
+        self._card_max = np.full(shape, np.inf)
+        self._net_pct = np.zeros(shape[:2])
+        self._net_fixed = np.zeros(shape[:2])
+        self._net_large_pct = np.zeros(shape[:1])
+
+        for b, (card, network) in enumerate(schedules.values()):
+            # First matching entry wins, as in the backend's linear scan.
+            for fee in reversed(card):
+                t = _card_type_code(fee["card_type"])
+                if t < 0:
+                    continue
+                if fee["product"] == "Small Ticket Fee Program (All)" and fee.get("mcc") is None:
+                    slot = 0
+                elif fee["product"] == "Industry Fee Program (All)" and fee.get("mcc") is not None:
+                    slot = mccs.index(int(fee["mcc"])) + 1
+                else:
+                    continue
+                self._card_ok[b, t, slot] = True
+                self._card_pct[b, t, slot] = fee["percent_rate"]
+                self._card_fixed[b, t, slot] = fee["fixed_rate"]
+                self._card_max[b, t, slot] = np.inf if fee.get("max_fee") is None else fee["max_fee"]
+            self._compile_network(b, network)
+
+    def _compile_network(self, b: int, network: List[dict]) -> None:
+        brand = list(COST_STRUCTURE_FILES)[b]
+        if brand == "mastercard":
+            # Card-type independent: brand volume %, inquiry fixed fee, +% on large tickets.
+            for fee in network:
+                name = fee.get("fee_name", "")
+                if "Acquirer Brand Volume" in name:
+                    self._net_pct[b, :] = fee["percent_rate"]
+                elif "Transactions => 1000 USD" in name:
+                    self._net_large_pct[b] = fee["percent_rate"]
+                elif "Account Status Inquiry Service Fee" in name:
+                    self._net_fixed[b, :] = fee["fixed_rate"]
+            return
+        # Visa: assessment % and APF fixed fee per card type; prepaid bills as debit.
+        for t, card_type in enumerate(CARD_TYPES):
+            lookup = "debit" if card_type == "prepaid" else card_type
+            assessment = processing = None
+            for fee in network:
+                name = fee.get("fee_name", "")
+                if str(fee.get("card_type", "")).lower() != lookup:
+                    continue
+                if "Acquirer Service Fee" in name:
+                    assessment = fee
+                elif "Acquirer Processing Fee" in name:
+                    processing = fee
+            if assessment and processing:
+                self._net_pct[b, t] = assessment["percent_rate"]
+                self._net_fixed[b, t] = processing["fixed_rate"]
+
+    # ------------------------------------------------------------------
+    # ProcessingCostProvider
+    # ------------------------------------------------------------------
+
+    def enrich(self, txn_df: pd.DataFrame, mcc: Optional[int] = None) -> pd.DataFrame:
+        df = txn_df.copy()
+        n = len(df)
+        if "amount" in df.columns:
+            amount = pd.to_numeric(df["amount"], errors="coerce").to_numpy(dtype=float)
+        else:
+            amount = np.full(n, np.nan)
+        brand = _column_codes(df, "card_brand", _brand_code)
+        card_type = _column_codes(df, "card_type", _card_type_code)
+
+        if "mcc" in df.columns:
+            row_mcc = pd.to_numeric(df["mcc"], errors="coerce").fillna(-1).to_numpy(dtype=np.int64)
+        else:
+            row_mcc = np.full(n, -1 if mcc is None else int(mcc), dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self._mccs, row_mcc), max(len(self._mccs) - 1, 0))
+        known_mcc = self._mccs[pos] == row_mcc if len(self._mccs) else np.zeros(n, dtype=bool)
+        slot = np.where(amount < SMALL_TICKET_LIMIT, 0, np.where(known_mcc, pos + 1, -1))
+
+        b, t, s = np.maximum(brand, 0), np.maximum(card_type, 0), np.maximum(slot, 0)
+        matched = (brand >= 0) & (card_type >= 0) & (slot >= 0) & self._card_ok[b, t, s]
+        matched &= ~np.isnan(amount)
+
+        card_cost = np.minimum(amount * self._card_pct[b, t, s] / 100 + self._card_fixed[b, t, s], self._card_max[b, t, s])
+        net_pct = self._net_pct[b, t] + np.where(amount >= LARGE_TICKET_LIMIT, self._net_large_pct[b], 0.0)
+        net_cost = amount * net_pct / 100 + self._net_fixed[b, t]
+        proc_cost = _round_like_python(card_cost) + _round_like_python(net_cost)
+        proc_cost[amount <= 0] = 0.0
+
+        fallback = ~matched & ~(amount <= 0)
+        if fallback.any():
+            proc_cost[fallback] = self.fallback_provider.enrich(df.loc[fallback], mcc)["proc_cost"].to_numpy(dtype=float)
+        df["proc_cost"] = proc_cost
+        self._count(calls=1, rows=n, priced_rows=int(n - fallback.sum()), fallback_rows=int(fallback.sum()))
+        return df
+
+    def _count(self, **increments: int) -> None:
+        with self._lock:
+            for name, value in increments.items():
+                self._counters[name] += value
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            **counters,
+            "source": str(self.cost_structure_dir),
+            "fallback_rate": round(counters["fallback_rows"] / counters["rows"], 4) if counters["rows"] else 0.0,
+        }
+
+
+def _cost_structure_available(path: Path) -> bool:
+    return all((path / name).is_file() for files in COST_STRUCTURE_FILES.values() for name in files)
 
 
 def default_processing_cost_provider() -> ProcessingCostProvider:
+    local: ProcessingCostProvider = HeuristicProcessingCostProvider()
+    if _cost_structure_available(COST_STRUCTURE_DIR):
+        local = CostStructureProcessingCostProvider(COST_STRUCTURE_DIR)
+    else:
+        logger.info("[ProcCost] No fee schedules in %s; using heuristic pricing", COST_STRUCTURE_DIR)
     endpoint = os.getenv("PROC_COST_SERVICE_URL", "").strip()
     if endpoint:
-        return ExternalProcessingCostProvider(endpoint=endpoint)
-    return HeuristicProcessingCostProvider()
+        return ExternalProcessingCostProvider(endpoint=endpoint, fallback_provider=local)
+    return local
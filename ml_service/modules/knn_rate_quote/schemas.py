@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional, Union
 
 from pydantic import BaseModel, Field, field_validator
 
@@ -52,6 +52,28 @@ class QuoteComputationResult:
     end_month: str
 
 
+class QuoteBatchRequest(BaseModel):
+    requests: List[QuoteRequest] = Field(
+        ...,
+        min_length=1,
+        description="Quote requests; items sharing an MCC and card filter share one reference pool.",
+    )
+
+
+class QuoteBatchItem(BaseModel):
+    index: int = Field(..., description="Position of the request in QuoteBatchRequest.requests")
+    mcc: int
+    status: str = Field(..., description="'ok' or 'error'")
+    result: Optional[QuoteResponse] = None
+    error: Optional[str] = None
+
+
+class QuoteBatchResponse(BaseModel):
+    items: List[QuoteBatchItem]
+    n_ok: int
+    n_failed: int
+
+
 class CompositeMerchantRequest(BaseModel):
     onboarding_merchant_txn_df: List[Dict[str, Any]] = Field(
         ...,
@@ -63,6 +85,13 @@ class CompositeMerchantRequest(BaseModel):
         default_factory=lambda: ["both"],
         description="Card filters, e.g. ['visa'] or ['debit'] or ['both'].",
     )
+    response_format: Literal["rows", "columns"] = Field(
+        default="rows",
+        description=(
+            "'rows': weekly_features is a list of CompositeWeeklyFeature objects. "
+            "'columns': weekly_features is one array per metric (see WEEKLY_FEATURE_COLUMNS)."
+        ),
+    )
 
     @field_validator("card_types")
     @classmethod
@@ -88,6 +117,31 @@ class CompositeWeeklyFeature(BaseModel):
     pct_ct_means: Dict[str, float]
 
 
+# Scalar CompositeWeeklyFeature fields, in order.  The columnar response
+# carries one array per name plus pct_ct_means: {pct_ct_<id>: array}.
+WEEKLY_FEATURE_COLUMNS: List[str] = [
+    name for name in CompositeWeeklyFeature.model_fields if name != "pct_ct_means"
+]
+
+
+def weekly_feature_rows(weekly_features: Union[List[Dict[str, Any]], Dict[str, Any], None]) -> List[Dict[str, Any]]:
+    """
+    Return composite weekly features as a list of row dicts, accepting either
+    the row-oriented shape or the columnar shape of getCompositeMerchant.
+    """
+    if not weekly_features:
+        return []
+    if not isinstance(weekly_features, dict):
+        return list(weekly_features)
+    pct_ct = weekly_features.get("pct_ct_means") or {}
+    columns = {name: values for name, values in weekly_features.items() if name != "pct_ct_means"}
+    n = len(next(iter(columns.values()))) if columns else 0
+    rows = [{name: values[i] for name, values in columns.items()} for i in range(n)]
+    for i, row in enumerate(rows):
+        row["pct_ct_means"] = {key: values[i] for key, values in pct_ct.items()}
+    return rows
+
+
 class CompositeMerchantResponse(BaseModel):
     composite_merchant_id: str
     matched_neighbor_merchant_ids: List[int]
@@ -104,7 +158,8 @@ class CompositeMerchantComputationResult:
     k: int
     matching_start_month: str
     matching_end_month: str
-    weekly_features: List[CompositeWeeklyFeature]
+    # List[CompositeWeeklyFeature] for response_format "rows", Dict[str, list] for "columns".
+    weekly_features: Union[List[CompositeWeeklyFeature], Dict[str, Any]]
 
 
 class KNNRateQuoteResult(BaseModel):
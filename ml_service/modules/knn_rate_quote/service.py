@@ -1,19 +1,32 @@
 from __future__ import annotations
 
-from typing import List
+import logging
+import threading
+from typing import Any, Dict, List, Tuple
 
 import pandas as pd
 from sklearn.neighbors import NearestNeighbors
 from sqlalchemy import text
 from sqlalchemy.engine import Engine
 
+from reference_data import (
+    MerchantRepository,
+    ReferenceDataService,
+    ReferenceFrameCache,
+    normalize_card_types,
+)
+
+from .config import AGGREGATION_MODE, FEATURE_STORE_ENABLED
 from .feature_engineering import (
+    MonthlyPanel,
     build_monthly_features,
-    build_pool_by_month,
+    build_monthly_features_from_store,
     lookup_horizon_proc_cost_pct,
     query_vector_from_pool_means,
+    query_vectors_from_pool_means,
     query_vector_from_txn_df,
 )
+from .neighbor_index import MonthlyPanelRegistry, NeighborIndexRegistry, PoolIndex
 from .processing_costs import ProcessingCostProvider, default_processing_cost_provider
 from .schemas import (
     CompositeMerchantComputationResult,
@@ -23,8 +36,11 @@ from .schemas import (
     NeighborForecast,
     QuoteComputationResult,
     QuoteRequest,
+    WEEKLY_FEATURE_COLUMNS,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class PostgresMerchantRepository:
     def __init__(self, engine: Engine) -> None:
@@ -43,21 +59,11 @@ class PostgresMerchantRepository:
                 COALESCE(cost_type_id, cost_type_ID) AS cost_type_ID,
                 proc_cost
             FROM knn_transactions
-            WHERE CAST(COALESCE(mcc, 0) AS INTEGER) = :mcc
+            WHERE mcc = :mcc
         """
-        bind: dict = {"mcc": int(mcc)}
-
-        normalized = [c.lower() for c in card_types if c and c.lower() != "both"]
-        if normalized:
-            placeholders = ", ".join([f":ct{i}" for i in range(len(normalized))])
-            query += f"""
-                AND (
-                    LOWER(COALESCE(card_brand, '')) IN ({placeholders})
-                    OR LOWER(COALESCE(card_type, '')) IN ({placeholders})
-                )
-            """
-            for i, val in enumerate(normalized):
-                bind[f"ct{i}"] = val
+        card_filter, bind = self._card_filter_clause(card_types)
+        query += card_filter
+        bind["mcc"] = int(mcc)
 
         with self.engine.connect() as conn:
             filtered = pd.read_sql(text(query), conn, params=bind)
@@ -80,12 +86,162 @@ class PostgresMerchantRepository:
             """
             return pd.read_sql(text(fallback_query), conn)
 
+    def _typed_schema(self) -> bool:
+        """True once migrate_knn_schema.py has run (typed columns, card columns constrained to lower case)."""
+        from migrate_knn_schema import knn_schema_is_typed  # imported here to avoid circular imports
+
+        return knn_schema_is_typed(self.engine)
+
+    def _card_filter_clause(self, card_types: list[str]) -> Tuple[str, dict]:
+        bind: dict = {}
+        normalized = [c.lower() for c in card_types if c and c.lower() != "both"]
+        if not normalized:
+            return "", bind
+        placeholders = ", ".join([f":ct{i}" for i in range(len(normalized))])
+        for i, val in enumerate(normalized):
+            bind[f"ct{i}"] = val
+        if self._typed_schema():
+            # Sargable: served by the (mcc, card_brand, date) / (mcc, card_type, date) indexes.
+            brand, ctype = "card_brand", "card_type"
+        else:
+            brand, ctype = "LOWER(TRIM(COALESCE(card_brand, '')))", "LOWER(TRIM(COALESCE(card_type, '')))"
+        clause = f"""
+                AND (
+                    {brand} IN ({placeholders})
+                    OR {ctype} IN ({placeholders})
+                )
+            """
+        return clause, bind
+
+    def _date_exprs(self) -> Dict[str, str]:
+        """Dialect-specific SQL for the month / ISO-free week buckets used in pandas."""
+        if self.engine.dialect.name == "sqlite":
+            return {
+                "ym": "strftime('%Y-%m', date)",
+                "year": "CAST(strftime('%Y', date) AS INTEGER)",
+                "week": "MIN((CAST(strftime('%j', date) AS INTEGER) - 1) / 7 + 1, 52)",
+            }
+        ts = "CAST(date AS TIMESTAMP)"
+        return {
+            "ym": f"to_char({ts}, 'YYYY-MM')",
+            "year": f"CAST(EXTRACT(YEAR FROM {ts}) AS INTEGER)",
+            "week": f"LEAST((CAST(EXTRACT(DOY FROM {ts}) AS INTEGER) - 1) / 7 + 1, 52)",
+        }
+
+    def _read_aggregate(
+        self,
+        select_sql: str,
+        group_cols: str,
+        mcc: int,
+        card_types: list[str],
+        extra_where: str = "",
+        extra_bind: dict | None = None,
+    ) -> pd.DataFrame:
+        card_filter, bind = self._card_filter_clause(card_types)
+        bind.update(extra_bind or {})
+        bind["mcc"] = int(mcc)
+        scoped = f"""
+            {select_sql}
+            FROM knn_transactions
+            WHERE mcc = :mcc
+              AND date IS NOT NULL AND merchant_id IS NOT NULL
+              {extra_where}
+              {card_filter}
+            GROUP BY {group_cols}
+        """
+        with self.engine.connect() as conn:
+            agg = pd.read_sql(text(scoped), conn, params=bind)
+            if not agg.empty:
+                return agg
+
+            # Fallback for datasets without MCC coverage (mirrors load_transactions).
+            unscoped = f"""
+                {select_sql}
+                FROM knn_transactions
+                WHERE date IS NOT NULL AND merchant_id IS NOT NULL
+                  {extra_where}
+                GROUP BY {group_cols}
+            """
+            return pd.read_sql(text(unscoped), conn, params=extra_bind or {})
+
+    def load_monthly_aggregates(self, mcc: int, card_types: list[str]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Merchant × month × cost_type counts and sums computed in the database.
+
+        Returns (features, cost_type_counts) in the feature-store row layout
+        consumed by build_monthly_features_from_store.
+        """
+        ym = self._date_exprs()["ym"]
+        agg = self._read_aggregate(
+            f"""
+            SELECT merchant_id,
+                   {ym} AS ym,
+                   COALESCE(cost_type_id, -1) AS cost_type_id,
+                   COUNT(*) AS txn_count,
+                   COUNT(amount) AS amount_count,
+                   COALESCE(SUM(amount), 0) AS total_processing_value,
+                   COALESCE(SUM(proc_cost), 0) AS sum_proc_cost
+            """,
+            group_cols=f"merchant_id, {ym}, COALESCE(cost_type_id, -1)",
+            mcc=mcc,
+            card_types=card_types,
+        )
+        agg = agg.dropna(subset=["ym"])
+        if agg.empty:
+            return pd.DataFrame(), pd.DataFrame()
+        agg["merchant_id"] = agg["merchant_id"].astype(str)
+        features = agg[["merchant_id", "ym", "amount_count", "total_processing_value", "sum_proc_cost"]]
+        counts = agg[["merchant_id", "ym", "cost_type_id", "txn_count"]]
+        return features, counts
+
+    def load_weekly_aggregates(
+        self,
+        mcc: int,
+        card_types: list[str],
+        merchant_ids: List[int],
+    ) -> pd.DataFrame:
+        """
+        Merchant × (calendar_year, week_of_year) × cost_type counts and sums for
+        the given merchants, computed in the database.  Rows with a NULL amount
+        are excluded, as in the transaction-level composite path.
+        """
+        if not merchant_ids:
+            return pd.DataFrame()
+        exprs = self._date_exprs()
+        placeholders = ", ".join(f":m{i}" for i in range(len(merchant_ids)))
+        id_bind = {f"m{i}": str(mid) for i, mid in enumerate(merchant_ids)}
+        agg = self._read_aggregate(
+            f"""
+            SELECT merchant_id,
+                   {exprs["year"]} AS calendar_year,
+                   {exprs["week"]} AS week_of_year,
+                   COALESCE(cost_type_id, -1) AS cost_type_id,
+                   COUNT(*) AS txn_count,
+                   SUM(amount) AS sum_amount,
+                   COALESCE(SUM(proc_cost), 0) AS sum_proc_cost
+            """,
+            group_cols=f"merchant_id, {exprs['year']}, {exprs['week']}, COALESCE(cost_type_id, -1)",
+            mcc=mcc,
+            card_types=card_types,
+            extra_where=f"AND amount IS NOT NULL AND merchant_id IN ({placeholders})",
+            extra_bind=id_bind,
+        )
+        agg = agg.dropna(subset=["calendar_year", "week_of_year"])
+        if not agg.empty:
+            agg["merchant_id"] = agg["merchant_id"].astype(str)
+        return agg
+
     def load_cost_type_ids(self) -> List[str]:
         with self.engine.connect() as conn:
             ref = pd.read_sql(text("SELECT cost_type_id FROM knn_cost_type_ref"), conn)
         return ref["cost_type_id"].dropna().astype(int).astype(str).tolist()
 
 
+# Feature set matched on when no onboarding transactions are supplied.
+VOLUME_FEATURE_COLS = ["total_transactions", "avg_amount"]
+_INT_WEEKLY_COLUMNS = {"calendar_year", "week_of_year", "neighbor_coverage"}
+
+
 class ProductionQuoteService:
     def __init__(
         self,
@@ -94,12 +250,41 @@ class ProductionQuoteService:
         k: int = 5,
         context_len_months: int = 1,
         horizon_len_months: int = 3,
+        reference_cache: ReferenceFrameCache | None = None,
+        repository: MerchantRepository | None = None,
+        reference_data: ReferenceDataService | None = None,
     ) -> None:
-        self.repository = PostgresMerchantRepository(engine)
+        # Reference rows come from the service shared with the TPV engine when
+        # one is passed; otherwise this instance gets a private one.
+        self.reference_data = reference_data or ReferenceDataService(
+            repository or PostgresMerchantRepository(engine), cache=reference_cache
+        )
+        self.reference_data.subscribe(self._drop_derived_reference)
+        self.monthly_cache = ReferenceFrameCache()
+        # The feature store and SQL aggregation need the database; other
+        # repositories (e.g. reference snapshots) only serve transaction rows.
+        db_backed = isinstance(self.repository, PostgresMerchantRepository)
+        self.use_feature_store = FEATURE_STORE_ENABLED and db_backed
+        self.aggregation_mode = AGGREGATION_MODE if db_backed else "rows"
         self.processing_cost_provider = processing_cost_provider or default_processing_cost_provider()
         self.k = k
         self.context_len_months = context_len_months
         self.horizon_len_months = horizon_len_months
+        self.neighbor_indexes = NeighborIndexRegistry(k=k, volume_feature_cols=VOLUME_FEATURE_COLS)
+        self.monthly_panels = MonthlyPanelRegistry()
+        self._store_refresh_lock = threading.Lock()
+
+    @property
+    def repository(self) -> MerchantRepository:
+        return self.reference_data.repository
+
+    @repository.setter
+    def repository(self, repository: MerchantRepository) -> None:
+        self.reference_data.repository = repository
+
+    @property
+    def reference_cache(self) -> ReferenceFrameCache:
+        return self.reference_data.cache
 
     @property
     def context_len_wk(self) -> int:
@@ -136,19 +321,120 @@ class ProductionQuoteService:
 
         raise ValueError("as_of_date is required when onboarding_merchant_txn_df is not provided.")
 
-    def _filter_reference_by_card_types(
+    def _load_reference(self, mcc: int, card_types: List[str]) -> pd.DataFrame:
+        """Return the card-filtered, typed reference frame, served from cache when fresh."""
+        return self.reference_data.load_transactions(mcc, card_types)
+
+    def _load_monthly_from_store(
         self,
-        reference_txn: pd.DataFrame,
-        card_types: list[str],
+        mcc: int,
+        card_types: Tuple[str, ...],
+        cost_type_ids: List[str],
     ) -> pd.DataFrame:
-        normalized = [c.strip().lower() for c in card_types if c.strip() and c.lower() != "both"]
-        if not normalized:
-            return reference_txn
+        from feature_store import load_store_rows, refresh_if_stale  # imported here to avoid circular imports
+
+        try:
+            # Only reached on a monthly-cache miss, so the source check runs
+            # once per TTL / invalidation per key, not per quote.
+            with self._store_refresh_lock:
+                refresh_if_stale(self.repository.engine, mcc)
+            features, counts = load_store_rows(self.repository.engine, mcc, card_types)
+        except Exception as exc:
+            logger.warning("[KNN] Feature store unavailable, using raw transactions: %s", exc)
+            return pd.DataFrame()
+        return build_monthly_features_from_store(features, counts, cost_type_ids)
+
+    def _load_monthly_reference(
+        self,
+        mcc: int,
+        card_types: List[str],
+        cost_type_ids: List[str],
+    ) -> pd.DataFrame:
+        """
+        Merchant × month reference features, read from the materialized
+        feature store when it covers the MCC and otherwise aggregated in SQL
+        (aggregation_mode "sql") or from the raw reference transactions
+        ("rows").
+        """
+        key = (int(mcc), normalize_card_types(card_types))
+        cached = self.monthly_cache.get(key)
+        if cached is not None:
+            return cached
+
+        monthly_ref = pd.DataFrame()
+        if self.use_feature_store:
+            monthly_ref = self._load_monthly_from_store(mcc, key[1], cost_type_ids)
+        if monthly_ref.empty and self.aggregation_mode == "sql":
+            features, counts = self.repository.load_monthly_aggregates(mcc, card_types)
+            if features.empty:
+                raise ValueError("No reference transactions available for requested mcc/card_types.")
+            monthly_ref = build_monthly_features_from_store(features, counts, cost_type_ids)
+        elif monthly_ref.empty:
+            reference_txn = self._load_reference(mcc, card_types)
+            if reference_txn.empty:
+                raise ValueError("No reference transactions available for requested mcc/card_types.")
+            monthly_ref = build_monthly_features(reference_txn, cost_type_ids)
+        if monthly_ref.empty:
+            raise ValueError("Reference monthly feature table is empty.")
 
-        brand = reference_txn.get("card_brand", pd.Series(dtype=str)).astype(str).str.lower()
-        ctype = reference_txn.get("card_type", pd.Series(dtype=str)).astype(str).str.lower()
-        mask = brand.isin(normalized) | ctype.isin(normalized)
-        return reference_txn[mask].copy()
+        self.monthly_cache.put(key, monthly_ref)
+        return monthly_ref
+
+    def _load_cost_type_ids(self) -> List[str]:
+        """knn_cost_type_ref ids, re-read at most once per reference-cache TTL."""
+        return self.reference_data.load_cost_type_ids()
+
+    def _load_pool_indexes(
+        self,
+        mcc: int,
+        card_types: List[str],
+    ) -> Tuple[pd.DataFrame, List[str], Dict[int, PoolIndex]]:
+        """Monthly reference frame, its feature columns and the per-end-month pool indexes."""
+        cost_type_ids = self._load_cost_type_ids()
+        monthly_ref = self._load_monthly_reference(mcc, card_types, cost_type_ids)
+        feature_cols = [c for c in monthly_ref.columns if c.startswith("pct_ct_")] + VOLUME_FEATURE_COLS
+        key = (int(mcc), normalize_card_types(card_types), self.context_len_months, self.horizon_len_months)
+        pools = self.neighbor_indexes.get(key, monthly_ref, feature_cols)
+        return monthly_ref, feature_cols, pools
+
+    def _monthly_panel(self, mcc: int, card_types: List[str], monthly_ref: pd.DataFrame) -> MonthlyPanel:
+        return self.monthly_panels.get((int(mcc), normalize_card_types(card_types)), monthly_ref)
+
+    def warm_neighbor_indexes(self, mccs: List[int], card_types: List[str] | None = None) -> int:
+        """Build pool indexes ahead of the first quote; returns the number of MCCs warmed."""
+        warmed = 0
+        for mcc in mccs:
+            try:
+                monthly_ref, _, _ = self._load_pool_indexes(mcc, card_types or ["both"])
+                self._monthly_panel(mcc, card_types or ["both"], monthly_ref)
+                warmed += 1
+            except ValueError as exc:
+                logger.warning("[KNN] Could not prebuild neighbour index for MCC %s: %s", mcc, exc)
+        return warmed
+
+    def invalidate_reference_cache(self, mcc: int | None = None) -> int:
+        """Invalidate the shared reference data; derived state drops via _drop_derived_reference."""
+        return self.reference_data.invalidate(mcc)
+
+    def _drop_derived_reference(self, mcc: int | None) -> int:
+        from migrate_knn_schema import forget_schema_check  # imported here to avoid circular imports
+
+        # An invalidation usually follows a data load or migration; re-inspect the column types.
+        forget_schema_check()
+        return (
+            self.monthly_cache.invalidate(mcc)
+            + self.neighbor_indexes.invalidate(mcc)
+            + self.monthly_panels.invalidate(mcc)
+        )
+
+    def reference_cache_stats(self) -> Dict[str, object]:
+        stats = self.reference_data.stats()
+        stats["monthly_features"] = self.monthly_cache.stats()
+        stats["neighbor_indexes"] = self.neighbor_indexes.stats()
+        stats["neighbor_indexes"]["monthly_panels"] = self.monthly_panels.stats()
+        if hasattr(self.processing_cost_provider, "stats"):
+            stats["processing_costs"] = self.processing_cost_provider.stats()
+        return stats
 
     def _build_window_pool(
         self,
@@ -156,23 +442,14 @@ class ProductionQuoteService:
         feature_cols: List[str],
         start_period: pd.Period,
         end_period: pd.Period,
+        panel: MonthlyPanel,
     ) -> pd.DataFrame:
-        periods = pd.period_range(start_period, end_period, freq="M")
-        ctx = monthly_ref[monthly_ref["ym_period"].isin(periods)].copy()
-        if ctx.empty:
-            return pd.DataFrame()
-
-        eligible_merchants = (
-            ctx.groupby("merchant_id")["ym_period"]
-            .nunique()
-            .loc[lambda s: s == len(periods)]
-            .index
-        )
-        if len(eligible_merchants) == 0:
+        rows = panel.window_rows(start_period, end_period)
+        if len(rows) == 0:
             return pd.DataFrame()
 
         return (
-            ctx[ctx["merchant_id"].isin(eligible_merchants)]
+            monthly_ref.iloc[rows]
             .groupby("merchant_id")[feature_cols]
             .mean()
             .reset_index()
@@ -316,6 +593,70 @@ class ProductionQuoteService:
             per_merchant_week["sum_proc_cost"] / per_merchant_week["sum_amount"]
         ).replace([float("inf"), float("-inf")], 0.0).fillna(0.0)
 
+        return self._summarise_composite_weeks(
+            per_merchant_week,
+            cost_type_ids,
+            int(tx["calendar_year"].min()),
+            int(tx["calendar_year"].max()),
+        )
+
+    def _composite_from_weekly_aggregates(
+        self,
+        weekly_agg: pd.DataFrame,
+        cost_type_ids: List[str],
+    ) -> pd.DataFrame:
+        """Composite weekly features from repository.load_weekly_aggregates rows."""
+        if weekly_agg.empty:
+            return pd.DataFrame()
+
+        keys = ["merchant_id", "calendar_year", "week_of_year"]
+        agg = weekly_agg.assign(
+            calendar_year=weekly_agg["calendar_year"].astype(int),
+            week_of_year=weekly_agg["week_of_year"].astype(int),
+            cost_type_ID=pd.to_numeric(weekly_agg["cost_type_id"], errors="coerce").fillna(-1).astype(int).astype(str),
+        )
+
+        weekly_cost_counts = agg.pivot_table(
+            index=keys,
+            columns="cost_type_ID",
+            values="txn_count",
+            aggfunc="sum",
+            fill_value=0,
+        )
+        weekly_cost_counts = weekly_cost_counts.reindex(columns=cost_type_ids, fill_value=0)
+        weekly_total_txn = weekly_cost_counts.sum(axis=1)
+        weekly_pct = weekly_cost_counts.div(weekly_total_txn, axis=0).fillna(0.0)
+        weekly_pct.columns = [f"pct_ct_{c}" for c in weekly_pct.columns]
+
+        per_merchant_week = (
+            agg.groupby(keys)[["txn_count", "sum_amount", "sum_proc_cost"]]
+            .sum()
+            .rename(columns={"txn_count": "weekly_txn_count"})
+            .reset_index()
+        )
+        per_merchant_week["weekly_total_proc_value"] = per_merchant_week["sum_amount"]
+        per_merchant_week["weekly_avg_txn_value"] = (
+            per_merchant_week["sum_amount"] / per_merchant_week["weekly_txn_count"]
+        )
+        per_merchant_week = per_merchant_week.join(weekly_pct, on=keys)
+        per_merchant_week["weekly_avg_txn_cost_pct"] = (
+            per_merchant_week["sum_proc_cost"] / per_merchant_week["sum_amount"]
+        ).replace([float("inf"), float("-inf")], 0.0).fillna(0.0)
+
+        return self._summarise_composite_weeks(
+            per_merchant_week,
+            cost_type_ids,
+            int(agg["calendar_year"].min()),
+            int(agg["calendar_year"].max()),
+        )
+
+    def _summarise_composite_weeks(
+        self,
+        per_merchant_week: pd.DataFrame,
+        cost_type_ids: List[str],
+        min_year: int,
+        max_year: int,
+    ) -> pd.DataFrame:
         pct_cols = [f"pct_ct_{c}" for c in cost_type_ids]
         agg_map = {
             "weekly_txn_count": ["mean", "std"],
@@ -347,8 +688,6 @@ class ProductionQuoteService:
             columns={f"{col}_mean": col for col in pct_cols if f"{col}_mean" in composite.columns}
         )
 
-        min_year = int(tx["calendar_year"].min())
-        max_year = int(tx["calendar_year"].max())
         full_index = pd.MultiIndex.from_product(
             [range(min_year, max_year + 1), range(1, 53)],
             names=["calendar_year", "week_of_year"],
@@ -370,92 +709,175 @@ class ProductionQuoteService:
         composite["neighbor_coverage"] = composite["neighbor_coverage"].fillna(0).astype(int)
         return composite.sort_values(["calendar_year", "week_of_year"])
 
-    def get_quote(self, req: QuoteRequest) -> QuoteComputationResult:
-        reference_txn = self.repository.load_transactions(req.mcc, req.card_types)
-        reference_txn = self._filter_reference_by_card_types(reference_txn, req.card_types)
-        if reference_txn.empty:
-            raise ValueError("No reference transactions available for requested mcc/card_types.")
+    @staticmethod
+    def _onboarding_frame(req: QuoteRequest) -> pd.DataFrame | None:
+        if req.onboarding_merchant_txn_df is None:
+            return None
+        onboarding_df = pd.DataFrame(req.onboarding_merchant_txn_df)
+        return None if onboarding_df.empty else onboarding_df
 
-        cost_type_ids = self.repository.load_cost_type_ids()
-        monthly_ref = build_monthly_features(reference_txn, cost_type_ids)
-        if monthly_ref.empty:
-            raise ValueError("Reference monthly feature table is empty.")
+    @staticmethod
+    def _require_volume_inputs(req: QuoteRequest) -> None:
+        if req.avg_monthly_txn_count is None or req.avg_monthly_txn_value is None:
+            raise ValueError(
+                "avg_monthly_txn_count and avg_monthly_txn_value are required when onboarding_merchant_txn_df is missing."
+            )
 
-        feature_cols = [c for c in monthly_ref.columns if c.startswith("pct_ct_")] + [
-            "total_transactions",
-            "avg_amount",
-        ]
-        no_df_feature_cols = ["total_transactions", "avg_amount"]
-        pool_by_month = build_pool_by_month(
-            monthly_ref,
-            feature_cols,
-            self.context_len_months,
-            self.horizon_len_months,
+    def _resolve_pool_index(
+        self,
+        req: QuoteRequest,
+        onboarding_df: pd.DataFrame | None,
+        pool_by_month: Dict[int, PoolIndex],
+    ) -> Tuple[pd.Period, PoolIndex]:
+        end_period = self._resolve_end_period(req, onboarding_df)
+        pool_index = pool_by_month.get(end_period.month)
+        if pool_index is None:
+            raise ValueError("No reference pool available for selected end month.")
+        return end_period, pool_index
+
+    def _onboarding_query_vector(
+        self,
+        req: QuoteRequest,
+        onboarding_df: pd.DataFrame,
+        end_period: pd.Period,
+        feature_cols: List[str],
+        cost_type_ids: List[str],
+    ) -> pd.DataFrame:
+        if "proc_cost" not in onboarding_df.columns or onboarding_df["proc_cost"].isna().any():
+            onboarding_df = self.processing_cost_provider.enrich(onboarding_df, mcc=req.mcc)
+
+        return query_vector_from_txn_df(
+            onboarding_df=onboarding_df,
+            cost_type_ids=cost_type_ids,
+            feature_cols=feature_cols,
+            end_period=end_period,
+            avg_monthly_txn_count=req.avg_monthly_txn_count,
+            avg_monthly_txn_value=req.avg_monthly_txn_value,
         )
 
-        onboarding_df = None
-        if req.onboarding_merchant_txn_df is not None:
-            onboarding_df = pd.DataFrame(req.onboarding_merchant_txn_df)
-            if onboarding_df.empty:
-                onboarding_df = None
+    def _quote_result(
+        self,
+        neighbor_ids: List[int],
+        horizon_forecasts: List[List[float]],
+        k: int,
+        end_period: pd.Period,
+    ) -> QuoteComputationResult:
+        return QuoteComputationResult(
+            neighbor_forecasts=[
+                NeighborForecast(merchant_id=int(merchant_id), forecast_proc_cost_pct_3m=forecast)
+                for merchant_id, forecast in zip(neighbor_ids, horizon_forecasts)
+            ],
+            context_len_wk=self.context_len_wk,
+            horizon_len_wk=self.horizon_len_wk,
+            k=k,
+            end_month=str(end_period),
+        )
 
-        end_period = self._resolve_end_period(req, onboarding_df)
-        pool = pool_by_month.get(end_period.month)
-        if pool is None or pool.empty:
-            raise ValueError("No reference pool available for selected end month.")
+    def get_quote(self, req: QuoteRequest) -> QuoteComputationResult:
+        cost_type_ids = self._load_cost_type_ids()
+        monthly_ref, feature_cols, pool_by_month = self._load_pool_indexes(req.mcc, req.card_types)
+
+        onboarding_df = self._onboarding_frame(req)
+        end_period, pool_index = self._resolve_pool_index(req, onboarding_df, pool_by_month)
 
         if onboarding_df is not None:
-            if "proc_cost" not in onboarding_df.columns or onboarding_df["proc_cost"].isna().any():
-                onboarding_df = self.processing_cost_provider.enrich(onboarding_df)
-
-            query_vec = query_vector_from_txn_df(
-                onboarding_df=onboarding_df,
-                cost_type_ids=cost_type_ids,
-                feature_cols=feature_cols,
-                end_period=end_period,
-                avg_monthly_txn_count=req.avg_monthly_txn_count,
-                avg_monthly_txn_value=req.avg_monthly_txn_value,
-            )
+            query_vec = self._onboarding_query_vector(req, onboarding_df, end_period, feature_cols, cost_type_ids)
             knn_feature_cols = feature_cols
         else:
-            if req.avg_monthly_txn_count is None or req.avg_monthly_txn_value is None:
-                raise ValueError(
-                    "avg_monthly_txn_count and avg_monthly_txn_value are required when onboarding_merchant_txn_df is missing."
-                )
+            self._require_volume_inputs(req)
             query_vec = query_vector_from_pool_means(
-                feature_cols=no_df_feature_cols,
-                pool=pool,
+                feature_cols=VOLUME_FEATURE_COLS,
+                pool=pool_index.pool,
                 avg_monthly_txn_count=req.avg_monthly_txn_count,
                 avg_monthly_txn_value=req.avg_monthly_txn_value,
             )
-            knn_feature_cols = no_df_feature_cols
-
-        effective_k = min(self.k, len(pool))
-        x_pool = pool[knn_feature_cols].apply(pd.to_numeric, errors="coerce").fillna(0.0)
-        x_query = query_vec.apply(pd.to_numeric, errors="coerce").fillna(0.0)
-        model = NearestNeighbors(n_neighbors=effective_k, metric="euclidean")
-        model.fit(x_pool.values)
-        _, idx = model.kneighbors(x_query.values)
+            knn_feature_cols = VOLUME_FEATURE_COLS
 
-        neighbors = pool.iloc[idx[0]]
-        horizon_forecasts = lookup_horizon_proc_cost_pct(monthly_ref, neighbors, self.horizon_len_months)
+        idx = pool_index.kneighbors(query_vec, knn_feature_cols)[0]
+        neighbors = pool_index.pool.iloc[idx]
+        panel = self._monthly_panel(req.mcc, req.card_types, monthly_ref)
+        horizon_forecasts = lookup_horizon_proc_cost_pct(
+            monthly_ref, neighbors, self.horizon_len_months, panel=panel
+        )
+        return self._quote_result(
+            neighbors["merchant_id"].tolist(), horizon_forecasts, pool_index.k, end_period
+        )
 
-        neighbor_forecasts: List[NeighborForecast] = []
-        for (_, row), forecast in zip(neighbors.iterrows(), horizon_forecasts):
-            neighbor_forecasts.append(
-                NeighborForecast(
-                    merchant_id=int(row["merchant_id"]),
-                    forecast_proc_cost_pct_3m=forecast,
+    def get_quote_batch(self, reqs: List[QuoteRequest]) -> List[QuoteComputationResult | Exception]:
+        """
+        Quote many merchants at once.
+
+        Requests are grouped by (mcc, card_types) so each group shares one
+        reference load and pool index, then by (end month, feature set) so all
+        query vectors in a sub-group are matched in a single kneighbors call
+        and their horizons gathered in one panel lookup.  Returns one entry
+        per request, in order: the result, or the exception that request
+        raised.
+        """
+        results: List[QuoteComputationResult | Exception | None] = [None] * len(reqs)
+        groups: Dict[Tuple[int, Tuple[str, ...]], List[int]] = {}
+        for pos, req in enumerate(reqs):
+            groups.setdefault((int(req.mcc), normalize_card_types(req.card_types)), []).append(pos)
+
+        for (mcc, _), positions in groups.items():
+            card_types = reqs[positions[0]].card_types
+            try:
+                cost_type_ids = self._load_cost_type_ids()
+                monthly_ref, feature_cols, pool_by_month = self._load_pool_indexes(mcc, card_types)
+                panel = self._monthly_panel(mcc, card_types, monthly_ref)
+            except Exception as exc:
+                for pos in positions:
+                    results[pos] = exc
+                continue
+
+            # (end month, feature set) -> [(request position, end period, onboarding query vector or None)]
+            batches: Dict[Tuple[int, Tuple[str, ...]], List[Tuple[int, pd.Period, pd.DataFrame | None]]] = {}
+            for pos in positions:
+                req = reqs[pos]
+                try:
+                    onboarding_df = self._onboarding_frame(req)
+                    end_period, _ = self._resolve_pool_index(req, onboarding_df, pool_by_month)
+                    if onboarding_df is not None:
+                        query_vec = self._onboarding_query_vector(
+                            req, onboarding_df, end_period, feature_cols, cost_type_ids
+                        )
+                        knn_feature_cols = feature_cols
+                    else:
+                        self._require_volume_inputs(req)
+                        query_vec = None
+                        knn_feature_cols = VOLUME_FEATURE_COLS
+                except Exception as exc:
+                    results[pos] = exc
+                    continue
+                batches.setdefault((end_period.month, tuple(knn_feature_cols)), []).append(
+                    (pos, end_period, query_vec)
                 )
-            )
 
-        return QuoteComputationResult(
-            neighbor_forecasts=neighbor_forecasts,
-            context_len_wk=self.context_len_wk,
-            horizon_len_wk=self.horizon_len_wk,
-            k=effective_k,
-            end_month=str(end_period),
-        )
+            for (month, knn_feature_cols), items in batches.items():
+                pool_index = pool_by_month[month]
+                k = pool_index.k
+                if list(knn_feature_cols) == VOLUME_FEATURE_COLS:
+                    query_vecs = query_vectors_from_pool_means(
+                        feature_cols=VOLUME_FEATURE_COLS,
+                        pool=pool_index.pool,
+                        avg_monthly_txn_counts=[reqs[pos].avg_monthly_txn_count for pos, _, _ in items],
+                        avg_monthly_txn_values=[reqs[pos].avg_monthly_txn_value for pos, _, _ in items],
+                    )
+                else:
+                    query_vecs = pd.concat([vec for _, _, vec in items], ignore_index=True)
+
+                idx = pool_index.kneighbors(query_vecs, knn_feature_cols)
+                neighbors = pool_index.pool.iloc[idx.ravel()]
+                horizon_forecasts = lookup_horizon_proc_cost_pct(
+                    monthly_ref, neighbors, self.horizon_len_months, panel=panel
+                )
+                neighbor_ids = neighbors["merchant_id"].tolist()
+                for row, (pos, end_period, _) in enumerate(items):
+                    window = slice(row * k, (row + 1) * k)
+                    results[pos] = self._quote_result(
+                        neighbor_ids[window], horizon_forecasts[window], k, end_period
+                    )
+        return results
 
     def get_composite_merchant(self, req: CompositeMerchantRequest) -> CompositeMerchantComputationResult:
         onboarding_df = pd.DataFrame(req.onboarding_merchant_txn_df)
@@ -474,48 +896,32 @@ class ProductionQuoteService:
         original_start_period = start_period
         original_end_period = end_period
 
-        reference_txn = self.repository.load_transactions(req.mcc, req.card_types)
-        reference_txn = self._filter_reference_by_card_types(reference_txn, req.card_types)
-        if reference_txn.empty:
-            raise ValueError("No reference transactions available for requested mcc/card_types.")
+        cost_type_ids = self._load_cost_type_ids()
+        monthly_ref = self._load_monthly_reference(req.mcc, req.card_types, cost_type_ids)
 
-        cost_type_ids = self.repository.load_cost_type_ids()
-        monthly_ref = build_monthly_features(reference_txn, cost_type_ids)
-        if monthly_ref.empty:
-            raise ValueError("Reference monthly feature table is empty.")
+        feature_cols = [c for c in monthly_ref.columns if c.startswith("pct_ct_")] + VOLUME_FEATURE_COLS
 
-        feature_cols = [c for c in monthly_ref.columns if c.startswith("pct_ct_")] + [
-            "total_transactions",
-            "avg_amount",
-        ]
+        panel = self._monthly_panel(req.mcc, req.card_types, monthly_ref)
 
         # Fallback to the most recent historical year containing the requested month.
-        if not monthly_ref.empty and "ym_period" in monthly_ref.columns:
-            min_available_period = monthly_ref["ym_period"].min()
-            max_available_period = monthly_ref["ym_period"].max()
-
-            def find_most_recent_with_month(target_period: pd.Period) -> pd.Period | None:
-                target_month = target_period.month
-                matches = monthly_ref[monthly_ref["ym_period"].dt.month == target_month]["ym_period"]
-                if matches.empty:
-                    return None
-                return matches.max()
-
-            if end_period > max_available_period:
-                fallback = find_most_recent_with_month(end_period)
-                end_period = fallback if fallback is not None else max_available_period
-
-            if start_period > max_available_period:
-                fallback = find_most_recent_with_month(start_period)
-                start_period = fallback if fallback is not None else max_available_period
-            elif start_period < min_available_period:
-                start_period = min_available_period
-        pool = self._build_window_pool(monthly_ref, feature_cols, start_period, end_period)
+        min_available_period = panel.first_period
+        max_available_period = panel.last_period
+
+        if end_period > max_available_period:
+            fallback = panel.latest_period_with_month(end_period.month)
+            end_period = fallback if fallback is not None else max_available_period
+
+        if start_period > max_available_period:
+            fallback = panel.latest_period_with_month(start_period.month)
+            start_period = fallback if fallback is not None else max_available_period
+        elif start_period < min_available_period:
+            start_period = min_available_period
+        pool = self._build_window_pool(monthly_ref, feature_cols, start_period, end_period, panel)
         if pool.empty:
             raise ValueError("No reference pool available for onboarding window.")
 
         if "proc_cost" not in onboarding_df.columns or onboarding_df["proc_cost"].isna().any():
-            onboarding_df = self.processing_cost_provider.enrich(onboarding_df)
+            onboarding_df = self.processing_cost_provider.enrich(onboarding_df, mcc=req.mcc)
 
         query_vec = self._build_window_query_vector(
             onboarding_df=onboarding_df,
@@ -536,29 +942,20 @@ class ProductionQuoteService:
 
         neighbors = pool.iloc[idx[0]].copy()
         neighbor_ids = [int(v) for v in neighbors["merchant_id"].tolist()]
-        composite = self._build_composite_weekly_features(reference_txn, neighbor_ids, cost_type_ids)
+        if self.aggregation_mode == "sql":
+            weekly_agg = self.repository.load_weekly_aggregates(req.mcc, req.card_types, neighbor_ids)
+            composite = self._composite_from_weekly_aggregates(weekly_agg, cost_type_ids)
+        else:
+            reference_txn = self._load_reference(req.mcc, req.card_types)
+            composite = self._build_composite_weekly_features(reference_txn, neighbor_ids, cost_type_ids)
         if composite.empty:
             raise ValueError("No composite weekly features could be generated.")
 
-        weekly_features: List[CompositeWeeklyFeature] = []
         pct_cols = [f"pct_ct_{c}" for c in cost_type_ids]
-        for _, row in composite.iterrows():
-            weekly_features.append(
-                CompositeWeeklyFeature(
-                    calendar_year=int(row["calendar_year"]),
-                    week_of_year=int(row["week_of_year"]),
-                    weekly_txn_count_mean=float(row["weekly_txn_count_mean"]),
-                    weekly_txn_count_stdev=float(row["weekly_txn_count_stdev"]),
-                    weekly_total_proc_value_mean=float(row["weekly_total_proc_value_mean"]),
-                    weekly_total_proc_value_stdev=float(row["weekly_total_proc_value_stdev"]),
-                    weekly_avg_txn_value_mean=float(row["weekly_avg_txn_value_mean"]),
-                    weekly_avg_txn_value_stdev=float(row["weekly_avg_txn_value_stdev"]),
-                    weekly_avg_txn_cost_pct_mean=float(row["weekly_avg_txn_cost_pct_mean"]),
-                    weekly_avg_txn_cost_pct_stdev=float(row["weekly_avg_txn_cost_pct_stdev"]),
-                    neighbor_coverage=int(row["neighbor_coverage"]),
-                    pct_ct_means={col: float(row[col]) for col in pct_cols},
-                )
-            )
+        if req.response_format == "columns":
+            weekly_features = self._weekly_feature_columns(composite, pct_cols)
+        else:
+            weekly_features = self._weekly_feature_rows(composite, pct_cols)
 
         return CompositeMerchantComputationResult(
             composite_merchant_id=f"composite_mcc_{req.mcc}_{start_period}_{end_period}",
@@ -569,6 +966,27 @@ class ProductionQuoteService:
             weekly_features=weekly_features,
         )
 
+    @staticmethod
+    def _weekly_feature_columns(composite: pd.DataFrame, pct_cols: List[str]) -> Dict[str, Any]:
+        """Columnar weekly features: one plain list per metric, no per-row objects."""
+        columns: Dict[str, Any] = {}
+        for name in WEEKLY_FEATURE_COLUMNS:
+            dtype = int if name in _INT_WEEKLY_COLUMNS else float
+            columns[name] = composite[name].to_numpy(dtype=dtype).tolist()
+        columns["pct_ct_means"] = {col: composite[col].to_numpy(dtype=float).tolist() for col in pct_cols}
+        return columns
+
+    @classmethod
+    def _weekly_feature_rows(cls, composite: pd.DataFrame, pct_cols: List[str]) -> List[CompositeWeeklyFeature]:
+        columns = cls._weekly_feature_columns(composite, pct_cols)
+        pct_ct = columns.pop("pct_ct_means")
+        names = list(columns)
+        pct_values = list(zip(*pct_ct.values())) if pct_ct else [()] * len(composite)
+        return [
+            CompositeWeeklyFeature(**dict(zip(names, values)), pct_ct_means=dict(zip(pct_cols, pcts)))
+            for values, pcts in zip(zip(*columns.values()), pct_values)
+        ]
+
     def quote_legacy(
         self,
         df: pd.DataFrame | None,
@@ -0,0 +1,86 @@
+"""
+tests/test_composite_columns.py
+
+Verifies that the columnar getCompositeMerchant response carries the same
+weekly features as the row-oriented response and that weekly_feature_rows
+restores the row shape for downstream parsers, including the volume forecast
+request.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------------------------
+# Make the knn_rate_quote module importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+import modules.knn_rate_quote.controller as controller
+from modules.knn_rate_quote.schemas import (
+    WEEKLY_FEATURE_COLUMNS,
+    CompositeMerchantRequest,
+    weekly_feature_rows,
+)
+from modules.knn_rate_quote.service import ProductionQuoteService
+from modules.volume_forecast.models import VolumeForecastRequest
+
+
+class _FrameRepository:
+    def __init__(self, frame: pd.DataFrame) -> None:
+        self.frame = frame
+
+    def load_transactions(self, mcc, card_types):
+        return self.frame.copy()
+
+    def load_cost_type_ids(self):
+        return ["1", "2", "3"]
+
+
+def _service() -> ProductionQuoteService:
+    rng = np.random.default_rng(17)
+    n = 5000
+    amount = rng.lognormal(3.0, 0.8, n)
+    frame = pd.DataFrame({
+        "transaction_id": [str(i) for i in range(n)],
+        "merchant_id": rng.integers(1, 31, n),
+        "date": (pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 730, n), unit="D")).astype(str),
+        "amount": amount,
+        "proc_cost": amount * rng.uniform(0.01, 0.03, n),
+        "card_brand": rng.choice(["visa", "mastercard"], n),
+        "card_type": rng.choice(["credit", "debit"], n),
+        "cost_type_ID": rng.integers(1, 4, n),
+    })
+    svc = ProductionQuoteService(engine=None, repository=_FrameRepository(frame))
+    svc.use_feature_store = False
+    svc.aggregation_mode = "rows"
+    return svc
+
+
+def test_columnar_response_matches_rows(monkeypatch):
+    monkeypatch.setattr(controller, "_service", _service())
+    onboarding = [
+        {"transaction_date": f"2019-{m:02d}-{d:02d}", "amount": 15.0 + d, "cost_type_ID": (d % 3) + 1, "proc_cost": 0.3}
+        for m in (4, 5, 6) for d in range(1, 28, 3)
+    ]
+    rows = controller.run_get_composite_merchant(
+        CompositeMerchantRequest(mcc=5411, onboarding_merchant_txn_df=onboarding)
+    )
+    cols = controller.run_get_composite_merchant(
+        CompositeMerchantRequest(mcc=5411, onboarding_merchant_txn_df=onboarding, response_format="columns")
+    )
+
+    features = cols.pop("weekly_features")
+    expected = rows.pop("weekly_features")
+    assert cols == rows
+    assert set(features) == set(WEEKLY_FEATURE_COLUMNS) | {"pct_ct_means"}
+    assert all(len(features[name]) == len(expected) for name in WEEKLY_FEATURE_COLUMNS)
+    assert weekly_feature_rows(features) == expected
+    assert weekly_feature_rows(expected) == expected
+    volume = VolumeForecastRequest(composite_weekly_features=features)
+    assert [w.model_dump() for w in volume.composite_weekly_features] == expected
@@ -0,0 +1,150 @@
+"""
+tests/test_engine_executor.py
+
+Verifies the per-engine executor lanes: admission and accounting, lane
+settings read from ML_EXECUTOR_<LANE>_*, thread vs process pools, stats and
+shutdown, and — through the app — that a saturated lane leaves the event loop
+free for health checks while a full queue answers 503, and that the stub
+rate-optimisation / TPV-prediction engines run on their own lanes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import httpx
+import pytest
+
+# ---------------------------------------------------------------------------
+# Make the ml_service modules importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+import engine_executor
+from engine_executor import EngineLane, EngineSaturatedError, executor_stats, run_engine, shutdown_executors
+
+
+@pytest.fixture(autouse=True)
+def fresh_lanes(monkeypatch):
+    monkeypatch.setattr(engine_executor, "_lanes", {})
+    yield
+    shutdown_executors()
+
+
+def test_admit_rejects_past_the_queue_and_finish_accounts():
+    lane = EngineLane("knn", workers=1, max_queue=1)
+    lane._admit()  # running
+    lane._admit()  # queued
+    with pytest.raises(EngineSaturatedError, match="saturated"):
+        lane._admit()
+
+    done: Future = Future()
+    done.set_result((10.0, 10.5, "ok"))
+    lane._finish(9.75, done)
+    lane._finish(9.75, None)  # submit failed
+    stats = lane.stats()
+    assert stats["rejected"] == 1 and stats["peak_queued"] == 1
+    assert stats["completed"] == 1 and stats["failed"] == 1 and stats["queued"] == 0 and stats["in_flight"] == 0
+    assert stats["avg_queue_wait_ms"] == 250.0 and stats["avg_run_ms"] == 500.0
+
+
+def test_lane_settings_from_env(monkeypatch):
+    monkeypatch.setenv("ML_EXECUTOR_VOLUME_WORKERS", "3")
+    monkeypatch.setenv("ML_EXECUTOR_VOLUME_MAX_QUEUE", "7")
+    monkeypatch.setenv("ML_EXECUTOR_VOLUME_KIND", " Process ")
+    volume = engine_executor._lane_from_env("volume")
+    assert (volume.workers, volume.max_queue, volume.kind) == (3, 7, "process")
+    assert isinstance(volume._get_executor(), ProcessPoolExecutor)
+    volume.shutdown()
+
+    # Lanes holding process-local state fall back to threads.
+    monkeypatch.setenv("ML_EXECUTOR_KNN_KIND", "process")
+    monkeypatch.setenv("ML_EXECUTOR_KNN_WORKERS", "0")
+    knn = engine_executor._lane_from_env("knn")
+    assert (knn.workers, knn.max_queue, knn.kind) == (1, 0, "thread")
+    assert isinstance(knn._get_executor(), ThreadPoolExecutor)
+    knn.shutdown()
+
+    monkeypatch.setenv("ML_EXECUTOR_TPV_KIND", "fiber")
+    with pytest.raises(ValueError, match="ML_EXECUTOR_TPV_KIND"):
+        engine_executor._lane_from_env("tpv")
+
+
+def test_run_engine_stats_and_shutdown():
+    async def main():
+        assert await run_engine("cost", lambda a, b=0: a + b, 2, b=3) == 5
+        with pytest.raises(ZeroDivisionError):
+            await run_engine("cost", lambda: 1 / 0)
+
+    asyncio.run(main())
+    stats = executor_stats()
+    assert set(stats) == set(engine_executor.LANES)
+    assert stats["cost"]["submitted"] == 2 and stats["cost"]["completed"] == 1 and stats["cost"]["failed"] == 1
+    assert stats["knn"]["submitted"] == 0
+
+    lane = engine_executor.get_lane("cost")
+    shutdown_executors()
+    assert lane._executor is None and engine_executor._lanes == {}
+
+
+def _app():
+    from config import MLConfig
+
+    if not MLConfig.DATABASE_URL:
+        MLConfig.DATABASE_URL = "sqlite://"  # read by database.py on import; the lifespan is not run
+    from app import app
+    return app
+
+
+def _profit_payload():
+    from modules.profit_forecast.tests.test_soft_guardrail_profitability import _make_request
+    return _make_request(n_simulations=1_000).model_dump(mode="json")
+
+
+def test_saturated_lane_leaves_health_responsive_and_full_queue_returns_503():
+    app = _app()
+    engine_executor._lanes["profit"] = EngineLane("profit", workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            blocked = [asyncio.create_task(run_engine("profit", release.wait, 10)) for _ in range(2)]
+            await asyncio.sleep(0.05)  # one running, one queued
+            try:
+                health = await asyncio.wait_for(client.get("/ml/cost-forecast/health"), timeout=2)
+                assert health.status_code == 200
+
+                rejected = await client.post("/ml/GetProfitForecast", json=_profit_payload())
+                assert rejected.status_code == 503 and rejected.headers["Retry-After"] == "1"
+                assert "saturated" in rejected.json()["detail"]
+            finally:
+                release.set()
+                await asyncio.gather(*blocked)
+
+            served = await client.post("/ml/GetProfitForecast", json=_profit_payload())
+            assert served.status_code == 200
+
+    asyncio.run(main())
+    assert executor_stats()["profit"]["rejected"] == 1
+
+
+def test_stub_engines_run_on_their_lanes():
+    app = _app()
+    form = {"mcc": 5411, "total_cost": 1.0, "total_payment_volume": 10.0, "effective_rate": 10.0}
+    csv = {"enriched_csv": ("enriched.csv", b"transaction_date,amount\n2024-01-01,10\n")}
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for path in ("/ml/rate-optimisation", "/ml/tpv-prediction"):
+                assert (await client.post(path, files=csv, data=form)).status_code == 200
+
+    asyncio.run(main())
+    stats = executor_stats()
+    assert stats["rate_optimisation"]["completed"] == 1 and stats["tpv_prediction"]["completed"] == 1
@@ -0,0 +1,123 @@
+"""
+tests/test_feature_store.py
+
+Verifies that KNN monthly features assembled from feature-store rows match
+the features built directly from raw reference transactions, and that an MCC
+is rebuilt once knn_transactions gains rows the store has not seen.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# ---------------------------------------------------------------------------
+# Make the ml_service modules importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+from feature_store import ROLLUP_KEY, aggregate_monthly_features
+from modules.knn_rate_quote.feature_engineering import (
+    build_monthly_features,
+    build_monthly_features_from_store,
+)
+from modules.knn_rate_quote.service import normalize_card_types
+
+COST_TYPE_IDS = ["1", "2", "3", "4"]
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _raw_transactions(n: int = 2000, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    amount = rng.lognormal(3.0, 1.0, n).round(2)
+    return pd.DataFrame({
+        "merchant_id": rng.integers(1, 9, n).astype(str),
+        "card_brand": rng.choice(["visa", "mastercard"], n),
+        "card_type": rng.choice(["credit", "debit"], n),
+        "date": pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D"),
+        "amount": amount,
+        "proc_cost": (amount * rng.uniform(0.01, 0.03, n)).round(4),
+        "cost_type_ID": rng.integers(1, 5, n),
+    })
+
+
+def _select_store_rows(features: pd.DataFrame, counts: pd.DataFrame, card_types):
+    """Mirror feature_store.load_store_rows on in-memory frames."""
+    filters = normalize_card_types(card_types)
+    if filters:
+        mask = lambda df: (df["card_brand"] != ROLLUP_KEY) & (
+            df["card_brand"].isin(filters) | df["card_type"].isin(filters)
+        )
+    else:
+        mask = lambda df: df["card_brand"] == ROLLUP_KEY
+    return features[mask(features)], counts[mask(counts)]
+
+
+def _filter_raw(raw: pd.DataFrame, card_types) -> pd.DataFrame:
+    filters = normalize_card_types(card_types)
+    if not filters:
+        return raw
+    return raw[raw["card_brand"].isin(filters) | raw["card_type"].isin(filters)]
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("card_types", [["both"], ["visa"], ["credit", "mastercard"]])
+def test_store_features_match_raw_features(card_types):
+    raw = _raw_transactions()
+    features, counts = aggregate_monthly_features(raw, 5411)
+    store_features, store_counts = _select_store_rows(features, counts, card_types)
+
+    from_store = build_monthly_features_from_store(store_features, store_counts, COST_TYPE_IDS)
+    from_raw = build_monthly_features(_filter_raw(raw, card_types), COST_TYPE_IDS)
+
+    pd.testing.assert_frame_equal(
+        from_store.reset_index(drop=True),
+        from_raw.reset_index(drop=True),
+        check_dtype=False,
+        rtol=1e-12,
+    )
+
+
+def test_rollup_rows_sum_card_rows():
+    raw = _raw_transactions()
+    features, _ = aggregate_monthly_features(raw, 5411)
+    rollup = features[features["card_brand"] == ROLLUP_KEY]
+    cards = features[features["card_brand"] != ROLLUP_KEY]
+
+    assert rollup["transaction_count"].sum() == len(raw)
+    assert cards["transaction_count"].sum() == len(raw)
+    assert rollup["total_processing_value"].sum() == pytest.approx(raw["amount"].sum())
+
+
+def test_stale_mcc_is_rebuilt_after_new_transactions(tmp_path):
+    from sqlalchemy import create_engine
+
+    from feature_store import COST_TYPE_COUNTS_TABLE, FEATURES_TABLE, is_stale, refresh_if_stale
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'store.db'}")
+    raw = _raw_transactions(200).rename(columns={"cost_type_ID": "cost_type_id"}).assign(mcc=5411)
+    features, counts = aggregate_monthly_features(raw, 5411)
+    features.head(0).to_sql(FEATURES_TABLE, engine, index=False)
+    counts.head(0).to_sql(COST_TYPE_COUNTS_TABLE, engine, index=False)
+    raw.to_sql("knn_transactions", engine, index=False)
+
+    assert is_stale(engine, 5411) and refresh_if_stale(engine, 5411)
+    assert not is_stale(engine, 5411) and not refresh_if_stale(engine, 5411)
+
+    appended = raw.head(3).assign(date=pd.Timestamp("2020-02-01"))
+    appended.to_sql("knn_transactions", engine, index=False, if_exists="append")
+    assert is_stale(engine, 5411) and refresh_if_stale(engine, 5411)
+    stored = pd.read_sql(f"SELECT max(ym) AS ym, sum(transaction_count) AS n FROM {FEATURES_TABLE} "
+                         f"WHERE mcc = 5411 AND card_brand = '{ROLLUP_KEY}'", engine)
+    assert stored["ym"][0] == "2020-02" and stored["n"][0] == 203
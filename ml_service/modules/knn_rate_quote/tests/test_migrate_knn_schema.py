@@ -0,0 +1,135 @@
+"""
+tests/test_migrate_knn_schema.py
+
+Verifies the statements migrate_knn_schema issues for legacy and already
+migrated column types and for the MCC partitioning step (against a recording
+connection, since the migration targets PostgreSQL), and that the
+knn_schema_is_typed() answer checks every typed column and the card CHECK
+constraints, and can be refreshed.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+
+# ---------------------------------------------------------------------------
+# Make the ml_service modules importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+import migrate_knn_schema as mig
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+        self.rowcount = len(rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def scalar(self):
+        return self.rows[0][0] if self.rows else None
+
+
+class RecordingConnection:
+    """Answers the migration's catalogue queries and records everything else."""
+
+    def __init__(self, column_types, mccs=(5411, 5812), null_mcc=0, partitioned=False, checks=()):
+        self.answers = {
+            "information_schema.columns": list(column_types.items()),
+            "pg_constraint": [(name,) for name in checks],
+            "pg_partitioned_table": [(1,)] if partitioned else [],
+            "WHERE mcc IS NULL": [(null_mcc,)],
+            "SELECT DISTINCT mcc": [(m,) for m in mccs],
+            "pg_get_serial_sequence": [("knn_transactions_id_seq",)],
+        }
+        self.statements = []
+
+    def execute(self, clause, params=None):
+        sql = " ".join(str(clause).split())
+        for marker, rows in self.answers.items():
+            if marker in sql:
+                return _Result(rows)
+        self.statements.append(sql)
+        return _Result([])
+
+
+LEGACY_TYPES = {"date": "text", "amount": "text", "proc_cost": "text", "cost_type_id": "text"}
+TYPED_TYPES = {"date": "date", "amount": "double precision", "proc_cost": "real", "cost_type_id": "bigint"}
+
+
+def test_column_steps_only_convert_untyped_columns():
+    conn = RecordingConnection(LEGACY_TYPES)
+    assert mig._convert_numeric_columns(conn) == 3
+    assert conn.statements[0].startswith("ALTER TABLE knn_transactions ALTER COLUMN amount TYPE DOUBLE PRECISION")
+    assert "cost_type_id TYPE INTEGER USING CAST(NULLIF(TRIM(CAST(cost_type_id AS TEXT)), '') AS INTEGER)" in conn.statements[2]
+
+    typed = RecordingConnection(TYPED_TYPES)
+    assert mig._convert_date_column(typed) is False
+    assert mig._convert_numeric_columns(typed) == 0
+    assert typed.statements == []
+
+
+def test_card_checks_added_once():
+    conn = RecordingConnection(TYPED_TYPES, checks=["ck_knn_card_brand_normalized"])
+    assert mig._add_card_checks(conn) == 1
+    assert conn.statements == [
+        "ALTER TABLE knn_transactions ADD CONSTRAINT ck_knn_card_type_normalized CHECK (card_type = LOWER(TRIM(card_type)))"
+    ]
+    assert mig._add_card_checks(RecordingConnection(TYPED_TYPES, checks=list(mig.CARD_CHECKS))) == 0
+
+
+def test_partition_step_keys_on_id_and_mcc():
+    conn = RecordingConnection(TYPED_TYPES, mccs=(5411, 5812))
+    assert mig._partition_by_mcc(conn) is True
+    statements = conn.statements
+    assert statements[:2] == [
+        "CREATE TABLE knn_transactions_partitioned (LIKE knn_transactions INCLUDING DEFAULTS) PARTITION BY LIST (mcc)",
+        "ALTER TABLE knn_transactions_partitioned ADD PRIMARY KEY (id, mcc)",
+    ]
+    assert "CREATE TABLE knn_transactions_p5812 PARTITION OF knn_transactions_partitioned FOR VALUES IN (5812)" in statements
+    assert statements.index("INSERT INTO knn_transactions_partitioned SELECT * FROM knn_transactions") < statements.index(
+        "ALTER TABLE knn_transactions RENAME TO knn_transactions_unpartitioned"
+    )
+    assert "ALTER SEQUENCE knn_transactions_id_seq OWNED BY knn_transactions.id" in statements
+    assert not any("ix_knn_txn_id" in s for s in statements)
+
+    assert mig._partition_by_mcc(RecordingConnection(TYPED_TYPES, partitioned=True)) is False
+    with pytest.raises(ValueError, match="no mcc"):
+        mig._partition_by_mcc(RecordingConnection(TYPED_TYPES, null_mcc=3))
+
+
+def _create(eng, date="DATE", amount="FLOAT", checks=True):
+    constraints = "".join(f", CONSTRAINT {n} CHECK ({c})" for n, c in mig.CARD_CHECKS.items()) if checks else ""
+    with eng.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS knn_transactions"))
+        conn.execute(text(f"""
+            CREATE TABLE knn_transactions (
+                id INTEGER, card_brand TEXT, card_type TEXT, date {date}, amount {amount},
+                proc_cost FLOAT, cost_type_id INTEGER{constraints}
+            )
+        """))
+
+
+def test_typed_check_covers_columns_and_card_constraints_and_refreshes(tmp_path):
+    eng = create_engine(f"sqlite:///{tmp_path / 'knn.db'}")
+    _create(eng, amount="TEXT")
+    assert mig.knn_schema_is_typed(eng) is False
+
+    _create(eng)
+    assert mig.knn_schema_is_typed(eng) is False  # cached
+    assert mig.knn_schema_is_typed(eng, ttl_seconds=0) is True  # expired
+
+    mig.forget_schema_check(eng)
+    _create(eng, checks=False)  # typed columns, but card values are not guaranteed normalized
+    assert mig.knn_schema_is_typed(eng) is False
+
+    mig.forget_schema_check(eng)
+    _create(eng, date="TEXT")
+    assert mig.knn_schema_is_typed(eng) is False
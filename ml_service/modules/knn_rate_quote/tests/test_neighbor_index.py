@@ -0,0 +1,176 @@
+"""
+tests/test_neighbor_index.py
+
+Verifies that prebuilt per-end-month neighbour indexes return the same
+neighbours as fitting NearestNeighbors on the pool per request, that they
+are reused until the monthly reference frame changes, expire, are released
+with their frame and stay within their byte budget, and that the dense
+monthly panel reproduces the masked per-neighbour horizon lookup.
+"""
+
+from __future__ import annotations
+
+import gc
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import NearestNeighbors
+
+# ---------------------------------------------------------------------------
+# Make the knn_rate_quote module importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+from modules.knn_rate_quote.feature_engineering import (
+    build_monthly_features,
+    build_monthly_panel,
+    build_pool_by_month,
+    lookup_horizon_proc_cost_pct,
+)
+from modules.knn_rate_quote.neighbor_index import NeighborIndexRegistry
+from modules.knn_rate_quote.service import VOLUME_FEATURE_COLS
+
+COST_TYPE_IDS = ["1", "2", "3"]
+KEY = (5411, (), 1, 3)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _monthly_reference(seed: int = 3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    n = 3000
+    raw = pd.DataFrame({
+        "merchant_id": rng.integers(1, 31, n),
+        "date": pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 730, n), unit="D"),
+        "amount": rng.lognormal(3.0, 0.8, n),
+        "proc_cost": rng.uniform(0.1, 1.0, n),
+        "cost_type_ID": rng.integers(1, 4, n),
+    })
+    return build_monthly_features(raw, COST_TYPE_IDS)
+
+
+def _masked_horizon_lookup(monthly_df: pd.DataFrame, cases: pd.DataFrame, horizon: int) -> list:
+    """Reference implementation: boolean-mask monthly_df per neighbour and month."""
+    results = []
+    for _, row in cases.iterrows():
+        end_period = pd.Period(str(row["end_period"]), freq="M")
+        values = []
+        for i in range(1, horizon + 1):
+            match = monthly_df[
+                (monthly_df["merchant_id"] == row["merchant_id"])
+                & (monthly_df["ym_period"] == end_period + i)
+            ]
+            values.append(0.0 if match.empty or match["proc_cost_pct"].isna().all()
+                          else float(match["proc_cost_pct"].iloc[0]))
+        results.append(values)
+    return results
+
+
+def _feature_cols(monthly_ref: pd.DataFrame) -> list[str]:
+    return [c for c in monthly_ref.columns if c.startswith("pct_ct_")] + VOLUME_FEATURE_COLS
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+def test_index_matches_per_request_fit():
+    monthly_ref = _monthly_reference()
+    feature_cols = _feature_cols(monthly_ref)
+    registry = NeighborIndexRegistry(k=5, volume_feature_cols=VOLUME_FEATURE_COLS)
+    pools = registry.get(KEY, monthly_ref, feature_cols)
+    expected_pools = build_pool_by_month(monthly_ref, feature_cols, 1, 3)
+
+    assert set(pools) == set(expected_pools)
+    rng = np.random.default_rng(0)
+    for month, pool_index in pools.items():
+        pool = expected_pools[month]
+        pd.testing.assert_frame_equal(pool_index.pool, pool)
+        for cols in (feature_cols, VOLUME_FEATURE_COLS):
+            query = pd.DataFrame([pool[cols].mean() * rng.uniform(0.8, 1.2)], columns=cols)
+            model = NearestNeighbors(n_neighbors=min(5, len(pool))).fit(pool[cols].values)
+            _, idx = model.kneighbors(query.values)
+            np.testing.assert_array_equal(pool_index.kneighbors(query, cols), idx)
+
+
+def test_index_reused_until_reference_changes():
+    monthly_ref = _monthly_reference()
+    feature_cols = _feature_cols(monthly_ref)
+    registry = NeighborIndexRegistry(k=5, volume_feature_cols=VOLUME_FEATURE_COLS)
+
+    first = registry.get(KEY, monthly_ref, feature_cols)
+    assert registry.get(KEY, monthly_ref, feature_cols) is first
+    assert registry.stats()["builds"] == 1
+
+    reloaded = monthly_ref.copy()
+    assert registry.get(KEY, reloaded, feature_cols) is not first
+    assert registry.stats()["builds"] == 2
+
+    assert registry.invalidate(5411) == 1
+    assert registry.stats()["entries"] == 0
+
+
+def test_index_bounded_by_ttl_budget_and_source_lifetime():
+    now = [0.0]
+    monthly_ref = _monthly_reference()
+    feature_cols = _feature_cols(monthly_ref)
+    registry = NeighborIndexRegistry(k=5, volume_feature_cols=VOLUME_FEATURE_COLS, ttl_seconds=60, clock=lambda: now[0])
+    first = registry.get(KEY, monthly_ref, feature_cols)
+    size = registry.stats()["bytes"]
+    now[0] = 61.0
+    assert registry.get(KEY, monthly_ref, feature_cols) is not first
+    assert registry.stats()["expirations"] == 1
+
+    del monthly_ref  # the monthly cache dropped the frame: the index goes with it
+    gc.collect()
+    stats = registry.stats()
+    assert stats["released"] == 1 and stats["entries"] == 0 and stats["bytes"] == 0
+
+    registry.max_bytes = int(size * 1.5)
+    frames = [_monthly_reference() for _ in range(2)]
+    for i, frame in enumerate(frames):
+        registry.get((5411 + i,) + KEY[1:], frame, feature_cols)
+    stats = registry.stats()
+    assert stats["entries"] == 1 and stats["evictions"] == 1 and stats["bytes"] <= registry.max_bytes
+
+    # An index over the whole budget is kept on its own instead of rebuilt per quote.
+    registry.max_bytes = size // 2
+    big = registry.get(KEY, frames[0], feature_cols)
+    assert registry.get(KEY, frames[0], feature_cols) is big
+    assert registry.stats()["oversized"] == 1 and registry.stats()["oversized_bytes"] > registry.max_bytes
+    assert registry.invalidate(KEY[0]) >= 1
+
+
+def test_panel_horizon_lookup_matches_masked_lookup():
+    monthly_ref = _monthly_reference()
+    # Knock out some months and values so missing / NaN cells are exercised.
+    monthly_ref = monthly_ref.drop(index=monthly_ref.index[::7]).reset_index(drop=True)
+    monthly_ref.loc[monthly_ref.index[::11], "proc_cost_pct"] = np.nan
+
+    cases = pd.DataFrame({
+        "merchant_id": [1, 5, 12, 30, 99],
+        "end_period": ["2019-03", "2020-11", "2019-12", "2018-06", "2019-05"],
+    })
+    expected = _masked_horizon_lookup(monthly_ref, cases, 3)
+    assert lookup_horizon_proc_cost_pct(monthly_ref, cases, 3) == expected
+    assert lookup_horizon_proc_cost_pct(monthly_ref, cases, 3, panel=build_monthly_panel(monthly_ref)) == expected
+
+
+def test_panel_window_rows_select_complete_merchants():
+    monthly_ref = _monthly_reference()
+    monthly_ref = monthly_ref.drop(index=monthly_ref.index[::5]).reset_index(drop=True)
+    panel = build_monthly_panel(monthly_ref)
+    start, end = pd.Period("2019-04", freq="M"), pd.Period("2019-06", freq="M")
+
+    window = monthly_ref[monthly_ref["ym_period"].between(start, end)]
+    complete = window.groupby("merchant_id")["ym_period"].nunique().loc[lambda s: s == 3].index
+    expected = window[window["merchant_id"].isin(complete)]
+
+    rows = panel.window_rows(start, end)
+    assert sorted(rows.tolist()) == expected.index.tolist()
+    assert panel.latest_period_with_month(6) == pd.Period("2020-06", freq="M")
@@ -0,0 +1,154 @@
+"""
+tests/test_processing_costs.py
+
+Exercises ExternalProcessingCostProvider against a local stub pricing
+server: size-bounded batches, the ticket cache, and heuristic fallback
+(with timeout accounting) when the service is slow.  Also checks
+CostStructureProcessingCostProvider against hand-priced fee schedule rows.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# ---------------------------------------------------------------------------
+# Make the knn_rate_quote module importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+from modules.knn_rate_quote.config import COST_STRUCTURE_DIR
+from modules.knn_rate_quote.processing_costs import (
+    CostStructureProcessingCostProvider,
+    ExternalProcessingCostProvider,
+    HeuristicProcessingCostProvider,
+)
+
+
+# ---------------------------------------------------------------------------
+# Stub server
+# ---------------------------------------------------------------------------
+
+class _StubPricing(BaseHTTPRequestHandler):
+    batches: list = []
+    delay_s: float = 0.0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).batches.append(body["transactions"])
+        time.sleep(type(self).delay_s)
+        priced = [{**t, "proc_cost": t["amount"] * 0.02 + 0.1} for t in body["transactions"]]
+        payload = json.dumps({"transactions": priced}).encode("utf-8")
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except BrokenPipeError:
+            pass  # client timed out and hung up
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def stub_url():
+    _StubPricing.batches = []
+    _StubPricing.delay_s = 0.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubPricing)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/price"
+    server.shutdown()
+    server.server_close()
+
+
+def _tickets(n: int = 1200, unique: int = 300) -> pd.DataFrame:
+    rng = np.random.default_rng(9)
+    amounts = np.round(np.linspace(5, 200, unique), 2)
+    pick = rng.integers(0, unique, n)
+    pick[:unique] = np.arange(unique)
+    return pd.DataFrame({
+        "date": pd.Timestamp("2019-05-01") + pd.to_timedelta(rng.integers(0, 28, n), unit="D"),
+        "amount": amounts[pick],
+        "card_brand": np.where(pick % 2, "Visa", "mastercard"),
+        "card_type": "credit",
+        "cost_type_ID": 1,
+    })
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+def test_batches_unique_tickets_and_caches(stub_url):
+    provider = ExternalProcessingCostProvider(endpoint=stub_url, batch_size=100, max_concurrency=3)
+    df = _tickets()
+
+    enriched = provider.enrich(df, mcc=5411)
+    np.testing.assert_allclose(enriched["proc_cost"], df["amount"] * 0.02 + 0.1)
+    assert sorted(len(b) for b in _StubPricing.batches) == [100, 100, 100]
+    assert all(t["mcc"] == 5411 for b in _StubPricing.batches for t in b)
+
+    again = provider.enrich(df.sample(frac=1.0, random_state=0), mcc=5411)
+    assert len(_StubPricing.batches) == 3
+    np.testing.assert_allclose(again["proc_cost"], again["amount"] * 0.02 + 0.1)
+
+    stats = provider.stats()
+    assert stats["tickets_priced"] == 300
+    assert stats["cache_hits"] == 1200 and stats["cache_misses"] == 1200
+    assert stats["fallback_rows"] == 0
+    provider.close()
+
+
+def test_timeout_falls_back_to_heuristic(stub_url):
+    _StubPricing.delay_s = 0.5
+    provider = ExternalProcessingCostProvider(endpoint=stub_url, timeout_seconds=0.1, batch_size=50)
+    df = _tickets(n=80, unique=80)
+
+    enriched = provider.enrich(df, mcc=5411)
+    expected = HeuristicProcessingCostProvider().enrich(df)["proc_cost"]
+    np.testing.assert_allclose(enriched["proc_cost"], expected)
+
+    stats = provider.stats()
+    assert stats["timeouts"] == 2
+    assert stats["fallback_rate"] == 1.0
+    assert stats["cache_entries"] == 0
+    provider.close()
+
+
+@pytest.mark.skipif(not COST_STRUCTURE_DIR.is_dir(), reason="cost_structure/ not available")
+def test_cost_structure_prices_from_fee_schedules():
+    df = pd.DataFrame(
+        [
+            # amount, brand, card type, mcc → card fee + network fee
+            (100.0, "Visa", "Credit", 5411),             # 1.60 + 0.1595
+            (100.0, "mastercard", "debit", 5411),        # min(1.20, max 0.35) + 0.155
+            (4.0, "Mastercard", "Credit", 5411),         # small ticket 0.092 + 0.0302
+            (2000.0, "Mastercard", "Credit", 5411),      # 32.1 + large-ticket 2.825
+            (1.0, "Visa", "Debit (Prepaid)", 5411),      # small ticket 0.066 + debit 0.0168
+            (0.0, "Visa", "Credit", 5411),
+            (100.0, "Amex", "Credit", 5411),             # no schedule → heuristic
+            (100.0, "Visa", "Credit", 7011),             # MCC not in the industry program
+        ],
+        columns=["amount", "card_brand", "card_type", "mcc"],
+    )
+    provider = CostStructureProcessingCostProvider(COST_STRUCTURE_DIR)
+
+    enriched = provider.enrich(df)
+    expected = [1.7595, 0.505, 0.1222, 34.925, 0.0828, 0.0, 1.85, 1.85]
+    np.testing.assert_allclose(enriched["proc_cost"], expected, rtol=0, atol=1e-12)
+    assert provider.stats()["fallback_rows"] == 2
+
+    no_mcc_column = provider.enrich(df.drop(columns="mcc"), mcc=5411)
+    np.testing.assert_allclose(no_mcc_column["proc_cost"].iloc[:7], expected[:7], rtol=0, atol=1e-12)
@@ -0,0 +1,131 @@
+"""
+tests/test_quote_batch.py
+
+Verifies that ProductionQuoteService.get_quote_batch returns the same
+neighbours and horizons as one get_quote call per request, loads reference
+data once per (mcc, card_types), and reports per-item errors in place.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# ---------------------------------------------------------------------------
+# Make the knn_rate_quote module importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+from modules.knn_rate_quote.schemas import QuoteRequest
+from modules.knn_rate_quote.service import ProductionQuoteService
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _reference_transactions(n: int = 6000, seed: int = 11) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    amount = rng.lognormal(3.0, 0.8, n)
+    return pd.DataFrame({
+        "transaction_id": [str(i) for i in range(n)],
+        "merchant_id": rng.integers(1, 41, n),
+        "date": (pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 730, n), unit="D")).astype(str),
+        "amount": amount,
+        "proc_cost": amount * rng.uniform(0.01, 0.03, n),
+        "card_brand": rng.choice(["visa", "mastercard"], n),
+        "card_type": rng.choice(["credit", "debit"], n),
+        "cost_type_ID": rng.integers(1, 4, n),
+    })
+
+
+class _CountingRepository:
+    def __init__(self, frame: pd.DataFrame) -> None:
+        self.frame = frame
+        self.calls = 0
+
+    def load_transactions(self, mcc, card_types):
+        self.calls += 1
+        return self.frame.copy()
+
+    def load_cost_type_ids(self):
+        return ["1", "2", "3"]
+
+
+@pytest.fixture()
+def service():
+    svc = ProductionQuoteService(engine=None)
+    svc.repository = _CountingRepository(_reference_transactions())
+    svc.use_feature_store = False
+    svc.aggregation_mode = "rows"
+    return svc
+
+
+def _requests() -> list[QuoteRequest]:
+    rng = np.random.default_rng(5)
+    reqs = []
+    for i in range(30):
+        reqs.append(QuoteRequest(
+            mcc=5411,
+            card_types=["visa"] if i % 3 == 0 else ["both"],
+            avg_monthly_txn_count=int(rng.integers(5, 20)),
+            avg_monthly_txn_value=float(rng.uniform(10, 40)),
+            as_of_date=f"2019-{(i % 9) + 1:02d}-15",
+        ))
+    onboarding = [
+        {"transaction_date": f"2019-05-{d:02d}", "amount": 20.0 + d, "cost_type_ID": (d % 3) + 1, "proc_cost": 0.4}
+        for d in range(1, 28)
+    ]
+    reqs.append(QuoteRequest(mcc=5411, onboarding_merchant_txn_df=onboarding))
+    return reqs
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+def test_batch_matches_single_quotes(service):
+    reqs = _requests()
+    batch = service.get_quote_batch(reqs)
+    for req, result in zip(reqs, batch):
+        single = service.get_quote(req)
+        assert result.end_month == single.end_month
+        assert result.k == single.k
+        assert [n.merchant_id for n in result.neighbor_forecasts] == [
+            n.merchant_id for n in single.neighbor_forecasts
+        ]
+        for got, expected in zip(result.neighbor_forecasts, single.neighbor_forecasts):
+            np.testing.assert_allclose(got.forecast_proc_cost_pct_3m, expected.forecast_proc_cost_pct_3m)
+
+
+def test_reference_loaded_once_per_card_filter(service):
+    service.get_quote_batch(_requests())
+    assert service.repository.calls == 2  # ("both",) and ("visa",)
+
+
+def test_per_item_errors(service):
+    reqs = [
+        QuoteRequest(mcc=5411, avg_monthly_txn_count=10, avg_monthly_txn_value=20.0, as_of_date="2019-03-01"),
+        QuoteRequest(mcc=5411, avg_monthly_txn_count=10, as_of_date="2019-03-01"),
+        QuoteRequest(mcc=5411, avg_monthly_txn_count=10, avg_monthly_txn_value=20.0),
+    ]
+    results = service.get_quote_batch(reqs)
+    assert not isinstance(results[0], Exception)
+    assert isinstance(results[1], ValueError)
+    assert "avg_monthly_txn_value" in str(results[1])
+    assert isinstance(results[2], ValueError)
+    assert "as_of_date" in str(results[2])
+
+
+def test_cost_type_failure_is_reported_per_item(service, monkeypatch):
+    def fail():
+        raise ConnectionError("knn_cost_type_ref unavailable")
+
+    monkeypatch.setattr(service.repository, "load_cost_type_ids", fail)
+    results = service.get_quote_batch(_requests()[:3])
+    assert len(results) == 3 and all(isinstance(r, ConnectionError) for r in results)
@@ -0,0 +1,157 @@
+"""
+tests/test_reference_cache.py
+
+Verifies the LRU/TTL behaviour of the KNN reference-transaction cache and
+that ProductionQuoteService only hits the repository on a cache miss.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# ---------------------------------------------------------------------------
+# Make the knn_rate_quote module importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+from modules.knn_rate_quote.service import (
+    ProductionQuoteService,
+    ReferenceFrameCache,
+    normalize_card_types,
+)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _frame(n_rows: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "merchant_id": [str(i % 7) for i in range(n_rows)],
+        "date": ["2019-01-05"] * n_rows,
+        "amount": [10.0] * n_rows,
+        "proc_cost": [0.2] * n_rows,
+        "card_brand": ["visa"] * n_rows,
+        "card_type": ["credit"] * n_rows,
+        "cost_type_ID": [1] * n_rows,
+    })
+
+
+class _CountingRepository:
+    def __init__(self, frame: pd.DataFrame) -> None:
+        self.frame = frame
+        self.calls = 0
+
+    def load_transactions(self, mcc, card_types):
+        self.calls += 1
+        return self.frame.copy()
+
+    def load_cost_type_ids(self):
+        return ["1"]
+
+
+# ============================================================================
+# ReferenceFrameCache
+# ============================================================================
+
+
+class TestReferenceFrameCache:
+
+    def test_card_type_normalisation(self):
+        assert normalize_card_types(["Visa", " mastercard"]) == ("mastercard", "visa")
+        assert normalize_card_types(["both"]) == ()
+        assert normalize_card_types([]) == ()
+
+    def test_hit_and_miss_counters(self):
+        cache = ReferenceFrameCache(max_bytes=10**9, ttl_seconds=60)
+        key = (5411, ())
+        assert cache.get(key) is None
+        cache.put(key, _frame(10))
+        assert cache.get(key) is not None
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["entries"] == 1
+
+    def test_lru_eviction_by_bytes(self):
+        one = _frame(100)
+        size = int(one.memory_usage(deep=True).sum())
+        cache = ReferenceFrameCache(max_bytes=int(size * 2.5), ttl_seconds=60)
+        cache.put((1, ()), _frame(100))
+        cache.put((2, ()), _frame(100))
+        cache.get((1, ()))                 # touch 1 so 2 becomes LRU
+        cache.put((3, ()), _frame(100))
+
+        assert cache.get((2, ())) is None
+        assert cache.get((1, ())) is not None
+        assert cache.get((3, ())) is not None
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["bytes"] <= cache.max_bytes
+
+    def test_oversized_frame_is_not_cached(self):
+        cache = ReferenceFrameCache(max_bytes=100, ttl_seconds=60)
+        cache.put((1, ()), _frame(1000))
+        assert cache.stats()["entries"] == 0
+
+    def test_ttl_expiry(self):
+        clock = _FakeClock()
+        cache = ReferenceFrameCache(max_bytes=10**9, ttl_seconds=30, clock=clock)
+        cache.put((1, ()), _frame(10))
+        clock.now = 29.0
+        assert cache.get((1, ())) is not None
+        clock.now = 31.0
+        assert cache.get((1, ())) is None
+        assert cache.stats()["expirations"] == 1
+
+    def test_invalidate_by_mcc(self):
+        cache = ReferenceFrameCache(max_bytes=10**9, ttl_seconds=60)
+        cache.put((5411, ()), _frame(10))
+        cache.put((5411, ("visa",)), _frame(10))
+        cache.put((5812, ()), _frame(10))
+        assert cache.invalidate(5411) == 2
+        assert cache.get((5812, ())) is not None
+        assert cache.invalidate() == 1
+        assert cache.stats()["bytes"] == 0
+
+
+# ============================================================================
+# ProductionQuoteService integration
+# ============================================================================
+
+
+class TestServiceUsesCache:
+
+    @pytest.fixture()
+    def service(self):
+        svc = ProductionQuoteService(engine=None)
+        svc.repository = _CountingRepository(_frame(50))
+        return svc
+
+    def test_repository_loaded_once_per_key(self, service):
+        first = service._load_reference(5411, ["both"])
+        second = service._load_reference(5411, ["BOTH"])
+        assert service.repository.calls == 1
+        assert first is second
+        assert pd.api.types.is_datetime64_any_dtype(first["date"])
+
+        service._load_reference(5411, ["visa"])
+        assert service.repository.calls == 2
+
+    def test_invalidation_forces_reload(self, service):
+        service._load_reference(5411, ["both"])
+        service.invalidate_reference_cache(5411)
+        service._load_reference(5411, ["both"])
+        assert service.repository.calls == 2
@@ -0,0 +1,120 @@
+"""
+tests/test_reference_data.py
+
+Verifies that the KNN quote service and the TPV forecast share one
+ReferenceDataService: a composite-merchant call followed by a TPV pool
+lookup reads the repository once, and one invalidation drops both the cached
+rows and the KNN state derived from them.  Concurrent misses (frames and
+cost-type ids) load once, and their per-key locks do not accumulate.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------------------------
+# Make the ml_service modules importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+from modules.knn_rate_quote.schemas import CompositeMerchantRequest
+from modules.knn_rate_quote.service import ProductionQuoteService
+from modules.tpv_forecast.service import _compute_pool_info, _MonthSummary
+from reference_data import ReferenceDataService
+
+
+class _CountingRepository:
+    def __init__(self, frame: pd.DataFrame) -> None:
+        self.frame = frame
+        self.calls = 0
+
+    def load_transactions(self, mcc, card_types):
+        self.calls += 1
+        return self.frame.copy()
+
+    def load_cost_type_ids(self):
+        return ["1", "2", "3"]
+
+
+def _frame() -> pd.DataFrame:
+    rng = np.random.default_rng(23)
+    n = 4000
+    amount = rng.lognormal(3.0, 0.8, n)
+    return pd.DataFrame({
+        "transaction_id": [str(i) for i in range(n)],
+        "merchant_id": rng.integers(1, 31, n),
+        "date": (pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 540, n), unit="D")).astype(str),
+        "amount": amount,
+        "proc_cost": amount * rng.uniform(0.01, 0.03, n),
+        "card_brand": rng.choice(["visa", "mastercard"], n),
+        "card_type": rng.choice(["credit", "debit"], n),
+        # Postgres returns the unquoted alias lower-cased.
+        "cost_type_id": rng.integers(1, 4, n),
+    })
+
+
+def test_knn_and_tpv_share_one_load():
+    repo = _CountingRepository(_frame())
+    shared = ReferenceDataService(repo)
+    knn = ProductionQuoteService(engine=None, reference_data=shared)
+    knn.use_feature_store = False
+    knn.aggregation_mode = "rows"
+
+    onboarding = [
+        {"transaction_date": f"2019-{m:02d}-{d:02d}", "amount": 20.0 + d, "cost_type_ID": (d % 3) + 1, "proc_cost": 0.4}
+        for m in (4, 5, 6) for d in range(1, 28, 3)
+    ]
+    knn.get_composite_merchant(CompositeMerchantRequest(mcc=5411, onboarding_merchant_txn_df=onboarding))
+    context = [_MonthSummary(2019, 6, 5000.0, 100, 50.0, 10.0, 40.0, {"cost_type_1_pct": 0.6, "cost_type_2_pct": 0.4})]
+    flat_mean, knn_mean, peers = _compute_pool_info(shared, 5411, ["both"], context)
+
+    assert repo.calls == 1
+    assert flat_mean > 0 and knn_mean > 0 and len(peers) == 10
+    cached = shared.load_transactions(5411, ["both"])
+    assert "cost_type_ID" in cached.columns
+    assert pd.api.types.is_datetime64_any_dtype(cached["date"])
+    assert "year" not in cached.columns  # TPV derived its own frame
+
+    assert len(knn.monthly_cache.stats()["keys"]) == 1
+    assert knn.invalidate_reference_cache(5411) >= 2
+    assert knn.monthly_cache.stats()["entries"] == 0
+    _compute_pool_info(shared, 5411, ["both"], context)
+    assert repo.calls == 2
+
+
+def test_concurrent_misses_load_once():
+    gate = threading.Event()
+
+    class _SlowRepository(_CountingRepository):
+        cost_type_calls = 0
+
+        def load_transactions(self, mcc, card_types):
+            gate.wait(5)
+            return super().load_transactions(mcc, card_types)
+
+        def load_cost_type_ids(self):
+            gate.wait(5)
+            self.cost_type_calls += 1
+            return super().load_cost_type_ids()
+
+    repo = _SlowRepository(_frame())
+    shared = ReferenceDataService(repo)
+    results, ids = [], []
+    threads = [threading.Thread(target=lambda: results.append(shared.load_transactions(5411, ["visa"]))) for _ in range(4)]
+    threads += [threading.Thread(target=lambda: ids.append(shared.load_cost_type_ids())) for _ in range(4)]
+    for t in threads:
+        t.start()
+    gate.set()
+    for t in threads:
+        t.join()
+
+    assert repo.calls == 1 and repo.cost_type_calls == 1
+    assert all(frame is results[0] for frame in results)
+    assert ids == [["1", "2", "3"]] * 4
+    assert shared._key_locks == {}  # idle per-key locks are pruned
@@ -0,0 +1,99 @@
+"""
+tests/test_reference_snapshots.py
+
+Verifies that Arrow reference snapshots exported from knn_transactions give
+the KNN service the same monthly reference features as reading the table,
+and that card / date predicates and column projection are applied.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+# ---------------------------------------------------------------------------
+# Make the ml_service modules importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+pytest.importorskip("pyarrow")
+
+from modules.knn_rate_quote.service import ProductionQuoteService
+from reference_snapshots import ArrowSnapshotMerchantRepository, export_snapshots
+
+COST_TYPE_IDS = ["1", "2", "3"]
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+@pytest.fixture()
+def engine(tmp_path):
+    rng = np.random.default_rng(4)
+    n = 3000
+    amount = rng.lognormal(3.0, 0.8, n)
+    txns = pd.DataFrame({
+        "id": np.arange(1, n + 1),
+        "transaction_id": [f"t{i}" for i in range(n)],
+        "merchant_id": rng.integers(100, 125, n).astype(str),
+        "mcc": rng.choice([5411, 5812], n),
+        "card_brand": rng.choice(["Visa", "mastercard"], n),
+        "card_type": rng.choice(["credit", "debit"], n),
+        "date": (pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 730, n), unit="D")).strftime("%Y-%m-%d"),
+        "amount": amount,
+        "proc_cost": amount * rng.uniform(0.01, 0.03, n),
+        "cost_type_id": rng.integers(1, 4, n),
+    })
+    eng = create_engine(f"sqlite:///{tmp_path / 'knn.db'}")
+    txns.to_sql("knn_transactions", eng, index=False)
+    pd.DataFrame({"id": [1, 2, 3], "cost_type_id": [1, 2, 3]}).to_sql("knn_cost_type_ref", eng, index=False)
+    return eng
+
+
+@pytest.fixture(params=["arrow", "parquet"])
+def snapshot_dir(request, engine, tmp_path):
+    out = tmp_path / "snapshots"
+    manifest = export_snapshots(out, engine=engine, fmt=request.param)
+    assert sorted(manifest["rows_by_mcc"]) == ["5411", "5812"]
+    assert sum(manifest["rows_by_mcc"].values()) == 3000
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("card_types", [["both"], ["visa"], ["debit"]])
+def test_snapshot_monthly_features_match_database(engine, snapshot_dir, card_types):
+    db_svc = ProductionQuoteService(engine=engine)
+    db_svc.use_feature_store = False
+    db_svc.aggregation_mode = "rows"
+    snap_svc = ProductionQuoteService(engine=None, repository=ArrowSnapshotMerchantRepository(snapshot_dir))
+    assert snap_svc.aggregation_mode == "rows" and not snap_svc.use_feature_store
+
+    assert snap_svc._load_cost_type_ids() == COST_TYPE_IDS
+    pd.testing.assert_frame_equal(
+        snap_svc._load_monthly_reference(5411, card_types, COST_TYPE_IDS),
+        db_svc._load_monthly_reference(5411, card_types, COST_TYPE_IDS),
+        check_dtype=False,
+    )
+
+
+def test_snapshot_predicates_and_projection(snapshot_dir):
+    repo = ArrowSnapshotMerchantRepository(snapshot_dir, columns=("date", "amount", "merchant_id"))
+    df = repo.load_transactions(5812, ["visa"], start_date="2019-03-01", end_date="2019-05-31")
+    assert list(df.columns) == ["date", "amount", "merchant_id"]
+    assert not df.empty
+    assert df["date"].min() >= pd.Timestamp("2019-03-01").date()
+    assert df["date"].max() <= pd.Timestamp("2019-05-31").date()
+
+    full = ArrowSnapshotMerchantRepository(snapshot_dir).load_transactions(5812, ["visa"])
+    assert set(full["card_brand"]) == {"visa"}
+    assert set(full["mcc"]) == {5812}
@@ -0,0 +1,134 @@
+"""
+tests/test_sql_aggregation.py
+
+Verifies that the SQL push-down aggregation mode produces the same monthly
+reference features and composite weekly features as aggregating
+transaction rows in pandas, on the legacy text-date layout, the typed layout
+written by migrate_knn_schema and a typed table without its card CHECK
+constraints (which keeps the normalizing card filter).  Uses a throwaway
+SQLite database.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+# ---------------------------------------------------------------------------
+# Make the knn_rate_quote module importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+from migrate_knn_schema import CARD_CHECKS, knn_schema_is_typed
+from modules.knn_rate_quote.service import ProductionQuoteService
+
+COST_TYPE_IDS = ["1", "2", "3", "4"]
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def _transactions() -> pd.DataFrame:
+    rng = np.random.default_rng(21)
+    n = 4000
+    amount = rng.lognormal(3.0, 0.8, n)
+    amount[::97] = np.nan
+    txns = pd.DataFrame({
+        "id": np.arange(1, n + 1),
+        "transaction_id": [f"t{i}" for i in range(n)],
+        "merchant_id": rng.integers(100, 130, n).astype(str),
+        "mcc": 5411,
+        "card_brand": rng.choice(["Visa", "mastercard"], n),
+        "card_type": rng.choice(["credit", "debit"], n),
+        "date": (pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 730, n), unit="D")).strftime("%Y-%m-%d"),
+        "amount": amount,
+        "proc_cost": amount * rng.uniform(0.01, 0.03, n),
+        "cost_type_id": rng.integers(1, 5, n),
+    })
+    return txns
+
+
+@pytest.fixture(params=["legacy", "typed", "unconstrained"])
+def engine(request, tmp_path):
+    txns = _transactions()
+    eng = create_engine(f"sqlite:///{tmp_path / 'knn.db'}")
+    if request.param in ("typed", "unconstrained"):
+        checks = "".join(f", CONSTRAINT {name} CHECK ({cond})" for name, cond in CARD_CHECKS.items())
+        with eng.begin() as conn:
+            conn.execute(text(f"""
+                CREATE TABLE knn_transactions (
+                    id INTEGER PRIMARY KEY, transaction_id VARCHAR, merchant_id VARCHAR,
+                    mcc INTEGER, card_brand VARCHAR, card_type VARCHAR, date DATE NOT NULL,
+                    amount FLOAT, proc_cost FLOAT, cost_type_id INTEGER
+                    {checks if request.param == "typed" else ""}
+                )
+            """))
+        if request.param == "typed":
+            txns["card_brand"] = txns["card_brand"].str.lower()
+        else:
+            # e.g. a CSV COPY into an init_db() table created before the constraints existed
+            txns["card_type"] = txns["card_type"].map({"credit": " Credit", "debit": "debit "})
+        txns.to_sql("knn_transactions", eng, index=False, if_exists="append")
+    else:
+        txns.to_sql("knn_transactions", eng, index=False)
+    assert knn_schema_is_typed(eng) == (request.param == "typed")
+    pd.DataFrame({"id": [1, 2, 3, 4], "cost_type_id": [1, 2, 3, 4]}).to_sql("knn_cost_type_ref", eng, index=False)
+    return eng
+
+
+def _service(engine, mode: str) -> ProductionQuoteService:
+    svc = ProductionQuoteService(engine=engine)
+    svc.use_feature_store = False
+    svc.aggregation_mode = mode
+    return svc
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("card_types", [["both"], ["visa"], ["credit", "mastercard"]])
+def test_monthly_features_match_row_mode(engine, card_types):
+    rows = _service(engine, "rows")._load_monthly_reference(5411, card_types, COST_TYPE_IDS)
+    sql = _service(engine, "sql")._load_monthly_reference(5411, card_types, COST_TYPE_IDS)
+    pd.testing.assert_frame_equal(
+        sql.reset_index(drop=True),
+        rows.reset_index(drop=True),
+        check_dtype=False,
+        rtol=1e-9,
+    )
+
+
+def test_composite_weekly_features_match_row_mode(engine):
+    neighbor_ids = [101, 105, 110, 117, 129]
+    rows_svc = _service(engine, "rows")
+    expected = rows_svc._build_composite_weekly_features(
+        rows_svc._load_reference(5411, ["both"]), neighbor_ids, COST_TYPE_IDS
+    )
+    sql_svc = _service(engine, "sql")
+    weekly_agg = sql_svc.repository.load_weekly_aggregates(5411, ["both"], neighbor_ids)
+    got = sql_svc._composite_from_weekly_aggregates(weekly_agg, COST_TYPE_IDS)
+
+    assert len(weekly_agg) < len(rows_svc._load_reference(5411, ["both"]))
+    pd.testing.assert_frame_equal(
+        got.reset_index(drop=True)[expected.columns],
+        expected.reset_index(drop=True),
+        check_dtype=False,
+        rtol=1e-9,
+    )
+
+
+@pytest.mark.parametrize("card_types", [["visa"], ["credit"]])
+def test_card_filter_matches_normalized_values(engine, card_types):
+    with engine.connect() as conn:
+        stored = pd.read_sql(text("SELECT card_brand, card_type FROM knn_transactions"), conn)
+    normalized = stored.apply(lambda col: col.str.strip().str.lower())
+    expected = normalized.isin(card_types).any(axis=1).sum()
+    assert len(_service(engine, "rows")._load_reference(5411, card_types)) == expected
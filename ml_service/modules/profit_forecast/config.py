@@ -6,3 +6,31 @@ import os
 DEFAULT_N_SIMULATIONS: int = int(os.getenv("DEFAULT_N_SIMULATIONS", "10000"))
 DEFAULT_CONFIDENCE_INTERVAL: float = 0.90
 HORIZON_LEN: int = 3
+
+# ── Fee-rate sweep ───────────────────────────────────────────────────────────
+# Most fee rates / target margins one request may sweep.
+MAX_SWEEP_RATES: int = int(os.getenv("PROFIT_MAX_SWEEP_RATES", "500"))
+# Rates are evaluated in chunks of at most this many (rate × month × draw)
+# elements, bounding the broadcast working set (8 bytes each).
+SWEEP_CHUNK_ELEMENTS: int = int(os.getenv("PROFIT_SWEEP_CHUNK_ELEMENTS", str(1 << 24)))
+
+# ── Variance reduction ───────────────────────────────────────────────────────
+# Default for requests that do not set variance_reduction: "none",
+# "antithetic" or "sobol".
+DEFAULT_VARIANCE_REDUCTION: str = os.getenv("PROFIT_VARIANCE_REDUCTION", "none").strip().lower()
+if DEFAULT_VARIANCE_REDUCTION not in ("none", "antithetic", "sobol"):
+    raise ValueError(
+        "PROFIT_VARIANCE_REDUCTION must be 'none', 'antithetic' or 'sobol', "
+        f"got {DEFAULT_VARIANCE_REDUCTION!r}"
+    )
+# Independently scrambled Sobol' blocks per request; their spread gives the
+# Monte Carlo standard error.
+SOBOL_REPLICATES: int = int(os.getenv("PROFIT_SOBOL_REPLICATES", "8"))
+# Pre-generated base-uniform matrices kept, one per (mode, n_simulations, months).
+SAMPLE_BANK_MAX_ENTRIES: int = int(os.getenv("PROFIT_SAMPLE_BANK_MAX_ENTRIES", "8"))
+# Budget on banked matrices (8 bytes per base uniform).  A larger matrix is
+# generated for its request and not kept, so odd sizes cannot flush the bank.
+SAMPLE_BANK_MAX_BYTES: int = int(
+    float(os.getenv("PROFIT_SAMPLE_BANK_MAX_MB", "64")) * 1024 * 1024
+)
+SAMPLE_BANK_SEED: int = 42
@@ -5,11 +5,19 @@ models.py — Pydantic request/response models for the GetProfitForecast module.
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
-from .config import DEFAULT_CONFIDENCE_INTERVAL, DEFAULT_N_SIMULATIONS, HORIZON_LEN
+from .config import (
+    DEFAULT_CONFIDENCE_INTERVAL,
+    DEFAULT_N_SIMULATIONS,
+    DEFAULT_VARIANCE_REDUCTION,
+    HORIZON_LEN,
+    MAX_SWEEP_RATES,
+)
+
+VarianceReduction = Literal["none", "antithetic", "sobol"]
 
 
 # ---------------------------------------------------------------------------
@@ -95,6 +103,32 @@ class ProfitForecastRequest(BaseModel):
         default=None,
         description="Optional target profit margin (fee_rate − cost_pct).",
     )
+    fee_rates: Optional[List[float]] = Field(
+        default=None, min_length=1, max_length=MAX_SWEEP_RATES,
+        description=(
+            "Optional fee-rate sweep. Every rate is evaluated on the same simulated "
+            "TPV/cost draws (common random numbers); results are returned in `sweep`."
+        ),
+    )
+    target_margins: Optional[List[float]] = Field(
+        default=None, min_length=1, max_length=MAX_SWEEP_RATES,
+        description="Target margins evaluated at every swept rate (defaults to [target_margin]).",
+    )
+    variance_reduction: VarianceReduction = Field(
+        default=DEFAULT_VARIANCE_REDUCTION,
+        description=(
+            "'antithetic' pairs every draw with its mirror; 'sobol' uses scrambled Sobol' "
+            "points. Both transform a pre-generated base-sample bank and round "
+            "n_simulations up to a whole number of pairs / replicate blocks."
+        ),
+    )
+
+    @field_validator("fee_rates")
+    @classmethod
+    def _fee_rates_are_fractions(cls, rates: Optional[List[float]]) -> Optional[List[float]]:
+        if rates is not None and not all(0.0 < r < 1.0 for r in rates):
+            raise ValueError("every fee rate must be a fraction of TPV in (0, 1)")
+        return rates
 
 
 # ---------------------------------------------------------------------------
@@ -110,6 +144,7 @@ class ProfitMonth(BaseModel):
     profit_mid: float
     margin_mid: float
     p_profitable: float
+    p_profitable_se: Optional[float] = None
     profit_ci_lower: float
     profit_ci_upper: float
     profit_median: float
@@ -123,6 +158,7 @@ class ProfitSummary(BaseModel):
     total_revenue_mid: float
     total_cost_mid: float
     avg_p_profitable: float
+    avg_p_profitable_se: Optional[float] = None
     min_p_profitable: float
     break_even_fee_rate: float
     suggested_fee_for_target: Optional[float] = None
@@ -162,9 +198,40 @@ class SimulationMetadata(BaseModel):
         default=False,
         description="False means samples may exceed CI bounds in tails; no hard clipping.",
     )
+    variance_reduction: VarianceReduction = "none"
+    mc_independent_units: Optional[int] = Field(
+        default=None,
+        description=(
+            "Independent units behind the standard errors: draws, antithetic pairs "
+            "or Sobol' replicate blocks."
+        ),
+    )
+
+
+class FeeRateSweepPoint(BaseModel):
+    fee_rate: float
+    total_profit_mid: float
+    avg_p_profitable: float
+    min_p_profitable: float
+    # Per horizon month, in month order
+    p_profitable: List[float]
+    profit_ci_lower: List[float]
+    profit_median: List[float]
+    profit_ci_upper: List[float]
+    # Aligned with FeeRateSweep.target_margins
+    avg_p_target_margin_met: Optional[List[float]] = None
+    min_p_target_margin_met: Optional[List[float]] = None
+
+
+class FeeRateSweep(BaseModel):
+    fee_rates: List[float]
+    target_margins: List[float] = Field(default_factory=list)
+    points: List[FeeRateSweepPoint]
+    common_random_numbers: bool = True
 
 
 class ProfitForecastResponse(BaseModel):
     months: List[ProfitMonth]
     summary: ProfitSummary
     metadata: SimulationMetadata
+    sweep: Optional[FeeRateSweep] = None
@@ -0,0 +1,188 @@
+"""
+sample_bank.py — Pre-generated base uniforms for variance-reduced profit simulation.
+
+With ``variance_reduction="antithetic"`` or ``"sobol"`` a profit forecast
+draws nothing at request time.  It takes a (2 × months, n) matrix of base
+uniforms from the bank and maps them through the TPV and cost% inverse
+CDFs of its own forecasts: row 2h feeds TPV of month h, row 2h+1 its cost%.
+Matrices are generated once per (mode, n_simulations, months) and shared
+read-only by every request with that shape, within SAMPLE_BANK_MAX_ENTRIES
+and SAMPLE_BANK_MAX_BYTES.  A matrix larger than the byte budget is
+generated for its request only.
+
+── LAYOUT ────────────────────────────────────────────────────────────────────
+antithetic   columns [0, m) hold pseudo-random u, columns [m, 2m) hold 1 − u;
+             the mean of each (u, 1 − u) pair is one independent unit
+sobol        SOBOL_REPLICATES independently scrambled Sobol' blocks of m
+             points each; the mean of each block is one independent unit
+none         not banked — drawn from the request's generator; every draw is
+             a unit
+
+The Monte Carlo standard error of any per-draw statistic is the standard
+deviation of its unit means over sqrt(#units) (see BaseSamples.standard_error).
+Without variance reduction this is the usual sqrt(p(1 − p) / n) for a
+probability, slightly conservative because the cost tails are stratified.
+
+Usage:
+    base = get_sample_bank().get("sobol", n_simulations=10_000, months=3)
+    tpv_u, cost_u = base.uniforms[0::2], base.uniforms[1::2]
+    se = base.standard_error(profit > 0)      # per month
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from scipy.stats import qmc
+
+from .config import (
+    DEFAULT_N_SIMULATIONS,
+    HORIZON_LEN,
+    SAMPLE_BANK_MAX_BYTES,
+    SAMPLE_BANK_MAX_ENTRIES,
+    SAMPLE_BANK_SEED,
+    SOBOL_REPLICATES,
+)
+
+NONE = "none"
+ANTITHETIC = "antithetic"
+SOBOL = "sobol"
+VARIANCE_REDUCTION_MODES = (NONE, ANTITHETIC, SOBOL)
+
+BankKey = Tuple[str, int, int]
+
+
+@dataclass(frozen=True)
+class BaseSamples:
+    mode: str
+    uniforms: Optional[np.ndarray]  # (2 × months, n_simulations); None for mode "none"
+    n_units: int
+
+    @property
+    def n_simulations(self) -> int:
+        return self.uniforms.shape[1] if self.uniforms is not None else self.n_units
+
+    def unit_means(self, values: np.ndarray) -> np.ndarray:
+        """Per-draw ``values`` (..., n) → means over each independent unit (..., n_units)."""
+        values = np.asarray(values, dtype=float)
+        lead = values.shape[:-1]
+        if self.mode == ANTITHETIC:
+            return values.reshape(*lead, 2, self.n_units).mean(axis=-2)
+        if self.mode == SOBOL:
+            return values.reshape(*lead, self.n_units, -1).mean(axis=-1)
+        return values
+
+    def standard_error(self, values: np.ndarray) -> np.ndarray:
+        """Monte Carlo standard error of the mean of ``values`` over its last axis."""
+        units = self.unit_means(values)
+        if self.n_units < 2:
+            return np.zeros(units.shape[:-1])
+        return units.std(axis=-1, ddof=1) / math.sqrt(self.n_units)
+
+
+def pseudo_random(n_simulations: int) -> BaseSamples:
+    """Layout of plain pseudo-random draws: every draw is its own unit."""
+    return BaseSamples(mode=NONE, uniforms=None, n_units=n_simulations)
+
+
+def _generate(mode: str, n_simulations: int, dims: int, seed: int) -> BaseSamples:
+    if mode == ANTITHETIC:
+        m = -(-n_simulations // 2)
+        u = np.random.default_rng(seed).random((dims, m))
+        uniforms = np.concatenate([u, 1.0 - u], axis=1)
+        return BaseSamples(mode=mode, uniforms=uniforms, n_units=m)
+    if mode == SOBOL:
+        m = -(-n_simulations // SOBOL_REPLICATES)
+        # Draw a power of two per block (Sobol' balance) and keep the first m points.
+        log2_m = max(0, (m - 1).bit_length())
+        blocks = [
+            qmc.Sobol(d=dims, scramble=True, seed=seed + r).random_base2(log2_m)[:m].T
+            for r in range(SOBOL_REPLICATES)
+        ]
+        return BaseSamples(mode=mode, uniforms=np.concatenate(blocks, axis=1), n_units=SOBOL_REPLICATES)
+    raise ValueError(f"unknown variance_reduction {mode!r}; expected one of {VARIANCE_REDUCTION_MODES}")
+
+
+class BaseSampleBank:
+    """Thread-safe LRU of base-uniform matrices keyed by (mode, n_simulations, months)."""
+
+    def __init__(
+        self,
+        max_entries: int = SAMPLE_BANK_MAX_ENTRIES,
+        max_bytes: int = SAMPLE_BANK_MAX_BYTES,
+        seed: int = SAMPLE_BANK_SEED,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.seed = seed
+        self._entries: "OrderedDict[BankKey, BaseSamples]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.oversized = 0
+
+    def get(self, mode: str, n_simulations: int, months: int) -> BaseSamples:
+        if mode == NONE:
+            return pseudo_random(n_simulations)
+        key = (mode, int(n_simulations), int(months))
+        with self._lock:
+            base = self._entries.get(key)
+            if base is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return base
+            self.misses += 1
+        base = _generate(mode, n_simulations, 2 * months, self.seed)
+        base.uniforms.setflags(write=False)
+        nbytes = base.uniforms.nbytes
+        with self._lock:
+            if nbytes > self.max_bytes:
+                self.oversized += 1
+                return base
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.uniforms.nbytes
+            self._entries[key] = base
+            self._bytes += nbytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.uniforms.nbytes
+                self.evictions += 1
+        return base
+
+    def preload(self, mode: str, n_simulations: int = DEFAULT_N_SIMULATIONS, months: int = HORIZON_LEN) -> None:
+        self.get(mode, n_simulations, months)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "oversized": self.oversized,
+                "keys": [{"mode": m, "n_simulations": n, "months": h} for m, n, h in self._entries],
+            }
+
+
+_bank: Optional[BaseSampleBank] = None
+_bank_lock = threading.Lock()
+
+
+def get_sample_bank() -> BaseSampleBank:
+    """The process-wide bank, created on first use."""
+    global _bank
+    with _bank_lock:
+        if _bank is None:
+            _bank = BaseSampleBank()
+        return _bank
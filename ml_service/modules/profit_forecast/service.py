@@ -7,33 +7,64 @@ distribution.
 
 Independence assumption: rho(log_tpv, avg_proc_cost_pct) ~ 0.14 < 0.15,
 validated empirically on MCC 5411.
+
+Fee-rate sweep: a request with ``fee_rates`` evaluates every rate on the same
+draws (common random numbers), so differences between rates carry no
+sampling noise and P(profitable) is monotone in the rate.
+
+Variance reduction: with ``variance_reduction`` "antithetic" or "sobol" the
+draws are the request's inverse-CDF transform of a pre-generated base-sample
+bank (see sample_bank.py) instead of fresh pseudo-random numbers.  Every
+mode reports the Monte Carlo standard error of p_profitable.
 """
 
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import List
+from typing import List, Optional, Sequence, Tuple
 
 import numpy as np
-from scipy.stats import norm, truncnorm
+from scipy.special import ndtr, ndtri
+from scipy.stats import norm
 
+from .config import DEFAULT_N_SIMULATIONS, DEFAULT_VARIANCE_REDUCTION, HORIZON_LEN, SWEEP_CHUNK_ELEMENTS
 from .models import (
+    FeeRateSweep,
+    FeeRateSweepPoint,
     ProfitForecastRequest,
     ProfitForecastResponse,
     ProfitMonth,
     ProfitSummary,
     SimulationMetadata,
 )
+from .sample_bank import BaseSamples, get_sample_bank, pseudo_random
+
+
+def _truncated_std_normal_ppf(u: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Inverse CDF of the standard normal truncated to [a, b], at probabilities
+    ``u``.  Rows whose interval lies right of 0 are evaluated on the mirrored
+    interval, where the normal CDF keeps its precision.
+    """
+    sign = np.where(a > 0, -1.0, 1.0)
+    lo = np.minimum(a * sign, b * sign)
+    hi = np.maximum(a * sign, b * sign)
+    p_lo, p_hi = ndtr(lo), ndtr(hi)
+    x = ndtri(p_lo + u * (p_hi - p_lo))
+    np.clip(x, lo, hi, out=x)
+    x *= sign
+    return x
 
 
 def _sample_cost_pct_soft_guardrail(
-    cost_pct_mid: float,
-    cost_pct_hw: float,
+    cost_pct_mid,
+    cost_pct_hw,
     confidence_interval: float,
     n_simulations: int,
     rng: np.random.Generator,
-    cost_pct_ci_lower: float | None = None,
-    cost_pct_ci_upper: float | None = None,
+    cost_pct_ci_lower=None,
+    cost_pct_ci_upper=None,
+    uniforms: Optional[np.ndarray] = None,
 ) -> np.ndarray:
     """
     Sample cost% with soft guardrails shaped by calibrated conformal CI.
@@ -42,124 +73,322 @@ def _sample_cost_pct_soft_guardrail(
     - Keep approximately `confidence_interval` mass inside the calibrated CI.
     - Preserve explicit tails outside the CI (do not hard-clip to bounds).
     - Enforce only physical feasibility: cost_pct >= 0.
+
+    Scalar inputs give ``n_simulations`` samples; per-month arrays give a
+    (months × n_simulations) matrix with every month drawn independently.
+    Each row holds exactly round(CI · n) truncated-normal core samples and
+    round(alpha/2 · n) lower-tail samples, the rest upper tail, shuffled.
+    All three are drawn by inverse CDF from one uniform matrix.
+
+    Given base ``uniforms`` (months × n) instead, each uniform goes through
+    the mixture's inverse CDF — lower tail below alpha/2, core up to
+    alpha/2 + CI, upper tail above — so the map is monotone and preserves
+    antithetic / Sobol' structure; nothing is drawn from ``rng``.
     """
+    scalar = np.ndim(cost_pct_mid) == 0
+    mid = np.atleast_1d(np.asarray(cost_pct_mid, dtype=float))[:, None]
+    hw = np.broadcast_to(np.asarray(cost_pct_hw, dtype=float), mid.shape[:1])[:, None]
+    lower = mid - hw if cost_pct_ci_lower is None else np.atleast_1d(np.asarray(cost_pct_ci_lower, dtype=float))[:, None]
+    upper = mid + hw if cost_pct_ci_upper is None else np.atleast_1d(np.asarray(cost_pct_ci_upper, dtype=float))[:, None]
+    lower, upper = np.minimum(lower, upper), np.maximum(lower, upper)
+
     z = norm.ppf((1 + confidence_interval) / 2)
     alpha = 1.0 - confidence_interval
     tail_prob = alpha / 2.0
 
-    lower = cost_pct_ci_lower if cost_pct_ci_lower is not None else cost_pct_mid - cost_pct_hw
-    upper = cost_pct_ci_upper if cost_pct_ci_upper is not None else cost_pct_mid + cost_pct_hw
-
-    if lower > upper:
-        lower, upper = upper, lower
-
-    lower = float(lower)
-    upper = float(upper)
-
-    # Degenerate interval: fallback to Gaussian if we cannot form a proper CI band.
-    if upper <= lower:
-        sigma_cost = cost_pct_hw / z if z > 0 else max(cost_pct_hw, 1e-9)
-        samples = rng.normal(cost_pct_mid, sigma_cost, n_simulations)
-        return np.maximum(samples, 0.0)
-
-    # Build a central truncated-normal core and exponential tails beyond CI.
-    inner_n = int(round(confidence_interval * n_simulations))
-    lower_tail_n = int(round(tail_prob * n_simulations))
-    upper_tail_n = n_simulations - inner_n - lower_tail_n
-
-    inner_sigma = max((upper - lower) / (2.0 * z), 1e-9)
-    a = (lower - cost_pct_mid) / inner_sigma
-    b = (upper - cost_pct_mid) / inner_sigma
-    inner = truncnorm.rvs(
-        a=a,
-        b=b,
-        loc=cost_pct_mid,
-        scale=inner_sigma,
-        size=inner_n,
-        random_state=rng,
-    )
-
+    inner_sigma = np.maximum((upper - lower) / (2.0 * z), 1e-9)
+    a = (lower - mid) / inner_sigma
+    b = (upper - mid) / inner_sigma
     # Tail scales tied to CI geometry so widths stay risk-adaptive.
-    left_scale = max((cost_pct_mid - lower) / max(z, 1e-9), 1e-9)
-    right_scale = max((upper - cost_pct_mid) / max(z, 1e-9), 1e-9)
+    left_scale = np.maximum((mid - lower) / max(z, 1e-9), 1e-9)
+    right_scale = np.maximum((upper - mid) / max(z, 1e-9), 1e-9)
+
+    if uniforms is None:
+        # Build a central truncated-normal core and exponential tails beyond CI.
+        inner_n = int(round(confidence_interval * n_simulations))
+        lower_tail_n = int(round(tail_prob * n_simulations))
+        core = slice(0, inner_n)
+        lower_tail = slice(inner_n, inner_n + lower_tail_n)
+        upper_tail = slice(inner_n + lower_tail_n, n_simulations)
+
+        u = rng.random((mid.shape[0], n_simulations))
+        samples = np.empty_like(u)
+        samples[:, core] = mid + inner_sigma * _truncated_std_normal_ppf(u[:, core], a, b)
+        # Exponential inverse CDF: -scale · log(1 − u).
+        samples[:, lower_tail] = lower + left_scale * np.log1p(-u[:, lower_tail])
+        samples[:, upper_tail] = upper - right_scale * np.log1p(-u[:, upper_tail])
+        rng.permuted(samples, axis=1, out=samples)
+    else:
+        u = np.clip(np.atleast_2d(uniforms), 1e-12, 1.0 - 1e-12)
+        in_lower = u < tail_prob
+        in_upper = u >= tail_prob + confidence_interval
+        core_u = np.clip((u - tail_prob) / confidence_interval, 0.0, 1.0)
+        samples = mid + inner_sigma * _truncated_std_normal_ppf(core_u, a, b)
+        # Lower tail: -log(u / (alpha/2)) is Exp(1) and decreasing in u.
+        lower_u = np.where(in_lower, u, tail_prob) / tail_prob
+        np.copyto(samples, lower + left_scale * np.log(lower_u), where=in_lower)
+        upper_u = np.where(in_upper, u - tail_prob - confidence_interval, 0.0) / tail_prob
+        np.copyto(samples, upper - right_scale * np.log1p(-np.minimum(upper_u, 1.0 - 1e-12)), where=in_upper)
 
-    lower_tail = lower - rng.exponential(scale=left_scale, size=lower_tail_n)
-    upper_tail = upper + rng.exponential(scale=right_scale, size=upper_tail_n)
+    # Degenerate interval: fallback to Gaussian if we cannot form a proper CI band.
+    degenerate = (upper <= lower)[:, 0]
+    if degenerate.any():
+        sigma_cost = hw[degenerate] / z if z > 0 else np.maximum(hw[degenerate], 1e-9)
+        samples[degenerate] = mid[degenerate] + sigma_cost * ndtri(u[degenerate])
 
-    samples = np.concatenate([inner, lower_tail, upper_tail])
-    rng.shuffle(samples)
-    return np.maximum(samples, 0.0)
+    np.maximum(samples, 0.0, out=samples)
+    return samples[0] if scalar else samples
 
 
-def _simulate_profit_month(
-    tpv_mid: float,
-    tpv_hw: float,
-    cost_pct_mid: float,
-    cost_pct_hw: float,
-    fee_rate: float,
+def _draw_profit_samples(
+    tpv_mid: np.ndarray,
+    tpv_hw: np.ndarray,
+    cost_pct_mid: np.ndarray,
+    cost_pct_hw: np.ndarray,
     confidence_interval: float,
     n_simulations: int,
     rng: np.random.Generator,
-    target_margin: float | None = None,
-    cost_pct_ci_lower: float | None = None,
-    cost_pct_ci_upper: float | None = None,
-    fixed_fee_per_tx: float = 0.0,
-    avg_ticket: float | None = None,
-) -> ProfitMonth:
-    z = norm.ppf((1 + confidence_interval) / 2)
+    cost_pct_ci_lower: np.ndarray | None = None,
+    cost_pct_ci_upper: np.ndarray | None = None,
+    base: Optional[BaseSamples] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (months × n_simulations) TPV and cost% draws, both floored at 0.
 
-    sigma_tpv = tpv_hw / z if z > 0 else tpv_hw
+    With banked ``base`` uniforms, row 2h drives month h's TPV and row
+    2h + 1 its cost%, and ``n_simulations`` is the bank's.
+    """
+    tpv_mid = np.asarray(tpv_mid, dtype=float)
+    z = norm.ppf((1 + confidence_interval) / 2)
 
-    tpv_samples = rng.normal(tpv_mid, sigma_tpv, n_simulations)
+    sigma_tpv = np.asarray(tpv_hw, dtype=float) / z if z > 0 else np.asarray(tpv_hw, dtype=float)
+
+    banked = base is not None and base.uniforms is not None
+    if banked:
+        n_simulations = base.n_simulations
+        tpv_samples = ndtri(np.clip(base.uniforms[0::2], 1e-12, 1.0 - 1e-12))
+    else:
+        tpv_samples = rng.standard_normal((len(tpv_mid), n_simulations))
+    tpv_samples *= sigma_tpv[:, None]
+    tpv_samples += tpv_mid[:, None]
+    np.maximum(tpv_samples, 0.0, out=tpv_samples)
     cost_samples = _sample_cost_pct_soft_guardrail(
-        cost_pct_mid=cost_pct_mid,
+        cost_pct_mid=np.asarray(cost_pct_mid, dtype=float),
         cost_pct_hw=cost_pct_hw,
         confidence_interval=confidence_interval,
         n_simulations=n_simulations,
         rng=rng,
         cost_pct_ci_lower=cost_pct_ci_lower,
         cost_pct_ci_upper=cost_pct_ci_upper,
+        uniforms=base.uniforms[1::2] if banked else None,
     )
+    return tpv_samples, cost_samples
 
-    tpv_samples = np.maximum(tpv_samples, 0.0)
-    cost_samples = np.maximum(cost_samples, 0.0)
 
-    revenue_samples = tpv_samples * fee_rate
-    # Add deterministic fixed-fee revenue: tx_count = TPV / avg_ticket
+def _fixed_fee_rate(fixed_fee_per_tx: float, avg_ticket: float | None) -> float:
+    """Fixed-fee revenue per dollar of TPV: tx_count = TPV / avg_ticket."""
     if fixed_fee_per_tx > 0.0 and avg_ticket is not None and avg_ticket > 0.0:
-        tx_count_samples = tpv_samples / avg_ticket
-        revenue_samples = revenue_samples + tx_count_samples * fixed_fee_per_tx
-    cost_dollar_samples = tpv_samples * cost_samples
-    profit_samples = revenue_samples - cost_dollar_samples
+        return fixed_fee_per_tx / avg_ticket
+    return 0.0
+
+
+def _summarize_profit_months(
+    tpv_samples: np.ndarray,
+    cost_samples: np.ndarray,
+    tpv_mid: np.ndarray,
+    cost_pct_mid: np.ndarray,
+    fee_rate: float,
+    confidence_interval: float,
+    target_margin: float | None = None,
+    fixed_fee_per_tx: float = 0.0,
+    avg_ticket: float | None = None,
+    base: Optional[BaseSamples] = None,
+) -> List[ProfitMonth]:
+    """
+    One ProfitMonth per row of the sample matrices; one np.quantile call for
+    all rows.  ``base`` gives the draws' independent units for p_profitable_se
+    (every draw when None).
+    """
+    tpv_mid = np.asarray(tpv_mid, dtype=float)
+    cost_pct_mid = np.asarray(cost_pct_mid, dtype=float)
+    horizon = len(tpv_mid)
+
+    profit_samples = np.subtract(fee_rate + _fixed_fee_rate(fixed_fee_per_tx, avg_ticket), cost_samples)
+    profit_samples *= tpv_samples
+    p_target_met = (
+        ((fee_rate - cost_samples) >= target_margin).mean(axis=1)
+        if target_margin is not None
+        else None
+    )
 
     # Compute midpoint revenue including fixed fee for deterministic mid values
-    mid_tx_count = tpv_mid / avg_ticket if (avg_ticket is not None and avg_ticket > 0.0) else 0.0
-    mid_fixed_fee_revenue = mid_tx_count * fixed_fee_per_tx if fixed_fee_per_tx > 0.0 else 0.0
+    mid_tx_count = tpv_mid / avg_ticket if (avg_ticket is not None and avg_ticket > 0.0) else np.zeros(horizon)
+    mid_fixed_fee_revenue = mid_tx_count * fixed_fee_per_tx if fixed_fee_per_tx > 0.0 else np.zeros(horizon)
     mid_revenue = tpv_mid * fee_rate + mid_fixed_fee_revenue
 
     alpha = 1 - confidence_interval
-    lo_pct = 100 * (alpha / 2)
-    hi_pct = 100 * (1 - alpha / 2)
+    ci_lower, median, ci_upper = np.quantile(profit_samples, [alpha / 2, 0.5, 1 - alpha / 2], axis=1)
+    profitable = profit_samples > 0
+    p_profitable = profitable.mean(axis=1)
+    p_profitable_se = (base or pseudo_random(profitable.shape[1])).standard_error(profitable)
+    profit_std = profit_samples.std(axis=1)
+    simulation_mean = profit_samples.mean(axis=1)
+
+    return [
+        ProfitMonth(
+            month_index=h + 1,
+            tpv_mid=float(tpv_mid[h]),
+            cost_pct_mid=float(cost_pct_mid[h]),
+            revenue_mid=float(mid_revenue[h]),
+            cost_mid=float(tpv_mid[h] * cost_pct_mid[h]),
+            profit_mid=float(mid_revenue[h] - tpv_mid[h] * cost_pct_mid[h]),
+            margin_mid=float(fee_rate - cost_pct_mid[h]),
+            p_profitable=float(p_profitable[h]),
+            p_profitable_se=float(p_profitable_se[h]),
+            profit_ci_lower=float(ci_lower[h]),
+            profit_ci_upper=float(ci_upper[h]),
+            profit_median=float(median[h]),
+            profit_std=float(profit_std[h]),
+            simulation_mean=float(simulation_mean[h]),
+            p_target_margin_met=float(p_target_met[h]) if p_target_met is not None else None,
+        )
+        for h in range(horizon)
+    ]
 
-    return ProfitMonth(
-        month_index=0,
-        tpv_mid=tpv_mid,
-        cost_pct_mid=cost_pct_mid,
-        revenue_mid=mid_revenue,
-        cost_mid=tpv_mid * cost_pct_mid,
-        profit_mid=mid_revenue - tpv_mid * cost_pct_mid,
-        margin_mid=fee_rate - cost_pct_mid,
-        p_profitable=float((profit_samples > 0).mean()),
-        profit_ci_lower=float(np.percentile(profit_samples, lo_pct)),
-        profit_ci_upper=float(np.percentile(profit_samples, hi_pct)),
-        profit_median=float(np.median(profit_samples)),
-        profit_std=float(np.std(profit_samples)),
-        simulation_mean=float(np.mean(profit_samples)),
-        p_target_margin_met=(
-            float((fee_rate - cost_samples >= target_margin).mean())
-            if target_margin is not None
-            else None
-        ),
+
+def _simulate_profit_months(
+    tpv_mid: np.ndarray,
+    tpv_hw: np.ndarray,
+    cost_pct_mid: np.ndarray,
+    cost_pct_hw: np.ndarray,
+    fee_rate: float,
+    confidence_interval: float,
+    n_simulations: int,
+    rng: np.random.Generator,
+    target_margin: float | None = None,
+    cost_pct_ci_lower: np.ndarray | None = None,
+    cost_pct_ci_upper: np.ndarray | None = None,
+    fixed_fee_per_tx: float = 0.0,
+    avg_ticket: float | None = None,
+) -> List[ProfitMonth]:
+    """
+    Simulate every horizon month at once: one (months × n_simulations)
+    matrix each for TPV and cost%, one np.quantile call for every month's
+    CI bounds and median.
+    """
+    tpv_samples, cost_samples = _draw_profit_samples(
+        tpv_mid, tpv_hw, cost_pct_mid, cost_pct_hw, confidence_interval, n_simulations, rng,
+        cost_pct_ci_lower=cost_pct_ci_lower, cost_pct_ci_upper=cost_pct_ci_upper,
+    )
+    return _summarize_profit_months(
+        tpv_samples, cost_samples, tpv_mid, cost_pct_mid, fee_rate, confidence_interval,
+        target_margin=target_margin, fixed_fee_per_tx=fixed_fee_per_tx, avg_ticket=avg_ticket,
+    )
+
+
+def _sweep_fee_rates(
+    tpv_samples: np.ndarray,
+    cost_samples: np.ndarray,
+    tpv_mid: np.ndarray,
+    cost_pct_mid: np.ndarray,
+    fee_rates: Sequence[float],
+    target_margins: Sequence[float],
+    confidence_interval: float,
+    fixed_fee_per_tx: float = 0.0,
+    avg_ticket: float | None = None,
+) -> FeeRateSweep:
+    """
+    Evaluate every fee rate on the same draws by broadcasting a
+    (rates × months × n_simulations) profit block, a chunk of rates at a
+    time.  Sharing the draws makes every curve monotone in the rate and a
+    rate equal to the request's fee_rate reproduce its months exactly.
+    """
+    rates = np.asarray(fee_rates, dtype=float)
+    margins = np.asarray(target_margins, dtype=float)
+    horizon, n_simulations = cost_samples.shape
+    alpha = 1 - confidence_interval
+    fixed_rate = _fixed_fee_rate(fixed_fee_per_tx, avg_ticket)
+
+    p_profitable = np.empty((len(rates), horizon))
+    quantiles = np.empty((3, len(rates), horizon))
+    p_target_met = np.empty((len(rates), len(margins), horizon))
+    chunk = max(1, SWEEP_CHUNK_ELEMENTS // cost_samples.size)
+    for start in range(0, len(rates), chunk):
+        block = slice(start, start + chunk)
+        rate = rates[block, None, None]
+        for j, margin in enumerate(margins):
+            p_target_met[block, j] = ((rate - cost_samples) >= margin).mean(axis=-1)
+        profit = np.subtract(rate + fixed_rate, cost_samples)
+        profit *= tpv_samples
+        p_profitable[block] = (profit > 0).mean(axis=-1)
+        quantiles[:, block] = np.quantile(profit, [alpha / 2, 0.5, 1 - alpha / 2], axis=-1)
+
+    tpv_mid = np.asarray(tpv_mid, dtype=float)
+    mid_tx_count = tpv_mid / avg_ticket if (avg_ticket is not None and avg_ticket > 0.0) else np.zeros(horizon)
+    mid_fixed_fee_revenue = mid_tx_count * fixed_fee_per_tx if fixed_fee_per_tx > 0.0 else np.zeros(horizon)
+    total_cost_mid = float(np.sum(tpv_mid * np.asarray(cost_pct_mid, dtype=float)))
+
+    points = [
+        FeeRateSweepPoint(
+            fee_rate=float(rates[i]),
+            total_profit_mid=float(np.sum(tpv_mid * rates[i] + mid_fixed_fee_revenue)) - total_cost_mid,
+            avg_p_profitable=float(p_profitable[i].mean()),
+            min_p_profitable=float(p_profitable[i].min()),
+            p_profitable=p_profitable[i].tolist(),
+            profit_ci_lower=quantiles[0, i].tolist(),
+            profit_median=quantiles[1, i].tolist(),
+            profit_ci_upper=quantiles[2, i].tolist(),
+            avg_p_target_margin_met=p_target_met[i].mean(axis=1).tolist() if len(margins) else None,
+            min_p_target_margin_met=p_target_met[i].min(axis=1).tolist() if len(margins) else None,
+        )
+        for i in range(len(rates))
+    ]
+    return FeeRateSweep(fee_rates=rates.tolist(), target_margins=margins.tolist(), points=points)
+
+
+def _simulate_profit_month(
+    tpv_mid: float,
+    tpv_hw: float,
+    cost_pct_mid: float,
+    cost_pct_hw: float,
+    fee_rate: float,
+    confidence_interval: float,
+    n_simulations: int,
+    rng: np.random.Generator,
+    target_margin: float | None = None,
+    cost_pct_ci_lower: float | None = None,
+    cost_pct_ci_upper: float | None = None,
+    fixed_fee_per_tx: float = 0.0,
+    avg_ticket: float | None = None,
+) -> ProfitMonth:
+    """A single month of _simulate_profit_months (month_index 0)."""
+    pm = _simulate_profit_months(
+        tpv_mid=np.array([tpv_mid]),
+        tpv_hw=np.array([tpv_hw]),
+        cost_pct_mid=np.array([cost_pct_mid]),
+        cost_pct_hw=np.array([cost_pct_hw]),
+        fee_rate=fee_rate,
+        confidence_interval=confidence_interval,
+        n_simulations=n_simulations,
+        rng=rng,
+        target_margin=target_margin,
+        cost_pct_ci_lower=None if cost_pct_ci_lower is None else np.array([cost_pct_ci_lower]),
+        cost_pct_ci_upper=None if cost_pct_ci_upper is None else np.array([cost_pct_ci_upper]),
+        fixed_fee_per_tx=fixed_fee_per_tx,
+        avg_ticket=avg_ticket,
+    )[0]
+    pm.month_index = 0
+    return pm
+
+
+def initialize() -> None:
+    """Pre-generate the base samples of default-shaped requests in the default variance-reduction mode."""
+    if DEFAULT_VARIANCE_REDUCTION == "none":
+        return
+    get_sample_bank().preload(DEFAULT_VARIANCE_REDUCTION, DEFAULT_N_SIMULATIONS, HORIZON_LEN)
+    print(
+        f"[Profit] Sample bank preloaded: {DEFAULT_VARIANCE_REDUCTION}, "
+        f"{DEFAULT_N_SIMULATIONS} simulations × {HORIZON_LEN} months"
     )
 
 
@@ -179,44 +408,75 @@ def get_profit_forecast(req: ProfitForecastRequest) -> ProfitForecastResponse:
             f"{len(cost_pct_mids)}. They must match."
         )
 
-    rng = np.random.default_rng(42)
-    months: List[ProfitMonth] = []
-
+    tpv_hws, cost_hws, cost_ci_lowers, cost_ci_uppers = [], [], [], []
     for h in range(horizon):
         tpv_fm = tpv_out.forecast[h]
         cost_fm = cost_out.forecast[h]
 
         if tpv_fm.tpv_ci_lower is not None and tpv_fm.tpv_ci_upper is not None:
-            tpv_hw = (tpv_fm.tpv_ci_upper - tpv_fm.tpv_ci_lower) / 2
+            tpv_hws.append((tpv_fm.tpv_ci_upper - tpv_fm.tpv_ci_lower) / 2)
         else:
-            tpv_hw = tpv_out.conformal_metadata.half_width_dollars
+            tpv_hws.append(tpv_out.conformal_metadata.half_width_dollars)
 
         if cost_fm.proc_cost_pct_ci_lower is not None and cost_fm.proc_cost_pct_ci_upper is not None:
-            cost_ci_lower = cost_fm.proc_cost_pct_ci_lower
-            cost_ci_upper = cost_fm.proc_cost_pct_ci_upper
-            cost_hw = (cost_fm.proc_cost_pct_ci_upper - cost_fm.proc_cost_pct_ci_lower) / 2
+            cost_ci_lowers.append(cost_fm.proc_cost_pct_ci_lower)
+            cost_ci_uppers.append(cost_fm.proc_cost_pct_ci_upper)
+            cost_hws.append((cost_fm.proc_cost_pct_ci_upper - cost_fm.proc_cost_pct_ci_lower) / 2)
         else:
-            cost_ci_lower = cost_fm.proc_cost_pct_mid - cost_out.conformal_metadata.half_width
-            cost_ci_upper = cost_fm.proc_cost_pct_mid + cost_out.conformal_metadata.half_width
-            cost_hw = cost_out.conformal_metadata.half_width
-
-        pm = _simulate_profit_month(
-            tpv_mid=tpv_mids[h],
-            tpv_hw=tpv_hw,
-            cost_pct_mid=cost_pct_mids[h],
-            cost_pct_hw=cost_hw,
-            fee_rate=req.fee_rate,
+            cost_ci_lowers.append(cost_fm.proc_cost_pct_mid - cost_out.conformal_metadata.half_width)
+            cost_ci_uppers.append(cost_fm.proc_cost_pct_mid + cost_out.conformal_metadata.half_width)
+            cost_hws.append(cost_out.conformal_metadata.half_width)
+
+    rng = np.random.default_rng(42)
+    base = get_sample_bank().get(req.variance_reduction, req.n_simulations, horizon)
+    tpv_mid = np.array(tpv_mids)
+    cost_pct_mid = np.array(cost_pct_mids[:horizon])
+    tpv_samples, cost_samples = _draw_profit_samples(
+        tpv_mid=tpv_mid,
+        tpv_hw=np.array(tpv_hws),
+        cost_pct_mid=cost_pct_mid,
+        cost_pct_hw=np.array(cost_hws),
+        confidence_interval=req.confidence_interval,
+        n_simulations=req.n_simulations,
+        rng=rng,
+        cost_pct_ci_lower=np.array(cost_ci_lowers),
+        cost_pct_ci_upper=np.array(cost_ci_uppers),
+        base=base,
+    )
+    months: List[ProfitMonth] = _summarize_profit_months(
+        tpv_samples,
+        cost_samples,
+        tpv_mid,
+        cost_pct_mid,
+        fee_rate=req.fee_rate,
+        confidence_interval=req.confidence_interval,
+        target_margin=req.target_margin,
+        fixed_fee_per_tx=req.fixed_fee_per_tx,
+        avg_ticket=req.avg_ticket,
+        base=base,
+    )
+    # The months share draws, so the average's SE comes from per-draw averages.
+    profit_rate = req.fee_rate + _fixed_fee_rate(req.fixed_fee_per_tx, req.avg_ticket)
+    avg_profitable = (((profit_rate - cost_samples) * tpv_samples) > 0).mean(axis=0)
+    avg_p_profitable_se = float(base.standard_error(avg_profitable))
+
+    # Fee-rate sweep on the same draws (common random numbers)
+    sweep = None
+    if req.fee_rates:
+        target_margins = req.target_margins
+        if target_margins is None:
+            target_margins = [req.target_margin] if req.target_margin is not None else []
+        sweep = _sweep_fee_rates(
+            tpv_samples,
+            cost_samples,
+            tpv_mid,
+            cost_pct_mid,
+            fee_rates=req.fee_rates,
+            target_margins=target_margins,
             confidence_interval=req.confidence_interval,
-            n_simulations=req.n_simulations,
-            rng=rng,
-            target_margin=req.target_margin,
-            cost_pct_ci_lower=cost_ci_lower,
-            cost_pct_ci_upper=cost_ci_upper,
             fixed_fee_per_tx=req.fixed_fee_per_tx,
             avg_ticket=req.avg_ticket,
         )
-        pm.month_index = h + 1
-        months.append(pm)
 
     total_revenue = sum(m.revenue_mid for m in months)
     total_cost = sum(m.cost_mid for m in months)
@@ -237,6 +497,7 @@ def get_profit_forecast(req: ProfitForecastRequest) -> ProfitForecastResponse:
         total_revenue_mid=total_revenue,
         total_cost_mid=total_cost,
         avg_p_profitable=float(np.mean(p_values)),
+        avg_p_profitable_se=avg_p_profitable_se,
         min_p_profitable=float(np.min(p_values)),
         break_even_fee_rate=worst_cost_upper,
         suggested_fee_for_target=(
@@ -258,7 +519,7 @@ def get_profit_forecast(req: ProfitForecastRequest) -> ProfitForecastResponse:
 
     metadata = SimulationMetadata(
         fee_rate=req.fee_rate,
-        n_simulations=req.n_simulations,
+        n_simulations=base.n_simulations,
         confidence_interval=req.confidence_interval,
         mcc=req.mcc,
         merchant_id=req.merchant_id,
@@ -273,10 +534,13 @@ def get_profit_forecast(req: ProfitForecastRequest) -> ProfitForecastResponse:
         cost_sampling_strategy="ci_shaped_soft_guardrails",
         cost_ci_tail_probability=(1.0 - req.confidence_interval),
         cost_ci_hard_clip=False,
+        variance_reduction=base.mode,
+        mc_independent_units=base.n_units,
     )
 
     return ProfitForecastResponse(
         months=months,
         summary=summary,
         metadata=metadata,
+        sweep=sweep,
     )
@@ -0,0 +1,60 @@
+"""
+tests/test_fee_rate_sweep.py
+
+Verifies that a fee-rate sweep evaluates every rate on the same draws:
+the point at the request's own fee rate reproduces its months exactly,
+P(profitable) never decreases with the rate, and target-margin
+probabilities are reported per swept margin.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# ---------------------------------------------------------------------------
+# Make the profit_forecast module importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+from modules.profit_forecast import service
+from modules.profit_forecast.service import get_profit_forecast
+from modules.profit_forecast.tests.test_soft_guardrail_profitability import _cost_output, _make_request
+
+
+def test_sweep_shares_draws_with_the_requested_rate(monkeypatch):
+    monkeypatch.setattr(service, "SWEEP_CHUNK_ELEMENTS", 3 * 20_000 * 4)  # force several chunks
+    rates = [0.01 + 0.0025 * i for i in range(20)] + [0.05]
+    req = _make_request(
+        cost_service_output=_cost_output(cost_mid=0.038, hw=0.01),
+        n_simulations=20_000,
+        fee_rates=rates,
+        target_margins=[0.0, 0.01],
+        fixed_fee_per_tx=0.30,
+        avg_ticket=40.0,
+    )
+    resp = get_profit_forecast(req)
+    sweep = resp.sweep
+    assert sweep.fee_rates == rates and len(sweep.points) == len(rates)
+
+    at_fee = sweep.points[-1]
+    assert at_fee.p_profitable == [m.p_profitable for m in resp.months]
+    assert at_fee.profit_ci_lower == [m.profit_ci_lower for m in resp.months]
+    assert at_fee.profit_median == [m.profit_median for m in resp.months]
+    assert at_fee.total_profit_mid == pytest.approx(resp.summary.total_profit_mid)
+
+    p_profitable = [p.avg_p_profitable for p in sweep.points[:-1]]
+    assert np.all(np.diff(p_profitable) >= 0)
+    assert p_profitable[0] < 0.05 and p_profitable[-1] > 0.95
+    # A stricter margin is never more likely to be met.
+    assert all(p.avg_p_target_margin_met[0] >= p.avg_p_target_margin_met[1] for p in sweep.points)
+
+
+def test_no_sweep_unless_requested_and_rates_are_validated():
+    assert get_profit_forecast(_make_request(n_simulations=1_000)).sweep is None
+    with pytest.raises(ValueError, match="fraction"):
+        _make_request(fee_rates=[0.02, 2.5])
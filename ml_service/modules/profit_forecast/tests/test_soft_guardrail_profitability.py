@@ -156,6 +156,23 @@ class TestSoftGuardrailTailBehaviour:
             f"Expected ~90% inside CI, got {pct_inside:.1%}"
         )
 
+    def test_month_matrix_keeps_exact_tail_counts(self, rng):
+        """Each month row holds exactly alpha/2 · n samples in either tail."""
+        samples = _sample_cost_pct_soft_guardrail(
+            cost_pct_mid=np.array([0.033, 0.05]),
+            cost_pct_hw=np.array([0.005, 0.01]),
+            confidence_interval=0.90,
+            n_simulations=20_000,
+            rng=rng,
+            cost_pct_ci_lower=np.array([0.028, 0.01]),  # month 2: mid above its CI
+            cost_pct_ci_upper=np.array([0.038, 0.02]),
+        )
+        assert samples.shape == (2, 20_000)
+        assert ((samples[0] < 0.028).sum(), (samples[0] > 0.038).sum()) == (1_000, 1_000)
+        assert ((samples[1] < 0.01).sum(), (samples[1] > 0.02).sum()) == (1_000, 1_000)
+        # Months are shuffled independently: tail membership is not aligned by column.
+        assert ((samples[0] > 0.038) & (samples[1] > 0.02)).sum() < 200
+
     def test_all_samples_nonnegative(self, rng):
         """cost_pct samples must be ≥ 0 (physically feasible)."""
         samples = _sample_cost_pct_soft_guardrail(
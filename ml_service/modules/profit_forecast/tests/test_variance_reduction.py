@@ -0,0 +1,85 @@
+"""
+tests/test_variance_reduction.py
+
+Verifies that antithetic and Sobol' draws agree with plain Monte Carlo on
+p_profitable while reporting a smaller standard error, and that the base
+samples come from the shared bank rather than being regenerated per request,
+within its entry and byte budgets.  An unknown default mode fails at import.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# ---------------------------------------------------------------------------
+# Make the profit_forecast module importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+from modules.profit_forecast.sample_bank import BaseSampleBank, get_sample_bank
+from modules.profit_forecast.service import get_profit_forecast
+from modules.profit_forecast.tests.test_soft_guardrail_profitability import _cost_output, _make_request
+
+
+def test_variance_reduction_agrees_with_plain_mc_and_lowers_se():
+    responses = {
+        mode: get_profit_forecast(
+            _make_request(
+                cost_service_output=_cost_output(cost_mid=0.038, hw=0.01),
+                fee_rate=0.045,
+                n_simulations=20_001,
+                variance_reduction=mode,
+            )
+        )
+        for mode in ("none", "antithetic", "sobol")
+    }
+    plain = responses["none"]
+    assert plain.metadata.mc_independent_units == plain.metadata.n_simulations == 20_001
+    for mode in ("antithetic", "sobol"):
+        resp = responses[mode]
+        assert resp.metadata.variance_reduction == mode
+        assert resp.metadata.n_simulations >= 20_001  # rounded up to whole pairs / blocks
+        for vr, mc in zip(resp.months, plain.months):
+            assert abs(vr.p_profitable - mc.p_profitable) < 4 * mc.p_profitable_se
+            assert vr.p_profitable_se < mc.p_profitable_se
+    assert responses["sobol"].summary.avg_p_profitable_se < plain.summary.avg_p_profitable_se / 5
+
+
+def test_bank_reuses_read_only_base_samples():
+    bank = BaseSampleBank(max_entries=1)
+    first = bank.get("sobol", 1_000, 3)
+    assert bank.get("sobol", 1_000, 3) is first and bank.stats()["hits"] == 1
+    assert first.uniforms.shape == (6, 1_000) and not first.uniforms.flags.writeable
+    bank.get("antithetic", 1_000, 3)  # evicts the Sobol' matrix
+    assert bank.get("sobol", 1_000, 3) is not first and bank.stats()["entries"] == 1
+    assert get_sample_bank() is get_sample_bank()
+
+    bank = BaseSampleBank(max_entries=8, max_bytes=100_000)  # one 6 × 1000 matrix is 48 kB
+    bank.get("sobol", 1_000, 3)
+    bank.get("antithetic", 1_000, 3)
+    bank.get("sobol", 1_000, 6)  # 96 kB: over budget with the others, evicts both
+    assert bank.stats()["entries"] == 1 and bank.stats()["evictions"] == 2
+    big = bank.get("sobol", 10_000, 3)  # 480 kB: served, never banked
+    assert big.n_simulations == 10_000 and bank.get("sobol", 10_000, 3) is not big
+    stats = bank.stats()
+    assert stats["oversized"] == 2 and stats["entries"] == 1 and stats["bytes"] <= stats["max_bytes"]
+
+
+def test_invalid_default_mode_is_rejected_at_import(monkeypatch):
+    import importlib
+
+    import modules.profit_forecast.config as config
+
+    try:
+        monkeypatch.setenv("PROFIT_VARIANCE_REDUCTION", " Sobol ")
+        assert importlib.reload(config).DEFAULT_VARIANCE_REDUCTION == "sobol"
+        monkeypatch.setenv("PROFIT_VARIANCE_REDUCTION", "quasi")
+        with pytest.raises(ValueError, match="PROFIT_VARIANCE_REDUCTION"):
+            importlib.reload(config)
+    finally:
+        monkeypatch.undo()
+        importlib.reload(config)
@@ -71,11 +71,6 @@ GBR_MIN_SAMPLES_LEAF: int = max(20, MIN_POOL)
 GBR_SUBSAMPLE: float = 0.8
 GBR_RANDOM_STATE: int = 4121
 
-# ---------------------------------------------------------------------------
-# Supported MCCs
-# ---------------------------------------------------------------------------
-SUPPORTED_MCCS: list[int] = [4121, 5411, 5499, 5812]
-
 # ---------------------------------------------------------------------------
 # Artifact storage — defaults to a mounted volume path in Docker
 # ---------------------------------------------------------------------------
@@ -83,6 +78,33 @@ ARTIFACTS_BASE_PATH: Path = Path(
     os.getenv("TPV_ARTIFACTS_BASE_PATH", "/app/artifacts/tpv")
 )
 
+# ---------------------------------------------------------------------------
+# Artifact cache — MCCs come from the artifact manifest; bundles load on first
+# use and are evicted least recently used past the budget.  The hot set
+# ("5411,5812:6") is loaded at startup and never evicted.
+# ---------------------------------------------------------------------------
+ARTIFACT_CACHE_MAX_BYTES: int = int(
+    float(os.getenv("TPV_ARTIFACT_CACHE_MAX_MB", "256")) * 1024 * 1024
+)
+ARTIFACT_HOT_SET: str = os.getenv("TPV_ARTIFACT_HOT_SET", "")
+
+# ---------------------------------------------------------------------------
+# Memoized forecast results — keyed by the aggregated context, card filter and
+# the bundle's trained_at; dropped on artifact hot-reload and reference-data
+# invalidation.  0 entries disables the cache.
+# ---------------------------------------------------------------------------
+RESULT_CACHE_MAX_ENTRIES: int = int(os.getenv("TPV_RESULT_CACHE_MAX_ENTRIES", "2048"))
+RESULT_CACHE_TTL_S: float = float(os.getenv("TPV_RESULT_CACHE_TTL_S", "900"))
+
+# ---------------------------------------------------------------------------
+# Peer-pool prefix-sum indexes — one per (mcc, card filter), rebuilt after a
+# reference-data invalidation or KNN_REFERENCE_CACHE_TTL_S; evicted least
+# recently used past this budget.
+# ---------------------------------------------------------------------------
+POOL_INDEX_CACHE_MAX_BYTES: int = int(
+    float(os.getenv("TPV_POOL_INDEX_CACHE_MAX_MB", "256")) * 1024 * 1024
+)
+
 # ---------------------------------------------------------------------------
 # Hot-reload interval
 # ---------------------------------------------------------------------------
@@ -7,7 +7,7 @@ Adapted for embedding inside ml_service.
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
 from pydantic import BaseModel, Field, field_validator
 
@@ -19,9 +19,12 @@ from .config import HORIZON_LEN, TARGET_COV
 # ---------------------------------------------------------------------------
 
 class TPVForecastRequest(BaseModel):
-    onboarding_merchant_txn_df: List[Dict[str, Any]] = Field(
+    onboarding_merchant_txn_df: Union[List[Dict[str, Any]], Dict[str, List[Any]]] = Field(
         ..., min_length=1,
-        description="Raw transaction records (transaction_date, amount required; cost_type_ID, card_type optional).",
+        description=(
+            "Raw transaction records (transaction_date, amount required; cost_type_ID, card_type optional), "
+            "either as row objects or columnar as {column: [values, ...]}."
+        ),
     )
     mcc: int = Field(..., description="Merchant category code.")
     merchant_id: Optional[str] = Field(default=None)
@@ -32,6 +35,13 @@ class TPVForecastRequest(BaseModel):
         description="Card filters for reference pool.",
     )
 
+    @field_validator("onboarding_merchant_txn_df")
+    @classmethod
+    def validate_columnar_lengths(cls, value: Any) -> Any:
+        if isinstance(value, dict) and len({len(column) for column in value.values()}) > 1:
+            raise ValueError("Columnar onboarding_merchant_txn_df columns must have equal lengths.")
+        return value
+
     @field_validator("card_types")
     @classmethod
     def validate_card_types(cls, value: List[str]) -> List[str]:
@@ -75,6 +85,8 @@ class ProcessMetadata(BaseModel):
     generated_at_utc: datetime
     artifact_trained_at: Optional[str] = None
     strat_enabled: bool = False
+    result_cache: Optional[str] = None  # "hit", "miss" or "disabled"; None for fallbacks
+    cached_at_utc: Optional[datetime] = None  # when a cache hit was computed; generated_at_utc is when it was served
 
 
 class TPVForecastResponse(BaseModel):
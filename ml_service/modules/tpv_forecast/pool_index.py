@@ -0,0 +1,280 @@
+"""
+Month-indexed prefix sums for the TPV reference pool.
+
+_compute_pool_info used to filter every reference transaction up to the
+context's last month, regroup merchant × month TPV, pivot cost-type counts
+and fit a cosine NearestNeighbors on each request, so latency grew with the
+length of the history.  SnapshotPoolIndex aggregates the reference frame once
+into cumulative arrays over the month axis:
+
+    flat pool mean as of month t          O(1)         cum log-TPV sum / count
+    per-merchant mean log-TPV as of t     O(merchants) cumulative row at t
+    per-merchant cost-type fingerprint    O(merchants × cost types)
+
+and keeps one fitted neighbour index per snapshot month.  PoolIndexRegistry
+tags each index with the reference-data generation it was built from and
+rebuilds after an invalidation or once the index is older than its TTL.  It
+holds no reference to the source frame, so the frame cache's byte budget
+still bounds the raw rows, and indexes are evicted least recently used past
+their own byte budget; the latest index larger than that budget is kept on
+its own rather than rebuilt per request.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import NearestNeighbors
+
+from config import MLConfig
+
+from .config import POOL_INDEX_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+IndexKey = Tuple[int, Tuple[str, ...]]
+
+
+@dataclass
+class PoolSnapshot:
+    """The reference pool as of one month: merchants seen up to and including it."""
+
+    position: int
+    flat_pool_mean: float
+    merchant_ids: np.ndarray
+    merchant_log_tpv: np.ndarray
+    fingerprints: np.ndarray  # merchants × cost types, row-normalized counts
+
+
+@dataclass
+class SnapshotPoolIndex:
+    months: np.ndarray          # sorted year * 12 + month - 1 keys
+    merchant_ids: np.ndarray    # sorted merchant ids
+    cost_type_ids: List[str]
+    cum_log_sum: np.ndarray     # T
+    cum_log_count: np.ndarray   # T
+    cum_merchant_log_sum: np.ndarray    # T × M
+    cum_merchant_months: np.ndarray     # T × M, int32
+    cum_cost_type_counts: np.ndarray    # T × M × C, int32
+    _models: Dict[Tuple[int, int], NearestNeighbors] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @classmethod
+    def build(cls, ref_txn: pd.DataFrame, cost_type_ids: Sequence[str]) -> "SnapshotPoolIndex":
+        dates = pd.to_datetime(ref_txn["date"], errors="coerce")
+        keep = (dates.notna() & ref_txn["merchant_id"].notna()).to_numpy()
+        dates = dates[keep]
+        month_keys = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy(dtype=np.int64)
+        amount = pd.to_numeric(ref_txn["amount"], errors="coerce").fillna(0.0).to_numpy(dtype=float)[keep]
+        m_codes, merchant_ids = pd.factorize(ref_txn["merchant_id"][keep], sort=True)
+        months, t_codes = np.unique(month_keys, return_inverse=True)
+        n_t, n_m, n_c = len(months), len(merchant_ids), len(cost_type_ids)
+
+        # Merchant × month TPV → log1p over the merchant-months that exist.
+        cell = t_codes * n_m + m_codes
+        tpv = np.bincount(cell, weights=amount, minlength=n_t * n_m).reshape(n_t, n_m)
+        present = np.bincount(cell, minlength=n_t * n_m).reshape(n_t, n_m) > 0
+        log_tpv = np.where(present, np.log1p(np.where(present, tpv, 0.0)), 0.0)
+
+        # Cost-type counts per merchant × month, restricted to the known ids.
+        raw_ct = ref_txn["cost_type_ID"] if "cost_type_ID" in ref_txn.columns else pd.Series(-1, index=ref_txn.index)
+        ct_codes = pd.Index(list(cost_type_ids)).get_indexer(
+            pd.to_numeric(raw_ct[keep], errors="coerce").fillna(-1).astype(int).astype(str)
+        )
+        known = ct_codes >= 0
+        # The T × M × C array is the largest; it is int32 (cumulative counts are
+        # bounded by the row count) and filled one month at a time, so no
+        # full-size int64 intermediate is allocated.
+        ct_t = t_codes[known]
+        order = np.argsort(ct_t, kind="stable")
+        ct_cells = (m_codes[known] * n_c + ct_codes[known])[order]
+        bounds = np.searchsorted(ct_t[order], np.arange(n_t + 1))
+        ct_counts = np.empty((n_t, n_m * n_c), dtype=np.int32)
+        running = np.zeros(n_m * n_c, dtype=np.int32)
+        for t in range(n_t):
+            month_counts = np.bincount(ct_cells[bounds[t]:bounds[t + 1]], minlength=n_m * n_c)
+            np.add(running, month_counts, out=running, casting="unsafe")
+            ct_counts[t] = running
+        ct_counts = ct_counts.reshape(n_t, n_m, n_c)
+
+        return cls(
+            months=months,
+            merchant_ids=np.asarray(merchant_ids),
+            cost_type_ids=list(cost_type_ids),
+            cum_log_sum=np.cumsum(log_tpv.sum(axis=1)),
+            cum_log_count=np.cumsum(present.sum(axis=1)),
+            cum_merchant_log_sum=np.cumsum(log_tpv, axis=0),
+            cum_merchant_months=np.cumsum(present, axis=0, dtype=np.int32),
+            cum_cost_type_counts=ct_counts,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(a.nbytes for a in (
+            self.cum_log_sum, self.cum_log_count, self.cum_merchant_log_sum,
+            self.cum_merchant_months, self.cum_cost_type_counts,
+        )))
+
+    def as_of(self, year: int, month: int) -> Optional[PoolSnapshot]:
+        """The pool of every merchant-month up to ``year``-``month``; None when empty."""
+        t = int(np.searchsorted(self.months, year * 12 + month - 1, side="right")) - 1
+        if t < 0:
+            return None
+        months_seen = self.cum_merchant_months[t]
+        seen = months_seen > 0
+        counts = self.cum_cost_type_counts[t, seen].astype(float)
+        totals = counts.sum(axis=1, keepdims=True)
+        fingerprints = np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+        return PoolSnapshot(
+            position=t,
+            flat_pool_mean=float(self.cum_log_sum[t] / self.cum_log_count[t]),
+            merchant_ids=self.merchant_ids[seen],
+            merchant_log_tpv=self.cum_merchant_log_sum[t, seen] / months_seen[seen],
+            fingerprints=fingerprints,
+        )
+
+    def kneighbors(self, snapshot: PoolSnapshot, query: np.ndarray, k: int) -> np.ndarray:
+        """Positions in ``snapshot`` of the ``k`` merchants closest (cosine) to ``query``."""
+        n_neighbors = min(k + 1, len(snapshot.merchant_ids))
+        key = (snapshot.position, n_neighbors)
+        with self._lock:
+            model = self._models.get(key)
+        if model is None:
+            model = NearestNeighbors(n_neighbors=n_neighbors, metric="cosine")
+            model.fit(snapshot.fingerprints)
+            with self._lock:
+                self._models[key] = model
+        _, idx = model.kneighbors(np.asarray(query, dtype=float).reshape(1, -1))
+        return idx[0][:k]
+
+
+@dataclass
+class _IndexEntry:
+    version: int
+    cost_type_ids: List[str]
+    index: SnapshotPoolIndex
+    nbytes: int
+    built_at: float
+
+
+class PoolIndexRegistry:
+    """
+    Thread-safe LRU of SnapshotPoolIndex per (mcc, card_types).
+
+    An entry is served while its ``version`` (the reference-data generation
+    it was built from) and cost-type ids match and it is younger than
+    ``ttl_seconds``; otherwise ``load_frame`` is called and the index
+    rebuilt.  Entries are evicted least recently used once their summed size
+    exceeds ``max_bytes``.  The most recent index larger than the whole
+    budget is kept on its own (logged and counted as ``oversized``), so a
+    large MCC is not rebuilt on every request.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = POOL_INDEX_CACHE_MAX_BYTES,
+        ttl_seconds: float = MLConfig.REFERENCE_CACHE_TTL_S,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[IndexKey, _IndexEntry]" = OrderedDict()
+        self._oversized: Optional[Tuple[IndexKey, _IndexEntry]] = None
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.builds = 0
+        self.hits = 0
+        self.evictions = 0
+        self.oversized = 0
+        self.last_build_seconds = 0.0
+
+    def get(
+        self,
+        key: IndexKey,
+        version: int,
+        cost_type_ids: List[str],
+        load_frame: Callable[[], pd.DataFrame],
+    ) -> SnapshotPoolIndex:
+        with self._lock:
+            if self._oversized is not None and self._oversized[0] == key:
+                entry = self._oversized[1]
+            else:
+                entry = self._entries.get(key)
+            if (
+                entry is not None
+                and entry.version == version
+                and entry.cost_type_ids == cost_type_ids
+                and self._clock() - entry.built_at <= self.ttl_seconds
+            ):
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.index
+
+        ref_txn = load_frame()
+        started = time.perf_counter()
+        index = SnapshotPoolIndex.build(ref_txn, cost_type_ids)
+        del ref_txn
+        entry = _IndexEntry(
+            version=version, cost_type_ids=list(cost_type_ids), index=index,
+            nbytes=index.nbytes, built_at=self._clock(),
+        )
+        with self._lock:
+            self.builds += 1
+            self.last_build_seconds = time.perf_counter() - started
+            self._drop(key)
+            if entry.nbytes > self.max_bytes:
+                self.oversized += 1
+                self._oversized = (key, entry)
+                logger.warning(
+                    "[TPV] Pool index for %s is %.1f MB, over TPV_POOL_INDEX_CACHE_MAX_MB (%.1f MB); "
+                    "keeping only the latest such index",
+                    key, entry.nbytes / 2**20, self.max_bytes / 2**20,
+                )
+                return index
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return index
+
+    def invalidate(self, mcc: Optional[int] = None) -> int:
+        with self._lock:
+            keys = [key for key in self._entries if mcc is None or key[0] == int(mcc)]
+            if self._oversized is not None and (mcc is None or self._oversized[0][0] == int(mcc)):
+                keys.append(self._oversized[0])
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            entries = list(self._entries.values()) + ([self._oversized[1]] if self._oversized else [])
+            return {
+                "entries": len(entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "neighbor_models": sum(len(e.index._models) for e in entries),
+                "builds": self.builds,
+                "hits": self.hits,
+                "evictions": self.evictions,
+                "oversized": self.oversized,
+                "oversized_bytes": self._oversized[1].nbytes if self._oversized else 0,
+                "last_build_seconds": round(self.last_build_seconds, 4),
+            }
+
+    def _drop(self, key: IndexKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes
+        if self._oversized is not None and self._oversized[0] == key:
+            self._oversized = None
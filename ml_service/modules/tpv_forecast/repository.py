@@ -1,8 +1,9 @@
 """
 repository.py — Reference-data access layer for GetTPVForecast (v2).
 
-Adapted for embedding inside ml_service. Uses the same Postgres DB
-as the rest of ml_service (via DATABASE_URL).
+Adapted for embedding inside ml_service.  Inside the service, TPV reads the
+Postgres reference rows through reference_data.ReferenceDataService, which
+queries over database.engine, the shared pooled engine.
 """
 
 from __future__ import annotations
@@ -57,48 +58,3 @@ class SQLiteMerchantRepository:
         with sqlite3.connect(self.db_path) as conn:
             ref = pd.read_sql("SELECT cost_type_ID FROM cost_type_ref", conn)
         return ref["cost_type_ID"].dropna().astype(int).astype(str).tolist()
-
-
-@dataclass
-class SQLAlchemyMerchantRepository:
-    connection_string: str
-
-    def _engine(self):
-        from sqlalchemy import create_engine
-        return create_engine(self.connection_string)
-
-    def load_transactions(self, mcc: int, card_types: List[str]) -> pd.DataFrame:
-        from sqlalchemy import text
-
-        query = """
-            SELECT transaction_id, date, amount, merchant_id, mcc,
-                   card_brand, card_type,
-                   cost_type_id AS "cost_type_ID", proc_cost
-            FROM knn_transactions
-            WHERE CAST(COALESCE(mcc, 0) AS INTEGER) = :mcc
-        """
-        bind: dict = {"mcc": int(mcc)}
-
-        normalized = [c.lower() for c in card_types if c.lower() != "both"]
-        if normalized:
-            placeholders = ", ".join([f":ct{i}" for i in range(len(normalized))])
-            query += f"""
-                AND (
-                    LOWER(COALESCE(card_brand, '')) IN ({placeholders})
-                    OR LOWER(COALESCE(card_type, '')) IN ({placeholders})
-                )
-            """
-            for i, val in enumerate(normalized):
-                bind[f"ct{i}"] = val
-
-        engine = self._engine()
-        with engine.connect() as conn:
-            df = pd.read_sql(text(query), conn, params=bind)
-        return df
-
-    def load_cost_type_ids(self) -> List[str]:
-        from sqlalchemy import text
-        engine = self._engine()
-        with engine.connect() as conn:
-            ref = pd.read_sql(text("SELECT cost_type_id FROM knn_cost_type_ref"), conn)
-        return ref["cost_type_id"].dropna().astype(int).astype(str).tolist()
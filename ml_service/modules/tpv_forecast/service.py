@@ -10,34 +10,39 @@ from __future__ import annotations
 
 import json
 import logging
-import math
 import os
-import threading
-import time
 from collections import defaultdict
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import joblib
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.linear_model import HuberRegressor
-from sklearn.neighbors import NearestNeighbors
 from sklearn.preprocessing import StandardScaler
 
+from artifact_bundle import BUNDLE_FILE, read_bundle
+from artifact_store import ArtifactStore, parse_hot_set
+from calibration_residuals import ResidualStore, conformal_quantile
+from compiled_models import CompiledLinearPredictor, CompiledTreeEnsemble, compile_linear, compile_trees
+from forecast_cache import DISABLED, HIT, MISS, ForecastResultCache, request_key
+from reference_data import ReferenceDataService, normalize_card_types
+
 from .config import (
+    ARTIFACT_CACHE_MAX_BYTES,
+    ARTIFACT_HOT_SET,
     ARTIFACT_POLL_INTERVAL_S,
     ARTIFACTS_BASE_PATH,
     HORIZON_LEN,
     KNN_K,
     LOG_TARGET,
     MIN_POOL,
+    RESULT_CACHE_MAX_ENTRIES,
+    RESULT_CACHE_TTL_S,
     SUPPORTED_CONTEXT_LENS,
-    SUPPORTED_MCCS,
-    TARGET_COV,
     _VOL_EPS,
 )
 from .models import (
@@ -47,6 +52,7 @@ from .models import (
     TPVForecastRequest,
     TPVForecastResponse,
 )
+from .pool_index import PoolIndexRegistry
 from .repository import MerchantRepository
 
 logger = logging.getLogger(__name__)
@@ -74,9 +80,11 @@ class _MonthSummary:
 @dataclass
 class ArtifactBundle:
     context_len: int
+    # The sklearn objects are only loaded from pickled artifacts; bundles read
+    # from bundle.bin leave them empty and always carry ``linear`` / ``risk``.
     models: List[HuberRegressor]
-    scaler: StandardScaler
-    cal_residuals: Dict[int, List[float]]
+    scaler: Optional[StandardScaler]
+    cal_residuals: ResidualStore
     global_q90: float
     risk_models: List[GradientBoostingRegressor]
     strat_enabled: bool
@@ -85,6 +93,10 @@ class ArtifactBundle:
     strat_q_vals: Optional[np.ndarray]
     config_snapshot: dict
     loaded_mtime: float = field(default=0.0)
+    # Scaler folded into the horizon models; None keeps the sklearn path.
+    linear: Optional[CompiledLinearPredictor] = None
+    # All risk models' trees in flat arrays; None keeps the sklearn path.
+    risk: Optional[CompiledTreeEnsemble] = None
 
     @property
     def trained_at(self) -> Optional[str]:
@@ -99,8 +111,33 @@ def _artifact_dir(mcc: int, ctx_len: int) -> Path:
     return ARTIFACTS_BASE_PATH / str(mcc) / str(ctx_len)
 
 
+def _load_bundle_file(d: Path, ctx_len: int) -> ArtifactBundle:
+    """Bundle from the memory-mapped bundle.bin; no unpickling."""
+    f = read_bundle(d / BUNDLE_FILE)
+    snapshot = f.metadata
+    strat_enabled = snapshot.get("strat_enabled", False) and "strat/knot_x" in f.arrays
+    return ArtifactBundle(
+        context_len=ctx_len,
+        models=[],
+        scaler=None,
+        cal_residuals=f.residuals(),
+        global_q90=float(f.arrays["global_q90"]),
+        risk_models=[],
+        strat_enabled=strat_enabled,
+        strat_scheme=snapshot.get("strat_scheme"),
+        strat_knot_x=f.arrays["strat/knot_x"] if strat_enabled else None,
+        strat_q_vals=f.arrays["strat/q_vals"] if strat_enabled else None,
+        config_snapshot=snapshot,
+        loaded_mtime=os.path.getmtime(d / "config_snapshot.json"),
+        linear=CompiledLinearPredictor.from_arrays(**f.group("linear")),
+        risk=CompiledTreeEnsemble.from_arrays(f.group("trees")),
+    )
+
+
 def _load_bundle(mcc: int, ctx_len: int) -> ArtifactBundle:
     d = _artifact_dir(mcc, ctx_len)
+    if (d / BUNDLE_FILE).exists():
+        return _load_bundle_file(d, ctx_len)
     snapshot_path = d / "config_snapshot.json"
 
     with open(snapshot_path) as f:
@@ -108,7 +145,7 @@ def _load_bundle(mcc: int, ctx_len: int) -> ArtifactBundle:
 
     models: List[HuberRegressor] = joblib.load(d / "models.pkl")
     scaler: StandardScaler = joblib.load(d / "scaler.pkl")
-    cal_residuals: Dict[int, List[float]] = joblib.load(d / "cal_residuals.pkl")
+    cal_residuals = ResidualStore.from_dict(joblib.load(d / "cal_residuals.pkl"))
     global_q90: float = joblib.load(d / "global_q90.pkl")
     risk_models: List[GradientBoostingRegressor] = joblib.load(d / "risk_models.pkl")
 
@@ -134,87 +171,87 @@ def _load_bundle(mcc: int, ctx_len: int) -> ArtifactBundle:
         strat_q_vals=strat_q_vals,
         config_snapshot=snapshot,
         loaded_mtime=mtime,
+        linear=compile_linear(scaler, models),
+        risk=compile_trees(risk_models),
     )
 
 
+def _predict_horizons(bundle: ArtifactBundle, X_raw: np.ndarray, horizon: int) -> np.ndarray:
+    """Point forecasts for the first ``horizon`` months of the single row ``X_raw``."""
+    if bundle.linear is not None:
+        return bundle.linear.predict(X_raw)[0, :horizon]
+    X_scaled = bundle.scaler.transform(X_raw)
+    return np.array([bundle.models[h].predict(X_scaled)[0] for h in range(horizon)], dtype=float)
+
+
+def _risk_scores(bundle: ArtifactBundle, risk_vec: np.ndarray) -> np.ndarray:
+    """Every risk model's score for the single row ``risk_vec``."""
+    if bundle.risk is not None:
+        return bundle.risk.predict(risk_vec)[0]
+    return np.array([m.predict(risk_vec)[0] for m in bundle.risk_models], dtype=float)
+
+
 # ---------------------------------------------------------------------------
 # Artifact cache with hot-reload
 # ---------------------------------------------------------------------------
 
-_ARTIFACT_CACHE: Dict[Tuple[int, int], ArtifactBundle] = {}
-_CACHE_LOCK = threading.Lock()
+# Bundles listed in the artifact manifest, loaded on first request.
+_ARTIFACTS = ArtifactStore(
+    "tpv",
+    ARTIFACTS_BASE_PATH,
+    loader=_load_bundle,
+    max_bytes=ARTIFACT_CACHE_MAX_BYTES,
+    hot_set=parse_hot_set(ARTIFACT_HOT_SET),
+)
+# Finished forecasts for repeated inputs; dropped when a bundle hot-reloads or
+# the reference data behind the peer pool is invalidated.
+_RESULTS = ForecastResultCache(
+    "tpv", max_entries=RESULT_CACHE_MAX_ENTRIES, ttl_seconds=RESULT_CACHE_TTL_S,
+)
+_ARTIFACTS.subscribe(_RESULTS.invalidate)
 _REPO: Optional[MerchantRepository] = None
+# Prefix-sum pool indexes, tagged with the reference-data generation they were built from.
+_POOL_INDEXES = PoolIndexRegistry()
 
 
 def set_repository(repo: MerchantRepository) -> None:
+    """
+    Use ``repo`` for reference transactions.  The pool indexes follow the
+    service's invalidation generation, so a repository without its own
+    cache is wrapped in a private ReferenceDataService.
+    """
     global _REPO
+    if not isinstance(repo, ReferenceDataService):
+        repo = ReferenceDataService(repo)
+    repo.subscribe(_POOL_INDEXES.invalidate)
+    repo.subscribe(_RESULTS.invalidate)
     _REPO = repo
-
-
-def _init_cache() -> None:
-    for mcc in SUPPORTED_MCCS:
-        for ctx_len in SUPPORTED_CONTEXT_LENS:
-            d = _artifact_dir(mcc, ctx_len)
-            if not (d / "config_snapshot.json").exists():
-                logger.warning(
-                    "[TPV] No artifacts for MCC %d ctx=%d at %s — skipping",
-                    mcc, ctx_len, d,
-                )
-                continue
-            try:
-                bundle = _load_bundle(mcc, ctx_len)
-                with _CACHE_LOCK:
-                    _ARTIFACT_CACHE[(mcc, ctx_len)] = bundle
-                logger.info(
-                    "[TPV] Loaded artifacts for MCC %d ctx=%d trained_at=%s strat=%s",
-                    mcc, ctx_len, bundle.trained_at, bundle.strat_enabled,
-                )
-            except Exception as exc:
-                logger.warning(
-                    "[TPV] Failed to load artifacts for MCC %d ctx=%d: %s",
-                    mcc, ctx_len, exc,
-                )
-
-
-def _poll_artifacts() -> None:
-    while True:
-        time.sleep(ARTIFACT_POLL_INTERVAL_S)
-        for (mcc, ctx_len) in list(_ARTIFACT_CACHE.keys()):
-            try:
-                snapshot_path = _artifact_dir(mcc, ctx_len) / "config_snapshot.json"
-                current_mtime = os.path.getmtime(snapshot_path)
-                with _CACHE_LOCK:
-                    old_mtime = _ARTIFACT_CACHE[(mcc, ctx_len)].loaded_mtime
-                if current_mtime > old_mtime:
-                    bundle = _load_bundle(mcc, ctx_len)
-                    with _CACHE_LOCK:
-                        _ARTIFACT_CACHE[(mcc, ctx_len)] = bundle
-                    logger.info(
-                        "[TPV] Hot-reloaded artifacts for MCC %d ctx=%d trained_at=%s",
-                        mcc, ctx_len, bundle.trained_at,
-                    )
-            except Exception as exc:
-                logger.warning(
-                    "[TPV] Artifact reload failed for MCC %d ctx=%d: %s",
-                    mcc, ctx_len, exc,
-                )
+    _POOL_INDEXES.invalidate()
+    _RESULTS.invalidate()
 
 
 def start_artifact_watcher() -> None:
-    t = threading.Thread(target=_poll_artifacts, daemon=True, name="tpv-artifact-watcher")
-    t.start()
+    _ARTIFACTS.start_watcher(ARTIFACT_POLL_INTERVAL_S)
 
 
 def initialize() -> None:
-    """Called at ml_service startup. Graceful — does NOT crash if no artifacts."""
-    _init_cache()
-    if _ARTIFACT_CACHE:
-        start_artifact_watcher()
-        logger.info("[TPV] Artifact cache loaded with %d bundles", len(_ARTIFACT_CACHE))
+    """
+    Called at ml_service startup. Reads the artifact manifest and loads only
+    the configured hot set; other bundles load on first request.  Graceful —
+    does NOT crash if no artifacts.
+    """
+    n_bundles = _ARTIFACTS.refresh_manifest()
+    start_artifact_watcher()
+    if n_bundles:
+        preloaded = _ARTIFACTS.preload()
+        logger.info(
+            "[TPV] Artifact manifest lists %d bundles for MCCs %s; %d preloaded",
+            n_bundles, _ARTIFACTS.mccs(), preloaded,
+        )
     else:
         logger.warning(
-            "[TPV] No trained artifacts found — service will run in degraded "
-            "mode (simple extrapolation fallback)."
+            "[TPV] No trained artifacts found at %s — service will run in degraded "
+            "mode (simple extrapolation fallback).", ARTIFACTS_BASE_PATH,
         )
 
 
@@ -222,48 +259,104 @@ def initialize() -> None:
 # Raw transaction → monthly summary aggregation
 # ---------------------------------------------------------------------------
 
-def _aggregate_transactions(records: List[Dict[str, Any]]) -> List[_MonthSummary]:
-    df = pd.DataFrame(records)
-    if df.empty:
+TransactionInput = Union[List[Dict[str, Any]], Dict[str, List[Any]], pd.DataFrame]
+
+
+def _transaction_columns(records: TransactionInput, names: Tuple[str, ...]) -> Dict[str, Any]:
+    """The named columns of row dicts, a columnar dict or a DataFrame (missing ones skipped)."""
+    if isinstance(records, (pd.DataFrame, dict)):
+        return {name: records[name] for name in names if name in records}
+    return {
+        name: [r.get(name) for r in records]
+        for name in names if any(name in r for r in records)
+    }
+
+
+def _numeric_column(values: Any) -> np.ndarray:
+    try:
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(np.asarray(values, dtype=object)), errors="coerce").to_numpy(dtype=float)
+
+
+def _month_keys(values: Any) -> np.ndarray:
+    """year * 12 + month - 1 per value; -1 where the date does not parse."""
+    if isinstance(values, pd.Series) and pd.api.types.is_datetime64_any_dtype(values):
+        dates = values
+    else:
+        # Onboarding histories repeat a few hundred distinct dates: parse each once.
+        codes, uniques = pd.factorize(values if isinstance(values, pd.Series) else np.asarray(values, dtype=object))
+        parsed = pd.to_datetime(pd.Series(uniques), errors="coerce")
+        unique_keys = (parsed.dt.year * 12 + parsed.dt.month - 1).fillna(-1).to_numpy(dtype=np.int64)
+        return np.where(codes >= 0, unique_keys[codes], -1)
+    return (dates.dt.year * 12 + dates.dt.month - 1).fillna(-1).to_numpy(dtype=np.int64)
+
+
+def _aggregate_transactions(records: TransactionInput) -> List[_MonthSummary]:
+    """
+    Monthly summaries of the onboarding transactions.
+
+    ``records`` may be row dicts, a columnar dict of arrays, or a DataFrame
+    (which is not modified).  All months are summarised in one pass over the
+    rows sorted by month, so cost is one sort rather than a Python loop per
+    group.
+    """
+    columns = _transaction_columns(records, ("date", "transaction_date", "amount", "cost_type_ID"))
+    n_rows = len(records) if not isinstance(records, dict) else max((len(v) for v in records.values()), default=0)
+    if n_rows == 0:
         raise ValueError("onboarding_merchant_txn_df is empty.")
 
-    if "transaction_date" in df.columns and "date" not in df.columns:
-        df = df.rename(columns={"transaction_date": "date"})
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df = df.dropna(subset=["date"])
-    if df.empty:
+    month_keys = _month_keys(columns["date"] if "date" in columns else columns["transaction_date"])
+    valid = month_keys >= 0
+    if not valid.any():
         raise ValueError("No valid dates in onboarding_merchant_txn_df.")
+    month_keys = month_keys[valid]
 
-    df["amount"] = pd.to_numeric(df.get("amount"), errors="coerce").fillna(0.0)
-    df["year"] = df["date"].dt.year
-    df["month"] = df["date"].dt.month
-
-    summaries: List[_MonthSummary] = []
-    for (yr, mo), grp in df.groupby(["year", "month"]):
-        amounts = grp["amount"].values.astype(float)
-        tpv = float(amounts.sum())
-        txn_count = len(amounts)
-        avg_val = float(amounts.mean()) if txn_count > 0 else 0.0
-        std_val = float(amounts.std(ddof=0)) if txn_count > 1 else 0.0
-        med_val = float(np.median(amounts)) if txn_count > 0 else 0.0
-
-        cost_type_pcts: Optional[Dict[str, float]] = None
-        if "cost_type_ID" in grp.columns:
-            ct = grp["cost_type_ID"].fillna(-1).astype(int).astype(str)
-            counts = ct.value_counts(normalize=True)
-            cost_type_pcts = {
-                f"cost_type_{k}_pct": float(v) for k, v in counts.items()
-            }
-
-        summaries.append(_MonthSummary(
-            year=int(yr), month=int(mo),
-            total_processing_value=tpv, transaction_count=txn_count,
-            avg_transaction_value=avg_val, std_txn_amount=std_val,
-            median_txn_amount=med_val, cost_type_pcts=cost_type_pcts,
-        ))
-
-    summaries.sort(key=lambda s: (s.year, s.month))
-    return summaries
+    if "amount" in columns:
+        amounts = np.nan_to_num(_numeric_column(columns["amount"])[valid], nan=0.0)
+    else:
+        amounts = np.zeros(len(month_keys))
+
+    # Sort by (month, amount) so each month is a contiguous, ordered run: an
+    # amount sort then a stable radix sort on the month offset (pandas dates
+    # span < 2**16 months), several times faster than np.lexsort.
+    by_amount = np.argsort(amounts)
+    offsets = (month_keys - month_keys.min())[by_amount].astype(np.uint16)
+    order = by_amount[np.argsort(offsets, kind="stable")]
+    keys, starts, counts = np.unique(month_keys[order], return_index=True, return_counts=True)
+    sorted_amounts = amounts[order]
+
+    tpv = np.add.reduceat(sorted_amounts, starts)
+    means = tpv / counts
+    sq_dev = np.add.reduceat((sorted_amounts - np.repeat(means, counts)) ** 2, starts)
+    stds = np.where(counts > 1, np.sqrt(sq_dev / counts), 0.0)
+    lo = sorted_amounts[starts + (counts - 1) // 2]
+    hi = sorted_amounts[starts + counts // 2]
+    medians = (lo + hi) / 2.0
+
+    ct_pcts: List[Optional[Dict[str, float]]] = [None] * len(keys)
+    if "cost_type_ID" in columns:
+        ct = np.nan_to_num(_numeric_column(columns["cost_type_ID"]), nan=-1).astype(int)[valid][order]
+        ct_codes, ct_values = pd.factorize(ct)
+        month_codes = np.repeat(np.arange(len(keys)), counts)
+        share = np.bincount(
+            month_codes * len(ct_values) + ct_codes, minlength=len(keys) * len(ct_values)
+        ).reshape(len(keys), len(ct_values))
+        labels = [f"cost_type_{v}_pct" for v in ct_values]
+        for g in range(len(keys)):
+            # Most frequent first, as value_counts() orders them.
+            cols = [c for c in np.argsort(-share[g], kind="stable") if share[g, c] > 0]
+            ct_pcts[g] = {labels[c]: float(share[g, c] / counts[g]) for c in cols}
+
+    return [
+        _MonthSummary(
+            year=int(key // 12), month=int(key % 12 + 1),
+            total_processing_value=float(tpv[g]), transaction_count=int(counts[g]),
+            avg_transaction_value=float(means[g]), std_txn_amount=float(stds[g]),
+            median_txn_amount=float(medians[g]), cost_type_pcts=ct_pcts[g],
+        )
+        for g, key in enumerate(keys)
+    ]
 
 
 # ---------------------------------------------------------------------------
@@ -276,54 +369,25 @@ def _compute_pool_info(
     card_types: List[str],
     context_months: List[_MonthSummary],
 ) -> Tuple[float, float, List[int]]:
-    ref_txn = repo.load_transactions(mcc, card_types)
-    if ref_txn.empty:
-        raise ValueError(f"No reference transactions in the database for MCC {mcc}.")
-
-    if "transaction_date" in ref_txn.columns and "date" not in ref_txn.columns:
-        ref_txn = ref_txn.rename(columns={"transaction_date": "date"})
-    ref_txn["date"] = pd.to_datetime(ref_txn["date"], errors="coerce")
-    ref_txn = ref_txn.dropna(subset=["date"])
-    ref_txn["amount"] = pd.to_numeric(ref_txn.get("amount"), errors="coerce").fillna(0.0)
-    ref_txn["year"] = ref_txn["date"].dt.year
-    ref_txn["month"] = ref_txn["date"].dt.month
-
+    def load_frame() -> pd.DataFrame:
+        ref_txn = repo.load_transactions(mcc, card_types)
+        if ref_txn.empty:
+            raise ValueError(f"No reference transactions in the database for MCC {mcc}.")
+        return ref_txn
+
+    # Read the generation first: an invalidation during the build leaves a stale tag.
+    version = getattr(repo, "generation", 0)
+    cost_type_ids = repo.load_cost_type_ids()
+    index = _POOL_INDEXES.get((int(mcc), normalize_card_types(card_types)), version, cost_type_ids, load_frame)
     last = context_months[-1]
-    end_yr, end_mo = last.year, last.month
-
-    snap = ref_txn[
-        (ref_txn["year"] < end_yr)
-        | ((ref_txn["year"] == end_yr) & (ref_txn["month"] <= end_mo))
-    ]
-    if snap.empty:
+    snapshot = index.as_of(last.year, last.month)
+    if snapshot is None:
         return 0.0, 0.0, []
 
-    merchant_monthly = (
-        snap.groupby(["merchant_id", "year", "month"])["amount"]
-        .sum().reset_index()
-        .rename(columns={"amount": "total_processing_value"})
-    )
-    merchant_monthly["log_tpv"] = np.log1p(merchant_monthly["total_processing_value"])
-    flat_pool_mean = float(merchant_monthly["log_tpv"].mean())
-
-    cost_type_ids = repo.load_cost_type_ids()
+    flat_pool_mean = snapshot.flat_pool_mean
     if not cost_type_ids:
         return flat_pool_mean, flat_pool_mean, []
 
-    snap_ct = snap.copy()
-    snap_ct["cost_type_ID"] = (
-        snap_ct.get("cost_type_ID").fillna(-1).astype(int).astype(str)
-    )
-    ref_ct_counts = (
-        snap_ct.groupby(["merchant_id", "cost_type_ID"])
-        .size().rename("count").reset_index()
-        .pivot_table(index="merchant_id", columns="cost_type_ID",
-                     values="count", fill_value=0)
-    )
-    ref_ct_counts = ref_ct_counts.reindex(columns=cost_type_ids, fill_value=0)
-    ref_totals = ref_ct_counts.sum(axis=1)
-    ref_pct = ref_ct_counts.div(ref_totals, axis=0).fillna(0.0)
-
     onb_ct: Dict[str, float] = defaultdict(float)
     total_ct_count = 0
     for m in context_months:
@@ -337,33 +401,19 @@ def _compute_pool_info(
         for k in onb_ct:
             onb_ct[k] /= total_ct_count
 
-    onb_vec = pd.DataFrame(
-        [{ct: onb_ct.get(ct, 0.0) for ct in cost_type_ids}]
-    ).fillna(0.0)
+    onb_vec = np.array([onb_ct.get(ct, 0.0) for ct in cost_type_ids], dtype=float)
 
-    merchant_log_tpv = merchant_monthly.groupby("merchant_id")["log_tpv"].mean()
-    common_mids = ref_pct.index.intersection(merchant_log_tpv.index)
-    if len(common_mids) < KNN_K + 1:
+    if len(snapshot.merchant_ids) < KNN_K + 1:
         return flat_pool_mean, flat_pool_mean, []
 
-    ref_pct_aligned = ref_pct.loc[common_mids]
-    merchant_log_tpv_aligned = merchant_log_tpv.loc[common_mids]
-
-    nn = NearestNeighbors(
-        n_neighbors=min(KNN_K + 1, len(common_mids)),
-        metric="cosine",
-    )
-    nn.fit(ref_pct_aligned.values)
-    _, raw_idx = nn.kneighbors(
-        onb_vec.reindex(columns=ref_pct_aligned.columns, fill_value=0.0).values
-    )
+    top = index.kneighbors(snapshot, onb_vec, KNN_K)
+    knn_pool_mean = float(snapshot.merchant_log_tpv[top].mean()) if len(top) else flat_pool_mean
+    peer_ids = [int(mid) for mid in snapshot.merchant_ids[top]]
+    return flat_pool_mean, knn_pool_mean, peer_ids
 
-    mid_index = ref_pct_aligned.index.tolist()
-    top_ids = [mid_index[i] for i in raw_idx[0]][:KNN_K]
 
-    knn_pool_mean = float(merchant_log_tpv_aligned.loc[top_ids].mean()) if top_ids else flat_pool_mean
-    peer_ids = [int(mid) for mid in top_ids]
-    return flat_pool_mean, knn_pool_mean, peer_ids
+def pool_index_stats() -> Dict[str, object]:
+    return _POOL_INDEXES.stats()
 
 
 # ---------------------------------------------------------------------------
@@ -477,12 +527,6 @@ def _build_risk_vector(
 # Conformal quantile helpers
 # ---------------------------------------------------------------------------
 
-def _adaptive_q(residuals: List[float], target: float = TARGET_COV) -> Optional[float]:
-    n = len(residuals)
-    level = math.ceil((n + 1) * target) / n
-    return float(np.quantile(residuals, level)) if level <= 1.0 else None
-
-
 def _compute_conformal_hw(
     peer_merchant_ids: Optional[List[int]],
     bundle: ArtifactBundle,
@@ -491,20 +535,15 @@ def _compute_conformal_hw(
     knn_pool_mean: float,
     confidence_interval: float,
 ) -> Tuple[float, int, str, Optional[float], Optional[str]]:
-    peer_residuals: List[float] = []
-    if peer_merchant_ids:
-        for pid in peer_merchant_ids:
-            peer_residuals.extend(bundle.cal_residuals.get(pid, []))
+    peer_residuals = bundle.cal_residuals.gather(peer_merchant_ids or [])
 
     if len(peer_residuals) >= MIN_POOL:
-        q = _adaptive_q(peer_residuals, target=confidence_interval)
+        q = conformal_quantile(peer_residuals, target=confidence_interval)
         if q is not None:
             return float(q), len(peer_residuals), "local", None, None
 
     risk_vec = _build_risk_vector(context_months, pool_mean, knn_pool_mean)
-    scores = np.array(
-        [m.predict(risk_vec)[0] for m in bundle.risk_models], dtype=float,
-    )
+    scores = _risk_scores(bundle, risk_vec)
     risk_score = float(np.max(scores))
 
     if bundle.strat_enabled and bundle.strat_knot_x is not None:
@@ -532,18 +571,7 @@ def _compute_conformal_hw(
 
 def _resolve_bundle(mcc: int, ctx_len: int) -> Optional[ArtifactBundle]:
     """Returns None if no artifacts are available (degraded mode)."""
-    with _CACHE_LOCK:
-        bundle = _ARTIFACT_CACHE.get((mcc, ctx_len))
-    if bundle is not None:
-        return bundle
-
-    with _CACHE_LOCK:
-        available = sorted([cl for (m, cl) in _ARTIFACT_CACHE if m == mcc])
-    if not available:
-        return None
-    nearest = min(available, key=lambda cl: abs(cl - ctx_len))
-    with _CACHE_LOCK:
-        return _ARTIFACT_CACHE[(mcc, nearest)]
+    return _ARTIFACTS.resolve(mcc, ctx_len)
 
 
 # ---------------------------------------------------------------------------
@@ -616,12 +644,47 @@ def _fallback_forecast(
     )
 
 
+# ---------------------------------------------------------------------------
+# Result cache
+# ---------------------------------------------------------------------------
+
+def _result_key(req: TPVForecastRequest, context_months: List[_MonthSummary], bundle: ArtifactBundle) -> str:
+    # Pool means and peer IDs are a function of the context, MCC and card
+    # filter over the reference data, whose invalidation clears the cache.
+    return request_key(
+        context_months=[asdict(m) for m in context_months],
+        card_types=list(normalize_card_types(req.card_types)),
+        mcc=req.mcc,
+        ctx_len=bundle.context_len,
+        horizon=req.horizon_months,
+        confidence_interval=req.confidence_interval,
+        trained_at=bundle.trained_at,
+    )
+
+
+def _with_cache_status(
+    resp: TPVForecastResponse, status: str, served_at: Optional[datetime] = None
+) -> TPVForecastResponse:
+    """
+    A private copy of a (possibly cached) response, tagged with how it was
+    served.  A cache hit is stamped with ``served_at``; cached_at_utc keeps
+    when the response was computed.
+    """
+    resp = resp.model_copy(deep=True)
+    meta = resp.process_metadata
+    meta.result_cache = status
+    if served_at is not None:
+        meta.cached_at_utc, meta.generated_at_utc = meta.generated_at_utc, served_at
+    return resp
+
+
 # ---------------------------------------------------------------------------
 # Main entry point
 # ---------------------------------------------------------------------------
 
 def get_tpv_forecast(req: TPVForecastRequest) -> TPVForecastResponse:
     generated_at = datetime.now(timezone.utc)
+    cache_generation = _RESULTS.generation
 
     # 1. Aggregate raw transactions into monthly summaries
     all_months = _aggregate_transactions(req.onboarding_merchant_txn_df)
@@ -646,6 +709,11 @@ def get_tpv_forecast(req: TPVForecastRequest) -> TPVForecastResponse:
         logger.warning("[TPV] No repository configured — using extrapolation fallback")
         return _fallback_forecast(context_months, req)
 
+    cache_key = _result_key(req, context_months, bundle)
+    cached = _RESULTS.get(cache_key)
+    if cached is not None:
+        return _with_cache_status(cached, HIT, served_at=generated_at)
+
     try:
         flat_pool_mean, knn_pool_mean, peer_ids = _compute_pool_info(
             repo=_REPO, mcc=req.mcc, card_types=req.card_types,
@@ -665,13 +733,9 @@ def get_tpv_forecast(req: TPVForecastRequest) -> TPVForecastResponse:
     c_mean_dollar = float(np.expm1(c_mean))
 
     X_raw = _build_feature_vector(context_months, knn_pool_mean)
-    X_scaled = bundle.scaler.transform(X_raw)
 
     # 6. Predict HORIZON_LEN steps in log-space
-    log_preds = np.array(
-        [bundle.models[h].predict(X_scaled)[0] for h in range(req.horizon_months)],
-        dtype=float,
-    )
+    log_preds = _predict_horizons(bundle, X_raw, req.horizon_months)
 
     # 6b. Sanity check — if model predictions diverge too far from the
     #     merchant's actual context mean, the features are likely OOD
@@ -735,8 +799,10 @@ def get_tpv_forecast(req: TPVForecastRequest) -> TPVForecastResponse:
         strat_enabled=bundle.strat_enabled,
     )
 
-    return TPVForecastResponse(
+    resp = TPVForecastResponse(
         forecast=forecast,
         conformal_metadata=conformal_meta,
         process_metadata=process_meta,
     )
+    _RESULTS.put(cache_key, resp, mcc=req.mcc, generation=cache_generation)
+    return _with_cache_status(resp, MISS if _RESULTS.enabled else DISABLED)
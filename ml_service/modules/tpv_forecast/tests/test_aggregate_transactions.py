@@ -0,0 +1,71 @@
+"""
+tests/test_aggregate_transactions.py
+
+Verifies that _aggregate_transactions gives the same monthly summaries for
+row records, a columnar dict and a DataFrame, and that they match a
+per-month groupby.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# ---------------------------------------------------------------------------
+# Make the tpv_forecast module importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+from modules.tpv_forecast.models import TPVForecastRequest
+from modules.tpv_forecast.service import _aggregate_transactions
+
+
+def _records():
+    rng = np.random.default_rng(11)
+    n = 2000
+    dates = (pd.Timestamp("2020-11-01") + pd.to_timedelta(rng.integers(0, 150, n), unit="D")).strftime("%Y-%m-%d")
+    records = [
+        {"transaction_date": d, "amount": round(float(a), 2), "cost_type_ID": int(c)}
+        for d, a, c in zip(dates, rng.lognormal(3.0, 1.0, n), rng.integers(1, 5, n))
+    ]
+    records[3]["transaction_date"] = "not a date"
+    records[4]["amount"] = None
+    records[5]["cost_type_ID"] = None
+    return records
+
+
+def test_row_columnar_and_frame_inputs_match_groupby():
+    records = _records()
+    frame = pd.DataFrame(records)
+    columnar = {name: frame[name].tolist() for name in frame.columns}
+    summaries = _aggregate_transactions(records)
+    assert _aggregate_transactions(columnar) == summaries
+    assert _aggregate_transactions(frame) == summaries
+    assert "date" not in frame.columns  # caller's frame untouched
+
+    frame["date"] = pd.to_datetime(frame["transaction_date"], errors="coerce")
+    frame = frame.dropna(subset=["date"])
+    frame["amount"] = frame["amount"].fillna(0.0)
+    groups = list(frame.groupby([frame["date"].dt.year, frame["date"].dt.month]))
+    assert [(s.year, s.month) for s in summaries] == [key for key, _ in groups]
+    for summary, (_, grp) in zip(summaries, groups):
+        amounts = grp["amount"].to_numpy()
+        assert summary.transaction_count == len(amounts)
+        assert summary.total_processing_value == pytest.approx(amounts.sum(), rel=1e-12)
+        assert summary.std_txn_amount == pytest.approx(amounts.std(), rel=1e-9)
+        assert summary.median_txn_amount == np.median(amounts)
+        shares = grp["cost_type_ID"].fillna(-1).astype(int).astype(str).value_counts(normalize=True)
+        assert summary.cost_type_pcts == {f"cost_type_{k}_pct": pytest.approx(v) for k, v in shares.items()}
+
+
+def test_request_accepts_columnar_transactions():
+    columnar = {"transaction_date": ["2021-01-05", "2021-02-05"], "amount": [10.0, 12.5]}
+    req = TPVForecastRequest(onboarding_merchant_txn_df=columnar, mcc=5411)
+    assert [s.total_processing_value for s in _aggregate_transactions(req.onboarding_merchant_txn_df)] == [10.0, 12.5]
+    with pytest.raises(ValueError):
+        TPVForecastRequest(onboarding_merchant_txn_df={"transaction_date": ["2021-01-05"], "amount": []}, mcc=5411)
@@ -0,0 +1,78 @@
+"""
+tests/test_artifact_bundle.py
+
+Verifies that a bundle.bin written from fitted sklearn artifacts reads back
+through a memory map into compiled predictors and calibration residuals that
+match the originals, and that unknown files and newer format versions are
+rejected.
+"""
+
+from __future__ import annotations
+
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.linear_model import HuberRegressor
+from sklearn.preprocessing import StandardScaler
+
+# ---------------------------------------------------------------------------
+# Make the ml_service modules importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+from artifact_bundle import BUNDLE_FILE, MAGIC, pack_artifacts, read_bundle, write_bundle
+from compiled_models import CompiledLinearPredictor, CompiledTreeEnsemble
+
+
+def test_bundle_round_trip_matches_sklearn(tmp_path):
+    rng = np.random.default_rng(7)
+    X = rng.normal(loc=[8.0, 0.5, 120.0], scale=[1.5, 0.2, 40.0], size=(300, 3))
+    scaler = StandardScaler().fit(X)
+    models = [HuberRegressor(max_iter=500).fit(scaler.transform(X), X @ rng.normal(size=3) + h) for h in range(3)]
+    risk_models = [
+        GradientBoostingRegressor(n_estimators=20, max_depth=2, random_state=h).fit(X, np.abs(X[:, 0] - 8) + h)
+        for h in range(3)
+    ]
+    cal_residuals = {17: [0.5, 1.5], 3: [2.0], 9: []}
+
+    path = write_bundle(
+        tmp_path / BUNDLE_FILE,
+        pack_artifacts(scaler, models, risk_models, cal_residuals, 1.25, np.array([0.0, 1.0]), np.array([2.0, 3.0])),
+        metadata={"trained_at": "2024-01-01", "strat_enabled": True},
+    )
+    bundle = read_bundle(path)
+    assert bundle.metadata["trained_at"] == "2024-01-01"
+    assert not bundle.arrays["linear/coef"].flags.writeable  # read-only view of the mapped file
+
+    linear = CompiledLinearPredictor.from_arrays(**bundle.group("linear"))
+    expected = np.column_stack([m.predict(scaler.transform(X)) for m in models])
+    np.testing.assert_allclose(linear.predict(X), expected, rtol=1e-10, atol=1e-10)
+
+    risk = CompiledTreeEnsemble.from_arrays(bundle.group("trees"))
+    expected = np.column_stack([m.predict(X) for m in risk_models])
+    np.testing.assert_allclose(risk.predict(X), expected, rtol=1e-10, atol=1e-10)
+
+    residuals = bundle.residuals()
+    assert len(residuals) == 3 and residuals.values.dtype == np.float32
+    assert residuals.gather([17, 9, 3]).tolist() == [0.5, 1.5, 2.0]
+    assert float(bundle.arrays["global_q90"]) == 1.25
+    assert bundle.arrays["strat/q_vals"].tolist() == [2.0, 3.0]
+
+
+def test_unknown_files_and_versions_are_rejected(tmp_path):
+    path = write_bundle(tmp_path / BUNDLE_FILE, {"x": np.arange(3)})
+    assert read_bundle(path, mmap=False).arrays["x"].tolist() == [0, 1, 2]
+
+    header = b'{"format_version": 99, "metadata": {}, "arrays": {}}'
+    (tmp_path / "future.bin").write_bytes(MAGIC + struct.pack("<Q", len(header)) + header)
+    with pytest.raises(ValueError, match="format_version"):
+        read_bundle(tmp_path / "future.bin")
+
+    (tmp_path / "models.pkl").write_bytes(b"\x80\x04not a bundle")
+    with pytest.raises(ValueError, match="not an artifact bundle"):
+        read_bundle(tmp_path / "models.pkl")
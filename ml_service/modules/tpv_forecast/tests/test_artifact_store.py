@@ -0,0 +1,97 @@
+"""
+tests/test_artifact_store.py
+
+Verifies that ArtifactStore discovers bundles from the manifest (or a
+directory scan), loads each one once on first use, resolves the nearest
+context length, evicts least-recently-used bundles past its memory budget
+while keeping the hot set resident, and reloads bundles whose snapshot
+changed.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# ---------------------------------------------------------------------------
+# Make the ml_service modules importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+from artifact_store import ArtifactStore, parse_hot_set, read_manifest, write_manifest
+
+
+def _write_bundle(base: Path, mcc: int, ctx_len: int, trained_at: str = "2024-01-01") -> None:
+    d = base / str(mcc) / str(ctx_len)
+    d.mkdir(parents=True, exist_ok=True)
+    (d / "models.pkl").write_bytes(b"x" * 1000)
+    (d / "config_snapshot.json").write_text(json.dumps({"trained_at": trained_at, "strat_enabled": True}))
+
+
+@pytest.fixture()
+def base(tmp_path):
+    for mcc in (5411, 5812, 7011):
+        for ctx_len in (1, 3, 6):
+            _write_bundle(tmp_path, mcc, ctx_len)
+    return tmp_path
+
+
+def _store(base: Path, max_bytes: int = 10**9, hot: str = ""):
+    calls = []
+
+    def loader(mcc: int, ctx_len: int):
+        calls.append((mcc, ctx_len))
+        snapshot = json.loads((base / str(mcc) / str(ctx_len) / "config_snapshot.json").read_text())
+        return (mcc, ctx_len, snapshot["trained_at"])
+
+    return ArtifactStore("test", base, loader=loader, max_bytes=max_bytes, hot_set=parse_hot_set(hot)), calls
+
+
+def test_manifest_lists_bundles_and_loads_lazily(base):
+    write_manifest(base)
+    assert len(read_manifest(base / "manifest.json")) == 9
+    store, calls = _store(base)
+    assert store.refresh_manifest() == 9 and store.mccs() == [5411, 5812, 7011]
+    assert calls == []
+
+    assert store.resolve(7011, 6) == (7011, 6, "2024-01-01")
+    assert store.resolve(7011, 5)[1] == 6  # nearest trained context length
+    assert store.resolve(7011, 2)[1] == 1  # ties go to the shorter one
+    assert store.resolve(9999, 3) is None
+    assert calls == [(7011, 6), (7011, 1)]
+    stats = store.stats()
+    assert stats["manifest"] == "file" and stats["resident"] == 2 and stats["hits"] == 1
+
+
+def test_lru_budget_keeps_hot_set(base):
+    size = 1000 + len(json.dumps({"trained_at": "2024-01-01", "strat_enabled": True}))
+    store, calls = _store(base, max_bytes=5 * size, hot="5411,5812:6")
+    assert store.refresh_manifest() == 9  # no manifest file: directory scan
+    assert store.preload() == 4
+    for ctx_len in (1, 3, 6):
+        store.get(7011, ctx_len)
+    resident = {(k["mcc"], k["ctx_len"]) for k in store.stats()["keys"]}
+    assert resident == {(5411, 1), (5411, 3), (5411, 6), (5812, 6), (7011, 6)}
+    assert store.stats()["evictions"] == 2
+
+    store.get(7011, 1)  # evicted earlier: loads again
+    assert calls.count((7011, 1)) == 2
+
+
+def test_poll_reloads_changed_bundles_and_new_mccs(base):
+    store, calls = _store(base)
+    store.get(5411, 3)
+    snapshot = base / "5411" / "3" / "config_snapshot.json"
+    _write_bundle(base, 5411, 3, trained_at="2024-02-01")
+    os.utime(snapshot, (snapshot.stat().st_atime, snapshot.stat().st_mtime + 5))
+    _write_bundle(base, 4121, 3)
+
+    store.poll()
+    assert store.get(5411, 3)[2] == "2024-02-01"
+    assert 4121 in store.mccs()
+    assert store.stats()["reloads"] == 1
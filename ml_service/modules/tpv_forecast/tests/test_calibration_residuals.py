@@ -0,0 +1,55 @@
+"""
+tests/test_calibration_residuals.py
+
+Verifies that ResidualStore.gather returns the same pool as concatenating
+the per-merchant residual lists peer by peer (duplicates counted, unknown
+merchants skipped), and that conformal_quantile equals np.quantile at the
+split-conformal level.
+"""
+
+from __future__ import annotations
+
+import math
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# ---------------------------------------------------------------------------
+# Make the ml_service modules importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+from calibration_residuals import ResidualStore, conformal_quantile
+
+
+def test_gather_matches_list_concatenation():
+    rng = np.random.default_rng(3)
+    cal = {int(m): rng.random(rng.integers(0, 6)).astype(np.float32).tolist()
+           for m in rng.choice(10_000, size=200, replace=False)}
+    store = ResidualStore.from_dict(cal)
+    assert len(store) == 200
+
+    peers = list(rng.choice(list(cal), size=50)) + [-1, 10_001, 0]
+    expected = [r for p in peers for r in cal.get(int(p), [])]
+    assert store.gather(peers).tolist() == expected
+    assert store.gather([]).size == 0
+
+    with pytest.raises(ValueError, match="strictly increasing"):
+        ResidualStore.from_arrays(np.array([5, 3]), np.array([0, 1, 2]), np.zeros(2))
+
+
+def test_conformal_quantile_matches_np_quantile():
+    rng = np.random.default_rng(11)
+    for n in (1, 2, 5, 9, 10, 19, 57, 400):
+        x = rng.lognormal(size=n)
+        for target in (0.5, 0.8, 0.9, 0.95):
+            level = math.ceil((n + 1) * target) / n
+            got = conformal_quantile(x, target)
+            if level > 1.0:
+                assert got is None
+            else:
+                assert got == float(np.quantile(x, level))
+    assert conformal_quantile(np.empty(0), 0.9) is None
@@ -0,0 +1,87 @@
+"""
+tests/test_compiled_models.py
+
+Verifies that CompiledLinearPredictor reproduces StandardScaler +
+per-horizon HuberRegressor predictions, and CompiledTreeEnsemble the
+per-horizon GradientBoostingRegressor risk scores, for many rows at once,
+and that the equivalence checks reject artifacts that do not match.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.linear_model import HuberRegressor
+from sklearn.preprocessing import StandardScaler
+
+# ---------------------------------------------------------------------------
+# Make the ml_service modules importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+from compiled_models import (
+    CompiledLinearPredictor,
+    CompiledModelMismatch,
+    CompiledTreeEnsemble,
+    compile_linear,
+    compile_trees,
+)
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    rng = np.random.default_rng(3)
+    X = rng.normal(loc=[8.0, 0.5, 120.0, 3.0], scale=[1.5, 0.2, 40.0, 0.8], size=(400, 4))
+    scaler = StandardScaler().fit(X)
+    models = []
+    for h in range(3):
+        y = X @ rng.normal(size=4) + rng.standard_t(3, size=400) + h
+        models.append(HuberRegressor(max_iter=500).fit(scaler.transform(X), y))
+    return X, scaler, models
+
+
+def test_compiled_predictor_matches_sklearn(fitted):
+    X, scaler, models = fitted
+    compiled = compile_linear(scaler, models)
+    assert compiled is not None and compiled.weights.shape == (4, 3)
+
+    expected = np.column_stack([m.predict(scaler.transform(X)) for m in models])
+    np.testing.assert_allclose(compiled.predict(X), expected, rtol=1e-10, atol=1e-10)
+    np.testing.assert_allclose(compiled.predict(X[0]), expected[:1], rtol=1e-10, atol=1e-10)
+
+
+def test_mismatched_artifacts_are_rejected(fitted):
+    _, scaler, models = fitted
+    compiled = CompiledLinearPredictor.from_sklearn(scaler, models)
+    stale = CompiledLinearPredictor(weights=compiled.weights, bias=compiled.bias + 1e-3)
+    with pytest.raises(CompiledModelMismatch):
+        stale.verify(scaler, models)
+    assert compile_linear(scaler, models[:1] + [object()]) is None
+
+
+def test_compiled_trees_match_sklearn_risk_models(fitted):
+    X, _, _ = fitted
+    rng = np.random.default_rng(4)
+    y = np.abs(X[:, 0] - 8.0) + rng.normal(scale=0.3, size=len(X))
+    models = [
+        GradientBoostingRegressor(n_estimators=40, max_depth=depth, learning_rate=0.1, random_state=h).fit(X, y + h)
+        for h, depth in enumerate([2, 3, 1])
+    ]
+    compiled = compile_trees(models)
+    assert compiled is not None and compiled.depth == 3
+
+    rows = np.vstack([X, compiled.probe_rows()])
+    expected = np.column_stack([m.predict(rows) for m in models])
+    np.testing.assert_allclose(compiled.predict(rows), expected, rtol=1e-10, atol=1e-10)
+    np.testing.assert_allclose(compiled.predict(rows[0]), expected[:1], rtol=1e-10, atol=1e-10)
+    with pytest.raises(ValueError):
+        compiled.predict(np.full(X.shape[1], np.nan))
+
+    other = CompiledTreeEnsemble.from_sklearn(models[::-1])
+    with pytest.raises(CompiledModelMismatch):
+        other.verify(models)
@@ -0,0 +1,52 @@
+"""
+tests/test_db_pool.py
+
+Verifies that create_pooled_engine's InstrumentedQueuePool reports checkout
+counts, saturation and checkout timeouts, and that a named engine is listed
+in all_pool_stats().
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import exc, text
+
+# ---------------------------------------------------------------------------
+# Make the ml_service modules importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+from db_pool import InstrumentedQueuePool, all_pool_stats, create_pooled_engine, pool_stats
+
+
+def test_pool_reports_checkouts_saturation_and_timeouts(tmp_path):
+    engine = create_pooled_engine(
+        f"sqlite:///{tmp_path / 'knn.db'}", name="test_pool", pool_size=2, max_overflow=0, pool_timeout=0.2,
+    )
+    assert isinstance(engine.pool, InstrumentedQueuePool)
+    assert "test_pool" in all_pool_stats()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+
+    held = [engine.connect(), engine.connect()]
+    stats = pool_stats(engine)
+    assert stats["saturation"] == 1.0 and stats["checked_out"] == 2
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    for conn in held:
+        conn.close()
+
+    stats = pool_stats(engine)
+    assert stats["checkouts"] >= 3
+    assert stats["timeouts"] == 1
+    assert stats["saturation"] == 0.0 and stats["peak_saturation"] == 1.0
+    engine.dispose()
+
+
+def test_in_memory_sqlite_keeps_the_default_pool():
+    engine = create_pooled_engine("sqlite://")
+    assert not isinstance(engine.pool, InstrumentedQueuePool)
@@ -0,0 +1,86 @@
+"""
+tests/test_forecast_cache.py
+
+Verifies that ForecastResultCache evicts least-recently-used and expired
+results and skips results computed across an invalidation, that an
+ArtifactStore hot-reload invalidates its subscribers, and that a repeated
+GetCostForecast request is served from the cache unchanged apart from its
+serve-time stamp.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# Make the ml_service modules importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+from artifact_store import ArtifactStore
+from forecast_cache import ForecastResultCache, request_key
+
+
+def test_lru_ttl_and_invalidation():
+    now = [0.0]
+    cache = ForecastResultCache("test", max_entries=2, ttl_seconds=60, clock=lambda: now[0])
+    assert request_key(mcc=5411, ci=0.9) == request_key(ci=0.9, mcc=5411) != request_key(mcc=5411, ci=0.8)
+
+    cache.put("a", 1, mcc=5411)
+    cache.put("b", 2, mcc=5812)
+    assert cache.get("a") == 1
+    cache.put("c", 3, mcc=5411)  # evicts "b", the least recently used
+    assert cache.get("b") is None and cache.stats()["evictions"] == 1
+
+    now[0] = 61.0
+    assert cache.get("a") is None and cache.stats()["expirations"] == 1
+
+    generation = cache.generation
+    assert cache.invalidate(5411) == 1  # only "c" was left
+    cache.put("d", 4, generation=generation)  # computed before the invalidation
+    assert cache.get("d") is None
+
+
+def test_hot_reload_invalidates_subscribers(tmp_path):
+    snapshot = tmp_path / "5411" / "3" / "config_snapshot.json"
+    snapshot.parent.mkdir(parents=True)
+    snapshot.write_text(json.dumps({"trained_at": "2024-01-01"}))
+    store = ArtifactStore("test-reload", tmp_path, loader=lambda mcc, cl: object(), max_bytes=10**9)
+    reloaded = []
+    store.subscribe(reloaded.append)
+
+    store.get(5411, 3)
+    snapshot.write_text(json.dumps({"trained_at": "2024-02-01"}))
+    os.utime(snapshot, (snapshot.stat().st_atime, snapshot.stat().st_mtime + 5))
+    store.poll()
+    assert set(reloaded) == {5411}  # manifest entry changed and resident bundle reloaded
+
+
+def test_repeated_cost_forecast_is_served_from_cache():
+    from modules.cost_forecast import service
+    from modules.cost_forecast.models import CostForecastRequest
+
+    req = CostForecastRequest(
+        context_months=[
+            {"year": 2019, "month": m, "avg_proc_cost_pct": 0.02 + 0.001 * m, "transaction_count": 200}
+            for m in (1, 2, 3)
+        ],
+        pool_mean_at_context_end=0.021,
+        knn_pool_mean_at_context_end=0.022,
+        mcc=5411,
+    )
+    first = service.get_proc_cost_monthly_forecast(req)
+    first["forecast"][0]["proc_cost_pct_mid"] = -1.0  # callers get private copies
+    second = service.get_proc_cost_monthly_forecast(req)
+    assert first["process_metadata"]["result_cache"] == "miss"
+    assert second["process_metadata"]["result_cache"] == "hit"
+    assert second["forecast"][0]["proc_cost_pct_mid"] > 0
+    assert second["forecast"][1:] == first["forecast"][1:]
+    # A hit is stamped when served; cached_at_utc is when it was computed.
+    assert "cached_at_utc" not in first["process_metadata"]
+    assert second["process_metadata"]["cached_at_utc"] == first["process_metadata"]["generated_at_utc"]
+    assert second["process_metadata"]["generated_at_utc"] >= first["process_metadata"]["generated_at_utc"]
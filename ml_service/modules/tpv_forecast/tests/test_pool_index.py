@@ -0,0 +1,107 @@
+"""
+tests/test_pool_index.py
+
+Verifies that SnapshotPoolIndex reproduces the per-request pool computation
+(flat mean, per-merchant mean log-TPV, cost-type fingerprints) as of several
+months, and that the registry reuses an index until the reference data is
+invalidated or the index expires, within its byte budget.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------------------------
+# Make the tpv_forecast module importable
+# ---------------------------------------------------------------------------
+ML_SERVICE_ROOT = Path(__file__).resolve().parents[3]  # ml_service/
+sys.path.insert(0, str(ML_SERVICE_ROOT))
+
+from modules.tpv_forecast.pool_index import PoolIndexRegistry, SnapshotPoolIndex
+
+COST_TYPES = ["1", "2", "3"]
+
+
+def _frame() -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    n = 3000
+    return pd.DataFrame({
+        "merchant_id": rng.integers(1, 41, n),
+        "date": pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 700, n), unit="D"),
+        "amount": rng.lognormal(3.0, 0.8, n),
+        "cost_type_ID": rng.integers(1, 5, n),  # 4 is not a known cost type
+    })
+
+
+def _brute_force(ref: pd.DataFrame, year: int, month: int):
+    ref = ref.assign(year=ref["date"].dt.year, month=ref["date"].dt.month)
+    snap = ref[(ref["year"] < year) | ((ref["year"] == year) & (ref["month"] <= month))]
+    monthly = snap.groupby(["merchant_id", "year", "month"])["amount"].sum().reset_index()
+    monthly["log_tpv"] = np.log1p(monthly["amount"])
+    per_merchant = monthly.groupby("merchant_id")["log_tpv"].mean().sort_index()
+    counts = (
+        snap.assign(ct=snap["cost_type_ID"].astype(str))
+        .pivot_table(index="merchant_id", columns="ct", values="amount", aggfunc="count", fill_value=0)
+        .reindex(index=per_merchant.index, columns=COST_TYPES, fill_value=0)
+        .to_numpy(dtype=float)
+    )
+    totals = counts.sum(axis=1, keepdims=True)
+    fingerprints = np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+    return float(monthly["log_tpv"].mean()), per_merchant, fingerprints
+
+
+def test_snapshots_match_brute_force():
+    ref = _frame()
+    index = SnapshotPoolIndex.build(ref, COST_TYPES)
+    assert index.as_of(2018, 12) is None
+
+    for year, month in [(2019, 1), (2019, 6), (2020, 3), (2020, 11), (2024, 1)]:
+        flat, per_merchant, fingerprints = _brute_force(ref, year, month)
+        snapshot = index.as_of(year, month)
+        assert np.isclose(snapshot.flat_pool_mean, flat, rtol=1e-12)
+        assert list(snapshot.merchant_ids) == list(per_merchant.index)
+        np.testing.assert_allclose(snapshot.merchant_log_tpv, per_merchant.to_numpy(), rtol=1e-12)
+        np.testing.assert_allclose(snapshot.fingerprints, fingerprints, atol=1e-12)
+
+    snapshot = index.as_of(2020, 3)
+    first = index.kneighbors(snapshot, np.array([0.6, 0.3, 0.1]), 10)
+    assert len(first) == 10 and len(index._models) == 1
+    index.kneighbors(snapshot, np.array([0.1, 0.3, 0.6]), 10)
+    assert len(index._models) == 1
+
+
+def test_registry_rebuilds_on_new_generation_or_ttl_and_evicts_by_bytes():
+    now = [0.0]
+    ref = _frame()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return ref
+
+    registry = PoolIndexRegistry(max_bytes=10**9, ttl_seconds=60, clock=lambda: now[0])
+    first = registry.get((5411, ()), 0, COST_TYPES, load)
+    assert first.cum_cost_type_counts.dtype == np.int32
+    assert registry.get((5411, ()), 0, COST_TYPES, load) is first and len(loads) == 1
+    assert registry.get((5411, ()), 1, COST_TYPES, load) is not first  # invalidated since
+    now[0] = 61.0
+    registry.get((5411, ()), 1, COST_TYPES, load)  # expired
+    assert registry.stats()["builds"] == 3 and registry.stats()["hits"] == 1 and len(loads) == 3
+
+    registry.max_bytes = first.nbytes  # room for one index
+    registry.get((5812, ()), 1, COST_TYPES, load)
+    assert registry.stats()["entries"] == 1 and registry.stats()["evictions"] == 1
+    assert registry.invalidate(5812) == 1 and registry.stats()["bytes"] == 0
+
+    registry.max_bytes = first.nbytes - 1  # every index is oversized: keep only the latest
+    big = registry.get((5411, ()), 1, COST_TYPES, load)
+    assert registry.get((5411, ()), 1, COST_TYPES, load) is big
+    stats = registry.stats()
+    assert stats["oversized"] == 1 and stats["oversized_bytes"] == big.nbytes and stats["bytes"] == 0
+    registry.get((5812, ()), 1, COST_TYPES, load)
+    assert registry.get((5411, ()), 1, COST_TYPES, load) is not big  # replaced by the newer one
+    assert registry.invalidate() == 1 and registry.stats()["oversized_bytes"] == 0
@@ -3,7 +3,9 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+
+from modules.knn_rate_quote.schemas import weekly_feature_rows
 
 from .config import DEFAULT_CONFIDENCE_INTERVAL, DEFAULT_FORECAST_HORIZON_WKS
 
@@ -34,6 +36,12 @@ class VolumeForecastRequest(BaseModel):
     use_exogenous_sarimax: bool = False
     use_guarded_calibration: bool = True
 
+    @field_validator("composite_weekly_features", mode="before")
+    @classmethod
+    def expand_columnar_features(cls, value: Any) -> Any:
+        """Accept the columnar getCompositeMerchant shape (one array per metric)."""
+        return weekly_feature_rows(value) if isinstance(value, dict) else value
+
 
 class ForecastWeek(BaseModel):
     forecast_week_index: int
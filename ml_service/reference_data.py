@@ -0,0 +1,327 @@
+"""
+Shared reference-data service for the KNN and TPV engines.
+
+getCompositeMerchant (KNN) and GetTPVForecast both need the knn_transactions
+slice for the request's MCC / card filter.  With a repository each, one
+merchant-quote pipeline run read and parsed the same rows twice.  Both
+engines now go through one ReferenceDataService: one repository, one cache
+of typed frames, and one invalidation signal.
+
+── WHAT IS SHARED ────────────────────────────────────────────────────────────
+load_transactions(mcc, card_types)   card-filtered rows with ``date`` as
+                                     datetime64 and ``amount`` / ``proc_cost``
+                                     numeric; cached per (mcc, card filter)
+                                     and read-only for callers
+load_cost_type_ids()                 knn_cost_type_ref ids, re-read once per TTL
+invalidate(mcc=None)                 drops cached frames and notifies every
+                                     subscriber (KNN monthly features and
+                                     neighbour indexes, ...) to drop state
+                                     derived from them
+
+Concurrent misses for the same key wait for a single load, so a KNN and a
+TPV request arriving together still cost one read.  The repository is the
+snapshot reader when REFERENCE_SNAPSHOT_DIR is set, knn_transactions
+otherwise.
+
+Usage:
+    ref = get_reference_data()
+    txns = ref.load_transactions(5411, ["visa"])
+    ref.subscribe(lambda mcc: my_cache.invalidate(mcc))
+    POST /ml/knn-rate-quote/cache/invalidate  → ref.invalidate(mcc)
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Protocol, Tuple
+
+import pandas as pd
+
+from config import MLConfig
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[int, Tuple[str, ...]]
+
+
+class MerchantRepository(Protocol):
+    def load_transactions(self, mcc: int, card_types: List[str]) -> pd.DataFrame: ...
+    def load_cost_type_ids(self) -> List[str]: ...
+
+
+def normalize_card_types(card_types: List[str]) -> Tuple[str, ...]:
+    """Canonical card filter used for cache keys; an empty tuple means 'both'."""
+    normalized = {c.strip().lower() for c in card_types if c and c.strip()}
+    normalized.discard("both")
+    return tuple(sorted(normalized))
+
+
+# ---------------------------------------------------------------------------
+# Frame cache
+# ---------------------------------------------------------------------------
+
+@dataclass
+class _CacheEntry:
+    frame: pd.DataFrame
+    nbytes: int
+    loaded_at: float
+
+
+class ReferenceFrameCache:
+    """
+    Thread-safe LRU cache of parsed reference frames.
+
+    Entries are keyed by (mcc, normalized card_types), evicted least-recently
+    used first once the summed frame size exceeds ``max_bytes``, and expire
+    ``ttl_seconds`` after loading.  Cached frames are shared between requests
+    and must be treated as read-only by callers.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = MLConfig.REFERENCE_CACHE_MAX_BYTES,
+        ttl_seconds: float = MLConfig.REFERENCE_CACHE_TTL_S,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[CacheKey, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: CacheKey, record: bool = True) -> Optional[pd.DataFrame]:
+        """Fresh frame for ``key`` or None; ``record=False`` leaves hit/miss counters alone."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += record
+                return None
+            if self._clock() - entry.loaded_at > self.ttl_seconds:
+                self._drop(key)
+                self.expirations += 1
+                self.misses += record
+                return None
+            self._entries.move_to_end(key)
+            self.hits += record
+            return entry.frame
+
+    def put(self, key: CacheKey, frame: pd.DataFrame) -> None:
+        nbytes = int(frame.memory_usage(deep=True).sum())
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = _CacheEntry(frame=frame, nbytes=nbytes, loaded_at=self._clock())
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate(self, mcc: Optional[int] = None) -> int:
+        """Drop every entry (or only those for ``mcc``); returns the number dropped."""
+        with self._lock:
+            keys = [k for k in self._entries if mcc is None or k[0] == int(mcc)]
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "keys": [
+                    {"mcc": mcc, "card_types": list(cts) or ["both"], "bytes": e.nbytes}
+                    for (mcc, cts), e in self._entries.items()
+                ],
+            }
+
+    def _drop(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes
+
+
+# ---------------------------------------------------------------------------
+# Shared service
+# ---------------------------------------------------------------------------
+
+def filter_by_card_types(reference_txn: pd.DataFrame, card_types: List[str]) -> pd.DataFrame:
+    """Rows whose card_brand or card_type is in ``card_types`` (all rows for 'both')."""
+    normalized = [c.strip().lower() for c in card_types if c.strip() and c.lower() != "both"]
+    if not normalized:
+        return reference_txn
+
+    brand = reference_txn.get("card_brand", pd.Series(dtype=str)).astype(str).str.strip().str.lower()
+    ctype = reference_txn.get("card_type", pd.Series(dtype=str)).astype(str).str.strip().str.lower()
+    mask = brand.isin(normalized) | ctype.isin(normalized)
+    return reference_txn[mask].copy()
+
+
+def parse_reference_frame(reference_txn: pd.DataFrame) -> pd.DataFrame:
+    """The typed columns every consumer relies on."""
+    tx = reference_txn.copy()
+    if "transaction_date" in tx.columns and "date" not in tx.columns:
+        tx = tx.rename(columns={"transaction_date": "date"})
+    if "cost_type_id" in tx.columns and "cost_type_ID" not in tx.columns:
+        # Unquoted SQL aliases come back lower-cased from Postgres.
+        tx = tx.rename(columns={"cost_type_id": "cost_type_ID"})
+    tx["date"] = pd.to_datetime(tx["date"], errors="coerce")
+    tx["amount"] = pd.to_numeric(tx.get("amount"), errors="coerce")
+    tx["proc_cost"] = pd.to_numeric(tx.get("proc_cost"), errors="coerce")
+    return tx
+
+
+class ReferenceDataService:
+    """
+    One cache of typed reference-transaction frames for every engine.
+
+    Satisfies the MerchantRepository protocol, so it can stand in wherever an
+    engine expects a repository.  ``repository`` may be swapped at runtime;
+    call invalidate() afterwards if frames from the old one are cached.
+    """
+
+    def __init__(self, repository: MerchantRepository, cache: ReferenceFrameCache | None = None) -> None:
+        self.repository = repository
+        self.cache = cache or ReferenceFrameCache()
+        self.generation = 0
+        self.loads = 0
+        self._lock = threading.Lock()
+        # key -> [lock, holders + waiters]; pruned when the count drops to zero.
+        self._key_locks: Dict[object, list] = {}
+        self._subscribers: List[Callable[[Optional[int]], Any]] = []
+        self._cost_type_ids: Optional[List[str]] = None
+        self._cost_type_ids_loaded_at = 0.0
+
+    def load_transactions(self, mcc: int, card_types: List[str]) -> pd.DataFrame:
+        """Card-filtered, typed reference frame, served from cache when fresh."""
+        key = (int(mcc), normalize_card_types(card_types))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self._key_lock(key):
+            # Another request may have loaded the key while we waited.
+            cached = self.cache.get(key, record=False)
+            if cached is not None:
+                return cached
+            generation = self.generation
+            reference_txn = self.repository.load_transactions(mcc, card_types)
+            reference_txn = parse_reference_frame(filter_by_card_types(reference_txn, card_types))
+            with self._lock:
+                self.loads += 1
+                # Skip caching when invalidate() ran mid-load: the rows may predate it.
+                if not reference_txn.empty and generation == self.generation:
+                    self.cache.put(key, reference_txn)
+        return reference_txn
+
+    def load_cost_type_ids(self) -> List[str]:
+        """knn_cost_type_ref ids, re-read at most once per cache TTL."""
+        cost_type_ids = self._fresh_cost_type_ids()
+        if cost_type_ids is not None:
+            return cost_type_ids
+        with self._key_lock("cost_type_ids"):
+            cost_type_ids = self._fresh_cost_type_ids()
+            if cost_type_ids is not None:
+                return cost_type_ids
+            generation = self.generation
+            loaded_at = time.monotonic()
+            cost_type_ids = self.repository.load_cost_type_ids()
+            with self._lock:
+                if generation == self.generation:
+                    self._cost_type_ids, self._cost_type_ids_loaded_at = cost_type_ids, loaded_at
+        return cost_type_ids
+
+    def _fresh_cost_type_ids(self) -> Optional[List[str]]:
+        with self._lock:
+            if self._cost_type_ids is None or time.monotonic() - self._cost_type_ids_loaded_at > self.cache.ttl_seconds:
+                return None
+            return self._cost_type_ids
+
+    @contextmanager
+    def _key_lock(self, key: object) -> Iterator[None]:
+        """Serialize loads of ``key``; the lock is dropped once nobody holds or waits for it."""
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[key]
+
+    def subscribe(self, callback: Callable[[Optional[int]], Any]) -> None:
+        """Register ``callback(mcc)`` to run on invalidate(); an int return counts as entries dropped."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def invalidate(self, mcc: Optional[int] = None) -> int:
+        """Drop cached frames for ``mcc`` (all when None) and everything derived from them."""
+        with self._lock:
+            self.generation += 1
+            subscribers = list(self._subscribers)
+            if mcc is None:
+                self._cost_type_ids = None
+        dropped = self.cache.invalidate(mcc)
+        for callback in subscribers:
+            result = callback(mcc)
+            if isinstance(result, int):
+                dropped += result
+        return dropped
+
+    def stats(self) -> Dict[str, object]:
+        stats = self.cache.stats()
+        stats["repository"] = type(self.repository).__name__
+        stats["loads"] = self.loads
+        stats["generation"] = self.generation
+        stats["subscribers"] = len(self._subscribers)
+        return stats
+
+
+_shared: Optional[ReferenceDataService] = None
+_shared_lock = threading.Lock()
+
+
+def _default_repository() -> MerchantRepository:
+    if MLConfig.REFERENCE_SNAPSHOT_DIR:
+        from reference_snapshots import ArrowSnapshotMerchantRepository
+        return ArrowSnapshotMerchantRepository(MLConfig.REFERENCE_SNAPSHOT_DIR)
+
+    from database import engine  # imported here to avoid circular imports
+    from modules.knn_rate_quote.service import PostgresMerchantRepository
+    return PostgresMerchantRepository(engine)
+
+
+def get_reference_data() -> ReferenceDataService:
+    """The process-wide service, created on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ReferenceDataService(_default_repository())
+            logger.info("[RefData] Serving reference transactions from %s", type(_shared.repository).__name__)
+        return _shared
+
+
+def set_reference_data(service: Optional[ReferenceDataService]) -> None:
+    global _shared
+    with _shared_lock:
+        _shared = service
@@ -0,0 +1,289 @@
+"""
+Per-MCC Arrow snapshots of knn_transactions.
+
+Reference transactions change only when a new dataset is loaded, yet every
+worker re-reads them from Postgres.  This module exports them once to
+uncompressed Arrow IPC files (one per MCC) that workers open through a
+memory map: pages are shared between uvicorn workers via the OS page cache
+and a KNN / TPV request never touches the database.
+
+── LAYOUT ────────────────────────────────────────────────────────────────────
+<snapshot dir>/
+    mcc_5411.arrow          knn_transactions rows for one MCC
+    ...
+    cost_type_ref.arrow     knn_cost_type_ref ids
+    manifest.json           exported_at, format, row count per MCC
+
+``--format parquet`` writes .parquet files instead (smaller on disk, but
+decoded on read rather than mapped).  Files are written to a temporary name
+and renamed into place, so workers holding the previous mapping keep a
+consistent view and pick up the new file on their next load.
+
+Usage:
+    Serve from snapshots by setting REFERENCE_SNAPSHOT_DIR.
+    Export: docker compose exec ml-service python reference_snapshots.py --out /data/snapshots [--mcc 5411]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+COST_TYPE_FILE = "cost_type_ref"
+MANIFEST_FILE = "manifest.json"
+FORMATS = {"arrow": ".arrow", "parquet": ".parquet"}
+
+# Same columns and names PostgresMerchantRepository.load_transactions returns.
+SNAPSHOT_SCHEMA = pa.schema([
+    ("transaction_id", pa.string()),
+    ("date", pa.date32()),
+    ("amount", pa.float64()),
+    ("merchant_id", pa.string()),
+    ("mcc", pa.int32()),
+    ("card_brand", pa.string()),
+    ("card_type", pa.string()),
+    ("cost_type_ID", pa.int32()),
+    ("proc_cost", pa.float64()),
+])
+
+
+def _snapshot_name(mcc: int) -> str:
+    return f"mcc_{int(mcc)}"
+
+
+# ---------------------------------------------------------------------------
+# Repository
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ArrowSnapshotMerchantRepository:
+    """
+    MerchantRepository backed by exported snapshot files.
+
+    ``columns`` projects every load onto a subset of SNAPSHOT_SCHEMA (the
+    card columns are always read for filtering).  Opened tables are kept per
+    file and re-opened when the file's mtime changes.
+    """
+
+    snapshot_dir: Path
+    columns: Optional[Sequence[str]] = None
+    _tables: Dict[Path, Tuple[float, pa.Table]] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.snapshot_dir = Path(self.snapshot_dir)
+
+    def _path(self, name: str) -> Optional[Path]:
+        for suffix in FORMATS.values():
+            path = self.snapshot_dir / f"{name}{suffix}"
+            if path.exists():
+                return path
+        return None
+
+    def _open(self, path: Path) -> pa.Table:
+        mtime = path.stat().st_mtime
+        with self._lock:
+            cached = self._tables.get(path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        if path.suffix == FORMATS["arrow"]:
+            # Zero-copy: the table's buffers point into the mapped file.
+            table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+        else:
+            table = pq.read_table(path, memory_map=True)
+        with self._lock:
+            self._tables[path] = (mtime, table)
+        return table
+
+    def _mcc_paths(self, mcc: int) -> List[Path]:
+        path = self._path(_snapshot_name(mcc))
+        if path is not None:
+            return [path]
+        # Fallback for datasets without MCC coverage, as in PostgresMerchantRepository.
+        return sorted(
+            p for suffix in FORMATS.values() for p in self.snapshot_dir.glob(f"mcc_*{suffix}")
+        )
+
+    def load_transactions(
+        self,
+        mcc: int,
+        card_types: List[str],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> pd.DataFrame:
+        """
+        Reference rows for ``mcc`` whose card_brand or card_type is in
+        ``card_types`` ("both" = no filter) and, when given, whose date lies in
+        [start_date, end_date].
+        """
+        paths = self._mcc_paths(mcc)
+        if not paths:
+            raise FileNotFoundError(f"No reference snapshots in {self.snapshot_dir}")
+
+        predicate = None
+        normalized = [c.lower() for c in card_types if c.lower() != "both"]
+        if normalized:
+            values = pa.array(normalized, pa.string())
+            predicate = pc.is_in(pc.field("card_brand"), values) | pc.is_in(pc.field("card_type"), values)
+        if start_date is not None:
+            start = pc.field("date") >= pa.scalar(pd.Timestamp(start_date).date(), pa.date32())
+            predicate = start if predicate is None else predicate & start
+        if end_date is not None:
+            end = pc.field("date") <= pa.scalar(pd.Timestamp(end_date).date(), pa.date32())
+            predicate = end if predicate is None else predicate & end
+
+        tables = []
+        for path in paths:
+            table = self._open(path)
+            if predicate is not None:
+                table = table.filter(predicate)
+            if self.columns is not None:
+                table = table.select([c for c in table.column_names if c in self.columns])
+            tables.append(table)
+        table = tables[0] if len(tables) == 1 else pa.concat_tables(tables)
+        return table.to_pandas()
+
+    def load_cost_type_ids(self) -> List[str]:
+        path = self._path(COST_TYPE_FILE)
+        if path is None:
+            raise FileNotFoundError(f"{COST_TYPE_FILE} snapshot not found in {self.snapshot_dir}")
+        ids = self._open(path).column("cost_type_id").drop_null()
+        return [str(int(v)) for v in ids.to_pylist()]
+
+    def manifest(self) -> Dict[str, object]:
+        path = self.snapshot_dir / MANIFEST_FILE
+        return json.loads(path.read_text()) if path.exists() else {}
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def _snapshot_frame(raw: pd.DataFrame) -> pd.DataFrame:
+    """Coerce a knn_transactions chunk to SNAPSHOT_SCHEMA (ISO dates, lower-case cards)."""
+    out = pd.DataFrame({
+        "transaction_id": raw["transaction_id"].astype("string"),
+        "date": pd.to_datetime(raw["date"], errors="coerce").dt.date,
+        "amount": pd.to_numeric(raw["amount"], errors="coerce"),
+        "merchant_id": raw["merchant_id"].astype("string"),
+        "mcc": pd.to_numeric(raw["mcc"], errors="coerce").astype("Int32"),
+        "card_brand": raw["card_brand"].astype("string").str.strip().str.lower(),
+        "card_type": raw["card_type"].astype("string").str.strip().str.lower(),
+        "cost_type_ID": pd.to_numeric(raw["cost_type_ID"], errors="coerce").astype("Int32"),
+        "proc_cost": pd.to_numeric(raw["proc_cost"], errors="coerce"),
+    })
+    return out[out["date"].notna()]
+
+
+def _write_table(path: Path, chunks, fmt: str) -> int:
+    """Stream DataFrame chunks to ``path`` via a temporary file; returns rows written."""
+    tmp = path.with_name(path.name + ".tmp")
+    rows = 0
+    if fmt == "arrow":
+        writer = pa.ipc.new_file(str(tmp), SNAPSHOT_SCHEMA)
+    else:
+        writer = pq.ParquetWriter(str(tmp), SNAPSHOT_SCHEMA)
+    try:
+        for chunk in chunks:
+            frame = _snapshot_frame(chunk)
+            writer.write_table(pa.Table.from_pandas(frame, schema=SNAPSHOT_SCHEMA, preserve_index=False))
+            rows += len(frame)
+    finally:
+        writer.close()
+    os.replace(tmp, path)
+    return rows
+
+
+def export_snapshots(
+    out_dir: Path,
+    mccs: Optional[List[int]] = None,
+    fmt: str = "arrow",
+    engine: Optional[Engine] = None,
+    chunk_rows: int = 200_000,
+) -> Dict[str, object]:
+    """Write one snapshot per MCC plus the cost-type ids and a manifest."""
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {sorted(FORMATS)}")
+    if engine is None:
+        db_url = os.environ.get("DATABASE_URL")
+        if not db_url:
+            raise ValueError("DATABASE_URL is not set")
+        engine = create_engine(db_url)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    suffix = FORMATS[fmt]
+
+    t0 = time.time()
+    with engine.connect() as conn:
+        if mccs is None:
+            mccs = [int(r[0]) for r in conn.execute(
+                text("SELECT DISTINCT mcc FROM knn_transactions WHERE mcc IS NOT NULL ORDER BY mcc")
+            )]
+        counts: Dict[str, int] = {}
+        for mcc in mccs:
+            chunks = pd.read_sql(text("""
+                SELECT
+                    COALESCE(CAST(transaction_id AS TEXT), CAST(id AS TEXT), '') AS transaction_id,
+                    date, amount, merchant_id, mcc, card_brand, card_type,
+                    cost_type_id AS "cost_type_ID", proc_cost
+                FROM knn_transactions
+                WHERE mcc = :mcc
+                ORDER BY merchant_id, date
+            """), conn, params={"mcc": int(mcc)}, chunksize=chunk_rows)
+            counts[str(mcc)] = _write_table(out_dir / f"{_snapshot_name(mcc)}{suffix}", chunks, fmt)
+            logger.info("[Snapshots] mcc=%s: %s rows", mcc, f"{counts[str(mcc)]:,}")
+
+        ref = pd.read_sql(text("SELECT cost_type_id FROM knn_cost_type_ref"), conn)
+
+    ref_table = pa.Table.from_pandas(
+        ref[["cost_type_id"]].astype("Int32"), schema=pa.schema([("cost_type_id", pa.int32())]), preserve_index=False
+    )
+    ref_path = out_dir / f"{COST_TYPE_FILE}{suffix}"
+    tmp = ref_path.with_name(ref_path.name + ".tmp")
+    if fmt == "arrow":
+        with pa.ipc.new_file(str(tmp), ref_table.schema) as writer:
+            writer.write_table(ref_table)
+    else:
+        pq.write_table(ref_table, str(tmp))
+    os.replace(tmp, ref_path)
+
+    # Keep the counts of MCCs not re-exported by this run.
+    manifest = ArrowSnapshotMerchantRepository(out_dir).manifest()
+    rows_by_mcc = manifest.get("rows_by_mcc", {}) if manifest.get("format") == fmt else {}
+    manifest = {
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+        "format": fmt,
+        "rows_by_mcc": {**rows_by_mcc, **counts},
+    }
+    (out_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+    logger.info("[Snapshots] Exported %d MCC(s) to %s in %.1fs", len(counts), out_dir, time.time() - t0)
+    return manifest
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Export knn_transactions to per-MCC Arrow snapshots.")
+    parser.add_argument("--out", type=Path, default=os.environ.get("REFERENCE_SNAPSHOT_DIR") or None,
+                        required=not os.environ.get("REFERENCE_SNAPSHOT_DIR"),
+                        help="Snapshot directory (default: $REFERENCE_SNAPSHOT_DIR).")
+    parser.add_argument("--mcc", type=int, action="append", default=None,
+                        help="Export only this MCC (repeatable; default: all MCCs).")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="arrow")
+    args = parser.parse_args()
+    export_snapshots(args.out, mccs=args.mcc, fmt=args.format)
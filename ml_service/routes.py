@@ -13,6 +13,10 @@ POST /ml/tpv-prediction
 POST /ml/knn-rate-quote
     Individual engine endpoints. Useful for testing engines in isolation.
     ── WHERE TO EDIT: each engine's controller.py (see modules/).
+
+Engine calls are awaited through engine_executor.run_engine so CPU-bound
+pandas / sklearn / statsmodels work runs on a bounded per-engine pool and
+the event loop stays free for health checks and cheap endpoints.
 """
 from __future__ import annotations
 
@@ -26,16 +30,34 @@ import pandas as pd
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile
 from sqlalchemy.orm import Session
 
+from artifact_store import all_store_stats
 from database import get_db
+from db_pool import all_pool_stats
+from engine_executor import EngineSaturatedError, executor_stats, run_engine
+from forecast_cache import all_result_cache_stats
 from modules.cost_forecast.controller import get_cost_forecast_health, run_cost_forecast
 from modules.cost_forecast.models import CostForecastRequest, ContextMonth
-from modules.knn_rate_quote.controller import run_get_composite_merchant, run_get_quote, run_knn_rate_quote
-from modules.knn_rate_quote.schemas import CompositeMerchantRequest, QuoteRequest
+from modules.knn_rate_quote.controller import (
+    get_reference_cache_stats,
+    invalidate_reference_cache,
+    run_get_composite_merchant,
+    run_get_quote,
+    run_get_quote_batch,
+    run_knn_rate_quote,
+)
+from modules.knn_rate_quote.schemas import (
+    CompositeMerchantRequest,
+    QuoteBatchRequest,
+    QuoteRequest,
+    weekly_feature_rows,
+)
 from modules.profit_forecast.controller import run_profit_forecast
 from modules.profit_forecast.models import ProfitForecastRequest
+from modules.profit_forecast.sample_bank import get_sample_bank
 from modules.rate_optimisation.controller import run_rate_optimisation
 from modules.tpv_forecast.controller import run_tpv_forecast
 from modules.tpv_forecast.models import TPVForecastRequest
+from modules.tpv_forecast.service import pool_index_stats
 from modules.tpv_prediction.controller import run_tpv_prediction
 from modules.volume_forecast.controller import run_volume_forecast
 from modules.volume_forecast.models import VolumeForecastRequest
@@ -114,13 +136,15 @@ async def process(
     logger.info("ML /process received — MCC %s, %d rows", mcc, len(df))
 
     # 1. Rate Optimisation
-    rate_result = run_rate_optimisation(df=df, metrics=metrics, db=db)
+    rate_result = await run_engine("rate_optimisation", run_rate_optimisation, df=df, metrics=metrics, db=db)
 
     # 2. TPV Prediction
-    tpv_result = run_tpv_prediction(df=df, metrics=metrics, db=db)
+    tpv_result = await run_engine("tpv_prediction", run_tpv_prediction, df=df, metrics=metrics, db=db)
 
     # 3. KNN Rate Quote
-    knn_result = run_knn_rate_quote(
+    knn_result = await run_engine(
+        "knn",
+        run_knn_rate_quote,
         df=df,
         mcc=mcc,
         card_type=card_type,
@@ -162,7 +186,7 @@ async def rate_optimisation_endpoint(
         slope=float(slope) if slope else None,
         cost_variance=float(cost_variance) if cost_variance else None,
     )
-    return run_rate_optimisation(df=df, metrics=metrics, db=db)
+    return await run_engine("rate_optimisation", run_rate_optimisation, df=df, metrics=metrics, db=db)
 
 
 @router.post("/tpv-prediction", tags=["TPV Prediction Engine"])
@@ -187,7 +211,7 @@ async def tpv_prediction_endpoint(
         slope=float(slope) if slope else None,
         cost_variance=float(cost_variance) if cost_variance else None,
     )
-    return run_tpv_prediction(df=df, metrics=metrics, db=db)
+    return await run_engine("tpv_prediction", run_tpv_prediction, df=df, metrics=metrics, db=db)
 
 
 @router.post("/knn-rate-quote", tags=["KNN Rate Quote Engine"])
@@ -211,7 +235,9 @@ async def knn_rate_quote_endpoint(
     """
     df = _parse_csv(enriched_csv) if enriched_csv is not None else None
     _as_of_date = pd.Timestamp(as_of_date).date() if as_of_date else None
-    return run_knn_rate_quote(
+    return await run_engine(
+        "knn",
+        run_knn_rate_quote,
         df=df,
         mcc=mcc,
         card_type=card_type,
@@ -224,7 +250,23 @@ async def knn_rate_quote_endpoint(
 @router.post("/getQuote", tags=["KNN Quote Service"])
 async def get_quote_endpoint(payload: QuoteRequest):
     try:
-        return run_get_quote(payload)
+        return await run_engine("knn", run_get_quote, payload)
+    except EngineSaturatedError:
+        raise
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.post("/getQuoteBatch", tags=["KNN Quote Service"])
+async def get_quote_batch_endpoint(payload: QuoteBatchRequest):
+    """
+    Quote many merchants in one call (e.g. monthly portfolio repricing).
+    Per-item failures are reported in the item's ``error`` field.
+    """
+    try:
+        return await run_engine("knn", run_get_quote_batch, payload)
+    except EngineSaturatedError:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=400, detail=str(exc))
 
@@ -232,12 +274,61 @@ async def get_quote_endpoint(payload: QuoteRequest):
 @router.post("/getCompositeMerchant", tags=["KNN Quote Service"])
 async def get_composite_merchant_endpoint(payload: CompositeMerchantRequest):
     try:
-        return run_get_composite_merchant(payload)
+        return await run_engine("knn", run_get_composite_merchant, payload)
+    except EngineSaturatedError:
+        raise
     except Exception as exc:
         logger.exception("getCompositeMerchant failed for mcc=%s: %s", payload.mcc, exc)
         raise HTTPException(status_code=400, detail=str(exc))
 
 
+@router.get("/knn-rate-quote/cache", tags=["KNN Quote Service"])
+async def knn_reference_cache_stats_endpoint():
+    """Hit/miss/eviction counters for the reference-transaction cache shared by KNN and TPV."""
+    stats = get_reference_cache_stats()
+    stats["tpv_pool_indexes"] = pool_index_stats()
+    return stats
+
+
+@router.post("/knn-rate-quote/cache/invalidate", tags=["KNN Quote Service"])
+async def knn_reference_cache_invalidate_endpoint(mcc: Optional[int] = None):
+    """
+    Drop cached reference frames so the next quote or TPV forecast reloads
+    them. Call after knn_transactions is re-seeded; pass ?mcc= to limit the scope.
+    """
+    return invalidate_reference_cache(mcc)
+
+
+@router.get("/executor/stats", tags=["ML Orchestration"])
+async def executor_stats_endpoint():
+    """Per-engine worker limits, queue depth and queue-wait / run-time counters."""
+    return executor_stats()
+
+
+@router.get("/artifacts/stats", tags=["ML Orchestration"])
+async def artifact_stats_endpoint():
+    """Manifest size, resident bundles, memory budget and load/eviction counters per forecast service."""
+    return all_store_stats()
+
+
+@router.get("/forecast-cache/stats", tags=["ML Orchestration"])
+async def forecast_cache_stats_endpoint():
+    """Entries, hit/miss and eviction/invalidation counters of the memoized cost and TPV forecasts."""
+    return all_result_cache_stats()
+
+
+@router.get("/profit-sample-bank/stats", tags=["ML Orchestration"])
+async def profit_sample_bank_stats_endpoint():
+    """Pre-generated base-sample matrices of variance-reduced profit forecasts, with their size and hit/miss counters."""
+    return get_sample_bank().stats()
+
+
+@router.get("/db/pool-stats", tags=["ML Orchestration"])
+async def db_pool_stats_endpoint():
+    """Connection-pool size, saturation and checkout-wait counters per database engine."""
+    return all_pool_stats()
+
+
 @router.get("/cost-forecast/health", tags=["Cost Forecast Service"])
 async def cost_forecast_health_endpoint():
     """Health check for the processing-cost forecast service."""
@@ -252,13 +343,14 @@ async def cost_forecast_health_endpoint():
 def _weekly_features_to_cost_request(body: dict) -> CostForecastRequest:
     """
     Convert old pipeline format (composite_weekly_features + onboarding rows)
-    to a CostForecastRequest.
+    to a CostForecastRequest.  composite_weekly_features may be in either the
+    row or the columnar getCompositeMerchant shape.
 
     The backend's MerchantQuoteService.run_ml_forecast_pipeline still sends
     the legacy SARIMA-era payload shape.  This function bridges the gap so
     the cost forecast service can serve those requests transparently.
     """
-    weekly_features = body.get("composite_weekly_features", [])
+    weekly_features = weekly_feature_rows(body.get("composite_weekly_features"))
     mcc = int(body.get("mcc", 5411))
 
     # Group weekly rows into (year, month) buckets
@@ -383,7 +475,7 @@ def _cost_forecast_fallback_from_weekly(body: dict) -> dict | None:
     inflated when the underlying proc_cost data includes aggregated fee
     layers).
     """
-    weekly_features = body.get("composite_weekly_features", [])
+    weekly_features = weekly_feature_rows(body.get("composite_weekly_features"))
     if not weekly_features:
         return None
 
@@ -487,6 +579,8 @@ async def get_cost_forecast_endpoint(request: Request):
 
         # Return monthly forecast directly (3 months, no weekly expansion)
         return cost_result
+    except EngineSaturatedError:
+        raise
     except Exception as exc:
         # If cost forecast is in degraded mode, fall back to KNN-neighbour-mean cost estimate
         if is_legacy:
@@ -514,7 +608,7 @@ def _weekly_features_to_tpv_request(body: dict) -> dict:
 
     Pool log-mean is derived from the context itself (no runtime KNN lookup).
     """
-    weekly_features = body.get("composite_weekly_features", [])
+    weekly_features = weekly_feature_rows(body.get("composite_weekly_features"))
     mcc = int(body.get("mcc", 5411))
 
     monthly_buckets: dict[tuple[int, int], list[dict]] = defaultdict(list)
@@ -572,7 +666,9 @@ async def get_tpv_forecast_endpoint(payload: TPVForecastRequest):
     extrapolation when artifacts are not yet trained.
     """
     try:
-        return run_tpv_forecast(payload)
+        return await run_engine("tpv", run_tpv_forecast, payload)
+    except EngineSaturatedError:
+        raise
     except Exception as exc:
         logger.exception("GetTPVForecast failed for mcc=%s: %s", payload.mcc, exc)
         raise HTTPException(status_code=400, detail=str(exc))
@@ -581,7 +677,9 @@ async def get_tpv_forecast_endpoint(payload: TPVForecastRequest):
 @router.post("/GetVolumeForecast", tags=["Volume Forecast Service"])
 async def get_volume_forecast_endpoint(payload: VolumeForecastRequest):
     try:
-        return run_volume_forecast(payload)
+        return await run_engine("volume", run_volume_forecast, payload)
+    except EngineSaturatedError:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=400, detail=str(exc))
 
@@ -596,6 +694,8 @@ async def get_profit_forecast_endpoint(payload: ProfitForecastRequest):
     with summary statistics (break-even rate, suggested fee, etc.).
     """
     try:
-        return run_profit_forecast(payload)
+        return await run_engine("profit", run_profit_forecast, payload)
+    except EngineSaturatedError:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=400, detail=str(exc))
@@ -72,6 +72,12 @@ def seed_knn_transactions(database_url: str | None = None) -> bool:
             .fillna(1)
             .astype(int)
         )
+        # Typed schema (see migrate_knn_schema.py): DATE column, lower-case card columns.
+        chunk["date"] = pd.to_datetime(chunk["date"], errors="coerce").dt.date
+        chunk = chunk.dropna(subset=["date"])
+        for col in ("card_brand", "card_type"):
+            if col in chunk.columns:
+                chunk[col] = chunk[col].astype("string").str.strip().str.lower()
         cols = [c for c in DB_COLS if c in chunk.columns]
         chunk[cols].to_sql(
             "knn_transactions",
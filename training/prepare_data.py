@@ -21,11 +21,17 @@ Usage:
   python prepare_data.py
   python prepare_data.py --input training/data/processed_transactions_4mcc.csv --output-dir training/data
   python prepare_data.py --mcc 5411
+  python prepare_data.py --feature-store-url postgresql://... --mcc 5411
+
+With --feature-store-url the monthly rows are read from the ml_service
+monthly feature store (knn_monthly_features, refreshed by
+ml_service/feature_store.py) instead of re-aggregating the raw CSV.
 """
 
 from __future__ import annotations
 
 import argparse
+import sys
 from pathlib import Path
 
 import numpy as np
@@ -37,6 +43,7 @@ import pandas as pd
 ROOT = Path(__file__).parent                         # Handoff/training/
 DEFAULT_INPUT = ROOT / "data" / "processed_transactions_4mcc.csv"
 DEFAULT_OUTPUT_DIR = ROOT / "data"
+ML_SERVICE_ROOT = ROOT.parent / "ml_service"
 COST_TYPE_REFERENCE_CSV = ROOT.parent / "cost_structure" / "cost_type_id.csv"
 
 
@@ -129,6 +136,20 @@ def _aggregate_to_monthly(txn_df: pd.DataFrame) -> pd.DataFrame:
     return monthly
 
 
+def _load_from_feature_store(database_url: str, mcc_list: list[int] | None) -> dict[int, pd.DataFrame]:
+    """Read monthly rows per MCC from the ml_service monthly feature store."""
+    sys.path.insert(0, str(ML_SERVICE_ROOT))
+    from feature_store import FEATURES_TABLE, load_training_frame
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(database_url)
+    if not mcc_list:
+        with engine.connect() as conn:
+            rows = conn.execute(text(f"SELECT DISTINCT mcc FROM {FEATURES_TABLE} ORDER BY mcc")).fetchall()
+        mcc_list = [int(r[0]) for r in rows]
+    return {mcc: load_training_frame(engine, mcc, COST_TYPE_IDS) for mcc in mcc_list}
+
+
 # ---------------------------------------------------------------------------
 # CLI
 # ---------------------------------------------------------------------------
@@ -155,24 +176,41 @@ def main() -> None:
         default=None,
         help="Process only this MCC code (default: all MCCs found in the file)",
     )
+    parser.add_argument(
+        "--feature-store-url",
+        default=None,
+        help="Database URL of the ml_service monthly feature store; when set, "
+             "monthly rows are read from it instead of aggregating --input",
+    )
     args = parser.parse_args()
 
-    input_path = Path(args.input)
     output_dir = Path(args.output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    print(f"Reading {input_path} ...")
-    txn_df = pd.read_csv(input_path)
-    print(f"  {len(txn_df):,} rows | MCCs present: {sorted(txn_df['mcc'].unique())}")
-
-    mcc_list = [args.mcc] if args.mcc else sorted(txn_df["mcc"].unique())
+    if args.feature_store_url:
+        print("Reading monthly rows from the feature store ...")
+        store_frames = _load_from_feature_store(args.feature_store_url, [args.mcc] if args.mcc else None)
+        mcc_list = sorted(store_frames)
+    else:
+        input_path = Path(args.input)
+        print(f"Reading {input_path} ...")
+        txn_df = pd.read_csv(input_path)
+        print(f"  {len(txn_df):,} rows | MCCs present: {sorted(txn_df['mcc'].unique())}")
+        mcc_list = [args.mcc] if args.mcc else sorted(txn_df["mcc"].unique())
 
     for mcc in mcc_list:
-        sub = txn_df[txn_df["mcc"] == mcc].copy()
-        n_merchants = sub["merchant_id"].nunique()
-        print(f"\n[MCC {mcc}] {len(sub):,} transactions | {n_merchants:,} merchants")
-
-        monthly = _aggregate_to_monthly(sub)
+        if args.feature_store_url:
+            monthly = store_frames[mcc]
+            print(f"\n[MCC {mcc}] read {len(monthly):,} monthly rows from feature store")
+            if monthly.empty:
+                print("  No rows — run ml_service/feature_store.py to refresh the store.")
+                continue
+        else:
+            sub = txn_df[txn_df["mcc"] == mcc].copy()
+            n_merchants = sub["merchant_id"].nunique()
+            print(f"\n[MCC {mcc}] {len(sub):,} transactions | {n_merchants:,} merchants")
+
+            monthly = _aggregate_to_monthly(sub)
 
         n_m_out = monthly["merchant_id"].nunique()
         yr_min = monthly["year"].min()
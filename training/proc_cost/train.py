@@ -30,8 +30,13 @@ Artifacts written per (mcc, ctx_len)
     risk_models.pkl         — List[GradientBoostingRegressor], length = HORIZON_LEN
     strat_knot_x.pkl        — np.ndarray (knot risk scores for interp),  only if strat enabled
     strat_q_vals.pkl        — np.ndarray (q90 values per knot),          only if strat enabled
+    bundle.bin              — all of the above as one memory-mappable file
+                              (ml_service/artifact_bundle.py); loaded by the service
     config_snapshot.json    — training metadata; mtime change triggers hot-reload
 
+<ARTIFACTS_BASE_PATH>/manifest.json is rewritten after each context length; it
+lists every trained bundle and is how ml_service discovers MCCs.
+
 Schedule (PoC)
 --------------
     0 2 1 * * cd /path/to/service && python train.py --mcc 5411 --data-path /data/5411_monthly_v2.csv
@@ -63,6 +68,10 @@ from sklearn.preprocessing import StandardScaler
 # Import pipeline constants from config.py in the same directory
 # ---------------------------------------------------------------------------
 sys.path.insert(0, str(Path(__file__).parent))
+# The single-file bundle format is defined next to the service that reads it.
+sys.path.append(str(Path(__file__).resolve().parents[2] / "ml_service"))
+from artifact_bundle import BUNDLE_FILE, pack_artifacts, write_bundle
+from artifact_store import write_manifest
 from config import (
     ARTIFACTS_BASE_PATH,
     COST_TYPE_COLS,
@@ -686,7 +695,20 @@ def _train_context_len(
         "n_model_features": 7,
         "n_risk_features": 9,
     }
+    # Single-file, memory-mapped form of the pickles above; the service loads
+    # this when present.  Written before config_snapshot.json, whose mtime
+    # triggers the hot-reload.
+    write_bundle(
+        artifact_dir / BUNDLE_FILE,
+        pack_artifacts(
+            scaler, models, risk_models, cal_residuals, global_q90,
+            strat_knot_x if strat_enabled else None,
+            strat_q_vals if strat_enabled else None,
+        ),
+        metadata=snapshot,
+    )
     _atomic_write(artifact_dir / "config_snapshot.json", lambda p: _jdump(snapshot, p))
+    write_manifest(ARTIFACTS_BASE_PATH)
 
     elapsed = time.monotonic() - t0
     print(f"  Artifacts saved to {artifact_dir}  [{elapsed:.1f}s]")